@@ -0,0 +1,168 @@
+"""Per-CLI admission control for clink subprocesses.
+
+Nothing used to limit how many CLI processes clink started at once, so
+several agents (or parallel subagents) calling clink together could fork
+dozens of Node processes and get rate-limited upstream. Each CLI client can
+now declare ``max_concurrency`` (processes running at once) and
+``max_queue`` (callers allowed to wait for a slot) in its JSON
+configuration. Waiting callers are admitted strictly in arrival order, and
+callers arriving at a full queue are rejected immediately with a "busy"
+error instead of piling up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+
+from clink.models import ResolvedCLIClient
+
+logger = logging.getLogger("clink.admission")
+
+
+class CLIBusyError(RuntimeError):
+    """Raised when a CLI is at its concurrency limit and its queue is full."""
+
+
+@dataclass
+class AdmissionStats:
+    """Queue-wait metrics for one CLI."""
+
+    admitted: int = 0
+    queued: int = 0
+    rejected: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def average_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.queued if self.queued else 0.0
+
+
+class CLIAdmission:
+    """FIFO semaphore with a bounded wait queue for one CLI client."""
+
+    def __init__(self, name: str, max_concurrency: int | None, max_queue: int | None) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.loop = asyncio.get_running_loop()
+        self.active = 0
+        self.stats = AdmissionStats()
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def slot(self, timeout: float | None = None) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block; yields the seconds spent queued."""
+        waited = await self._acquire(timeout)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    async def _acquire(self, timeout: float | None) -> float:
+        if self.max_concurrency is None or (self.active < self.max_concurrency and not self._waiters):
+            self.active += 1
+            self.stats.admitted += 1
+            return 0.0
+
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.stats.rejected += 1
+            logger.warning(
+                "CLI '%s' is busy: %d running (limit %d), %d queued (limit %d); rejecting request",
+                self.name,
+                self.active,
+                self.max_concurrency,
+                len(self._waiters),
+                self.max_queue,
+            )
+            raise CLIBusyError(
+                f"CLI '{self.name}' is busy: {self.active} requests running (max_concurrency="
+                f"{self.max_concurrency}) and {len(self._waiters)} waiting (max_queue={self.max_queue}). "
+                "Retry later or use a different CLI."
+            )
+
+        waiter: asyncio.Future[None] = self.loop.create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                self.stats.rejected += 1
+                raise CLIBusyError(
+                    f"CLI '{self.name}' is busy: no slot became free within {timeout:g} seconds "
+                    f"(max_concurrency={self.max_concurrency})."
+                ) from exc
+            raise
+
+        waited = time.monotonic() - started
+        self.stats.admitted += 1
+        self.stats.queued += 1
+        self.stats.total_wait_seconds += waited
+        self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, waited)
+        logger.debug("CLI '%s' request admitted after waiting %.2fs", self.name, waited)
+        return waited
+
+    def _release(self) -> None:
+        # Hand the slot straight to the oldest waiter so newcomers cannot overtake it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+_admissions: dict[str, CLIAdmission] = {}
+
+
+def get_admission(client: ResolvedCLIClient) -> CLIAdmission | None:
+    """Return the admission controller for a client, or None when it has no limit."""
+    if client.max_concurrency is None:
+        return None
+
+    key = client.name.lower()
+    loop = asyncio.get_running_loop()
+    admission = _admissions.get(key)
+    if admission is None or admission.loop is not loop:
+        admission = CLIAdmission(client.name, client.max_concurrency, client.max_queue)
+        _admissions[key] = admission
+    else:
+        # Follow registry reloads without losing track of requests already running
+        admission.max_concurrency = client.max_concurrency
+        admission.max_queue = client.max_queue
+    return admission
+
+
+def admission_stats() -> dict[str, dict[str, float | int]]:
+    """Queue-wait metrics and current occupancy per CLI."""
+    return {
+        admission.name: {
+            **asdict(admission.stats),
+            "average_wait_seconds": round(admission.stats.average_wait_seconds, 3),
+            "active": admission.active,
+            "waiting": admission.waiting,
+        }
+        for admission in _admissions.values()
+    }
+
+
+def reset_admissions() -> None:
+    """Forget all controllers (mainly for tests)."""
+    _admissions.clear()
@@ -13,9 +13,19 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 
+from clink.admission import CLIBusyError, get_admission
 from clink.constants import DEFAULT_STREAM_LIMIT
 from clink.models import ResolvedCLIClient, ResolvedCLIRole
-from clink.parsers import BaseParser, ParsedCLIResponse, ParserError, get_parser
+from clink.parsers import BaseParser, ParsedCLIResponse, ParserError, ParserStream, get_parser
+from clink.streaming import ProgressCallback, capture_output
+from clink.worker_pool import (
+    CLIWorkerPool,
+    SpawnFactory,
+    WorkerPoolError,
+    WorkerProcess,
+    get_worker_pool,
+    refill_worker_pools,
+)
 
 logger = logging.getLogger("clink.agent")
 
@@ -32,6 +42,7 @@ class AgentOutput:
     duration_seconds: float
     parser_name: str
     output_file_content: str | None = None
+    queue_wait_seconds: float = 0.0
 
 
 class CLIAgentError(RuntimeError):
@@ -60,7 +71,15 @@ class BaseCLIAgent:
         system_prompt: str | None = None,
         files: Sequence[str],
         images: Sequence[str],
+        output_limit: int | None = None,
+        on_progress: ProgressCallback | None = None,
     ) -> AgentOutput:
+        """Run the CLI for one prompt.
+
+        ``output_limit`` caps how much response content line-oriented parsers
+        keep in memory while streaming; ``on_progress`` receives short notes
+        (for example "turn completed") as the CLI produces output.
+        """
         # Files and images are already embedded into the prompt by the tool; they are
         # accepted here only to keep parity with SimpleTool callers.
         _ = (files, images)
@@ -78,56 +97,74 @@ class BaseCLIAgent:
             )
         command[0] = resolved_executable
 
-        sanitized_command = list(command)
+        admission = get_admission(self.client)
+        timeout = self.client.timeout_seconds
+        if admission is None:
+            return await self._execute(
+                command, env, prompt, timeout=timeout, output_limit=output_limit, on_progress=on_progress
+            )
 
+        try:
+            # timeout_seconds bounds the whole call: time spent queued is deducted from the run
+            async with admission.slot(timeout=timeout) as queue_wait:
+                result = await self._execute(
+                    command,
+                    env,
+                    prompt,
+                    timeout=max(timeout - queue_wait, 0.001),
+                    output_limit=output_limit,
+                    on_progress=on_progress,
+                )
+        except CLIBusyError as exc:
+            raise CLIAgentError(str(exc)) from exc
+        finally:
+            # The freed slot may be taken by a warm process again
+            refill_worker_pools(self.client)
+        result.queue_wait_seconds = queue_wait
+        return result
+
+    async def _execute(
+        self,
+        command: list[str],
+        env: dict[str, str],
+        prompt: str,
+        *,
+        timeout: float,
+        output_limit: int | None,
+        on_progress: ProgressCallback | None,
+    ) -> AgentOutput:
         cwd = str(self.client.working_dir) if self.client.working_dir else None
-        limit = DEFAULT_STREAM_LIMIT
-
-        stdout_text = ""
-        stderr_text = ""
-        output_file_content: str | None = None
         start_time = time.monotonic()
 
-        output_file_path: Path | None = None
-        command_with_output_flag = list(command)
-
-        if self.client.output_to_file:
-            fd, tmp_path = tempfile.mkstemp(prefix="clink-", suffix=".json")
-            os.close(fd)
-            output_file_path = Path(tmp_path)
-            flag_template = self.client.output_to_file.flag_template
-            try:
-                rendered_flag = flag_template.format(path=str(output_file_path))
-            except KeyError as exc:  # pragma: no cover - defensive
-                raise CLIAgentError(f"Invalid output flag template '{flag_template}': missing placeholder {exc}")
-            command_with_output_flag.extend(shlex.split(rendered_flag))
-            sanitized_command = list(command_with_output_flag)
+        pool = get_worker_pool(self.client, command, self._worker_spawner(command, cwd=cwd, env=env))
+        if pool is not None and pool.persistent:
+            return await self._run_on_worker(pool, command, prompt, start_time, timeout)
+
+        if pool is not None:
+            worker = await pool.acquire()
+            process = worker.process
+            command_with_output_flag = worker.command
+            output_file_path = worker.output_file_path
+        else:
+            command_with_output_flag, output_file_path = self._with_output_file(command)
+        sanitized_command = list(command_with_output_flag)
 
         self._logger.debug("Executing CLI command: %s", " ".join(sanitized_command))
         if cwd:
             self._logger.debug("Working directory: %s", cwd)
 
-        try:
-            process = await asyncio.create_subprocess_exec(
-                *command_with_output_flag,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd,
-                limit=limit,
-                env=env,
-            )
-        except FileNotFoundError as exc:
-            raise CLIAgentError(f"Executable not found for CLI '{self.client.name}': {exc}") from exc
+        if pool is None:
+            process = await self._spawn_process(command_with_output_flag, cwd=cwd, env=env)
 
+        stream = self._parser.stream(output_limit)
         try:
-            stdout_bytes, stderr_bytes = await asyncio.wait_for(
-                process.communicate(prompt.encode("utf-8")),
-                timeout=self.client.timeout_seconds,
+            captured = await asyncio.wait_for(
+                capture_output(process, prompt, stream, on_progress=on_progress),
+                timeout=timeout,
             )
         except asyncio.TimeoutError as exc:
             process.kill()
-            await process.communicate()
+            await process.wait()
             raise CLIAgentError(
                 f"CLI '{self.client.name}' timed out after {self.client.timeout_seconds} seconds",
                 returncode=None,
@@ -135,8 +172,9 @@ class BaseCLIAgent:
 
         duration = time.monotonic() - start_time
         return_code = process.returncode
-        stdout_text = stdout_bytes.decode("utf-8", errors="replace")
-        stderr_text = stderr_bytes.decode("utf-8", errors="replace")
+        stdout_text = captured.stdout
+        stderr_text = captured.stderr
+        output_file_content: str | None = None
 
         if output_file_path and output_file_path.exists():
             output_file_content = output_file_path.read_text(encoding="utf-8", errors="replace")
@@ -149,45 +187,158 @@ class BaseCLIAgent:
             if output_file_content and not stdout_text.strip():
                 stdout_text = output_file_content
 
-        if return_code != 0:
+        return self._finalize_output(
+            returncode=return_code,
+            stdout=stdout_text,
+            stderr=stderr_text,
+            sanitized_command=sanitized_command,
+            duration_seconds=duration,
+            output_file_content=output_file_content,
+            stream=stream,
+        )
+
+    def _finalize_output(
+        self,
+        *,
+        returncode: int,
+        stdout: str,
+        stderr: str,
+        sanitized_command: list[str],
+        duration_seconds: float,
+        output_file_content: str | None,
+        stream: ParserStream | None = None,
+    ) -> AgentOutput:
+        if stream is None:
+            stream = self._parser.stream()
+        try:
+            parsed: ParsedCLIResponse | None = stream.finish(stdout, stderr)
+            parse_error: ParserError | None = None
+        except ParserError as exc:
+            parsed, parse_error = None, exc
+
+        if returncode != 0:
             recovered = self._recover_from_error(
-                returncode=return_code,
-                stdout=stdout_text,
-                stderr=stderr_text,
+                returncode=returncode,
+                stdout=stdout,
+                stderr=stderr,
                 sanitized_command=sanitized_command,
-                duration_seconds=duration,
+                duration_seconds=duration_seconds,
                 output_file_content=output_file_content,
+                parsed=parsed,
             )
             if recovered is not None:
                 return recovered
 
-        if return_code != 0:
             raise CLIAgentError(
-                f"CLI '{self.client.name}' exited with status {return_code}",
-                returncode=return_code,
-                stdout=stdout_text,
-                stderr=stderr_text,
+                f"CLI '{self.client.name}' exited with status {returncode}",
+                returncode=returncode,
+                stdout=stdout,
+                stderr=stderr,
             )
 
-        try:
-            parsed = self._parser.parse(stdout_text, stderr_text)
-        except ParserError as exc:
+        if parsed is None:
             raise CLIAgentError(
-                f"Failed to parse output from CLI '{self.client.name}': {exc}",
-                returncode=return_code,
-                stdout=stdout_text,
-                stderr=stderr_text,
-            ) from exc
+                f"Failed to parse output from CLI '{self.client.name}': {parse_error}",
+                returncode=returncode,
+                stdout=stdout,
+                stderr=stderr,
+            ) from parse_error
 
         return AgentOutput(
             parsed=parsed,
             sanitized_command=sanitized_command,
+            returncode=returncode,
+            stdout=stdout,
+            stderr=stderr,
+            duration_seconds=duration_seconds,
+            parser_name=self._parser.name,
+            output_file_content=output_file_content,
+        )
+
+    # ------------------------------------------------------------------
+    # Process helpers
+    # ------------------------------------------------------------------
+
+    def _with_output_file(self, command: list[str]) -> tuple[list[str], Path | None]:
+        """Append the output-file flag (when configured) pointing at a fresh temp file."""
+        if not self.client.output_to_file:
+            return list(command), None
+
+        fd, tmp_path = tempfile.mkstemp(prefix="clink-", suffix=".json")
+        os.close(fd)
+        output_file_path = Path(tmp_path)
+        flag_template = self.client.output_to_file.flag_template
+        try:
+            rendered_flag = flag_template.format(path=str(output_file_path))
+        except KeyError as exc:  # pragma: no cover - defensive
+            raise CLIAgentError(f"Invalid output flag template '{flag_template}': missing placeholder {exc}")
+        return [*command, *shlex.split(rendered_flag)], output_file_path
+
+    async def _spawn_process(
+        self,
+        command: list[str],
+        *,
+        cwd: str | None,
+        env: dict[str, str],
+        stderr: int = asyncio.subprocess.PIPE,
+    ) -> asyncio.subprocess.Process:
+        try:
+            return await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=stderr,
+                cwd=cwd,
+                limit=DEFAULT_STREAM_LIMIT,
+                env=env,
+            )
+        except FileNotFoundError as exc:
+            raise CLIAgentError(f"Executable not found for CLI '{self.client.name}': {exc}") from exc
+
+    def _worker_command(self, command: list[str]) -> list[str]:
+        worker = self.client.worker
+        return [*command, *worker.args] if worker else list(command)
+
+    def _worker_spawner(self, command: list[str], *, cwd: str | None, env: dict[str, str]) -> SpawnFactory:
+        """Build the factory a worker pool uses to start processes for this command."""
+
+        async def spawn() -> WorkerProcess:
+            worker = self.client.worker
+            if worker and worker.mode == "jsonl":
+                # stderr is not drained between requests, so it must not be a pipe
+                worker_command = self._worker_command(command)
+                process = await self._spawn_process(worker_command, cwd=cwd, env=env, stderr=asyncio.subprocess.DEVNULL)
+                return WorkerProcess(process=process, command=worker_command)
+
+            command_with_output_flag, output_file_path = self._with_output_file(command)
+            process = await self._spawn_process(command_with_output_flag, cwd=cwd, env=env)
+            return WorkerProcess(process=process, command=command_with_output_flag, output_file_path=output_file_path)
+
+        return spawn
+
+    async def _run_on_worker(
+        self, pool: CLIWorkerPool, command: list[str], prompt: str, start_time: float, timeout: float
+    ) -> AgentOutput:
+        """Serve the prompt from a long-running (jsonl) worker."""
+        sanitized_command = self._worker_command(command)
+        self._logger.debug("Sending prompt to pooled CLI worker: %s", " ".join(sanitized_command))
+        try:
+            stdout_text, stderr_text, return_code = await pool.request(prompt, timeout=timeout)
+        except asyncio.TimeoutError as exc:
+            raise CLIAgentError(
+                f"CLI '{self.client.name}' timed out after {self.client.timeout_seconds} seconds",
+                returncode=None,
+            ) from exc
+        except WorkerPoolError as exc:
+            raise CLIAgentError(f"CLI '{self.client.name}' worker failed: {exc}") from exc
+
+        return self._finalize_output(
             returncode=return_code,
             stdout=stdout_text,
             stderr=stderr_text,
-            duration_seconds=duration,
-            parser_name=self._parser.name,
-            output_file_content=output_file_content,
+            sanitized_command=sanitized_command,
+            duration_seconds=time.monotonic() - start_time,
+            output_file_content=None,
         )
 
     def _build_command(self, *, role: ResolvedCLIRole, system_prompt: str | None) -> list[str]:
@@ -216,11 +367,13 @@ class BaseCLIAgent:
         sanitized_command: list[str],
         duration_seconds: float,
         output_file_content: str | None,
+        parsed: ParsedCLIResponse | None = None,
     ) -> AgentOutput | None:
         """Hook for subclasses to convert CLI errors into successful outputs.
 
-        Return an AgentOutput to treat the failure as success, or None to signal
-        that normal error handling should proceed.
+        ``parsed`` is the streamed parse of the output (None when it could not
+        be parsed). Return an AgentOutput to treat the failure as success, or
+        None to signal that normal error handling should proceed.
         """
 
         return None
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from clink.models import ResolvedCLIRole
-from clink.parsers.base import ParserError
+from clink.parsers.base import ParsedCLIResponse
 
 from .base import AgentOutput, BaseCLIAgent
 
@@ -31,10 +31,9 @@ class ClaudeAgent(BaseCLIAgent):
         sanitized_command: list[str],
         duration_seconds: float,
         output_file_content: str | None,
+        parsed: ParsedCLIResponse | None = None,
     ) -> AgentOutput | None:
-        try:
-            parsed = self._parser.parse(stdout, stderr)
-        except ParserError:
+        if parsed is None:
             return None
 
         return AgentOutput(
@@ -26,6 +26,7 @@ class GeminiAgent(BaseCLIAgent):
         sanitized_command: list[str],
         duration_seconds: float,
         output_file_content: str | None,
+        parsed: ParsedCLIResponse | None = None,
     ) -> AgentOutput | None:
         combined = "\n".join(part for part in (stderr, stdout) if part)
         if not combined:
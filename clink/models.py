@@ -3,9 +3,9 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field, PositiveInt, field_validator
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt, field_validator, model_validator
 
 
 class OutputCaptureConfig(BaseModel):
@@ -18,6 +18,55 @@ class OutputCaptureConfig(BaseModel):
     )
 
 
+class CLIWorkerConfig(BaseModel):
+    """Optional warm worker pool that hides CLI boot time."""
+
+    enabled: bool = Field(default=False, description="Keep pre-spawned CLI processes ready for new requests.")
+    mode: Literal["prespawn", "jsonl"] = Field(
+        default="prespawn",
+        description=(
+            "'prespawn' starts the normal one-shot command ahead of time and hands it the prompt on stdin; "
+            "'jsonl' keeps a long-running process that answers one JSON request per line. No bundled CLI "
+            "speaks that protocol, so it needs a wrapper command that does, started in server mode via `args`."
+        ),
+    )
+    pool_size: PositiveInt = Field(default=1, description="Number of warm processes kept per command.")
+    max_requests: PositiveInt = Field(
+        default=50,
+        description="Recycle a long-running (jsonl) worker after serving this many requests.",
+    )
+    max_idle_seconds: PositiveInt = Field(
+        default=600,
+        description="Replace warm processes that have been idle longer than this (stale auth/config).",
+    )
+    args: list[str] = Field(
+        default_factory=list,
+        description="Extra arguments appended to the command when running in jsonl mode (required for jsonl).",
+    )
+
+    @field_validator("args", mode="before")
+    @classmethod
+    def _ensure_list(cls, value: Any) -> list[str]:
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [str(item) for item in value]
+        if isinstance(value, str):
+            return [value]
+        raise TypeError("args must be a list of strings or a single string")
+
+    @model_validator(mode="after")
+    def _require_jsonl_args(self) -> CLIWorkerConfig:
+        # The plain command runs one prompt and exits; without arguments that start a
+        # jsonl server it would sit on stdin and every request would time out
+        if self.enabled and self.mode == "jsonl" and not self.args:
+            raise ValueError(
+                "worker mode 'jsonl' needs 'args' that start the command as a jsonl worker server; no bundled "
+                "CLI speaks that protocol, so use a wrapper command or mode 'prespawn'"
+            )
+        return self
+
+
 class CLIRoleConfig(BaseModel):
     """Role-specific configuration loaded from JSON manifests."""
 
@@ -49,8 +98,17 @@ class CLIClientConfig(BaseModel):
     additional_args: list[str] = Field(default_factory=list)
     env: dict[str, str] = Field(default_factory=dict)
     timeout_seconds: PositiveInt | None = Field(default=None)
+    max_concurrency: PositiveInt | None = Field(
+        default=None,
+        description="Maximum number of processes of this CLI running at once (unlimited when omitted).",
+    )
+    max_queue: NonNegativeInt | None = Field(
+        default=None,
+        description="Requests allowed to wait for a free slot; further requests fail fast as busy.",
+    )
     roles: dict[str, CLIRoleConfig] = Field(default_factory=dict)
     output_to_file: OutputCaptureConfig | None = None
+    worker: CLIWorkerConfig | None = None
 
     @field_validator("additional_args", mode="before")
     @classmethod
@@ -83,10 +141,13 @@ class ResolvedCLIClient(BaseModel):
     config_args: list[str] = Field(default_factory=list)
     env: dict[str, str] = Field(default_factory=dict)
     timeout_seconds: int
+    max_concurrency: int | None = None
+    max_queue: int | None = None
     parser: str
     runner: str | None = None
     roles: dict[str, ResolvedCLIRole]
     output_to_file: OutputCaptureConfig | None = None
+    worker: CLIWorkerConfig | None = None
 
     def list_roles(self) -> list[str]:
         return list(self.roles.keys())
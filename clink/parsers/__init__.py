@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from .base import BaseParser, ParsedCLIResponse, ParserError
+from .base import BaseParser, ParsedCLIResponse, ParserError, ParserStream
 from .claude import ClaudeJSONParser
 from .codex import CodexJSONLParser
 from .gemini import GeminiJSONParser
@@ -26,5 +26,6 @@ __all__ = [
     "BaseParser",
     "ParsedCLIResponse",
     "ParserError",
+    "ParserStream",
     "get_parser",
 ]
@@ -18,6 +18,39 @@ class ParserError(RuntimeError):
     """Raised when CLI output cannot be parsed into a structured response."""
 
 
+class ParserStream:
+    """Incremental view of a parser that is fed stdout one line at a time.
+
+    The default stream suits parsers that need the complete document (a single
+    JSON object): it only watches for a finished ``<SUMMARY>`` block and parses
+    the captured stdout in :meth:`finish`. Line-oriented parsers override
+    :meth:`_consume` and :meth:`finish` and set ``needs_raw_output`` to False so
+    the agent does not have to keep the raw stdout in memory.
+    """
+
+    needs_raw_output: bool = True
+
+    def __init__(self, parser: BaseParser, output_limit: int | None = None) -> None:
+        self.parser = parser
+        self.output_limit = output_limit
+        self.lines_fed = 0
+        self.summary_seen = False
+
+    def feed(self, line: str) -> str | None:
+        """Consume one stdout line and return a short progress note, if any."""
+        self.lines_fed += 1
+        return self._consume(line)
+
+    def _consume(self, line: str) -> str | None:
+        if not self.summary_seen and "</summary>" in line.lower():
+            self.summary_seen = True
+            return "summary received"
+        return None
+
+    def finish(self, stdout: str, stderr: str) -> ParsedCLIResponse:
+        return self.parser.parse(stdout, stderr)
+
+
 class BaseParser:
     """Base interface for CLI output parsers."""
 
@@ -25,3 +58,7 @@ class BaseParser:
 
     def parse(self, stdout: str, stderr: str) -> ParsedCLIResponse:
         raise NotImplementedError("Parsers must implement parse()")
+
+    def stream(self, output_limit: int | None = None) -> ParserStream:
+        """Return an incremental parser; ``output_limit`` caps the content kept in memory."""
+        return ParserStream(self, output_limit)
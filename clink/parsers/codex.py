@@ -5,59 +5,140 @@ from __future__ import annotations
 import json
 from typing import Any
 
-from .base import BaseParser, ParsedCLIResponse, ParserError
+from clink.constants import SUMMARY_PATTERN
 
+from .base import BaseParser, ParsedCLIResponse, ParserError, ParserStream
 
-class CodexJSONLParser(BaseParser):
-    """Parse stdout emitted by `codex exec --json`."""
+# Raw events are kept for metadata only up to this many characters of JSONL;
+# command executions can print far more than the agent messages themselves
+MAX_EVENT_CHARS = 256 * 1024
 
-    name = "codex_jsonl"
 
-    def parse(self, stdout: str, stderr: str) -> ParsedCLIResponse:
-        lines = [line.strip() for line in (stdout or "").splitlines() if line.strip()]
-        events: list[dict[str, Any]] = []
-        agent_messages: list[str] = []
-        errors: list[str] = []
-        usage: dict[str, Any] | None = None
-
-        for line in lines:
-            if not line.startswith("{"):
-                continue
-            try:
-                event = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            events.append(event)
-            event_type = event.get("type")
-            if event_type == "item.completed":
-                item = event.get("item") or {}
-                if item.get("type") == "agent_message":
-                    text = item.get("text")
-                    if isinstance(text, str) and text.strip():
-                        agent_messages.append(text.strip())
-            elif event_type == "error":
-                message = event.get("message")
-                if isinstance(message, str) and message.strip():
-                    errors.append(message.strip())
-            elif event_type == "turn.completed":
-                turn_usage = event.get("usage")
-                if isinstance(turn_usage, dict):
-                    usage = turn_usage
-
-        if not agent_messages and errors:
-            agent_messages.extend(errors)
-
-        if not agent_messages:
+class CodexJSONLStream(ParserStream):
+    """Consume `codex exec --json` events as they are printed.
+
+    Agent messages are kept only up to ``output_limit`` characters; anything
+    beyond is counted but dropped, and a ``<SUMMARY>`` block seen in a dropped
+    message is carried over so the tool can still compress the response. Raw
+    events are kept for metadata up to ``MAX_EVENT_CHARS`` regardless of the
+    output limit.
+    """
+
+    needs_raw_output = False
+
+    def __init__(self, parser: BaseParser, output_limit: int | None = None) -> None:
+        super().__init__(parser, output_limit)
+        self.events: list[dict[str, Any]] = []
+        self.event_chars = 0
+        self.events_truncated = False
+        self.agent_messages: list[str] = []
+        self.errors: list[str] = []
+        self.usage: dict[str, Any] | None = None
+        self.summary: str | None = None
+        self.content_length = 0
+        self.kept_length = 0
+        self.content_overflow = False
+
+    def _consume(self, line: str) -> str | None:
+        line = line.strip()
+        if not line.startswith("{"):
+            return None
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(event, dict):
+            return None
+
+        if not self.events_truncated:
+            if self.event_chars + len(line) <= MAX_EVENT_CHARS:
+                self.events.append(event)
+                self.event_chars += len(line)
+            else:
+                self.events_truncated = True
+
+        event_type = event.get("type")
+        if event_type == "item.completed":
+            item = event.get("item") or {}
+            item_type = item.get("type")
+            if item_type == "agent_message":
+                text = item.get("text")
+                if isinstance(text, str) and text.strip():
+                    self._add_message(text.strip())
+                    return "summary received" if self.summary else "agent message received"
+            return f"{item_type or 'item'} completed"
+        if event_type == "error":
+            message = event.get("message")
+            if isinstance(message, str) and message.strip():
+                self.errors.append(message.strip())
+                return f"error: {message.strip()[:200]}"
+        elif event_type == "turn.completed":
+            turn_usage = event.get("usage")
+            if isinstance(turn_usage, dict):
+                self.usage = turn_usage
+            return "turn completed"
+        return None
+
+    def _add_message(self, text: str) -> None:
+        separator = 2 if self.agent_messages or self.content_length else 0
+        self.content_length += separator + len(text)
+
+        match = SUMMARY_PATTERN.search(text)
+        if match and match.group(1).strip():
+            self.summary = match.group(1).strip()
+
+        if self.content_overflow:
+            return
+        if self.output_limit is None or self.kept_length + separator + len(text) <= self.output_limit:
+            self.agent_messages.append(text)
+            self.kept_length += separator + len(text)
+            return
+
+        room = self.output_limit - self.kept_length - separator
+        if room > 0:
+            self.agent_messages.append(text[:room])
+        self.kept_length = self.output_limit
+        self.content_overflow = True
+
+    def finish(self, stdout: str, stderr: str) -> ParsedCLIResponse:
+        if not self.lines_fed and stdout:
+            # Output arrived through a file rather than the stdout stream
+            for line in stdout.splitlines():
+                self.feed(line)
+
+        messages = self.agent_messages or self.errors
+        if not messages:
             raise ParserError("Codex CLI JSONL output did not include an agent_message item")
 
-        content = "\n\n".join(agent_messages).strip()
-        metadata: dict[str, Any] = {"events": events}
-        if errors:
-            metadata["errors"] = errors
-        if usage:
-            metadata["usage"] = usage
+        content = "\n\n".join(messages).strip()
+        if self.content_overflow and self.summary and self.summary not in content:
+            content = f"{content}\n\n<SUMMARY>{self.summary}</SUMMARY>"
+
+        metadata: dict[str, Any] = {"events": self.events}
+        if self.errors:
+            metadata["errors"] = self.errors
+        if self.usage:
+            metadata["usage"] = self.usage
+        if self.content_overflow:
+            metadata["output_streamed_length"] = self.content_length
+        if self.events_truncated:
+            metadata["events_truncated"] = True
         if stderr and stderr.strip():
             metadata["stderr"] = stderr.strip()
 
         return ParsedCLIResponse(content=content, metadata=metadata)
+
+
+class CodexJSONLParser(BaseParser):
+    """Parse stdout emitted by `codex exec --json`."""
+
+    name = "codex_jsonl"
+
+    def parse(self, stdout: str, stderr: str) -> ParsedCLIResponse:
+        stream = self.stream()
+        for line in (stdout or "").splitlines():
+            stream.feed(line)
+        return stream.finish(stdout, stderr)
+
+    def stream(self, output_limit: int | None = None) -> CodexJSONLStream:
+        return CodexJSONLStream(self, output_limit)
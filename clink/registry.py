@@ -164,10 +164,13 @@ class ClinkRegistry:
             config_args=config_args,
             env=env,
             timeout_seconds=int(timeout_seconds),
+            max_concurrency=raw.max_concurrency,
+            max_queue=raw.max_queue,
             parser=parser_name,
             runner=runner_name,
             roles=roles,
             output_to_file=output_to_file,
+            worker=raw.worker,
             working_dir=working_dir,
         )
 
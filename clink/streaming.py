@@ -0,0 +1,205 @@
+"""Bounded, incremental capture of CLI output for clink agents.
+
+``process.communicate()`` buffered the complete stdout and stderr of a CLI
+before anything was parsed, and the tool only cut the response down to
+``MAX_RESPONSE_CHARS`` afterwards, so a runaway CLI could pile up hundreds of
+megabytes first. Output is now read in chunks while the CLI runs:
+
+- stdout is split into lines and fed to the parser's incremental stream,
+  which keeps only what the response can use and spots ``<SUMMARY>`` blocks
+  as soon as they are printed
+- raw stdout is retained up to PAL_CLINK_MAX_CAPTURE_MB (default 16) for
+  parsers that need the whole document, and only a small prefix for
+  line-oriented parsers; stderr keeps a fixed-size prefix
+- progress notes produced by the stream can be forwarded to the MCP client
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from clink.constants import DEFAULT_STREAM_LIMIT
+from clink.parsers import ParserStream
+from utils.env import get_env
+
+logger = logging.getLogger("clink.streaming")
+
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+DEFAULT_MAX_CAPTURE_MB = 16
+# Raw stdout kept for error reporting when the parser consumes lines itself
+UNPARSED_STDOUT_BYTES = 256 * 1024
+STDERR_CAPTURE_BYTES = 256 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+def get_max_capture_bytes() -> int:
+    """Raw stdout retained for parsers that need the complete document."""
+    raw = get_env("PAL_CLINK_MAX_CAPTURE_MB", str(DEFAULT_MAX_CAPTURE_MB)) or str(DEFAULT_MAX_CAPTURE_MB)
+    try:
+        megabytes = float(raw)
+    except ValueError:
+        logger.warning("Invalid PAL_CLINK_MAX_CAPTURE_MB=%r; using %d", raw, DEFAULT_MAX_CAPTURE_MB)
+        megabytes = DEFAULT_MAX_CAPTURE_MB
+    return max(1, int(megabytes * 1024 * 1024))
+
+
+@dataclass
+class CapturedOutput:
+    """What was retained from a CLI run."""
+
+    stdout: str
+    stderr: str
+    stdout_bytes: int
+    stdout_truncated: bool
+    stderr_truncated: bool
+
+
+class _BoundedBuffer:
+    """Keep the first ``limit`` bytes of a stream and count the rest."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.parts: list[bytes] = []
+        self.size = 0
+        self.total = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.size
+
+    def append(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.limit - self.size
+        if room <= 0:
+            return
+        chunk = data[:room]
+        self.parts.append(chunk)
+        self.size += len(chunk)
+
+    def text(self) -> str:
+        return b"".join(self.parts).decode("utf-8", errors="replace")
+
+
+class _ProgressThrottle:
+    def __init__(self, callback: ProgressCallback | None) -> None:
+        self.callback = callback
+        self.last_sent = 0.0
+
+    async def __call__(self, note: str | None, *, force: bool = False) -> None:
+        if self.callback is None or not note:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_sent < PROGRESS_INTERVAL_SECONDS:
+            return
+        self.last_sent = now
+        try:
+            await self.callback(note)
+        except Exception:  # pragma: no cover - progress is best effort
+            logger.debug("Failed to forward clink progress", exc_info=True)
+
+
+async def _write_stdin(process: asyncio.subprocess.Process, data: bytes) -> None:
+    if process.stdin is None:
+        return
+    try:
+        process.stdin.write(data)
+        await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The CLI exited (or closed stdin) without reading the whole prompt
+        pass
+    finally:
+        process.stdin.close()
+
+
+async def _read_stdout(
+    reader: asyncio.StreamReader,
+    stream: ParserStream,
+    raw: _BoundedBuffer,
+    progress: _ProgressThrottle,
+) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    discarding = False
+
+    async def feed(line: str) -> None:
+        note = stream.feed(line.rstrip("\r"))
+        # Summaries are worth reporting even when the throttle would skip them
+        await progress(note, force=note == "summary received")
+
+    while True:
+        chunk = await reader.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        raw.append(chunk)
+
+        lines = (pending + decoder.decode(chunk)).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            if discarding:
+                # Tail of an oversized line
+                discarding = False
+                continue
+            await feed(line)
+
+        if len(pending) > DEFAULT_STREAM_LIMIT:
+            logger.warning("Dropping CLI output line longer than %d characters", DEFAULT_STREAM_LIMIT)
+            pending = ""
+            discarding = True
+
+    pending += decoder.decode(b"", final=True)
+    if pending and not discarding:
+        await feed(pending)
+
+
+async def _read_stderr(reader: asyncio.StreamReader, buffer: _BoundedBuffer) -> None:
+    while True:
+        chunk = await reader.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        buffer.append(chunk)
+
+
+async def capture_output(
+    process: asyncio.subprocess.Process,
+    prompt: str,
+    stream: ParserStream,
+    *,
+    on_progress: ProgressCallback | None = None,
+) -> CapturedOutput:
+    """Write the prompt, stream stdout/stderr through the parser and wait for exit.
+
+    Cancelling the coroutine (for example from ``asyncio.wait_for``) stops the
+    readers; the caller is responsible for killing the process.
+    """
+    stdout_buffer = _BoundedBuffer(get_max_capture_bytes() if stream.needs_raw_output else UNPARSED_STDOUT_BYTES)
+    stderr_buffer = _BoundedBuffer(STDERR_CAPTURE_BYTES)
+    progress = _ProgressThrottle(on_progress)
+
+    tasks = [_write_stdin(process, prompt.encode("utf-8"))]
+    if process.stdout is not None:
+        tasks.append(_read_stdout(process.stdout, stream, stdout_buffer, progress))
+    if process.stderr is not None:
+        tasks.append(_read_stderr(process.stderr, stderr_buffer))
+    await asyncio.gather(*tasks)
+    await process.wait()
+
+    if stdout_buffer.truncated:
+        logger.info(
+            "CLI stdout exceeded the %d byte capture buffer (%d bytes total); kept the parsed stream only",
+            stdout_buffer.limit,
+            stdout_buffer.total,
+        )
+    return CapturedOutput(
+        stdout=stdout_buffer.text(),
+        stderr=stderr_buffer.text(),
+        stdout_bytes=stdout_buffer.total,
+        stdout_truncated=stdout_buffer.truncated,
+        stderr_truncated=stderr_buffer.truncated,
+    )
@@ -0,0 +1,505 @@
+"""Warm worker pools that hide CLI boot time for clink agents.
+
+Every clink call used to start a fresh CLI process and pay its full boot
+time (Node startup, auth and config loading) before any work happened. A
+pool keeps processes ready ahead of the request:
+
+- ``prespawn`` mode starts the regular one-shot command early. The process
+  boots and then blocks reading stdin until a prompt arrives. Each process
+  serves exactly one request and the pool refills itself in the background.
+- ``jsonl`` mode keeps long-running processes that read one JSON request per
+  line (``{"id": ..., "prompt": ...}``) and answer with one JSON line
+  (``{"id": ..., "stdout": ..., "stderr": ..., "returncode": ...}``). Workers
+  that sat idle are health-checked with ``{"id": ..., "type": "ping"}``,
+  recycled after ``max_requests`` and respawned when they crash. This is a
+  protocol of our own: none of the bundled CLIs speak it, so this mode needs
+  a wrapper command and the ``args`` that start it as a server.
+
+Warm processes count against the CLI's ``max_concurrency``: a pool only keeps
+as many ready as there are admission slots not already running a request, so
+running and warm processes together never exceed the limit.
+
+Workers idle for longer than ``max_idle_seconds`` are discarded in the
+background, and a pool that no longer owns any process is dropped, so warm
+processes for rarely used roles do not live until the server exits.
+
+Pools are opt-in per CLI via the ``worker`` block of its JSON configuration.
+Set PAL_CLINK_WORKERS=false to disable them regardless of configuration.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from clink.admission import CLIAdmission, get_admission
+from clink.models import CLIWorkerConfig, ResolvedCLIClient
+from utils.env import get_env_bool
+
+logger = logging.getLogger("clink.workers")
+
+# Idle jsonl workers are pinged before reuse once they have been idle this long
+HEALTH_CHECK_AFTER_IDLE_SECONDS = 30
+HEALTH_CHECK_TIMEOUT_SECONDS = 10
+
+
+class WorkerPoolError(RuntimeError):
+    """Raised when a pooled worker cannot serve a request."""
+
+
+@dataclass(eq=False)
+class WorkerProcess:
+    """A spawned CLI process owned by a pool."""
+
+    process: asyncio.subprocess.Process
+    command: list[str]
+    output_file_path: Path | None = None
+    requests_served: int = 0
+    idle_since: float = field(default_factory=time.monotonic)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    def discard(self) -> None:
+        """Kill the process (if still running) and remove its output file."""
+        if self.alive:
+            try:
+                self.process.kill()
+            except (OSError, RuntimeError):  # pragma: no cover - already gone or loop closed
+                pass
+        if self.output_file_path:
+            try:
+                self.output_file_path.unlink(missing_ok=True)
+            except OSError:  # pragma: no cover - best effort cleanup
+                pass
+
+
+@dataclass
+class WorkerPoolStats:
+    """Counters describing how often requests found a warm worker."""
+
+    spawned: int = 0
+    warm_hits: int = 0
+    cold_starts: int = 0
+    recycled: int = 0
+    crashed: int = 0
+
+
+SpawnFactory = Callable[[], Awaitable[WorkerProcess]]
+
+
+class CLIWorkerPool:
+    """Pre-spawned processes for one CLI command, bound to the event loop that created it."""
+
+    def __init__(self, name: str, config: CLIWorkerConfig, spawn: SpawnFactory, admission: CLIAdmission | None = None):
+        self.name = name
+        self.config = config
+        self.admission = admission
+        self.loop = asyncio.get_running_loop()
+        self.stats = WorkerPoolStats()
+        self._spawn = spawn
+        self._idle: deque[WorkerProcess] = deque()
+        self._busy: set[WorkerProcess] = set()
+        self._spawning = 0
+        self._sequence = 0
+        self._available = asyncio.Condition()
+        self._tasks: set[asyncio.Task] = set()
+        self._reaper: asyncio.Task | None = None
+        self._closed = False
+
+    @property
+    def persistent(self) -> bool:
+        """True when workers are long-running (jsonl) rather than one-shot."""
+        return self.config.mode == "jsonl"
+
+    @property
+    def size_limit(self) -> int:
+        """Processes this pool may own: ``pool_size``, capped by the CLI's ``max_concurrency``."""
+        if self.admission is None or self.admission.max_concurrency is None:
+            return self.config.pool_size
+        return min(self.config.pool_size, self.admission.max_concurrency)
+
+    @property
+    def warm_count(self) -> int:
+        """One-shot processes started for no request yet (ready or still spawning)."""
+        return 0 if self.persistent else len(self._idle) + self._spawning
+
+    def _missing(self) -> int:
+        """How many processes to start so the pool is full without exceeding the admission limit."""
+        missing = self.size_limit - len(self._idle) - len(self._busy) - self._spawning
+        if self.persistent or self.admission is None or self.admission.max_concurrency is None:
+            # jsonl workers only run inside admission slots, and size_limit caps how many exist
+            return missing
+        # Handed-out one-shot processes run inside admission slots; warm ones take the free slots
+        free = self.admission.max_concurrency - self.admission.active - _warm_processes(self.name, self.loop)
+        return min(missing, free)
+
+    # ------------------------------------------------------------------
+    # Pool maintenance
+    # ------------------------------------------------------------------
+
+    def warm(self) -> None:
+        """Top the pool up to ``pool_size`` processes in the background."""
+        if self._closed:
+            return
+        for _ in range(max(0, self._missing())):
+            self._spawning += 1
+            task = self.loop.create_task(self._refill())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self) -> None:
+        try:
+            worker = await self._start()
+        except Exception as exc:
+            logger.warning("Failed to pre-spawn worker for CLI '%s': %s", self.name, exc)
+            async with self._available:
+                self._spawning -= 1
+                # Wake every acquire() waiting on this spawn, not just one
+                self._available.notify_all()
+            return
+
+        async with self._available:
+            self._spawning -= 1
+            if self._closed:
+                worker.discard()
+                return
+            self._idle.append(worker)
+            self._available.notify_all()
+        self._schedule_reaper()
+
+    async def _start(self) -> WorkerProcess:
+        worker = await self._spawn()
+        self.stats.spawned += 1
+        return worker
+
+    def _usable(self, worker: WorkerProcess) -> bool:
+        """Drop workers that died or sat idle for too long."""
+        if not worker.alive:
+            self.stats.crashed += 1
+            logger.info(
+                "Worker for CLI '%s' exited while idle (code %s); respawning",
+                self.name,
+                worker.process.returncode,
+            )
+            worker.discard()
+            return False
+        if time.monotonic() - worker.idle_since > self.config.max_idle_seconds:
+            self.stats.recycled += 1
+            worker.discard()
+            return False
+        return True
+
+    def _schedule_reaper(self) -> None:
+        """Make sure idle workers are discarded once they pass ``max_idle_seconds``."""
+        if self._closed or (self._reaper is not None and not self._reaper.done()):
+            return
+        self._reaper = self.loop.create_task(self._reap_idle())
+        self._tasks.add(self._reaper)
+        self._reaper.add_done_callback(self._tasks.discard)
+
+    async def _reap_idle(self) -> None:
+        """Discard expired idle workers until none are idle; drop the pool once it owns nothing."""
+        max_idle = self.config.max_idle_seconds
+        while not self._closed:
+            async with self._available:
+                now = time.monotonic()
+                expired = [worker for worker in self._idle if now - worker.idle_since >= max_idle]
+                for worker in expired:
+                    self._idle.remove(worker)
+                    worker.discard()
+                self.stats.recycled += len(expired)
+                next_expiry = min((worker.idle_since + max_idle for worker in self._idle), default=None)
+                empty = not self._idle and not self._busy and not self._spawning
+
+            if expired:
+                logger.debug("Discarded %d idle worker(s) for CLI '%s'", len(expired), self.name)
+            if empty:
+                _forget_pool(self)
+                self._closed = True
+                return
+            if next_expiry is None:
+                # Only busy workers left; checking one back in schedules a new reaper
+                return
+            await asyncio.sleep(max(next_expiry - time.monotonic(), 0.0))
+
+    async def _retire(self, worker: WorkerProcess) -> None:
+        worker.discard()
+        async with self._available:
+            self._busy.discard(worker)
+            self._available.notify()
+
+    def close(self) -> list[WorkerProcess]:
+        """Kill every process owned by the pool and return them."""
+        self._closed = True
+        for task in list(self._tasks):
+            task.cancel()
+        workers = [*self._idle, *self._busy]
+        for worker in workers:
+            worker.discard()
+        self._idle.clear()
+        self._busy.clear()
+        return workers
+
+    async def aclose(self) -> None:
+        """Kill every process owned by the pool and wait for them to exit."""
+        tasks = list(self._tasks)
+        workers = self.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for worker in workers:
+            await worker.process.wait()
+
+    # ------------------------------------------------------------------
+    # prespawn mode
+    # ------------------------------------------------------------------
+
+    async def acquire(self) -> WorkerProcess:
+        """Take a warm one-shot process, starting one inline when none is ready.
+
+        The caller owns the returned process: it writes the prompt, waits for
+        the process to exit and never hands it back. A process still being
+        pre-spawned is waited for rather than racing it with a cold start.
+        """
+        worker = None
+        async with self._available:
+            while worker is None:
+                while self._idle and worker is None:
+                    candidate = self._idle.popleft()
+                    if self._usable(candidate):
+                        worker = candidate
+                if worker is not None or not self._spawning:
+                    break
+                await self._available.wait()
+
+        if worker is not None:
+            self.stats.warm_hits += 1
+        else:
+            self.stats.cold_starts += 1
+            # Make room for the cold start by giving up warm processes of other commands
+            _trim_warm_processes(self.name, self.loop, self.admission)
+            worker = await self._start()
+
+        self.warm()
+        return worker
+
+    # ------------------------------------------------------------------
+    # jsonl mode
+    # ------------------------------------------------------------------
+
+    async def request(self, prompt: str, *, timeout: float) -> tuple[str, str, int]:
+        """Send a prompt to a long-running worker and return (stdout, stderr, returncode).
+
+        Raises:
+            asyncio.TimeoutError: The worker did not answer in time (it is killed and replaced)
+            WorkerPoolError: The worker crashed or broke the protocol
+        """
+        worker = await self._checkout()
+        try:
+            response = await asyncio.wait_for(self._exchange(worker, {"prompt": prompt}), timeout=timeout)
+        except BaseException:
+            await self._retire(worker)
+            raise
+        await self._checkin(worker)
+
+        try:
+            returncode = int(response.get("returncode", 0))
+        except (TypeError, ValueError):
+            returncode = 1
+        return str(response.get("stdout", "")), str(response.get("stderr", "")), returncode
+
+    async def _checkout(self) -> WorkerProcess:
+        while True:
+            async with self._available:
+                while not self._idle and len(self._busy) + self._spawning >= self.size_limit:
+                    await self._available.wait()
+                candidate = self._idle.popleft() if self._idle else None
+                if candidate is None:
+                    self._spawning += 1
+                else:
+                    self._busy.add(candidate)
+
+            if candidate is None:
+                try:
+                    worker = await self._start()
+                except BaseException:
+                    async with self._available:
+                        self._spawning -= 1
+                        self._available.notify()
+                    raise
+                async with self._available:
+                    self._spawning -= 1
+                    self._busy.add(worker)
+                self.stats.cold_starts += 1
+                return worker
+
+            if self._usable(candidate) and await self._healthy(candidate):
+                self.stats.warm_hits += 1
+                return candidate
+            await self._retire(candidate)
+
+    async def _checkin(self, worker: WorkerProcess) -> None:
+        worker.requests_served += 1
+        if worker.requests_served >= self.config.max_requests or not worker.alive:
+            self.stats.recycled += 1
+            logger.debug("Recycling worker for CLI '%s' after %d requests", self.name, worker.requests_served)
+            await self._retire(worker)
+            self.warm()
+            return
+
+        worker.idle_since = time.monotonic()
+        async with self._available:
+            self._busy.discard(worker)
+            self._idle.append(worker)
+            self._available.notify()
+        self._schedule_reaper()
+
+    async def _healthy(self, worker: WorkerProcess) -> bool:
+        if time.monotonic() - worker.idle_since < HEALTH_CHECK_AFTER_IDLE_SECONDS:
+            return True
+        try:
+            await asyncio.wait_for(self._exchange(worker, {"type": "ping"}), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, WorkerPoolError) as exc:
+            self.stats.crashed += 1
+            logger.info("Worker for CLI '%s' failed its health check: %s", self.name, exc or "timeout")
+            return False
+        return True
+
+    async def _exchange(self, worker: WorkerProcess, payload: dict) -> dict:
+        self._sequence += 1
+        request_id = str(self._sequence)
+        line = json.dumps({"id": request_id, **payload}) + "\n"
+
+        process = worker.process
+        try:
+            process.stdin.write(line.encode("utf-8"))
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as exc:
+            raise WorkerPoolError(f"worker for CLI '{self.name}' closed its input") from exc
+
+        while True:
+            try:
+                raw = await process.stdout.readline()
+            except ValueError as exc:  # line longer than the stream limit
+                raise WorkerPoolError(f"worker for CLI '{self.name}' sent an oversized line") from exc
+            if not raw:
+                raise WorkerPoolError(f"worker for CLI '{self.name}' exited (code {process.returncode})")
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                # Tolerate banners or log lines printed on stdout
+                continue
+            if isinstance(message, dict) and str(message.get("id")) == request_id:
+                return message
+
+
+_pools: dict[tuple, CLIWorkerPool] = {}
+
+
+def is_worker_pool_enabled() -> bool:
+    """Return False when warm workers were disabled globally via PAL_CLINK_WORKERS."""
+    return get_env_bool("PAL_CLINK_WORKERS", True)
+
+
+def get_worker_pool(client: ResolvedCLIClient, command: list[str], spawn: SpawnFactory) -> CLIWorkerPool | None:
+    """Return the pool serving ``command`` for this client, or None when pooling is off.
+
+    Pools are keyed by the fully built command (role arguments and system
+    prompt included), working directory, environment and worker settings, so
+    a configuration change never reuses a process started with stale flags.
+    """
+    config = client.worker
+    if config is None or not config.enabled or not is_worker_pool_enabled():
+        return None
+
+    loop = asyncio.get_running_loop()
+    key = (
+        client.name.lower(),
+        tuple(command),
+        str(client.working_dir or ""),
+        tuple(sorted(client.env.items())),
+        config.model_dump_json(),
+    )
+    pool = _pools.get(key)
+    if pool is not None and (pool.loop is not loop or pool._closed):
+        pool.close()
+        pool = None
+    if pool is None:
+        pool = CLIWorkerPool(client.name, config, spawn, get_admission(client))
+        _pools[key] = pool
+        pool.warm()
+    return pool
+
+
+def _warm_processes(name: str, loop: asyncio.AbstractEventLoop) -> int:
+    """Warm one-shot processes held for a CLI across all of its pools."""
+    name = name.lower()
+    return sum(pool.warm_count for pool in _pools.values() if pool.name.lower() == name and pool.loop is loop)
+
+
+def _trim_warm_processes(name: str, loop: asyncio.AbstractEventLoop, admission: CLIAdmission | None) -> None:
+    """Discard idle one-shot processes of a CLI until running plus warm fits ``max_concurrency``."""
+    if admission is None or admission.max_concurrency is None:
+        return
+    excess = admission.active + _warm_processes(name, loop) - admission.max_concurrency
+    name = name.lower()
+    for pool in list(_pools.values()):
+        if excess <= 0:
+            return
+        if pool.name.lower() != name or pool.loop is not loop or pool.persistent:
+            continue
+        while pool._idle and excess > 0:
+            pool._idle.pop().discard()
+            pool.stats.recycled += 1
+            excess -= 1
+
+
+def refill_worker_pools(client: ResolvedCLIClient) -> None:
+    """Top up a CLI's one-shot pools, e.g. once a finished request frees its admission slot."""
+    loop = asyncio.get_running_loop()
+    name = client.name.lower()
+    for pool in list(_pools.values()):
+        if pool.name.lower() == name and pool.loop is loop and not pool.persistent:
+            pool.warm()
+
+
+def _forget_pool(pool: CLIWorkerPool) -> None:
+    for key, candidate in list(_pools.items()):
+        if candidate is pool:
+            del _pools[key]
+
+
+def worker_pool_stats() -> dict[str, dict[str, int]]:
+    """Aggregate pool counters per CLI name."""
+    totals: dict[str, dict[str, int]] = {}
+    for pool in _pools.values():
+        bucket = totals.setdefault(pool.name, asdict(WorkerPoolStats()))
+        for key, value in asdict(pool.stats).items():
+            bucket[key] += value
+    return totals
+
+
+async def close_worker_pools() -> None:
+    """Kill all pools created on the running event loop and reap their processes."""
+    loop = asyncio.get_running_loop()
+    for key, pool in list(_pools.items()):
+        if pool.loop is loop:
+            del _pools[key]
+            await pool.aclose()
+
+
+def shutdown_worker_pools() -> None:
+    """Kill all pooled processes (registered to run at interpreter exit)."""
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
+
+
+atexit.register(shutdown_worker_pools)
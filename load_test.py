@@ -0,0 +1,372 @@
+"""
+Concurrent load test for PAL MCP Server
+
+Drives N concurrent MCP sessions against server.py and reports throughput,
+p50/p95/p99 latency and error rates per tool. By default the server talks to
+the bundled OpenAI-compatible mock provider (tests/mock_openai_server.py)
+through CUSTOM_API_URL, so no API keys or network access are needed and
+provider latency, token rates and 429/500 errors can be shaped at will.
+
+Transports:
+    stdio: every session spawns its own server.py process (as MCP clients do)
+    http:  one server.py process started with PAL_TRANSPORT=http serves all
+           sessions over streamable HTTP, or pass --url to target a running one
+
+Usage:
+    python load_test.py [--sessions N] [--requests N | --duration SECONDS] [--tools chat,thinkdeep]
+                        [--transport stdio|http] [--url URL] [--provider-url URL]
+                        [--latency SPEC] [--tokens-per-second N] [--error-429-rate R] [--json FILE]
+
+Examples:
+    # 8 stdio sessions, 20 chat calls each, 300ms median provider latency
+    python load_test.py --sessions 8 --requests 20 --latency lognormal:300,0.4
+
+    # One HTTP server, 32 sessions for 60 seconds, 5% rate limiting, mixed tools
+    python load_test.py --transport http --sessions 32 --duration 60 --error-429-rate 0.05 --tools chat,thinkdeep,version
+
+    # Against a real provider endpoint instead of the mock
+    python load_test.py --provider-url http://localhost:11434/v1 --model llama3.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from tests.mock_openai_server import MockOpenAIServer, add_mock_arguments, config_from_arguments
+
+SERVER_SCRIPT = Path(__file__).resolve().parent / "server.py"
+
+# Provider keys cleared in the server environment so only the custom endpoint is used
+PROVIDER_KEYS = (
+    "GEMINI_API_KEY",
+    "OPENAI_API_KEY",
+    "XAI_API_KEY",
+    "DIAL_API_KEY",
+    "OPENROUTER_API_KEY",
+    "AZURE_OPENAI_API_KEY",
+    "AZURE_OPENAI_ENDPOINT",
+)
+
+
+def _chat_arguments(index: int, model: str, workdir: str) -> dict[str, Any]:
+    return {
+        "prompt": f"Load test request {index}: explain what a p99 latency is in one sentence.",
+        "working_directory_absolute_path": workdir,
+        "model": model,
+    }
+
+
+def _thinkdeep_arguments(index: int, model: str, workdir: str) -> dict[str, Any]:
+    return {
+        "step": f"Load test request {index}: assess whether retries amplify load under rate limiting.",
+        "step_number": 1,
+        "total_steps": 1,
+        "next_step_required": False,
+        "findings": "Retries with jittered backoff spread load; without jitter they synchronise.",
+        "model": model,
+    }
+
+
+def _challenge_arguments(index: int, model: str, workdir: str) -> dict[str, Any]:
+    return {"prompt": f"Load test request {index}: caching always improves latency."}
+
+
+def _no_arguments(index: int, model: str, workdir: str) -> dict[str, Any]:
+    return {}
+
+
+TOOL_ARGUMENTS: dict[str, Callable[[int, str, str], dict[str, Any]]] = {
+    "chat": _chat_arguments,
+    "thinkdeep": _thinkdeep_arguments,
+    "challenge": _challenge_arguments,
+    "version": _no_arguments,
+    "listmodels": _no_arguments,
+}
+
+
+@dataclass
+class CallResult:
+    tool: str
+    started: float
+    latency: float
+    ok: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadReport:
+    """Per-tool latency and error statistics for one run."""
+
+    wall_clock: float
+    results: list[CallResult] = field(default_factory=list)
+    session_errors: list[str] = field(default_factory=list)
+    session_startup: list[float] = field(default_factory=list)
+    provider_stats: dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> dict[str, Any]:
+        # Throughput is measured over the calls themselves, excluding session startup
+        window = 0.0
+        if self.results:
+            window = max(r.started + r.latency for r in self.results) - min(r.started for r in self.results)
+
+        by_tool: dict[str, list[CallResult]] = defaultdict(list)
+        for result in self.results:
+            by_tool[result.tool].append(result)
+
+        tools = {}
+        for tool, results in sorted(by_tool.items()):
+            latencies = sorted(result.latency for result in results)
+            errors = [result for result in results if not result.ok]
+            tools[tool] = {
+                "requests": len(results),
+                "errors": len(errors),
+                "error_rate": round(len(errors) / len(results), 4),
+                "throughput_rps": round(len(results) / window, 3) if window else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+                "sample_errors": sorted({result.error or "error" for result in errors})[:3],
+            }
+
+        total = len(self.results)
+        failed = sum(1 for result in self.results if not result.ok)
+        startup = sorted(self.session_startup)
+        return {
+            "wall_clock_seconds": round(self.wall_clock, 3),
+            "requests": total,
+            "errors": failed,
+            "error_rate": round(failed / total, 4) if total else 0.0,
+            "throughput_rps": round(total / window, 3) if window else 0.0,
+            "session_startup_p50_ms": round(percentile(startup, 50) * 1000, 1),
+            "session_errors": self.session_errors,
+            "tools": tools,
+            "mock_provider": self.provider_stats,
+        }
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil without float rounding
+    return sorted_values[min(int(rank), len(sorted_values)) - 1]
+
+
+def format_report(summary: dict[str, Any]) -> str:
+    lines = [
+        f"Requests: {summary['requests']} in {summary['wall_clock_seconds']}s "
+        f"({summary['throughput_rps']} req/s), errors: {summary['errors']} ({summary['error_rate']:.1%})",
+        f"Session startup p50: {summary['session_startup_p50_ms']}ms",
+        "",
+        f"{'tool':<12} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}",
+    ]
+    for tool, stats in summary["tools"].items():
+        lines.append(
+            f"{tool:<12} {stats['requests']:>6} {stats['throughput_rps']:>8} {stats['p50_ms']:>9} "
+            f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['error_rate']:>8.1%}"
+        )
+        lines.extend(f"    {error}" for error in stats["sample_errors"])
+    for error in summary["session_errors"]:
+        lines.append(f"Session failed: {error}")
+    if summary["mock_provider"]:
+        lines.append(f"Mock provider: {summary['mock_provider']}")
+    return "\n".join(lines)
+
+
+def build_server_env(provider_url: str, model: str, extra: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Environment for server.py that routes every model call to ``provider_url``."""
+    env = dict(os.environ)
+    env.update(dict.fromkeys(PROVIDER_KEYS, ""))
+    env.update(
+        {
+            "CUSTOM_API_URL": provider_url,
+            "CUSTOM_API_KEY": env.get("LOAD_TEST_CUSTOM_API_KEY", ""),
+            "CUSTOM_MODEL_NAME": model,
+            "DEFAULT_MODEL": model,
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    env.update(extra or {})
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_health(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await asyncio.to_thread(urllib.request.urlopen, url, None, 2)
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server did not become healthy at {url} within {timeout:.0f}s")
+
+
+@contextlib.asynccontextmanager
+async def _open_session(args: argparse.Namespace, env: dict[str, str], mcp_url: Optional[str]):
+    if mcp_url:
+        async with streamablehttp_client(mcp_url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                yield session
+    else:
+        params = StdioServerParameters(command=sys.executable, args=[str(SERVER_SCRIPT)], env=env)
+        with open(os.devnull, "w") as errlog:
+            async with stdio_client(params, errlog=errlog) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    yield session
+
+
+async def _run_session(
+    session_index: int,
+    args: argparse.Namespace,
+    env: dict[str, str],
+    mcp_url: Optional[str],
+    tools: list[str],
+    deadline: Optional[float],
+    report: LoadReport,
+) -> None:
+    workdir = tempfile.mkdtemp(prefix=f"pal-load-{session_index}-")
+    started = time.perf_counter()
+    try:
+        async with _open_session(args, env, mcp_url) as session:
+            report.session_startup.append(time.perf_counter() - started)
+            # Offset the tool rotation per session so the mix is spread over time
+            rotation = itertools.islice(itertools.cycle(tools), session_index, None)
+            for index in itertools.count():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if deadline is None and index >= args.requests:
+                    break
+                tool = next(rotation)
+                arguments = TOOL_ARGUMENTS[tool](index, args.model, workdir)
+                call_started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(session.call_tool(tool, arguments), timeout=args.timeout)
+                    error = _result_error(result) if result.isError else None
+                    ok = not result.isError
+                except Exception as e:  # timeouts and transport failures count against the tool
+                    ok, error = False, f"{type(e).__name__}: {e}"[:200]
+                report.results.append(CallResult(tool, call_started, time.perf_counter() - call_started, ok, error))
+    except Exception as e:
+        report.session_errors.append(f"session {session_index}: {type(e).__name__}: {e}"[:300])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _result_error(result: Any) -> str:
+    text = " ".join(getattr(block, "text", "") for block in result.content or [])
+    try:
+        text = json.loads(text).get("content") or text
+    except (ValueError, AttributeError):
+        pass
+    return str(text)[:200]
+
+
+async def run_load_test(args: argparse.Namespace) -> LoadReport:
+    tools = [tool.strip() for tool in args.tools.split(",") if tool.strip()]
+    unknown = [tool for tool in tools if tool not in TOOL_ARGUMENTS]
+    if unknown:
+        raise SystemExit(
+            f"Unsupported tools for load testing: {', '.join(unknown)} (choose from {', '.join(TOOL_ARGUMENTS)})"
+        )
+
+    async with contextlib.AsyncExitStack() as stack:
+        provider_url = args.provider_url
+        mock: Optional[MockOpenAIServer] = None
+        if not provider_url and not args.url:
+            mock = stack.enter_context(MockOpenAIServer(config_from_arguments(args)))
+            provider_url = mock.base_url
+        env = build_server_env(provider_url or "", args.model)
+
+        mcp_url = args.url
+        if args.transport == "http" and not mcp_url:
+            port = _free_port()
+            env = build_server_env(
+                provider_url,
+                args.model,
+                {"PAL_TRANSPORT": "http", "PAL_HTTP_PORT": str(port), "PAL_HTTP_HOST": "127.0.0.1"},
+            )
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                str(SERVER_SCRIPT),
+                env=env,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+
+            async def _terminate():
+                if process.returncode is None:
+                    process.terminate()
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(process.wait(), timeout=10)
+
+            stack.push_async_callback(_terminate)
+            await _wait_for_health(f"http://127.0.0.1:{port}/health")
+            mcp_url = f"http://127.0.0.1:{port}/mcp"
+
+        report = LoadReport(wall_clock=0.0)
+        started = time.monotonic()
+        deadline = started + args.duration if args.duration else None
+        await asyncio.gather(
+            *(_run_session(index, args, env, mcp_url, tools, deadline, report) for index in range(args.sessions))
+        )
+        report.wall_clock = time.monotonic() - started
+        if mock is not None:
+            report.provider_stats = mock.stats()
+        return report
+
+
+def parse_arguments(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Concurrent MCP load test for PAL MCP Server")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent MCP sessions")
+    parser.add_argument("--requests", type=int, default=10, help="Tool calls per session")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--tools", default="chat", help=f"Comma-separated tool mix ({', '.join(TOOL_ARGUMENTS)})")
+    parser.add_argument("--model", default="llama3.2", help="Model name passed to the tools")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--url", default=None, help="Streamable HTTP endpoint of a running server (e.g. .../mcp)")
+    parser.add_argument("--provider-url", default=None, help="Use this OpenAI-compatible endpoint instead of the mock")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-call timeout in seconds")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report as JSON to this file")
+    add_mock_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_arguments(argv)
+    report = asyncio.run(run_load_test(args))
+    summary = report.summary()
+    print(format_report(summary))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 1 if summary["session_errors"] or not summary["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -239,6 +239,47 @@ class ModelProvider(ABC):
 
         return any(indicator in error_str for indicator in retryable_indicators)
 
+    def _rate_limited(
+        self,
+        operation: Callable[[], ModelResponse],
+        *,
+        model_name: str,
+        capabilities: Optional[ModelCapabilities] = None,
+        estimated_tokens: int = 0,
+    ) -> Callable[[], ModelResponse]:
+        """Wrap one provider attempt with client-side pacing.
+
+        Each attempt waits for room in the (provider, model) request and token
+        buckets, exposes the limiter to response-header hooks while it runs,
+        corrects the token bucket from the reported usage and, on a 429, pauses
+        every caller of the model for the advertised retry delay.
+        """
+
+        from .rate_limiter import get_rate_limiter, rate_limit_scope, retry_after_seconds
+
+        limiter = get_rate_limiter(self.get_provider_type(), model_name, capabilities)
+        if limiter is None:
+            return operation
+
+        def _attempt() -> ModelResponse:
+            limiter.acquire(estimated_tokens)
+            with rate_limit_scope(limiter):
+                try:
+                    response = operation()
+                except Exception as exc:
+                    retry_after = retry_after_seconds(exc)
+                    if retry_after is not None:
+                        limiter.pause(retry_after)
+                        # The next attempt waits out the pause in acquire(); no extra back-off
+                        exc._rate_limit_paused = True
+                    raise
+            usage = getattr(response, "usage", None)
+            if isinstance(usage, dict):
+                limiter.record_usage(estimated_tokens, usage.get("total_tokens", 0) or 0)
+            return response
+
+        return _attempt
+
     def _run_with_retries(
         self,
         operation: Callable[[], Any],
@@ -271,18 +312,27 @@ class ModelProvider(ABC):
 
         for attempt_index in range(attempts):
             try:
-                return operation()
+                result = operation()
+                self._report_health(healthy=True)
+                return result
             except Exception as exc:  # noqa: BLE001 - bubble exact provider errors
                 last_exc = exc
                 attempt_number = attempt_index + 1
 
                 # Decide whether to retry based on subclass hook
                 retryable = self._is_error_retryable(exc)
-                if not retryable or attempt_number >= attempts:
+                if not retryable:
+                    raise
+                if attempt_number >= attempts:
+                    # Still failing after every retry: let auto mode skip this provider for a while
+                    self._report_health(healthy=False)
                     raise
 
                 delay_idx = min(attempt_index, len(delays) - 1) if delays else -1
                 delay = delays[delay_idx] if delay_idx >= 0 else 0.0
+                if getattr(exc, "_rate_limit_paused", False):
+                    # The rate limiter already holds the next attempt for the Retry-After delay
+                    delay = 0.0
 
                 if delay > 0:
                     logger.warning(
@@ -306,6 +356,20 @@ class ModelProvider(ABC):
         # Should never reach here because loop either returns or raises
         raise last_exc if last_exc else RuntimeError("Retry loop exited without result")
 
+    def _report_health(self, *, healthy: bool) -> None:
+        """Tell the registry whether this provider is serving requests."""
+
+        try:
+            from .registry import ModelProviderRegistry
+
+            provider_type = self.get_provider_type()
+            if healthy:
+                ModelProviderRegistry.mark_provider_healthy(provider_type)
+            else:
+                ModelProviderRegistry.mark_provider_unhealthy(provider_type)
+        except Exception:  # pragma: no cover - health tracking must never break a call
+            logger.debug("Failed to record provider health", exc_info=True)
+
     # ------------------------------------------------------------------
     # Validation hooks
     # ------------------------------------------------------------------
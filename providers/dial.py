@@ -196,7 +196,7 @@ class DIALModelProvider(RegistryBackedProviderMixin, OpenAICompatibleProvider):
 
         if images and capabilities.supports_images:
             for img_path in images:
-                processed_image = self._process_image(img_path)
+                processed_image = self._process_image(img_path, capabilities.max_image_size_mb or None)
                 if processed_image:
                     user_message_content.append(processed_image)
         elif images:
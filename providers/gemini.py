@@ -1,6 +1,5 @@
 """Gemini model provider implementation."""
 
-import base64
 import logging
 from typing import TYPE_CHECKING, ClassVar, Optional
 
@@ -11,7 +10,8 @@ from google import genai
 from google.genai import types
 
 from utils.env import get_env
-from utils.image_utils import validate_image
+from utils.image_utils import prepare_image
+from utils.token_utils import estimate_tokens
 
 from .base import ModelProvider
 from .registries.gemini import GeminiModelRegistry
@@ -160,7 +160,7 @@ class GeminiModelProvider(RegistryBackedProviderMixin, ModelProvider):
         if images and capabilities.supports_images:
             for image_path in images:
                 try:
-                    image_part = self._process_image(image_path)
+                    image_part = self._process_image(image_path, capabilities.max_image_size_mb or None)
                     if image_part:
                         parts.append(image_part)
                 except Exception as e:
@@ -297,7 +297,12 @@ class GeminiModelProvider(RegistryBackedProviderMixin, ModelProvider):
 
         try:
             return self._run_with_retries(
-                operation=_attempt,
+                operation=self._rate_limited(
+                    _attempt,
+                    model_name=resolved_model_name,
+                    capabilities=capabilities,
+                    estimated_tokens=estimate_tokens(full_prompt),
+                ),
                 max_attempts=max_retries,
                 delays=retry_delays,
                 log_prefix=f"Gemini API ({resolved_model_name})",
@@ -430,21 +435,15 @@ class GeminiModelProvider(RegistryBackedProviderMixin, ModelProvider):
 
         return any(indicator in error_str for indicator in retryable_indicators)
 
-    def _process_image(self, image_path: str) -> Optional[dict]:
-        """Process an image for Gemini API."""
+    def _process_image(self, image_path: str, max_size_mb: Optional[float] = None) -> Optional[dict]:
+        """Process an image for Gemini API.
+
+        Validation, optional downscaling and base64 encoding are cached per
+        image version (see utils.image_utils.prepare_image).
+        """
         try:
-            # Use base class validation
-            image_bytes, mime_type = validate_image(image_path)
-
-            # For data URLs, extract the base64 data directly
-            if image_path.startswith("data:"):
-                # Extract base64 data from data URL
-                _, data = image_path.split(",", 1)
-                return {"inline_data": {"mime_type": mime_type, "data": data}}
-            else:
-                # For file paths, encode the bytes
-                image_data = base64.b64encode(image_bytes).decode()
-                return {"inline_data": {"mime_type": mime_type, "data": image_data}}
+            prepared = prepare_image(image_path, max_size_mb)
+            return {"inline_data": {"mime_type": prepared.mime_type, "data": prepared.base64_data}}
 
         except ValueError as e:
             logger.warning(str(e))
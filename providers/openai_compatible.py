@@ -9,9 +9,11 @@ from urllib.parse import urlparse
 from openai import OpenAI
 
 from utils.env import get_env, suppress_env_vars
-from utils.image_utils import validate_image
+from utils.image_utils import prepare_image
+from utils.token_utils import estimate_tokens
 
 from .base import ModelProvider
+from .rate_limiter import observe_response_headers
 from .shared import (
     ModelCapabilities,
     ModelResponse,
@@ -279,12 +281,14 @@ class OpenAICompatibleProvider(ModelProvider):
                             transport=self._test_transport,
                             timeout=timeout_config,
                             follow_redirects=True,
+                            event_hooks={"response": [self._observe_rate_limit_headers]},
                         )
                     else:
                         # Normal production client
                         http_client = httpx.Client(
                             timeout=timeout_config,
                             follow_redirects=True,
+                            event_hooks={"response": [self._observe_rate_limit_headers]},
                         )
 
                     # Keep client initialization minimal to avoid proxy parameter conflicts
@@ -328,6 +332,11 @@ class OpenAICompatibleProvider(ModelProvider):
 
         return self._client
 
+    @staticmethod
+    def _observe_rate_limit_headers(response) -> None:
+        """httpx response hook feeding ``x-ratelimit-*`` headers to the active rate limiter."""
+        observe_response_headers(response.headers)
+
     def _sanitize_for_logging(self, params: dict) -> dict:
         """Sanitize sensitive data from parameters before logging.
 
@@ -485,7 +494,12 @@ class OpenAICompatibleProvider(ModelProvider):
 
         try:
             return self._run_with_retries(
-                operation=_attempt,
+                operation=self._rate_limited(
+                    _attempt,
+                    model_name=model_name,
+                    capabilities=capabilities,
+                    estimated_tokens=estimate_tokens("".join(str(m.get("content", "")) for m in messages)),
+                ),
                 max_attempts=max_retries,
                 delays=retry_delays,
                 log_prefix="responses endpoint",
@@ -562,7 +576,7 @@ class OpenAICompatibleProvider(ModelProvider):
         if images and capabilities and capabilities.supports_images:
             for image_path in images:
                 try:
-                    image_content = self._process_image(image_path)
+                    image_content = self._process_image(image_path, capabilities.max_image_size_mb or None)
                     if image_content:
                         user_content.append(image_content)
                 except Exception as e:
@@ -659,7 +673,12 @@ class OpenAICompatibleProvider(ModelProvider):
 
         try:
             return self._run_with_retries(
-                operation=_attempt,
+                operation=self._rate_limited(
+                    _attempt,
+                    model_name=resolved_model,
+                    capabilities=capabilities,
+                    estimated_tokens=estimate_tokens((system_prompt or "") + prompt),
+                ),
                 max_attempts=max_retries,
                 delays=retry_delays,
                 log_prefix=f"{self.FRIENDLY_NAME} API ({resolved_model})",
@@ -830,28 +849,20 @@ class OpenAICompatibleProvider(ModelProvider):
 
         return any(indicator in error_str for indicator in retryable_indicators)
 
-    def _process_image(self, image_path: str) -> Optional[dict]:
-        """Process an image for OpenAI-compatible API."""
+    def _process_image(self, image_path: str, max_size_mb: Optional[float] = None) -> Optional[dict]:
+        """Process an image for OpenAI-compatible API.
+
+        Validation, optional downscaling and base64 encoding are cached per
+        image version (see utils.image_utils.prepare_image).
+        """
         try:
-            if image_path.startswith("data:"):
-                # Validate the data URL
-                validate_image(image_path)
+            prepared = prepare_image(image_path, max_size_mb)
+            if image_path.startswith("data:") and not prepared.resized:
                 # Handle data URL: data:image/png;base64,iVBORw0...
                 return {"type": "image_url", "image_url": {"url": image_path}}
-            else:
-                # Use base class validation
-                image_bytes, mime_type = validate_image(image_path)
-
-                # Read and encode the image
-                import base64
-
-                image_data = base64.b64encode(image_bytes).decode()
-                logging.debug(f"Processing image '{image_path}' as MIME type '{mime_type}'")
-
-                # Create data URL for OpenAI API
-                data_url = f"data:{mime_type};base64,{image_data}"
 
-                return {"type": "image_url", "image_url": {"url": data_url}}
+            logging.debug(f"Processing image '{image_path[:100]}' as MIME type '{prepared.mime_type}'")
+            return {"type": "image_url", "image_url": {"url": prepared.data_url}}
 
         except ValueError as e:
             logging.warning(str(e))
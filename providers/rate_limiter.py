@@ -0,0 +1,292 @@
+"""Client-side rate limiting per provider and model.
+
+Rate limits used to be handled only after the fact: a 429 was classified as
+retryable and the call slept and tried again, so concurrent bursts kept
+running into the quota together and throughput oscillated through 429
+storms. Calls are now paced *before* they are sent, using two token buckets
+per (provider, model):
+
+* requests per minute and tokens per minute, configured through the optional
+  ``requests_per_minute`` / ``tokens_per_minute`` fields in
+  ``conf/*_models.json``
+* limits and remaining budget reported in ``x-ratelimit-*`` response headers
+  (OpenAI-compatible APIs) adjust the buckets automatically, so limits work
+  even without configuration
+* a 429 pauses every caller of that model for the advertised retry delay
+
+Callers reserve capacity up front and sleep until their reservation is
+covered, which queues bursts in arrival order and keeps throughput at the
+quota. Set PAL_RATE_LIMITING=false to disable pacing.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
+
+from utils.env import get_env_bool
+
+if TYPE_CHECKING:
+    from .shared import ModelCapabilities, ProviderType
+
+logger = logging.getLogger(__name__)
+
+# Fallback pause after a 429 that did not say how long to wait
+DEFAULT_RETRY_AFTER_SECONDS = 5.0
+MAX_RETRY_AFTER_SECONDS = 120.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_RETRY_HINT = re.compile(r"(?:retry(?:[ _-]?after|[ _-]?delay)?|try again)\D{0,20}?(\d+(?:\.\d+)?)\s*(ms|s)?", re.I)
+
+
+def is_rate_limiting_enabled() -> bool:
+    """Return True unless pacing was disabled via PAL_RATE_LIMITING."""
+    return get_env_bool("PAL_RATE_LIMITING", True)
+
+
+def parse_duration(value: str) -> float | None:
+    """Parse header durations such as ``"1s"``, ``"6m0s"``, ``"250ms"`` or ``"2"`` into seconds."""
+    value = (value or "").strip().lower()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` tokens per second.
+
+    Reservations may drive the level negative; the caller then waits until the
+    deficit has been refilled, which serves callers in reservation order.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` tokens and return how long to wait before using them."""
+        self._refill(now)
+        # A single oversized request only has to wait for a full bucket
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, delta: float, now: float) -> None:
+        """Return (positive) or take (negative) tokens after the fact."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + delta)
+
+    def set_capacity(self, per_minute: float, now: float) -> None:
+        self._refill(now)
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def cap_level(self, remaining: float, now: float) -> None:
+        """Align with the budget the server says is left."""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class ModelRateLimiter:
+    """Request and token buckets for one (provider, model) pair."""
+
+    def __init__(self, name: str, requests_per_minute: int = 0, tokens_per_minute: int = 0) -> None:
+        self.name = name
+        self.configured = (0, 0)
+        self.requests: TokenBucket | None = None
+        self.tokens: TokenBucket | None = None
+        self.paused_until = 0.0
+        self.total_wait_seconds = 0.0
+        self.throttled_calls = 0
+        self._lock = threading.Lock()
+        self.configure(requests_per_minute, tokens_per_minute)
+
+    def configure(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        """Apply limits from the model configuration (0 leaves a bucket to header adaptation)."""
+        with self._lock:
+            now = time.monotonic()
+            for kind, per_minute in (("requests", requests_per_minute), ("tokens", tokens_per_minute)):
+                if per_minute <= 0:
+                    continue
+                bucket = getattr(self, kind)
+                if bucket is None:
+                    setattr(self, kind, TokenBucket(per_minute))
+                else:
+                    bucket.set_capacity(per_minute, now)
+            self.configured = (requests_per_minute, tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """Block until a call of ``estimated_tokens`` fits the quota; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.requests:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens and estimated_tokens > 0:
+                wait = max(wait, self.tokens.reserve(estimated_tokens, now))
+            if wait > 0:
+                self.throttled_calls += 1
+                self.total_wait_seconds += wait
+
+        if wait > 0:
+            logger.debug("Pacing %s call for %.2fs to stay within its rate limit", self.name, wait)
+            time.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if not self.tokens or actual_tokens <= 0:
+            return
+        with self._lock:
+            self.tokens.adjust(estimated_tokens - actual_tokens, time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds`` (after a 429)."""
+        seconds = min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning("Rate limited by %s; pausing calls for %.1fs", self.name, seconds)
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt limits and remaining budget from ``x-ratelimit-*`` response headers."""
+        lowered = {key.lower(): value for key, value in headers.items()}
+        with self._lock:
+            now = time.monotonic()
+            for kind in ("requests", "tokens"):
+                limit = _as_number(lowered.get(f"x-ratelimit-limit-{kind}"))
+                remaining = _as_number(lowered.get(f"x-ratelimit-remaining-{kind}"))
+                if limit is None and remaining is None:
+                    continue
+                bucket = getattr(self, kind)
+                if limit:
+                    if bucket is None:
+                        bucket = TokenBucket(limit)
+                        setattr(self, kind, bucket)
+                        logger.info("Learned %s limit for %s: %d per minute", kind, self.name, limit)
+                    elif bucket.capacity != limit:
+                        bucket.set_capacity(limit, now)
+                if bucket is not None and remaining is not None:
+                    bucket.cap_level(remaining, now)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.capacity if self.requests else None,
+                "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+                "throttled_calls": self.throttled_calls,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+            }
+
+
+def _as_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Return how long to back off for a rate-limit error, or None for other errors."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    message = str(error)
+    if status != 429 and "429" not in message and "rate limit" not in message.lower():
+        return None
+
+    headers = getattr(response, "headers", None) or {}
+    if headers:
+        retry_after_ms = _as_number(headers.get("retry-after-ms"))
+        if retry_after_ms is not None:
+            return retry_after_ms / 1000.0
+        for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+            seconds = parse_duration(headers.get(header, ""))
+            if seconds is not None:
+                return seconds
+
+    match = _RETRY_HINT.search(message)
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000.0 if match.group(2) == "ms" else seconds
+    return DEFAULT_RETRY_AFTER_SECONDS
+
+
+_limiters: dict[tuple[str, str], ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+_scope = threading.local()
+
+
+def get_rate_limiter(
+    provider_type: ProviderType, model_name: str, capabilities: ModelCapabilities | None = None
+) -> ModelRateLimiter | None:
+    """Return the shared limiter for a provider/model pair (None when pacing is disabled)."""
+    if not is_rate_limiting_enabled():
+        return None
+
+    key = (provider_type.value, model_name)
+    requests_per_minute = getattr(capabilities, "requests_per_minute", 0) or 0
+    tokens_per_minute = getattr(capabilities, "tokens_per_minute", 0) or 0
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = ModelRateLimiter(f"{provider_type.value}/{model_name}", requests_per_minute, tokens_per_minute)
+            _limiters[key] = limiter
+        elif limiter.configured != (requests_per_minute, tokens_per_minute):
+            # The model configuration was edited (hot reload)
+            limiter.configure(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+@contextmanager
+def rate_limit_scope(limiter: ModelRateLimiter):
+    """Make ``limiter`` the target for response headers observed on this thread."""
+    previous = getattr(_scope, "limiter", None)
+    _scope.limiter = limiter
+    try:
+        yield limiter
+    finally:
+        _scope.limiter = previous
+
+
+def observe_response_headers(headers: Mapping[str, str]) -> None:
+    """Feed response headers to the limiter of the call running on this thread."""
+    limiter = getattr(_scope, "limiter", None)
+    if limiter is not None:
+        limiter.observe_headers(headers)
+
+
+def rate_limiter_stats() -> dict[str, dict[str, Any]]:
+    """Current limits and pacing counters per provider/model."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def reset_rate_limiters() -> None:
+    """Forget all limiters (mainly for tests)."""
+    with _limiters_lock:
+        _limiters.clear()
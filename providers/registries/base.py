@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import copy
 import importlib.resources
 import json
 import logging
@@ -10,9 +11,9 @@ from dataclasses import fields
 from pathlib import Path
 
 from utils.env import get_env
-from utils.file_utils import read_json_file
 
 from ..shared import ModelCapabilities, ProviderType, TemperatureConstraint
+from .cache import load_snapshot, snapshot_key, store_snapshot, watcher
 
 logger = logging.getLogger(__name__)
 
@@ -56,11 +57,69 @@ class CustomModelRegistryBase:
         self.alias_map: dict[str, str] = {}
         self.model_map: dict[str, ModelCapabilities] = {}
         self._extras: dict[str, dict] = {}
+        # Bumped on every (re)load so holders of derived data can refresh it
+        self.generation = 0
+        self._loaded_signature: tuple | None = None
 
     def reload(self) -> None:
-        data = self._load_config_data()
-        configs = [config for config in self._parse_models(data) if config is not None]
-        self._build_maps(configs)
+        """(Re)load the manifest, reusing a compiled snapshot when its content is unchanged."""
+        signature = self.source_signature()
+        config_text = self._read_config_text()
+        if self.source_signature() != signature:
+            # Edited while being read; leave the signature unset so the watcher reloads again
+            signature = None
+
+        key = snapshot_key(self, config_text) if config_text else None
+        compiled = load_snapshot(key) if key else None
+        if compiled is None:
+            compiled = self._compile(self._parse_config_text(config_text))
+            if key:
+                store_snapshot(key, compiled)
+
+        # Swap all maps at once so concurrent readers never see a half-built registry
+        self.model_map, self.alias_map, self._extras = compiled
+        self._loaded_signature = signature
+        self.generation += 1
+        watcher.watch(self)
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the manifest on disk changed since the last load."""
+        signature = self.source_signature()
+        if signature == self._loaded_signature:
+            return False
+        try:
+            config_text = self._read_config_text()
+            if config_text:
+                # A half-written or broken manifest must not wipe the loaded models
+                json.loads(config_text)
+            self.reload()
+        except Exception as exc:
+            # Keep serving the previous models until the manifest is fixed
+            logger.warning("Ignoring invalid model registry update in %s: %s", self.source_path(), exc)
+            self._loaded_signature = signature
+            return False
+        logger.info("Reloaded model registry from %s", self.source_path())
+        return True
+
+    def source_path(self) -> Path | None:
+        """Filesystem path of the manifest when it can be watched for changes."""
+        if not self._use_resources:
+            return self.config_path
+        try:
+            resource = importlib.resources.files(self._resource_package).joinpath(self._default_filename)
+        except Exception:
+            return None
+        return resource if isinstance(resource, Path) else None
+
+    def source_signature(self) -> tuple | None:
+        path = self.source_path()
+        if path is None:
+            return None
+        try:
+            stat_result = path.stat()
+        except OSError:
+            return (str(path), None, None)
+        return (str(path), stat_result.st_mtime_ns, stat_result.st_size)
 
     def list_models(self) -> list[str]:
         return list(self.model_map.keys())
@@ -98,22 +157,23 @@ class CustomModelRegistryBase:
     # Internal helpers
     # ------------------------------------------------------------------
     def _load_config_data(self) -> dict:
+        return self._parse_config_text(self._read_config_text())
+
+    def _read_config_text(self) -> str | None:
+        """Return the manifest text, or None when there is no manifest to load."""
         if self._use_resources:
             try:
                 resource = importlib.resources.files(self._resource_package).joinpath(self._default_filename)
                 if hasattr(resource, "read_text"):
-                    config_text = resource.read_text(encoding="utf-8")
-                else:  # pragma: no cover - legacy Python fallback
-                    with resource.open("r", encoding="utf-8") as handle:
-                        config_text = handle.read()
-                data = json.loads(config_text)
+                    return resource.read_text(encoding="utf-8")
+                with resource.open("r", encoding="utf-8") as handle:  # pragma: no cover - legacy Python fallback
+                    return handle.read()
             except FileNotFoundError:
                 logger.debug("Packaged %s not found", self._default_filename)
-                return {"models": []}
+                return None
             except Exception as exc:
                 logger.warning("Failed to read packaged %s: %s", self._default_filename, exc)
-                return {"models": []}
-            return data or {"models": []}
+                return None
 
         if not self.config_path:
             raise FileNotFoundError("Registry configuration path is not set")
@@ -126,17 +186,42 @@ class CustomModelRegistryBase:
                     logger.debug("Falling back to %s", fallback)
                     self.config_path = fallback
                 else:
-                    return {"models": []}
+                    return None
             else:
-                return {"models": []}
+                return None
+
+        try:
+            return self.config_path.read_text(encoding="utf-8")
+        except OSError:
+            return None
 
-        data = read_json_file(str(self.config_path))
+    def _parse_config_text(self, config_text: str | None) -> dict:
+        if not config_text:
+            return {"models": []}
+        try:
+            data = json.loads(config_text)
+        except json.JSONDecodeError as exc:
+            if self._use_resources:
+                logger.warning("Failed to read packaged %s: %s", self._default_filename, exc)
+            return {"models": []}
         return data or {"models": []}
 
     @property
     def use_resources(self) -> bool:
         return self._use_resources
 
+    def _snapshot_namespace(self) -> tuple:
+        """Settings besides the manifest text that change how entries are compiled."""
+        return (type(self).__module__, type(self).__qualname__)
+
+    def _compile(self, data: dict) -> tuple[dict[str, ModelCapabilities], dict[str, str], dict[str, dict]]:
+        # Build on a shallow copy so the live maps stay intact until the swap
+        shadow = copy.copy(self)
+        shadow._extras = {}
+        configs = [config for config in shadow._parse_models(data) if config is not None]
+        shadow._build_maps(configs)
+        return shadow.model_map, shadow.alias_map, shadow._extras
+
     def _parse_models(self, data: dict) -> Iterable[ModelCapabilities | None]:
         for raw in data.get("models", []):
             if not isinstance(raw, dict):
@@ -236,6 +321,9 @@ class CapabilityModelRegistry(CustomModelRegistryBase):
     def _provider_default(self) -> ProviderType:
         return self._provider
 
+    def _snapshot_namespace(self) -> tuple:
+        return (*super()._snapshot_namespace(), self._provider.value, self._friendly_prefix)
+
     def _default_friendly_name(self, model_name: str) -> str:
         return self._friendly_prefix.format(model=model_name)
 
@@ -0,0 +1,192 @@
+"""Shared snapshot cache and hot reload for JSON-backed model registries.
+
+Every registry instance used to re-read its ``conf/*_models.json`` manifest and
+rebuild each :class:`ModelCapabilities` (including temperature constraints) from
+scratch, and providers, tools and ``listmodels`` all create their own instances.
+Compiled registry contents are now kept as pickled snapshots keyed by a hash of
+the manifest text and the registry flavour:
+
+* in process, so a manifest is parsed at most once per content version; every
+  instance still unpickles its own objects, so nothing is shared mutably
+* on disk under ``~/.pal/registry_cache`` (override with
+  PAL_REGISTRY_CACHE_DIR), so cold starts skip parsing unchanged manifests
+
+A daemon thread polls the mtime of file-backed manifests every
+PAL_REGISTRY_RELOAD_SECONDS (default 5, 0 disables) and reloads registries whose
+manifest changed, so edits apply without a restart and without any parsing on
+the request path.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from utils.env import get_env
+
+if TYPE_CHECKING:
+    from .base import CustomModelRegistryBase
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes so stale files are ignored
+SNAPSHOT_FORMAT_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path.home() / ".pal" / "registry_cache"
+DEFAULT_RELOAD_SECONDS = 5.0
+
+_snapshots: dict[str, bytes] = {}
+_snapshots_lock = threading.Lock()
+_code_fingerprints: dict[type, str] = {}
+
+
+def get_cache_dir() -> Path | None:
+    """Directory holding persisted snapshots, or None when disabled (PAL_REGISTRY_CACHE_DIR=off)."""
+    configured = (get_env("PAL_REGISTRY_CACHE_DIR", "") or "").strip()
+    if configured.lower() in {"off", "false", "none", "0"}:
+        return None
+    return Path(configured).expanduser() if configured else DEFAULT_CACHE_DIR
+
+
+def get_reload_interval() -> float:
+    """Seconds between manifest mtime checks; 0 disables hot reload."""
+    raw = get_env("PAL_REGISTRY_RELOAD_SECONDS", str(DEFAULT_RELOAD_SECONDS)) or str(DEFAULT_RELOAD_SECONDS)
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.warning("Invalid PAL_REGISTRY_RELOAD_SECONDS=%r; using %s", raw, DEFAULT_RELOAD_SECONDS)
+        return DEFAULT_RELOAD_SECONDS
+
+
+def _code_fingerprint(registry_class: type) -> str:
+    """Identify the code that compiles a registry so edits invalidate old snapshots."""
+    fingerprint = _code_fingerprints.get(registry_class)
+    if fingerprint is not None:
+        return fingerprint
+
+    from ..shared import model_capabilities, temperature
+
+    modules = {inspect.getfile(model_capabilities), inspect.getfile(temperature)}
+    for klass in registry_class.__mro__:
+        if klass.__module__.startswith("providers."):
+            modules.add(inspect.getfile(klass))
+
+    parts = [str(SNAPSHOT_FORMAT_VERSION)]
+    for module_path in sorted(modules):
+        try:
+            stat_result = os.stat(module_path)
+            parts.append(f"{module_path}:{stat_result.st_mtime_ns}:{stat_result.st_size}")
+        except OSError:
+            parts.append(module_path)
+    fingerprint = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    _code_fingerprints[registry_class] = fingerprint
+    return fingerprint
+
+
+def snapshot_key(registry: CustomModelRegistryBase, config_text: str) -> str:
+    """Hash of the manifest text, the registry flavour and the compiling code."""
+    digest = hashlib.sha256()
+    digest.update(_code_fingerprint(type(registry)).encode("utf-8"))
+    digest.update(repr(registry._snapshot_namespace()).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(config_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_snapshot(key: str) -> Any | None:
+    """Return a fresh copy of a compiled registry, or None when it has not been cached."""
+    with _snapshots_lock:
+        payload = _snapshots.get(key)
+
+    if payload is None:
+        cache_dir = get_cache_dir()
+        if cache_dir is None:
+            return None
+        try:
+            payload = (cache_dir / f"{key}.pickle").read_bytes()
+        except OSError:
+            return None
+        with _snapshots_lock:
+            _snapshots[key] = payload
+
+    try:
+        return pickle.loads(payload)
+    except Exception as exc:
+        # Corrupt or incompatible snapshot; drop it and parse the manifest instead
+        logger.debug("Discarding unreadable registry snapshot %s: %s", key, exc)
+        with _snapshots_lock:
+            _snapshots.pop(key, None)
+        return None
+
+
+def store_snapshot(key: str, compiled: Any) -> bytes:
+    """Remember a compiled registry in memory and (best effort) on disk."""
+    payload = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+    with _snapshots_lock:
+        _snapshots[key] = payload
+
+    cache_dir = get_cache_dir()
+    if cache_dir is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".snapshot-", suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, cache_dir / f"{key}.pickle")
+        except OSError as exc:
+            # Persistence only speeds up the next start; keep working from memory
+            logger.debug("Could not persist registry snapshot to %s: %s", cache_dir, exc)
+    return payload
+
+
+def clear_snapshot_cache() -> None:
+    """Drop in-process snapshots (persisted files are left untouched)."""
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+class RegistryWatcher:
+    """Poll manifest mtimes in the background and reload registries that changed."""
+
+    def __init__(self) -> None:
+        self._registries: weakref.WeakSet[CustomModelRegistryBase] = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, registry: CustomModelRegistryBase) -> None:
+        interval = get_reload_interval()
+        if interval <= 0 or registry.source_signature() is None:
+            return
+        with self._lock:
+            self._registries.add(registry)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, args=(interval,), name="pal-registry-watcher", daemon=True
+                )
+                self._thread.start()
+
+    def poll(self) -> int:
+        """Reload every watched registry whose manifest changed; returns how many were reloaded."""
+        with self._lock:
+            registries = list(self._registries)
+        return sum(1 for registry in registries if registry.reload_if_changed())
+
+    def _run(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.poll()
+            except Exception:  # pragma: no cover - the watcher must never die
+                logger.debug("Registry watcher poll failed", exc_info=True)
+
+
+watcher = RegistryWatcher()
@@ -1,7 +1,8 @@
 """Model provider registry for managing available providers."""
 
 import logging
-from typing import TYPE_CHECKING, Optional
+import time
+from typing import TYPE_CHECKING, Any, Optional
 
 from utils.env import get_env
 
@@ -53,6 +54,9 @@ class ModelProviderRegistry:
             # Initialize instance dictionaries on first creation
             cls._instance._providers = {}
             cls._instance._initialized_providers = {}
+            cls._instance._selection_table = None
+            cls._instance._selection_state = None
+            cls._instance._unhealthy_until = {}
             logging.debug(f"REGISTRY: Created instance {cls._instance}")
         return cls._instance
 
@@ -384,10 +388,9 @@ class ModelProviderRegistry:
     def get_preferred_fallback_model(cls, tool_category: Optional["ToolModelCategory"] = None) -> str:
         """Get the preferred fallback model based on provider priority and tool category.
 
-        This method orchestrates model selection by:
-        1. Getting allowed models for each provider (respecting restrictions)
-        2. Asking providers for their preference from the allowed list
-        3. Falling back to first available model if no preference given
+        Candidates come from the precomputed selection table (see
+        :meth:`get_selection_table`); the first candidate whose provider is not
+        cooling down after repeated failures wins.
 
         Args:
             tool_category: Optional category to influence model selection
@@ -398,39 +401,125 @@ class ModelProviderRegistry:
         from tools.models import ToolModelCategory
 
         effective_category = tool_category or ToolModelCategory.BALANCED
-        first_available_model = None
+        candidates = cls.get_selection_table().get(effective_category, [])
 
-        # Ask each provider for their preference in priority order
+        for model_name, provider_type in candidates:
+            if cls.is_provider_healthy(provider_type):
+                return model_name
+
+        if candidates:
+            # Every candidate's provider is cooling down; an attempt beats no model at all
+            logging.debug(f"All providers for '{effective_category.value}' are unhealthy, using {candidates[0][0]}")
+            return candidates[0][0]
+
+        # Ultimate fallback if no providers have models
+        logging.warning("No models available from any provider, using default fallback")
+        return "gemini-2.5-flash"
+
+    @classmethod
+    def get_selection_table(cls) -> dict["ToolModelCategory", list[tuple[str, ProviderType]]]:
+        """Return the auto-mode ranking: ordered (model, provider) candidates per tool category.
+
+        The table is rebuilt only when the configured providers, the restriction
+        policy or a provider's model registry change, so resolving ``auto`` is a
+        dictionary lookup rather than a walk over every provider's model list.
+        """
+        instance = cls()
+        state = cls._selection_table_state()
+        if instance._selection_table is None or instance._selection_state != state:
+            instance._selection_table = cls._build_selection_table()
+            # Building may have created provider instances; key the table on the result
+            instance._selection_state = cls._selection_table_state()
+        return instance._selection_table
+
+    @classmethod
+    def _selection_table_state(cls) -> tuple:
+        """Cheap fingerprint of everything the selection table depends on."""
+        from utils.model_restrictions import get_restriction_service
+
+        state: list[Any] = [get_restriction_service()]
         for provider_type in cls.PROVIDER_PRIORITY_ORDER:
             provider = cls.get_provider(provider_type)
-            if provider:
-                # 1. Registry filters the models first
-                allowed_models = cls._get_allowed_models_for_provider(provider, provider_type)
+            registry = getattr(provider, "_registry", None) if provider else None
+            state.append((provider, getattr(registry, "generation", None)))
+        return tuple(state)
 
-                if not allowed_models:
-                    continue
+    @classmethod
+    def _build_selection_table(cls) -> dict["ToolModelCategory", list[tuple[str, ProviderType]]]:
+        """Rank candidates for every tool category.
+
+        Each provider (in priority order) contributes the model it prefers for
+        the category from its restriction-filtered list; the alphabetically
+        first allowed model of the highest-priority provider closes the list
+        for providers that express no preference.
+        """
+        from tools.models import ToolModelCategory
 
-                # 2. Keep track of the first available model as fallback
-                if not first_available_model:
-                    first_available_model = sorted(allowed_models)[0]
+        allowed_by_provider: list[tuple[ModelProvider, ProviderType, list[str]]] = []
+        for provider_type in cls.PROVIDER_PRIORITY_ORDER:
+            provider = cls.get_provider(provider_type)
+            if provider:
+                allowed_models = cls._get_allowed_models_for_provider(provider, provider_type)
+                if allowed_models:
+                    allowed_by_provider.append((provider, provider_type, allowed_models))
+
+        table: dict[ToolModelCategory, list[tuple[str, ProviderType]]] = {}
+        for category in ToolModelCategory:
+            candidates: list[tuple[str, ProviderType]] = []
+            for provider, provider_type, allowed_models in allowed_by_provider:
+                preferred_model = provider.get_preferred_model(category, allowed_models)
+                if preferred_model and (preferred_model, provider_type) not in candidates:
+                    candidates.append((preferred_model, provider_type))
+
+            if allowed_by_provider:
+                _, provider_type, allowed_models = allowed_by_provider[0]
+                first_available = (sorted(allowed_models)[0], provider_type)
+                if first_available not in candidates:
+                    candidates.append(first_available)
+
+            table[category] = candidates
+            logging.debug(
+                f"Auto-mode ranking for '{category.value}': {[model for model, _ in candidates] or 'no models'}"
+            )
+        return table
 
-                # 3. Ask provider to pick from allowed list
-                preferred_model = provider.get_preferred_model(effective_category, allowed_models)
+    @classmethod
+    def mark_provider_unhealthy(cls, provider_type: ProviderType, cooldown_seconds: Optional[float] = None) -> None:
+        """Skip a provider's models in auto mode until the cooldown expires.
 
-                if preferred_model:
-                    logging.debug(
-                        f"Provider {provider_type.value} selected '{preferred_model}' for category '{effective_category.value}'"
-                    )
-                    return preferred_model
+        Args:
+            provider_type: Provider that keeps failing
+            cooldown_seconds: How long to skip it (default PAL_PROVIDER_COOLDOWN_SECONDS, 60)
+        """
+        if cooldown_seconds is None:
+            try:
+                cooldown_seconds = float(get_env("PAL_PROVIDER_COOLDOWN_SECONDS", "60") or 60)
+            except ValueError:
+                cooldown_seconds = 60.0
+        if cooldown_seconds <= 0:
+            return
+        instance = cls()
+        instance._unhealthy_until[provider_type] = time.monotonic() + cooldown_seconds
+        logging.warning(f"Provider {provider_type.value} marked unhealthy for {cooldown_seconds:g}s")
 
-        # If no provider returned a preference, use first available model
-        if first_available_model:
-            logging.debug(f"No provider preference, using first available: {first_available_model}")
-            return first_available_model
+    @classmethod
+    def mark_provider_healthy(cls, provider_type: ProviderType) -> None:
+        """Clear an earlier unhealthy mark."""
+        instance = cls()
+        if instance._unhealthy_until.pop(provider_type, None) is not None:
+            logging.info(f"Provider {provider_type.value} is healthy again")
 
-        # Ultimate fallback if no providers have models
-        logging.warning("No models available from any provider, using default fallback")
-        return "gemini-2.5-flash"
+    @classmethod
+    def is_provider_healthy(cls, provider_type: ProviderType) -> bool:
+        """Return False while the provider is cooling down after repeated failures."""
+        instance = cls()
+        until = instance._unhealthy_until.get(provider_type)
+        if until is None:
+            return True
+        if time.monotonic() >= until:
+            instance._unhealthy_until.pop(provider_type, None)
+            return True
+        return False
 
     @classmethod
     def get_available_providers_with_keys(cls) -> list[ProviderType]:
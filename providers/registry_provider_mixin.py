@@ -5,8 +5,8 @@ capabilities via JSON configuration files. Subclasses only need to set
 ``REGISTRY_CLASS`` to an appropriate :class:`CapabilityModelRegistry` and the
 mix-in will take care of:
 
-* Populating ``MODEL_CAPABILITIES`` exactly once per process (with optional
-  reload support for tests).
+* Populating ``MODEL_CAPABILITIES`` once per process and refreshing it when
+  the registry hot-reloads an edited manifest (with forced reloads for tests).
 * Lazily exposing the registry contents through the standard provider hooks
   (:meth:`get_all_model_capabilities` and :meth:`get_model_registry`).
 * Providing defensive logging when a registry cannot be constructed so the
@@ -32,6 +32,7 @@ class RegistryBackedProviderMixin:
     REGISTRY_CLASS: ClassVar[type[CapabilityModelRegistry] | None] = None
     _registry: ClassVar[CapabilityModelRegistry | None] = None
     MODEL_CAPABILITIES: ClassVar[dict[str, ModelCapabilities]] = {}
+    _registry_generation: ClassVar[int] = 0
 
     @classmethod
     def _registry_logger(cls) -> logging.Logger:
@@ -51,6 +52,10 @@ class RegistryBackedProviderMixin:
             raise RuntimeError(f"{cls.__name__} must define REGISTRY_CLASS.")
 
         if cls._registry is not None and not force_reload:
+            if cls._registry.generation != cls._registry_generation:
+                # The manifest was hot-reloaded in the background
+                cls.MODEL_CAPABILITIES = dict(cls._registry.model_map)
+                cls._registry_generation = cls._registry.generation
             return
 
         try:
@@ -63,6 +68,7 @@ class RegistryBackedProviderMixin:
 
         cls._registry = registry
         cls.MODEL_CAPABILITIES = dict(registry.model_map)
+        cls._registry_generation = registry.generation
 
     @classmethod
     def reload_registry(cls) -> None:
@@ -64,6 +64,10 @@ class ModelCapabilities:
         default_factory=lambda: RangeTemperatureConstraint(0.0, 2.0, 0.3)
     )
 
+    # Client-side pacing quotas (0 = none configured; rate-limit headers can still set one)
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
     def get_effective_temperature(self, requested_temperature: float) -> Optional[float]:
         """Return the temperature that should be sent to the provider.
 
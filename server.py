@@ -14,8 +14,8 @@ Key Components:
 - Request Handler: Processes incoming tool calls and returns formatted responses
 - Configuration: Manages API keys and model settings
 
-The server runs on stdio (standard input/output) and communicates using JSON-RPC messages
-as defined by the MCP protocol.
+The server runs on stdio (standard input/output) by default, or over streamable HTTP/SSE
+with PAL_TRANSPORT=http, and communicates using JSON-RPC messages as defined by the MCP protocol.
 """
 
 import asyncio
@@ -70,6 +70,7 @@ from tools import (  # noqa: E402
 from tools.models import ToolOutput  # noqa: E402
 from tools.shared.exceptions import ToolExecutionError  # noqa: E402
 from utils.env import env_override_enabled, get_env  # noqa: E402
+from utils.http_transport import get_transport  # noqa: E402
 
 # Configure logging for server operations
 # Can be controlled via LOG_LEVEL environment variable (DEBUG, INFO, WARNING, ERROR)
@@ -787,7 +788,7 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         # NOTE: Consensus tool is exempt as it handles multiple models internally
         from providers.registry import ModelProviderRegistry
         from utils.file_utils import check_total_file_size
-        from utils.model_context import ModelContext
+        from utils.model_context import ModelContext, TokenDemand
 
         # Get model from arguments or use default
         model_name = arguments.get("model") or DEFAULT_MODEL
@@ -843,6 +844,12 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
 
         # Create model context with resolved model and option
         model_context = ModelContext(model_name, model_option)
+        # Plan the context window from what this call actually needs
+        model_context.token_demand = TokenDemand.from_arguments(
+            arguments,
+            expected_output_tokens=tool.get_expected_output_tokens(),
+            system_prompt_tokens=tool.get_system_prompt_tokens(model_context.capabilities),
+        )
         arguments["_model_context"] = model_context
         arguments["_resolved_model_name"] = model_name
         logger.debug(
@@ -856,11 +863,20 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         argument_files = arguments.get("absolute_file_paths")
         if argument_files:
             logger.debug(f"Checking file sizes for {len(argument_files)} files with model {model_name}")
-            file_size_check = check_total_file_size(argument_files, model_name)
+            file_size_check = check_total_file_size(argument_files, model_name, model_context=model_context)
             if file_size_check:
                 logger.warning(f"File size check failed for {name} with model {model_name}")
                 raise ToolExecutionError(ToolOutput(**file_size_check).model_dump_json())
 
+        # Format large files in worker processes while the loop serves other sessions;
+        # workflow tools embed their relevant files for the final (expert analysis) step
+        from utils.prep_pool import prefetch_file_contents
+
+        embedded_files = argument_files
+        if not embedded_files and arguments.get("next_step_required") is False:
+            embedded_files = arguments.get("relevant_files")
+        await prefetch_file_contents(embedded_files, include_line_numbers=tool.wants_line_numbers_by_default())
+
         # Execute tool with pre-resolved model context
         result = await tool.execute(arguments)
         logger.info(f"Tool '{name}' execution completed")
@@ -1044,7 +1060,8 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
         4. Debug tool can reference specific findings from analyze tool
         5. Natural cross-tool collaboration without context loss
     """
-    from utils.conversation_memory import add_turn, build_conversation_history, get_thread
+    from utils.conversation_memory import add_turn, build_conversation_history, get_conversation_file_list, get_thread
+    from utils.prep_pool import prefetch_file_contents
 
     continuation_id = arguments["continuation_id"]
 
@@ -1093,7 +1110,7 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
             logger.debug(f"[CONVERSATION_DEBUG] Successfully added user turn to thread {continuation_id}")
 
     # Create model context early to use for history building
-    from utils.model_context import ModelContext
+    from utils.model_context import ModelContext, TokenDemand
 
     tool = TOOLS.get(context.tool_name)
     requires_model = tool.requires_model() if tool else True
@@ -1202,11 +1219,24 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
             arguments["_model_context"] = model_context
             arguments["_resolved_model_name"] = fallback_model
 
+    # Plan the window around the new input; history demand is measured while building it
+    if isinstance(getattr(model_context, "token_demand", None), TokenDemand):
+        model_context.token_demand = TokenDemand.from_arguments(
+            arguments,
+            expected_output_tokens=tool.get_expected_output_tokens() if tool else None,
+            system_prompt_tokens=tool.get_system_prompt_tokens(model_context.capabilities) if tool else None,
+        )
+
     # Build conversation history with model-specific limits
     logger.debug(f"[CONVERSATION_DEBUG] Building conversation history for thread {continuation_id}")
     logger.debug(f"[CONVERSATION_DEBUG] Thread has {len(context.turns)} turns, tool: {context.tool_name}")
     logger.debug(f"[CONVERSATION_DEBUG] Using model: {model_context.model_name}")
-    conversation_history, conversation_tokens = build_conversation_history(context, model_context)
+    relevance_query = arguments.get("prompt") or arguments.get("step")
+    # Format large history files in worker processes while the loop serves other sessions
+    await prefetch_file_contents(get_conversation_file_list(context))
+    conversation_history, conversation_tokens = build_conversation_history(
+        context, model_context, query=relevance_query
+    )
     logger.debug(f"[CONVERSATION_DEBUG] Conversation history built: {conversation_tokens:,} tokens")
     logger.debug(
         f"[CONVERSATION_DEBUG] Conversation history length: {len(conversation_history)} chars (~{conversation_tokens:,} tokens)"
@@ -1250,6 +1280,7 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     # History has already consumed some of the content budget
     remaining_tokens = token_allocation.content_tokens - conversation_tokens
     enhanced_arguments["_remaining_tokens"] = max(0, remaining_tokens)  # Ensure non-negative
+    enhanced_arguments["_history_tokens"] = conversation_tokens  # History demand for the tool's token planning
     enhanced_arguments["_model_context"] = model_context  # Pass context for use in tools
 
     logger.debug("[CONVERSATION_DEBUG] Token budget calculation:")
@@ -1446,20 +1477,52 @@ async def handle_get_prompt(name: str, arguments: dict[str, Any] = None) -> GetP
     )
 
 
+def build_initialization_options() -> InitializationOptions:
+    """Build the handshake options sent to every MCP client session."""
+    from config import IS_AUTO_MODE
+
+    # Prepare dynamic instructions for the MCP client based on model mode
+    if IS_AUTO_MODE:
+        handshake_instructions = (
+            "When the user names a specific model (e.g. 'use chat with gpt5'), send that exact model in the tool call. "
+            "When no model is mentioned, first use the `listmodels` tool from PAL to obtain available models to choose the best one from."
+        )
+    else:
+        handshake_instructions = (
+            "When the user names a specific model (e.g. 'use chat with gpt5'), send that exact model in the tool call. "
+            f"When no model is mentioned, default to '{DEFAULT_MODEL}'."
+        )
+
+    return InitializationOptions(
+        server_name="PAL",
+        server_version=__version__,
+        instructions=handshake_instructions,
+        capabilities=ServerCapabilities(
+            tools=ToolsCapability(),  # Advertise tool support capability
+            prompts=PromptsCapability(),  # Advertise prompt support capability
+        ),
+    )
+
+
 async def main():
     """
     Main entry point for the MCP server.
 
-    Initializes the Gemini API configuration and starts the server using
-    stdio transport. The server will continue running until the client
-    disconnects or an error occurs.
+    Initializes the provider configuration and starts the server. By default
+    the server uses stdio transport and runs until the client disconnects;
+    with PAL_TRANSPORT=http it serves many clients over streamable HTTP/SSE
+    until the process is stopped.
 
-    The server communicates via standard input/output streams using the
-    MCP protocol's JSON-RPC message format.
+    Both transports use the MCP protocol's JSON-RPC message format.
     """
     # Validate and configure providers based on available API keys
     configure_providers()
 
+    # Start prompt preparation workers now, so no request pays for spawning them
+    from utils.prep_pool import start_prep_pool
+
+    start_prep_pool()
+
     # Log startup message
     logger.info("PAL MCP Server starting up...")
     logger.info(f"Log level: {log_level}")
@@ -1483,34 +1546,20 @@ async def main():
     logger.info(f"Available tools: {list(TOOLS.keys())}")
     logger.info("Server ready - waiting for tool requests...")
 
-    # Prepare dynamic instructions for the MCP client based on model mode
-    if IS_AUTO_MODE:
-        handshake_instructions = (
-            "When the user names a specific model (e.g. 'use chat with gpt5'), send that exact model in the tool call. "
-            "When no model is mentioned, first use the `listmodels` tool from PAL to obtain available models to choose the best one from."
-        )
-    else:
-        handshake_instructions = (
-            "When the user names a specific model (e.g. 'use chat with gpt5'), send that exact model in the tool call. "
-            f"When no model is mentioned, default to '{DEFAULT_MODEL}'."
-        )
+    initialization_options = build_initialization_options()
+
+    if get_transport() == "http":
+        # One long-running process serves many clients over streamable HTTP/SSE,
+        # sharing providers, caches and conversation memory between sessions
+        from utils.http_transport import serve_http
+
+        await serve_http(server, initialization_options)
+        return
 
     # Run the server using stdio transport (standard input/output)
     # This allows the server to be launched by MCP clients as a subprocess
     async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="PAL",
-                server_version=__version__,
-                instructions=handshake_instructions,
-                capabilities=ServerCapabilities(
-                    tools=ToolsCapability(),  # Advertise tool support capability
-                    prompts=PromptsCapability(),  # Advertise prompt support capability
-                ),
-            ),
-        )
+        await server.run(read_stream, write_stream, initialization_options)
 
 
 def run():
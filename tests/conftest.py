@@ -32,6 +32,10 @@ env_config.reload_env({"PAL_MCP_FORCE_ENV_OVERRIDE": "false"})
 # This prevents all tests from failing due to missing model parameter
 os.environ["DEFAULT_MODEL"] = "gemini-2.5-flash"
 
+# Keep model registry snapshots in memory and skip the background mtime watcher
+os.environ["PAL_REGISTRY_CACHE_DIR"] = "off"
+os.environ["PAL_REGISTRY_RELOAD_SECONDS"] = "0"
+
 # Force reload of config module to pick up the env var
 import config  # noqa: E402
 
@@ -217,3 +221,15 @@ def disable_force_env_override(monkeypatch):
         yield
     finally:
         env_config.reload_env()
+
+
+@pytest.fixture(autouse=True)
+def isolate_relevance_index(tmp_path, monkeypatch):
+    """Keep lexical relevance indexes inside the per-test sandbox instead of ~/.pal/index."""
+
+    from utils.relevance_index import clear_index_cache
+
+    monkeypatch.setenv("PAL_INDEX_DIR", str(tmp_path / "pal_index"))
+    clear_index_cache()
+    yield
+    clear_index_cache()
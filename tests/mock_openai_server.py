@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible mock provider
+
+A small stdlib-only HTTP server that speaks enough of the OpenAI API for the
+server's custom provider (CUSTOM_API_URL) and the OpenAI SDK, with
+configurable behaviour so concurrency and performance work can be exercised
+offline and without API keys:
+
+- Latency distributions for the time to first token (fixed, uniform, normal,
+  lognormal)
+- Token generation rate and completion length
+- Injected 429 (with Retry-After) and 500 responses at configurable rates
+- Streaming (server-sent events) and non-streaming chat completions
+
+Endpoints: ``GET /v1/models``, ``POST /v1/chat/completions``, ``GET /health``
+and ``GET /stats`` (request and injected error counters).
+
+Usage:
+    # Standalone (point CUSTOM_API_URL at http://127.0.0.1:8089/v1)
+    python tests/mock_openai_server.py --port 8089 --latency lognormal:400,0.5 --error-429-rate 0.05
+
+    # In-process
+    with MockOpenAIServer(MockServerConfig(latency=LatencyModel.parse("fixed:50"))) as server:
+        client = OpenAI(base_url=server.base_url, api_key="mock")
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+DEFAULT_MODELS = ("llama3.2", "mock-model")
+FILLER_WORDS = ("the", "change", "looks", "correct", "and", "keeps", "behaviour", "unchanged", "for", "callers")
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Distribution of the delay before the first token, in milliseconds."""
+
+    kind: str = "fixed"
+    params: tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """
+        Parse a distribution spec.
+
+        Formats: ``fixed:MS``, ``uniform:LOW_MS,HIGH_MS``, ``normal:MEAN_MS,STDDEV_MS``
+        and ``lognormal:MEDIAN_MS,SIGMA``.
+        """
+        kind, _, raw = spec.partition(":")
+        kind = kind.strip().lower()
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected:
+            raise ValueError(f"Unknown latency distribution '{kind}' (expected {', '.join(expected)})")
+        try:
+            params = tuple(float(value) for value in raw.split(",")) if raw else ()
+        except ValueError as e:
+            raise ValueError(f"Invalid latency parameters in '{spec}'") from e
+        if len(params) != expected[kind]:
+            raise ValueError(f"Latency '{kind}' takes {expected[kind]} parameter(s), got '{spec}'")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one delay in seconds (never negative)."""
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(max(median, 1e-3)), sigma)
+        return max(value, 0.0) / 1000.0
+
+
+@dataclass
+class MockServerConfig:
+    """Behaviour of the mock provider."""
+
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    tokens_per_second: float = 0.0  # 0 = completion is generated instantly
+    completion_tokens: int = 64
+    error_429_rate: float = 0.0
+    error_500_rate: float = 0.0
+    retry_after: float = 1.0
+    models: tuple[str, ...] = DEFAULT_MODELS
+    seed: Optional[int] = None
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    server: "_MockHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature defined by BaseHTTPRequestHandler
+        pass
+
+    def do_GET(self):  # noqa: N802
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path in ("/health", ""):
+            self._send_json(200, {"status": "ok"})
+        elif path.endswith("/models"):
+            models = [{"id": name, "object": "model", "owned_by": "mock"} for name in self.server.config.models]
+            self._send_json(200, {"object": "list", "data": models})
+        elif path == "/stats":
+            self._send_json(200, self.server.owner.stats())
+        else:
+            self._send_json(404, _error_body("Not found", "invalid_request_error"))
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not self.path.split("?", 1)[0].rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, _error_body("Not found", "invalid_request_error"))
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, _error_body("Request body is not valid JSON", "invalid_request_error"))
+            return
+
+        owner = self.server.owner
+        injected = owner.draw_error()
+        if injected == 429:
+            owner.count("rate_limited")
+            self._send_json(
+                429,
+                _error_body("Rate limit reached (injected by mock server)", "rate_limit_exceeded"),
+                headers={"Retry-After": f"{owner.config.retry_after:g}"},
+            )
+            return
+        if injected == 500:
+            owner.count("server_errors")
+            self._send_json(500, _error_body("Internal error (injected by mock server)", "server_error"))
+            return
+
+        owner.count("completions")
+        time.sleep(owner.draw_latency())
+        if body.get("stream"):
+            owner.count("streams")
+            self._stream_completion(body)
+        else:
+            self._complete(body)
+
+    def _complete(self, body: dict[str, Any]) -> None:
+        config = self.server.config
+        if config.tokens_per_second > 0:
+            time.sleep(config.completion_tokens / config.tokens_per_second)
+        text = " ".join(_completion_words(body, config.completion_tokens))
+        prompt_tokens = _prompt_tokens(body)
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", config.models[0]),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": config.completion_tokens,
+                    "total_tokens": prompt_tokens + config.completion_tokens,
+                },
+            },
+        )
+
+    def _stream_completion(self, body: dict[str, Any]) -> None:
+        config = self.server.config
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get("model", config.models[0])
+        delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta: dict[str, Any], finish_reason: Optional[str] = None) -> None:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        try:
+            chunk({"role": "assistant", "content": ""})
+            for index, word in enumerate(_completion_words(body, config.completion_tokens)):
+                if delay:
+                    time.sleep(delay)
+                chunk({"content": word if index == 0 else f" {word}"})
+            chunk({}, finish_reason="stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, status: int, payload: dict[str, Any], headers: Optional[dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], owner: "MockOpenAIServer"):
+        super().__init__(address, _MockHandler)
+        self.owner = owner
+        self.config = owner.config
+
+
+class MockOpenAIServer:
+    """OpenAI-compatible mock provider running on a background thread."""
+
+    def __init__(self, config: Optional[MockServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockServerConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._counters = {"completions": 0, "streams": 0, "rate_limited": 0, "server_errors": 0}
+        self._httpd = _MockHTTPServer((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL to use as CUSTOM_API_URL / OpenAI base_url."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def draw_latency(self) -> float:
+        with self._lock:
+            return self.config.latency.sample(self._rng)
+
+    def draw_error(self) -> Optional[int]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.config.error_429_rate:
+            return 429
+        if roll < self.config.error_429_rate + self.config.error_500_rate:
+            return 500
+        return None
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-openai-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def _error_body(message: str, error_type: str) -> dict[str, Any]:
+    return {"error": {"message": message, "type": error_type, "param": None, "code": error_type}}
+
+
+def _prompt_tokens(body: dict[str, Any]) -> int:
+    text = "".join(str(message.get("content") or "") for message in body.get("messages") or [])
+    return max(1, len(text) // 4)
+
+
+def _completion_words(body: dict[str, Any], count: int) -> list[str]:
+    """Deterministic filler text, prefixed with a hint of the last user message."""
+    messages = body.get("messages") or []
+    last_user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+    content = last_user.get("content") or ""
+    if isinstance(content, list):  # multimodal content parts
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    words = ["Mock", "answer", "to:"] + str(content).split()[:8]
+    while len(words) < count:
+        words.append(FILLER_WORDS[len(words) % len(FILLER_WORDS)])
+    return words[: max(count, 1)]
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the mock behaviour options (shared with load_test.py)."""
+    parser.add_argument(
+        "--latency",
+        default="fixed:0",
+        help="Time to first token: fixed:MS, uniform:LOW,HIGH, normal:MEAN,STDDEV or lognormal:MEDIAN,SIGMA",
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation rate (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="Tokens per completion")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-500-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and error sampling")
+
+
+def config_from_arguments(args: argparse.Namespace) -> MockServerConfig:
+    return MockServerConfig(
+        latency=LatencyModel.parse(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(config_from_arguments(args), host=args.host, port=args.port)
+    print(f"Mock OpenAI-compatible server listening on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
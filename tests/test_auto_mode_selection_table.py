@@ -0,0 +1,104 @@
+"""Tests for the precomputed auto-mode selection table and provider health fall-through."""
+
+from unittest.mock import patch
+
+import pytest
+
+import utils.model_restrictions
+from providers.gemini import GeminiModelProvider
+from providers.openai import OpenAIModelProvider
+from providers.registry import ModelProviderRegistry
+from providers.shared import ProviderType
+from tools.models import ToolModelCategory
+
+
+@pytest.fixture
+def gemini_and_openai(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-gemini")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai")
+    for key in ("GOOGLE_ALLOWED_MODELS", "OPENAI_ALLOWED_MODELS"):
+        monkeypatch.delenv(key, raising=False)
+    utils.model_restrictions._restriction_service = None
+
+    registry = ModelProviderRegistry()
+    saved_providers = dict(registry._providers)
+    saved_initialized = dict(registry._initialized_providers)
+    registry._providers.clear()
+    registry._initialized_providers.clear()
+    registry._unhealthy_until.clear()
+    ModelProviderRegistry.register_provider(ProviderType.GOOGLE, GeminiModelProvider)
+    ModelProviderRegistry.register_provider(ProviderType.OPENAI, OpenAIModelProvider)
+
+    yield registry
+
+    registry._providers.clear()
+    registry._providers.update(saved_providers)
+    registry._initialized_providers.clear()
+    registry._initialized_providers.update(saved_initialized)
+    registry._unhealthy_until.clear()
+    utils.model_restrictions._restriction_service = None
+
+
+@pytest.mark.no_mock_provider
+def test_table_is_computed_once(gemini_and_openai):
+    with patch.object(
+        ModelProviderRegistry,
+        "_get_allowed_models_for_provider",
+        wraps=ModelProviderRegistry._get_allowed_models_for_provider,
+    ) as allowed:
+        first = ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.EXTENDED_REASONING)
+        calls = allowed.call_count
+        for category in ToolModelCategory:
+            ModelProviderRegistry.get_preferred_fallback_model(category)
+
+    assert calls == 2  # one per configured provider
+    assert allowed.call_count == calls
+    assert first == "gemini-3-pro-preview"
+
+    table = ModelProviderRegistry.get_selection_table()
+    assert set(table) == set(ToolModelCategory)
+    providers = [provider_type for _, provider_type in table[ToolModelCategory.EXTENDED_REASONING]]
+    assert providers[:2] == [ProviderType.GOOGLE, ProviderType.OPENAI]
+
+
+@pytest.mark.no_mock_provider
+def test_table_rebuilt_when_restrictions_change(gemini_and_openai, monkeypatch):
+    assert ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.FAST_RESPONSE) == "gemini-2.5-flash"
+
+    monkeypatch.setenv("GOOGLE_ALLOWED_MODELS", "gemini-2.5-pro")
+    utils.model_restrictions._restriction_service = None
+
+    assert ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.FAST_RESPONSE) == "gemini-2.5-pro"
+
+
+@pytest.mark.no_mock_provider
+def test_unhealthy_provider_falls_through(gemini_and_openai):
+    top_choice = ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.BALANCED)
+
+    ModelProviderRegistry.mark_provider_unhealthy(ProviderType.GOOGLE, cooldown_seconds=60)
+    fallback = ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.BALANCED)
+    assert fallback != top_choice
+    assert ModelProviderRegistry.get_provider_for_model(fallback).get_provider_type() == ProviderType.OPENAI
+
+    # Every provider cooling down still yields the top-ranked model
+    ModelProviderRegistry.mark_provider_unhealthy(ProviderType.OPENAI, cooldown_seconds=60)
+    assert ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.BALANCED) == top_choice
+
+    ModelProviderRegistry.mark_provider_healthy(ProviderType.GOOGLE)
+    assert ModelProviderRegistry.get_preferred_fallback_model(ToolModelCategory.BALANCED) == top_choice
+
+
+@pytest.mark.no_mock_provider
+def test_exhausted_retries_mark_provider_unhealthy(gemini_and_openai):
+    provider = ModelProviderRegistry.get_provider(ProviderType.OPENAI)
+
+    def failing():
+        raise ConnectionError("upstream down")
+
+    with patch.object(provider, "_is_error_retryable", return_value=True):
+        with pytest.raises(ConnectionError):
+            provider._run_with_retries(failing, max_attempts=2)
+    assert not ModelProviderRegistry.is_provider_healthy(ProviderType.OPENAI)
+
+    assert provider._run_with_retries(lambda: "ok", max_attempts=1) == "ok"
+    assert ModelProviderRegistry.is_provider_healthy(ProviderType.OPENAI)
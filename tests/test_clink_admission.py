@@ -0,0 +1,195 @@
+import asyncio
+import contextlib
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from clink.admission import CLIAdmission, CLIBusyError, admission_stats, reset_admissions
+from clink.agents.base import BaseCLIAgent, CLIAgentError
+from clink.models import ResolvedCLIClient, ResolvedCLIRole
+
+
+@pytest.fixture(autouse=True)
+def clean_admissions():
+    reset_admissions()
+    yield
+    reset_admissions()
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_in_arrival_order():
+    admission = CLIAdmission("stub", max_concurrency=1, max_queue=None)
+    order: list[int] = []
+    release = asyncio.Event()
+
+    async def worker(index: int) -> float:
+        async with admission.slot() as waited:
+            order.append(index)
+            if index == 0:
+                await release.wait()
+            return waited
+
+    tasks = [asyncio.create_task(worker(index)) for index in range(4)]
+    await asyncio.sleep(0.05)
+    assert order == [0]
+    assert admission.waiting == 3
+
+    release.set()
+    waits = await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2, 3]
+    assert waits[0] == 0.0 and all(wait > 0 for wait in waits[1:])
+    assert admission.active == 0
+    assert admission.stats.queued == 3
+    assert admission.stats.max_wait_seconds >= admission.stats.average_wait_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_fails_fast():
+    admission = CLIAdmission("stub", max_concurrency=1, max_queue=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with admission.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(CLIBusyError, match="is busy"):
+        async with admission.slot():
+            pass
+
+    release.set()
+    await asyncio.gather(holder, queued)
+    assert admission.stats.rejected == 1
+    assert admission.stats.admitted == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_times_out_and_cancelled_waiters_leave_queue():
+    admission = CLIAdmission("stub", max_concurrency=1, max_queue=None)
+    release = asyncio.Event()
+
+    async def hold():
+        async with admission.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(CLIBusyError, match="no slot became free"):
+        async with admission.slot(timeout=0.05):
+            pass
+
+    cancelled = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert admission.waiting == 0
+
+    release.set()
+    await holder
+    assert admission.active == 0
+
+
+class SlowProcess:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.returncode = None
+        self.stdin = self
+        self.stdout = asyncio.StreamReader()
+        self.stderr = asyncio.StreamReader()
+        self.stderr.feed_eof()
+
+    def write(self, data: bytes) -> None:
+        return None
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        async def finish():
+            await asyncio.sleep(self.delay)
+            self.stdout.feed_data(json.dumps({"result": "ok"}).encode())
+            self.stdout.feed_eof()
+            self.returncode = 0
+
+        self._finisher = asyncio.get_running_loop().create_task(finish())
+
+    def kill(self) -> None:
+        self._finisher.cancel()
+        self.returncode = -9
+
+    async def wait(self) -> int:
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._finisher
+        return self.returncode
+
+
+@pytest.mark.asyncio
+async def test_agent_reports_busy_and_queue_wait(monkeypatch):
+    role = ResolvedCLIRole(name="default", prompt_path=Path("systemprompts/clink/default.txt").resolve())
+    client = ResolvedCLIClient(
+        name="claude",
+        executable=["claude"],
+        working_dir=None,
+        timeout_seconds=30,
+        max_concurrency=1,
+        max_queue=1,
+        parser="claude_json",
+        roles={"default": role},
+    )
+
+    async def fake_create_subprocess_exec(*_args, **_kwargs):
+        return SlowProcess(0.1)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_create_subprocess_exec)
+    monkeypatch.setattr(shutil, "which", lambda name: f"/usr/bin/{name}")
+
+    async def ask():
+        return await BaseCLIAgent(client).run(role=role, prompt="hi", files=[], images=[])
+
+    results = await asyncio.gather(ask(), ask(), ask(), return_exceptions=True)
+
+    first, second, rejected = results
+    assert first.parsed.content == "ok" and first.queue_wait_seconds == 0.0
+    assert second.parsed.content == "ok" and second.queue_wait_seconds > 0.05
+    assert isinstance(rejected, CLIAgentError) and "is busy" in str(rejected)
+    stats = admission_stats()["claude"]
+    assert stats["rejected"] == 1 and stats["queued"] == 1 and stats["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_counts_against_cli_timeout(monkeypatch):
+    role = ResolvedCLIRole(name="default", prompt_path=Path("systemprompts/clink/default.txt").resolve())
+    client = ResolvedCLIClient(
+        name="claude",
+        executable=["claude"],
+        working_dir=None,
+        timeout_seconds=1,
+        max_concurrency=1,
+        max_queue=1,
+        parser="claude_json",
+        roles={"default": role},
+    )
+
+    async def fake_create_subprocess_exec(*_args, **_kwargs):
+        return SlowProcess(0.6)
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_create_subprocess_exec)
+    monkeypatch.setattr(shutil, "which", lambda name: f"/usr/bin/{name}")
+
+    async def ask():
+        return await BaseCLIAgent(client).run(role=role, prompt="hi", files=[], images=[])
+
+    started = asyncio.get_running_loop().time()
+    first, second = await asyncio.gather(ask(), ask(), return_exceptions=True)
+
+    # The second call queued for ~0.6s, leaving ~0.4s of its 1s budget to run
+    assert first.parsed.content == "ok"
+    assert isinstance(second, CLIAgentError) and "timed out" in str(second)
+    assert asyncio.get_running_loop().time() - started < 1.1
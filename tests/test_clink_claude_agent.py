@@ -10,16 +10,40 @@ from clink.agents.claude import ClaudeAgent
 from clink.models import ResolvedCLIClient, ResolvedCLIRole
 
 
+def _stream_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class DummyStdin:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
 class DummyProcess:
     def __init__(self, *, stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0):
-        self._stdout = stdout
-        self._stderr = stderr
+        self.stdin = DummyStdin()
+        self.stdout = _stream_reader(stdout)
+        self.stderr = _stream_reader(stderr)
         self.returncode = returncode
-        self.stdin_data: bytes | None = None
 
-    async def communicate(self, input_data):
-        self.stdin_data = input_data
-        return self._stdout, self._stderr
+    @property
+    def stdin_data(self) -> bytes:
+        return self.stdin.data
+
+    async def wait(self) -> int:
+        return self.returncode
 
 
 @pytest.fixture()
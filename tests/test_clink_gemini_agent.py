@@ -9,14 +9,36 @@ from clink.agents.gemini import GeminiAgent
 from clink.models import ResolvedCLIClient, ResolvedCLIRole
 
 
+def _stream_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+class DummyStdin:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes) -> None:
+        self.data += data
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+
 class DummyProcess:
     def __init__(self, *, stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0):
-        self._stdout = stdout
-        self._stderr = stderr
+        self.stdin = DummyStdin()
+        self.stdout = _stream_reader(stdout)
+        self.stderr = _stream_reader(stderr)
         self.returncode = returncode
 
-    async def communicate(self, _input):
-        return self._stdout, self._stderr
+    async def wait(self) -> int:
+        return self.returncode
 
 
 @pytest.fixture()
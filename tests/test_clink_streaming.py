@@ -0,0 +1,151 @@
+import asyncio
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from clink.parsers import ParserStream, get_parser
+from clink.streaming import UNPARSED_STDOUT_BYTES, capture_output
+from tools.clink import MAX_RESPONSE_CHARS, CLinkTool
+
+
+def _agent_message(text: str) -> str:
+    return json.dumps({"type": "item.completed", "item": {"type": "agent_message", "text": text}})
+
+
+def test_codex_stream_caps_content_and_keeps_late_summary():
+    stream = get_parser("codex_jsonl").stream(output_limit=100)
+
+    stream.feed(_agent_message("A" * 80))
+    stream.feed(_agent_message("B" * 80))
+    note = stream.feed(_agent_message("<SUMMARY>All good.</SUMMARY>"))
+    stream.feed(json.dumps({"type": "turn.completed", "usage": {"output_tokens": 3}}))
+    parsed = stream.finish("", "")
+
+    assert note == "summary received"
+    assert parsed.content.startswith("A" * 80 + "\n\n" + "B" * 18)
+    assert parsed.content.endswith("<SUMMARY>All good.</SUMMARY>")
+    assert parsed.metadata["output_streamed_length"] == 80 + 2 + 80 + 2 + len("<SUMMARY>All good.</SUMMARY>")
+    assert "events_truncated" not in parsed.metadata  # a few small events fit the event cap
+    assert parsed.metadata["usage"] == {"output_tokens": 3}
+
+
+def test_codex_stream_caps_raw_events_without_output_limit(monkeypatch):
+    monkeypatch.setattr("clink.parsers.codex.MAX_EVENT_CHARS", 10_000)
+    stream = get_parser("codex_jsonl").stream(output_limit=None)
+    command = {"type": "item.completed", "item": {"type": "command_execution", "aggregated_output": "x" * 1000}}
+
+    for _ in range(50):
+        stream.feed(json.dumps(command))
+    stream.feed(_agent_message("done"))
+    parsed = stream.finish("", "")
+
+    assert parsed.content == "done"
+    assert sum(len(json.dumps(event)) for event in parsed.metadata["events"]) <= 10_000
+    assert parsed.metadata["events_truncated"] is True
+
+
+def test_codex_parser_matches_stream_without_limit():
+    stdout = "\n".join([_agent_message("first"), "not json", _agent_message("second")])
+
+    parsed = get_parser("codex_jsonl").parse(stdout, "")
+
+    assert parsed.content == "first\n\nsecond"
+    assert "output_streamed_length" not in parsed.metadata
+
+
+async def _run_python(code: str) -> asyncio.subprocess.Process:
+    return await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        code,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+
+@pytest.mark.asyncio
+async def test_capture_bounds_raw_stdout_for_line_parsers():
+    # ~2MB of JSONL followed by the final answer
+    code = (
+        "import json, sys\n"
+        "sys.stdin.read()\n"
+        "filler = json.dumps({'type': 'item.completed', 'item': {'type': 'reasoning', 'text': 'x' * 1000}})\n"
+        "for _ in range(2000):\n"
+        "    print(filler)\n"
+        "print(json.dumps({'type': 'item.completed', 'item': {'type': 'agent_message', 'text': 'done'}}))\n"
+        "print(json.dumps({'type': 'turn.completed', 'usage': {}}))\n"
+    )
+    notes: list[str] = []
+
+    async def on_progress(note: str) -> None:
+        notes.append(note)
+
+    stream = get_parser("codex_jsonl").stream(output_limit=MAX_RESPONSE_CHARS)
+    process = await _run_python(code)
+    captured = await capture_output(process, "prompt", stream, on_progress=on_progress)
+
+    assert process.returncode == 0
+    assert captured.stdout_truncated is True
+    assert len(captured.stdout.encode()) <= UNPARSED_STDOUT_BYTES
+    assert captured.stdout_bytes > 2_000_000
+    assert stream.finish(captured.stdout, captured.stderr).content == "done"
+    assert notes  # first note is sent immediately
+
+
+@pytest.mark.asyncio
+async def test_capture_keeps_full_document_for_json_parsers():
+    code = (
+        "import json, sys\n"
+        "sys.stdin.read()\n"
+        "print(json.dumps({'result': 'y' * 300000}))\n"
+        "print('warn', file=sys.stderr)\n"
+    )
+
+    stream = get_parser("claude_json").stream()
+    process = await _run_python(code)
+    captured = await capture_output(process, "prompt", stream)
+
+    assert isinstance(stream, ParserStream) and stream.needs_raw_output
+    assert captured.stdout_truncated is False
+    assert captured.stderr.strip() == "warn"
+    assert stream.finish(captured.stdout, captured.stderr).content == "y" * 300_000
+
+
+def test_output_limit_uses_streamed_length():
+    tool = CLinkTool()
+    client = tool._registry.get_client(tool._default_cli_name)
+    content = "C" * MAX_RESPONSE_CHARS
+
+    limited, metadata = tool._apply_output_limit(client, content, {"output_streamed_length": 5 * MAX_RESPONSE_CHARS})
+
+    assert metadata["output_truncated"] is True
+    assert metadata["output_original_length"] == 5 * MAX_RESPONSE_CHARS
+    assert f"produced {5 * MAX_RESPONSE_CHARS} characters" in limited
+
+
+@pytest.mark.asyncio
+async def test_progress_forwarded_when_client_requests_it():
+    from mcp.server.lowlevel.server import request_ctx
+
+    sent: list[tuple] = []
+
+    class Session:
+        async def send_progress_notification(self, token, progress, total=None, message=None, related_request_id=None):
+            sent.append((token, progress, message, related_request_id))
+
+    tool = CLinkTool()
+    client = tool._registry.get_client(tool._default_cli_name)
+    context = SimpleNamespace(request_id="req-1", meta=SimpleNamespace(progressToken="tok"), session=Session())
+
+    assert tool._progress_reporter(client) is None
+    token = request_ctx.set(context)
+    try:
+        report = tool._progress_reporter(client)
+    finally:
+        request_ctx.reset(token)
+    await report("turn completed")
+
+    assert sent == [("tok", 1, f"{client.name}: turn completed", "req-1")]
@@ -1,11 +1,13 @@
+import asyncio
 import json
 
 import pytest
 
 from clink import get_registry
-from clink.agents import AgentOutput
+from clink.agents import AgentOutput, CLIAgentError
 from clink.parsers.base import ParsedCLIResponse
 from tools.clink import MAX_RESPONSE_CHARS, CLinkTool
+from tools.shared.exceptions import ToolExecutionError
 
 
 @pytest.mark.asyncio
@@ -69,6 +71,16 @@ def test_registry_lists_roles():
     ]
 
 
+def test_schema_requires_a_cli_choice_when_several_are_configured():
+    from jsonschema import Draft202012Validator
+
+    validator = Draft202012Validator(CLinkTool().get_input_schema())
+
+    assert not validator.is_valid({"prompt": "Hello"})
+    assert validator.is_valid({"prompt": "Hello", "cli_name": "gemini"})
+    assert validator.is_valid({"prompt": "Hello", "cli_names": ["gemini", "codex"]})
+
+
 @pytest.mark.asyncio
 async def test_clink_tool_defaults_to_first_cli(monkeypatch):
     tool = CLinkTool()
@@ -185,3 +197,103 @@ async def test_clink_tool_truncates_without_summary(monkeypatch):
     assert metadata.get("output_truncated") is True
     assert metadata.get("events_removed_for_normal") is True
     assert metadata.get("output_original_length") == len(long_text)
+
+
+def _fan_out_agents(monkeypatch, behaviours, wait_for_all=False):
+    """Patch create_agent so each CLI name maps to (delay_seconds, content or exception).
+
+    With ``wait_for_all`` every agent blocks until all of them have started, so
+    CLIs run one after another time out instead of answering.
+    """
+    started = set()
+    all_started = asyncio.Event()
+
+    class DummyAgent:
+        def __init__(self, client):
+            self.client = client
+
+        async def run(self, **kwargs):
+            delay, outcome = behaviours[self.client.name]
+            if wait_for_all:
+                started.add(self.client.name)
+                if len(started) == len(behaviours):
+                    all_started.set()
+                await asyncio.wait_for(all_started.wait(), timeout=5)
+            await asyncio.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return AgentOutput(
+                parsed=ParsedCLIResponse(content=outcome, metadata={}),
+                sanitized_command=[self.client.name],
+                returncode=0,
+                stdout="",
+                stderr="",
+                duration_seconds=delay,
+                parser_name="dummy",
+                output_file_content=None,
+            )
+
+    monkeypatch.setattr("tools.clink.create_agent", DummyAgent)
+
+
+@pytest.mark.asyncio
+async def test_clink_fan_out_runs_clis_in_parallel(monkeypatch):
+    tool = CLinkTool()
+    _fan_out_agents(monkeypatch, {"gemini": (0.3, "Gemini says yes"), "codex": (0.3, "Codex says no")}, True)
+
+    result = await tool.execute({"prompt": "Second opinion?", "cli_names": ["gemini", "codex", "GEMINI"]})
+
+    payload = json.loads(result[0].text)
+    assert "=== gemini (role: default, 0.3s) ===\nGemini says yes" in payload["content"]
+    assert "=== codex (role: default, 0.3s) ===\nCodex says no" in payload["content"]
+    metadata = payload["metadata"]
+    assert metadata["cli_names"] == ["gemini", "codex"]
+    assert set(metadata["results"]) == {"gemini", "codex"}
+    assert "partial_results" not in metadata
+
+
+@pytest.mark.asyncio
+async def test_clink_fan_out_returns_partial_results(monkeypatch):
+    tool = CLinkTool()
+    timeout = CLIAgentError("CLI 'codex' timed out after 1800 seconds")
+    _fan_out_agents(monkeypatch, {"gemini": (0, "Gemini answer"), "codex": (0, timeout)})
+
+    result = await tool.execute({"prompt": "Review", "cli_names": ["gemini", "codex"]})
+
+    payload = json.loads(result[0].text)
+    assert payload["status"] in {"success", "continuation_available"}
+    assert "Gemini answer" in payload["content"]
+    assert "=== codex (role: default) FAILED ===\nCLI 'codex' timed out" in payload["content"]
+    assert payload["metadata"]["partial_results"] is True
+    assert payload["metadata"]["errors"]["codex"]["cli_name"] == "codex"
+
+
+@pytest.mark.asyncio
+async def test_clink_fan_out_fails_when_every_cli_fails(monkeypatch):
+    tool = CLinkTool()
+    _fan_out_agents(monkeypatch, {"gemini": (0, CLIAgentError("boom")), "codex": (0, CLIAgentError("bust"))})
+
+    with pytest.raises(ToolExecutionError) as exc_info:
+        await tool.execute({"prompt": "Review", "cli_names": ["gemini", "codex"]})
+
+    payload = json.loads(exc_info.value.payload)
+    assert payload["status"] == "error"
+    assert "gemini: boom" in payload["content"] and "codex: bust" in payload["content"]
+
+
+@pytest.mark.asyncio
+async def test_clink_fan_out_shares_output_cap(monkeypatch):
+    tool = CLinkTool()
+    short_text = "short answer"
+    long_text = "L" * (MAX_RESPONSE_CHARS * 2)
+    _fan_out_agents(monkeypatch, {"gemini": (0, short_text), "codex": (0, long_text)})
+
+    result = await tool.execute({"prompt": "Review", "cli_names": ["gemini", "codex"]})
+
+    payload = json.loads(result[0].text)
+    assert short_text in payload["content"]
+    assert len(payload["content"]) <= MAX_RESPONSE_CHARS
+    codex_metadata = payload["metadata"]["results"]["codex"]
+    assert codex_metadata["output_truncated"] is True
+    # The short answer's unused share goes to the long one
+    assert codex_metadata["output_limit"] > MAX_RESPONSE_CHARS // 2
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from clink.agents.base import BaseCLIAgent, CLIAgentError
+from clink.models import CLIWorkerConfig, ResolvedCLIClient, ResolvedCLIRole
+from clink.worker_pool import _pools, close_worker_pools, worker_pool_stats
+
+STUB_CLI = textwrap.dedent("""
+    import json
+    import os
+    import sys
+
+    if "--serve" not in sys.argv:
+        prompt = sys.stdin.read()
+        print(json.dumps({"result": f"{os.getpid()}:{prompt}"}))
+        sys.exit(0)
+
+    print("stub worker ready", flush=True)
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get("type") == "ping":
+            print(json.dumps({"id": request["id"], "ok": True}), flush=True)
+            continue
+        if request["prompt"] == "crash":
+            sys.exit(3)
+        stdout = json.dumps({"result": f"{os.getpid()}:{request['prompt']}"})
+        print(json.dumps({"id": request["id"], "stdout": stdout, "returncode": 0}), flush=True)
+    """)
+
+
+@pytest.fixture(autouse=True)
+async def clean_pools():
+    yield
+    await close_worker_pools()
+
+
+@pytest.fixture()
+def make_agent(tmp_path):
+    script = tmp_path / "stub_cli.py"
+    script.write_text(STUB_CLI)
+    role = ResolvedCLIRole(name="default", prompt_path=Path("systemprompts/clink/default.txt").resolve())
+
+    def factory(**worker_options) -> BaseCLIAgent:
+        client = ResolvedCLIClient(
+            name="stub",
+            executable=[sys.executable, str(script)],
+            working_dir=None,
+            timeout_seconds=10,
+            parser="claude_json",
+            roles={"default": role},
+            worker=CLIWorkerConfig(**worker_options) if worker_options else None,
+        )
+        return BaseCLIAgent(client)
+
+    return factory, role
+
+
+async def _ask(agent: BaseCLIAgent, role: ResolvedCLIRole, prompt: str) -> tuple[int, str]:
+    result = await agent.run(role=role, prompt=prompt, files=[], images=[])
+    pid, _, echoed = result.parsed.content.partition(":")
+    return int(pid), echoed
+
+
+async def _wait_for_idle_worker():
+    for _ in range(100):
+        if all(pool._idle for pool in _pools.values()):
+            return
+        await asyncio.sleep(0.02)
+
+
+@pytest.mark.asyncio
+async def test_prespawn_mode_hands_prompt_to_warm_process(make_agent):
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="prespawn", pool_size=1)
+
+    first_pid, echoed = await _ask(agent, role, "hello")
+    assert echoed == "hello"
+
+    await _wait_for_idle_worker()
+    second_pid, echoed = await _ask(agent, role, "again")
+
+    assert echoed == "again"
+    assert second_pid != first_pid  # one-shot processes are never reused
+    stats = worker_pool_stats()["stub"]
+    # The first request waits for the process the new pool is already spawning
+    assert stats["warm_hits"] == 2 and stats["cold_starts"] == 0
+    assert stats["spawned"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_jsonl_mode_reuses_and_recycles_workers(make_agent):
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="jsonl", pool_size=1, max_requests=2, args=["--serve"])
+
+    first_pid, _ = await _ask(agent, role, "one")
+    second_pid, echoed = await _ask(agent, role, "two")
+    assert echoed == "two"
+    assert second_pid == first_pid
+
+    third_pid, _ = await _ask(agent, role, "three")
+    assert third_pid != first_pid
+    assert worker_pool_stats()["stub"]["recycled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_jsonl_worker_crash_is_reported_and_respawned(make_agent):
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="jsonl", pool_size=1, args=["--serve"])
+
+    first_pid, _ = await _ask(agent, role, "before")
+    with pytest.raises(CLIAgentError, match="worker failed"):
+        await agent.run(role=role, prompt="crash", files=[], images=[])
+
+    pid, echoed = await _ask(agent, role, "after")
+    assert echoed == "after"
+    assert pid != first_pid
+
+
+@pytest.mark.asyncio
+async def test_pool_can_be_disabled_globally(make_agent, monkeypatch):
+    monkeypatch.setenv("PAL_CLINK_WORKERS", "false")
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="jsonl", args=["--serve"])
+
+    _, echoed = await _ask(agent, role, "direct")
+
+    assert echoed == "direct"
+    assert not _pools
+
+
+def test_worker_config_loaded_from_manifest(tmp_path, monkeypatch):
+    from clink.registry import ClinkRegistry
+
+    config = {
+        "name": "claude",
+        "command": "claude",
+        "worker": {"enabled": True, "pool_size": 2},
+    }
+    (tmp_path / "claude.json").write_text(json.dumps(config))
+    monkeypatch.setenv("CLI_CLIENTS_CONFIG_PATH", str(tmp_path))
+
+    worker = ClinkRegistry().get_client("claude").worker
+
+    assert worker.enabled is True
+    assert worker.mode == "prespawn"
+    assert worker.pool_size == 2
+
+
+@pytest.mark.asyncio
+async def test_idle_workers_are_reaped_and_empty_pools_dropped(make_agent):
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="prespawn", pool_size=1, max_idle_seconds=1)
+
+    await _ask(agent, role, "hello")
+    await _wait_for_idle_worker()
+    (pool,) = _pools.values()
+    (worker,) = pool._idle
+
+    await asyncio.sleep(1.3)
+
+    assert not _pools  # nothing requested it again, so the pool is gone
+    assert await asyncio.wait_for(worker.process.wait(), timeout=5) is not None
+    assert pool.stats.recycled == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_processes_count_against_max_concurrency(make_agent):
+    from clink.admission import reset_admissions
+
+    reset_admissions()
+    factory, role = make_agent
+    agent = factory(enabled=True, mode="prespawn", pool_size=3)
+    agent.client = agent.client.model_copy(update={"max_concurrency": 2})
+
+    results = await asyncio.gather(*(_ask(agent, role, f"p{index}") for index in range(4)))
+    assert sorted(echoed for _, echoed in results) == ["p0", "p1", "p2", "p3"]
+
+    await _wait_for_idle_worker()
+    (pool,) = _pools.values()
+    assert pool.size_limit == 2
+    # Nothing is running, so warm processes may take every slot but no more
+    assert len(pool._idle) + pool._spawning == 2
+
+    admission = pool.admission
+    async with admission.slot(), admission.slot():
+        running = [await pool.acquire(), await pool.acquire()]
+        # Both slots run a request: no warm process is started on top of them
+        assert pool.warm_count == 0
+        for worker in running:
+            worker.discard()
+            await worker.process.wait()
+    reset_admissions()
+
+
+def test_jsonl_mode_requires_server_args():
+    with pytest.raises(ValueError, match="jsonl"):
+        CLIWorkerConfig(enabled=True, mode="jsonl")
+    assert CLIWorkerConfig(enabled=False, mode="jsonl").args == []
@@ -240,7 +240,7 @@ async def test_consensus_auto_mode_with_openrouter_and_gemini(monkeypatch):
 
         # Clear conversation storage to avoid cross-test leakage
         storage = get_storage_backend()
-        storage._store.clear()
+        storage.clear()
 
         models_to_consult = [
             {"model": "claude-3-5-flash-20241022", "stance": "neutral"},
@@ -10,7 +10,7 @@ def test_first_response_persisted_in_conversation_history(tmp_path):
 
     # Clear in-memory storage to avoid cross-test contamination
     storage = get_storage_backend()
-    storage._store.clear()  # type: ignore[attr-defined]
+    storage.clear()
 
     tool = ChatTool()
     request = ChatRequest(
@@ -37,4 +37,4 @@ def test_first_response_persisted_in_conversation_history(tmp_path):
     assert thread.turns[-1].content == response_text
 
     # Cleanup storage for subsequent tests
-    storage._store.clear()  # type: ignore[attr-defined]
+    storage.clear()
@@ -11,6 +11,7 @@ from unittest.mock import Mock, patch
 import pytest
 
 from server import get_follow_up_instructions
+from utils import conversation_memory
 from utils.conversation_memory import (
     CONVERSATION_TIMEOUT_SECONDS,
     MAX_CONVERSATION_TURNS,
@@ -771,5 +772,57 @@ class TestConversationFlow:
                 assert large_file in history
 
 
+class TestThreadDecodeCache:
+    """Repeated loads of an unchanged thread reuse the decoded context"""
+
+    def test_unchanged_payload_skips_validation_and_returns_copies(self):
+        thread_id = create_thread("chat", {"prompt": "Hello"})
+        assert add_turn(thread_id, "user", "First question")
+
+        with patch.object(ThreadContext, "model_validate_json", side_effect=AssertionError("re-parsed")):
+            first = get_thread(thread_id)
+            second = get_thread(thread_id)
+
+        assert [turn.content for turn in first.turns] == ["First question"]
+        assert first is not second and first.turns is not second.turns
+        first.turns.append(ConversationTurn(role="assistant", content="local only", timestamp="now"))
+        first.initial_context["prompt"] = "changed"
+        assert len(get_thread(thread_id).turns) == 1
+        assert get_thread(thread_id).initial_context["prompt"] == "Hello"
+
+    def test_cache_is_bounded_by_payload_bytes(self):
+        thread_ids = [create_thread("chat", {"prompt": "x" * 1000}) for _ in range(3)]
+
+        with patch("utils.conversation_memory.THREAD_CACHE_MAX_BYTES", 3000):
+            for thread_id in thread_ids:
+                assert add_turn(thread_id, "user", "Question")
+
+            assert list(conversation_memory._decoded_threads) == thread_ids[1:]
+            assert conversation_memory._decoded_threads_bytes <= 3000
+            # Evicted threads are still loaded from storage
+            assert len(get_thread(thread_ids[0]).turns) == 1
+
+    @patch("utils.conversation_memory.get_storage")
+    def test_changed_payload_is_parsed_again(self, mock_storage):
+        mock_client = Mock()
+        mock_storage.return_value = mock_client
+        thread_id = "12345678-1234-1234-1234-123456789012"
+
+        def payload(tool_name):
+            return ThreadContext(
+                thread_id=thread_id,
+                created_at="2023-01-01T00:00:00Z",
+                last_updated_at="2023-01-01T00:00:00Z",
+                tool_name=tool_name,
+                turns=[],
+                initial_context={},
+            ).model_dump_json()
+
+        mock_client.get.return_value = payload("chat")
+        assert get_thread(thread_id).tool_name == "chat"
+        mock_client.get.return_value = payload("debug")
+        assert get_thread(thread_id).tool_name == "debug"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
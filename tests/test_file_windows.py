@@ -0,0 +1,128 @@
+"""
+Tests for line-window file references and windowed reads
+"""
+
+import os
+
+from utils import file_windows
+from utils.file_utils import _add_line_numbers, estimate_file_tokens, expand_paths, read_file_content, read_files
+from utils.file_windows import FileWindow, parse_file_reference, read_line_window
+
+
+def _write_log(path, lines=1000, trailing_newline=True):
+    content = "\n".join(f"entry {i}" for i in range(1, lines + 1))
+    path.write_text(content + ("\n" if trailing_newline else ""))
+
+
+class TestParseFileReference:
+    def test_plain_path(self):
+        assert parse_file_reference("/tmp/app.log") == ("/tmp/app.log", None)
+
+    def test_line_range(self):
+        assert parse_file_reference("/tmp/app.log:12000-12600") == (
+            "/tmp/app.log",
+            FileWindow(mode="range", start=12000, end=12600),
+        )
+
+    def test_open_ended_range_and_head_tail(self):
+        assert parse_file_reference("/tmp/app.log:50-")[1] == FileWindow(mode="range", start=50)
+        assert parse_file_reference("/tmp/app.log:head=20")[1] == FileWindow(mode="head", count=20)
+        assert parse_file_reference("/tmp/app.log:tail")[1].mode == "tail"
+
+    def test_existing_file_with_colon_is_plain_path(self, tmp_path):
+        odd = tmp_path / "report:1-2"
+        odd.write_text("data")
+        assert parse_file_reference(str(odd)) == (str(odd), None)
+
+
+class TestReadLineWindow:
+    def test_range(self, tmp_path):
+        log = tmp_path / "app.log"
+        _write_log(log)
+
+        window = read_line_window(str(log), FileWindow(mode="range", start=500, end=502))
+
+        assert window.text == "entry 500\nentry 501\nentry 502"
+        assert (window.first_line, window.last_line, window.total_lines) == (500, 502, 1000)
+
+    def test_head_and_tail_without_trailing_newline(self, tmp_path):
+        log = tmp_path / "app.log"
+        _write_log(log, lines=10, trailing_newline=False)
+
+        assert read_line_window(str(log), FileWindow(mode="head", count=2)).text == "entry 1\nentry 2"
+        tail = read_line_window(str(log), FileWindow(mode="tail", count=2))
+        assert tail.text == "entry 9\nentry 10"
+        assert (tail.first_line, tail.total_lines) == (9, 10)
+
+    def test_range_past_end_is_clamped(self, tmp_path):
+        log = tmp_path / "app.log"
+        _write_log(log, lines=10)
+
+        assert read_line_window(str(log), FileWindow(mode="range", start=9, end=50)).text == "entry 9\nentry 10"
+        assert read_line_window(str(log), FileWindow(mode="range", start=50, end=60)).text == ""
+
+    def test_windows_across_index_blocks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_windows, "_INDEX_BLOCK_BYTES", 16)
+        file_windows.clear_line_index_cache()
+        log = tmp_path / "app.log"
+        _write_log(log, lines=300)
+        lines = log.read_text().splitlines()
+
+        for start, end in [(1, 1), (7, 9), (99, 140), (250, 300), (300, 300)]:
+            window = read_line_window(str(log), FileWindow(mode="range", start=start, end=end))
+            assert window.text == "\n".join(lines[start - 1 : end])
+            assert window.total_lines == 300
+
+    def test_line_index_is_built_once_per_file_version(self, tmp_path, monkeypatch):
+        file_windows.clear_line_index_cache()
+        log = tmp_path / "app.log"
+        _write_log(log, lines=1000)
+
+        built = []
+        real_array = file_windows.array
+        monkeypatch.setattr(file_windows, "array", lambda *args: built.append(1) or real_array(*args))
+
+        read_line_window(str(log), FileWindow(mode="range", start=10, end=20))
+        read_line_window(str(log), FileWindow(mode="tail", count=5))
+        assert len(built) == 1
+
+        _write_log(log, lines=1200)
+        stat_result = log.stat()
+        os.utime(log, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+        assert read_line_window(str(log), FileWindow(mode="tail", count=1)).text == "entry 1200"
+        assert len(built) == 2
+
+
+class TestWindowedFileContent:
+    def test_window_bypasses_size_limit_with_original_line_numbers(self, tmp_path):
+        log = tmp_path / "app.log"
+        _write_log(log, lines=5000)
+
+        full, _ = read_file_content(str(log), max_size=1000)
+        assert "FILE TOO LARGE" in full
+        assert f"{log}:START-END" in full
+
+        content, tokens = read_file_content(f"{log}:4000-4001", max_size=1000)
+        assert "--- BEGIN FILE EXCERPT:" in content
+        assert "(lines 4000-4001 of 5000;" in content
+        assert "4000│ entry 4000\n4001│ entry 4001" in content
+        assert "entry 3999" not in content
+        assert tokens > 0
+
+    def test_window_references_flow_through_read_files(self, tmp_path):
+        log = tmp_path / "app.log"
+        _write_log(log, lines=100)
+        reference = f"{log}:tail=3"
+
+        assert expand_paths([reference]) == [reference]
+        assert 0 < estimate_file_tokens(reference) < estimate_file_tokens(str(log))
+
+        content = read_files([reference], include_line_numbers=True)
+        assert "  98│ entry 98" in content
+        assert "entry 97\n" not in content
+
+
+class TestStreamingLineNumbers:
+    def test_matches_split_semantics(self):
+        assert _add_line_numbers("a\r\nb\n") == "   1│ a\n   2│ b\n   3│ "
+        assert _add_line_numbers("") == "   1│ "
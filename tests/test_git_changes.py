@@ -0,0 +1,195 @@
+"""
+Tests for server-side git change collection used by the precommit tool
+"""
+
+import shutil
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from utils import git_changes
+from utils.git_changes import clear_change_cache, collect_changes, render_changeset
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    clear_change_cache()
+    root = tmp_path / "repo"
+    root.mkdir()
+    _git(root, "init", "-q")
+    (root / "app.py").write_text("def handler():\n    return 1\n")
+    (root / "util.py").write_text("VALUE = 1\n")
+    _git(root, "add", ".")
+    _git(root, "commit", "-q", "-m", "initial")
+    yield root
+    clear_change_cache()
+
+
+class TestCollectChanges:
+    def test_collects_staged_unstaged_and_untracked(self, repo):
+        (repo / "app.py").write_text("def handler():\n    return 2\n")
+        _git(repo, "add", "app.py")
+        (repo / "util.py").write_text("VALUE = 2\n")
+        (repo / "new_module.py").write_text("print('new')\n")
+
+        changeset = collect_changes(str(repo))
+
+        by_source = {(change.path, change.source) for change in changeset.files}
+        assert by_source == {("app.py", "staged"), ("util.py", "unstaged"), ("new_module.py", "untracked")}
+        hunk_text = "\n".join(hunk.text for hunk in changeset.hunks)
+        assert "+    return 2" in hunk_text
+        assert "+VALUE = 2" in hunk_text
+        assert "+print('new')" in hunk_text
+
+    def test_skips_binaries_and_lockfiles(self, repo):
+        (repo / "poetry.lock").write_text("[[package]]\nname = 'x'\n")
+        (repo / "logo.png").write_bytes(b"\x89PNG\0\0binary")
+        _git(repo, "add", ".")
+
+        changeset = collect_changes(str(repo), include_unstaged=False)
+
+        reasons = {change.path: change.skipped_reason for change in changeset.files}
+        assert reasons == {"poetry.lock": "lockfile", "logo.png": "binary"}
+        assert changeset.hunks == []
+
+    def test_compare_to_ref(self, repo):
+        _git(repo, "checkout", "-q", "-b", "feature")
+        (repo / "util.py").write_text("VALUE = 3\n")
+        _git(repo, "commit", "-q", "-am", "change")
+
+        changeset = collect_changes(str(repo), compare_to="HEAD~1")
+
+        assert [(change.path, change.source) for change in changeset.files] == [("util.py", "HEAD~1...HEAD")]
+
+    def test_cache_reused_until_worktree_changes(self, repo):
+        (repo / "util.py").write_text("VALUE = 2\n")
+
+        with patch.object(git_changes, "_stream_hunks", wraps=git_changes._stream_hunks) as streamed:
+            first = collect_changes(str(repo))
+            assert collect_changes(str(repo)) is first
+            assert streamed.call_count == 1
+
+            (repo / "util.py").write_text("VALUE = 22\n")
+            assert collect_changes(str(repo)) is not first
+            assert streamed.call_count == 2
+
+    @pytest.mark.parametrize("config", [None, "diff.noprefix=true", "diff.mnemonicPrefix=true"])
+    def test_paths_survive_user_diff_config_and_quoting(self, repo, config):
+        if config:
+            key, value = config.split("=")
+            _git(repo, "config", key, value)
+        for name in ("ü.txt", "tab\there.txt", 'quote"d.txt'):
+            (repo / name).write_text("one\n")
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-q", "-m", "add")
+        for name in ("ü.txt", "tab\there.txt", 'quote"d.txt', "util.py"):
+            (repo / name).write_text("two\n")
+
+        changeset = collect_changes(str(repo), include_untracked=False)
+
+        assert {hunk.path for hunk in changeset.hunks} == {"ü.txt", "tab\there.txt", 'quote"d.txt', "util.py"}
+
+    def test_git_diff_failure_is_reported(self, repo):
+        with pytest.raises(git_changes.GitError, match="git diff failed"):
+            git_changes._stream_hunks(str(repo), ["--no-such-option"], ["util.py"], "unstaged")
+
+    def test_stalled_git_diff_times_out(self, repo, monkeypatch):
+        real_popen = subprocess.Popen
+
+        def stalled(command, **kwargs):
+            return real_popen([sys.executable, "-c", "import time; time.sleep(30)"], **kwargs)
+
+        monkeypatch.setattr(git_changes, "GIT_TIMEOUT_SECONDS", 0.5)
+        monkeypatch.setattr(git_changes.subprocess, "Popen", stalled)
+
+        with pytest.raises(git_changes.GitError, match="timed out"):
+            git_changes._stream_hunks(str(repo), [], ["util.py"], "unstaged")
+
+    def test_not_a_repository(self, tmp_path):
+        assert collect_changes(str(tmp_path)) is None
+
+
+class TestRenderChangeset:
+    def test_renders_everything_within_budget(self, repo):
+        (repo / "util.py").write_text("VALUE = 2\n")
+
+        rendered = render_changeset(collect_changes(str(repo)), max_tokens=10_000)
+
+        assert "--- BEGIN DIFF: util.py (unstaged) ---" in rendered
+        assert "+VALUE = 2" in rendered
+        assert "omitted" not in rendered
+
+    def test_ranks_relevant_hunks_into_tight_budget(self, repo):
+        (repo / "app.py").write_text("def handler():\n    return authenticate_user()\n")
+        (repo / "util.py").write_text("VALUE = 2\n" + "".join(f"OTHER_{i} = {i}\n" for i in range(200)))
+
+        rendered = render_changeset(collect_changes(str(repo)), max_tokens=400, query="check authenticate flow")
+
+        assert "authenticate_user" in rendered
+        assert "OTHER_150" not in rendered
+        assert "1 hunks omitted to fit the token budget: util.py (1)" in rendered
+
+
+class TestPrecommitIntegration:
+    def test_expert_context_includes_server_changeset(self, repo):
+        from tools.precommit import PrecommitTool
+
+        (repo / "util.py").write_text("VALUE = 2\n")
+        tool = PrecommitTool()
+        tool.initial_request = "Validate value change"
+        tool.git_config = {"path": str(repo), "compare_to": None, "include_staged": True, "include_unstaged": True}
+
+        context = tool.prepare_expert_analysis_context(tool.consolidated_findings)
+
+        assert "=== GIT CHANGES (collected by server) ===" in context
+        assert "+VALUE = 2" in context
+
+    def test_guidance_drops_changeset_file_for_git_repositories(self, repo, monkeypatch):
+        from tools.precommit import SERVER_DIFF_NOTE, PrecommitRequest, PrecommitTool
+
+        request = PrecommitRequest(
+            step="Validate",
+            step_number=1,
+            total_steps=3,
+            next_step_required=True,
+            findings="Starting",
+            path=str(repo),
+        )
+        tool = PrecommitTool()
+        assert SERVER_DIFF_NOTE in tool.get_required_actions(1, "external", "", 3, request)
+
+        monkeypatch.setenv("PAL_PRECOMMIT_SERVER_DIFF", "false")
+        actions = tool.get_required_actions(1, "external", "", 3, request)
+        assert SERVER_DIFF_NOTE not in actions
+        assert "Execute git diff --cached for staged changes (exclude binary files)" in actions
+
+    @pytest.mark.asyncio
+    async def test_repository_root_resolved_once_per_step(self, repo):
+        from tools.precommit import PrecommitTool
+
+        with patch("tools.precommit.find_repository_root", wraps=git_changes.find_repository_root) as resolved:
+            await PrecommitTool().execute(
+                {
+                    "step": "Validate",
+                    "step_number": 1,
+                    "total_steps": 3,
+                    "next_step_required": True,
+                    "findings": "Starting",
+                    "path": str(repo),
+                    "model": "flash",
+                }
+            )
+
+        assert resolved.call_count == 1
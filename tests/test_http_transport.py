@@ -0,0 +1,101 @@
+"""Tests for serving MCP sessions over streamable HTTP."""
+
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import server
+from utils import client_info
+from utils.http_transport import HTTPTransportSettings, build_http_app, get_transport
+
+MCP_HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+
+
+def _rpc(client, payload, session_id=None, headers=None):
+    request_headers = {**MCP_HEADERS, **(headers or {})}
+    if session_id:
+        request_headers["mcp-session-id"] = session_id
+    response = client.post("/mcp", content=json.dumps(payload), headers=request_headers)
+    messages = [json.loads(line[5:]) for line in response.text.splitlines() if line.startswith("data:")]
+    return response, messages[0] if messages else None
+
+
+def _open_session(client, client_name, headers=None):
+    response, message = _rpc(
+        client,
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {},
+                "clientInfo": {"name": client_name, "version": "1.0"},
+            },
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    session_id = response.headers["mcp-session-id"]
+    _rpc(client, {"jsonrpc": "2.0", "method": "notifications/initialized"}, session_id, headers)
+    return session_id, message["result"]
+
+
+@pytest.fixture
+def clean_client_info(monkeypatch):
+    monkeypatch.setattr(client_info, "_client_info_cache", None)
+    client_info._session_client_info.clear()
+    yield
+    client_info._session_client_info.clear()
+
+
+def test_transport_selection(monkeypatch):
+    monkeypatch.delenv("PAL_TRANSPORT", raising=False)
+    assert get_transport() == "stdio"
+
+    monkeypatch.setenv("PAL_TRANSPORT", "streamable-http")
+    assert get_transport() == "http"
+
+    monkeypatch.setenv("PAL_TRANSPORT", "carrier-pigeon")
+    with pytest.raises(ValueError):
+        get_transport()
+
+    monkeypatch.setenv("PAL_HTTP_HOST", "0.0.0.0")
+    monkeypatch.setenv("PAL_HTTP_PORT", "9100")
+    settings = HTTPTransportSettings.from_env()
+    assert (settings.host, settings.port, settings.is_loopback) == ("0.0.0.0", 9100, False)
+
+
+def test_concurrent_sessions_keep_their_own_client_info(clean_client_info):
+    app = build_http_app(server.server, server.build_initialization_options(), HTTPTransportSettings())
+
+    with TestClient(app, base_url="http://127.0.0.1:8000") as client:
+        assert client.get("/health").json()["status"] == "ok"
+
+        cursor_session, init_result = _open_session(client, "cursor")
+        gemini_session, _ = _open_session(client, "gemini-cli-mcp-client")
+        assert init_result["serverInfo"]["name"] == "PAL"
+        assert "listmodels" in init_result["instructions"] or "default to" in init_result["instructions"]
+
+        for session_id in (cursor_session, gemini_session):
+            _, message = _rpc(client, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}, session_id)
+            assert any(tool["name"] == "chat" for tool in message["result"]["tools"])
+
+        assert sorted(info["friendly_name"] for info in client_info._session_client_info.values()) == [
+            "Cursor",
+            "Gemini",
+        ]
+
+
+def test_auth_token_required_when_configured():
+    settings = HTTPTransportSettings(host="0.0.0.0", auth_token="s3cret")
+    app = build_http_app(server.server, server.build_initialization_options(), settings)
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        response, _ = _rpc(client, {"jsonrpc": "2.0", "id": 1, "method": "ping"})
+        assert response.status_code == 401
+
+        session_id, _ = _open_session(client, "cursor", headers={"Authorization": "Bearer s3cret"})
+        assert session_id
@@ -0,0 +1,117 @@
+"""Tests for the encode-once image cache and optional downscaling."""
+
+import base64
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+
+from utils.image_utils import clear_image_cache, prepare_image, validate_image
+
+PNG_1X1 = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_image_cache()
+    yield
+    clear_image_cache()
+
+
+class TestImageCache:
+    def test_file_is_read_once_per_version(self, tmp_path):
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            first = prepare_image(str(image))
+            second = prepare_image(str(image))
+            assert validate_image(str(image)) == (PNG_1X1, "image/png")
+
+        assert first is second
+        assert mock_open.call_count == 1
+        assert first.base64_data == base64.b64encode(PNG_1X1).decode()
+
+    def test_prepared_image_replaces_raw_entry(self, tmp_path):
+        from utils import image_utils
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+
+        validate_image(str(image))
+        assert [key[0] for key in image_utils._cache._entries] == ["raw"]
+
+        prepared = prepare_image(str(image))
+
+        assert [key[0] for key in image_utils._cache._entries] == ["prepared"]
+        assert image_utils._cache._bytes == len(prepared.image_bytes) + len(prepared.base64_data)
+
+    def test_modified_file_is_reloaded(self, tmp_path):
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+        prepare_image(str(image))
+
+        image.write_bytes(PNG_1X1 + b"\0")
+        stat_result = image.stat()
+        os.utime(image, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+
+        assert prepare_image(str(image)).image_bytes == PNG_1X1 + b"\0"
+
+    def test_data_url_payload_is_reused(self):
+        data_url = "data:image/png;base64," + base64.b64encode(PNG_1X1).decode()
+
+        prepared = prepare_image(data_url)
+
+        assert prepared.data_url == data_url
+        assert prepared.image_bytes == PNG_1X1
+
+    def test_size_limit_is_checked_per_call(self, tmp_path):
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+        validate_image(str(image))
+
+        with pytest.raises(ValueError, match="Image too large"):
+            validate_image(str(image), max_size_mb=0.00001)
+
+    def test_large_image_is_downscaled(self, tmp_path, monkeypatch):
+        image_module = pytest.importorskip("PIL.Image")
+        monkeypatch.setenv("PAL_IMAGE_MAX_DIMENSION", "64")
+        image = tmp_path / "big.png"
+        image_module.new("RGB", (512, 256), color=(200, 10, 10)).save(image)
+
+        prepared = prepare_image(str(image))
+
+        assert prepared.resized
+        with image_module.open(io.BytesIO(prepared.image_bytes)) as result:
+            assert result.size == (64, 32)
+
+
+class TestProviderImageProcessing:
+    def test_openai_compatible_returns_data_url(self, tmp_path):
+        from providers.openai import OpenAIModelProvider
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+        provider = OpenAIModelProvider(api_key="test-key")
+
+        result = provider._process_image(str(image))
+
+        assert result == {
+            "type": "image_url",
+            "image_url": {"url": "data:image/png;base64," + base64.b64encode(PNG_1X1).decode()},
+        }
+
+    def test_gemini_returns_inline_data(self, tmp_path):
+        from providers.gemini import GeminiModelProvider
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(PNG_1X1)
+        provider = GeminiModelProvider(api_key="test-key")
+
+        result = provider._process_image(str(image))
+
+        assert result == {"inline_data": {"mime_type": "image/png", "data": base64.b64encode(PNG_1X1).decode()}}
+        assert provider._process_image(str(tmp_path / "missing.png")) is None
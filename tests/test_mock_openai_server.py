@@ -0,0 +1,56 @@
+"""Tests for the local mock provider and the load test report."""
+
+import random
+
+import openai
+import pytest
+
+from load_test import CallResult, LoadReport, percentile
+from tests.mock_openai_server import LatencyModel, MockOpenAIServer, MockServerConfig
+
+
+def test_mock_server_serves_completions_and_streams():
+    config = MockServerConfig(latency=LatencyModel.parse("fixed:1"), completion_tokens=12, seed=7)
+    with MockOpenAIServer(config) as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="mock", max_retries=0)
+        messages = [{"role": "user", "content": "Review the cache"}]
+
+        response = client.chat.completions.create(model="llama3.2", messages=messages)
+        assert response.choices[0].message.content.startswith("Mock answer to: Review the cache")
+        assert response.usage.completion_tokens == 12
+
+        chunks = list(client.chat.completions.create(model="llama3.2", messages=messages, stream=True))
+        streamed = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+        assert streamed == response.choices[0].message.content
+        assert chunks[-1].choices[0].finish_reason == "stop"
+
+        assert server.stats() == {"completions": 2, "streams": 1, "rate_limited": 0, "server_errors": 0}
+
+
+def test_mock_server_injects_errors():
+    with MockOpenAIServer(MockServerConfig(error_429_rate=1.0, retry_after=3)) as server:
+        client = openai.OpenAI(base_url=server.base_url, api_key="mock", max_retries=0)
+        with pytest.raises(openai.RateLimitError) as exc_info:
+            client.chat.completions.create(model="llama3.2", messages=[{"role": "user", "content": "hi"}])
+        assert exc_info.value.response.headers["Retry-After"] == "3"
+
+    with pytest.raises(ValueError):
+        LatencyModel.parse("uniform:10")
+    assert LatencyModel.parse("normal:-500,1").sample(random.Random(0)) == 0.0
+
+
+def test_load_report_percentiles_per_tool():
+    latencies = [i / 1000 for i in range(1, 101)]
+    assert percentile(latencies, 50) == 0.05
+    assert percentile(latencies, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+    report = LoadReport(wall_clock=2.0)
+    report.results = [CallResult("chat", 0.0, latency, ok=True) for latency in latencies]
+    report.results.append(CallResult("version", 0.5, 0.5, ok=False, error="boom"))
+
+    summary = report.summary()
+    assert summary["requests"] == 101 and summary["errors"] == 1
+    assert summary["tools"]["chat"]["p95_ms"] == 95.0
+    assert summary["tools"]["version"]["error_rate"] == 1.0
+    assert summary["tools"]["version"]["sample_errors"] == ["boom"]
@@ -0,0 +1,109 @@
+"""Tests for shared model registry snapshots and manifest hot reload."""
+
+import json
+import os
+
+import pytest
+
+from providers.registries import cache
+from providers.registries.custom import CustomEndpointModelRegistry
+from providers.registries.openrouter import OpenRouterModelRegistry
+
+
+def _write_manifest(path, *models):
+    entries = [{"model_name": name, "aliases": [f"{name}-alias"], "context_window": 1000} for name in models]
+    path.write_text(json.dumps({"models": entries}), encoding="utf-8")
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    calls = []
+    original = OpenRouterModelRegistry._convert_entry
+
+    def counting(self, raw):
+        calls.append(raw.get("model_name"))
+        return original(self, raw)
+
+    monkeypatch.setattr(OpenRouterModelRegistry, "_convert_entry", counting)
+    cache.clear_snapshot_cache()
+    yield calls
+    cache.clear_snapshot_cache()
+
+
+def test_manifest_parsed_once_per_process(count_parses):
+    first = OpenRouterModelRegistry()
+    parsed = len(count_parses)
+    second = OpenRouterModelRegistry()
+
+    assert parsed > 0
+    assert len(count_parses) == parsed
+    assert second.list_models() == first.list_models()
+    assert second.alias_map == first.alias_map
+    # Each instance owns its capability objects
+    name = first.list_models()[0]
+    assert second.model_map[name].context_window == first.model_map[name].context_window
+    assert second.model_map[name] is not first.model_map[name]
+
+
+def test_snapshot_persisted_for_cold_start(count_parses, tmp_path, monkeypatch):
+    monkeypatch.setenv("PAL_REGISTRY_CACHE_DIR", str(tmp_path))
+
+    OpenRouterModelRegistry()
+    assert list(tmp_path.glob("*.pickle"))
+    parsed = len(count_parses)
+
+    cache.clear_snapshot_cache()
+    registry = OpenRouterModelRegistry()
+
+    assert len(count_parses) == parsed
+    assert registry.list_models()
+
+
+def test_snapshot_key_depends_on_registry_flavour(tmp_path):
+    manifest = tmp_path / "models.json"
+    _write_manifest(manifest, "shared-model")
+
+    custom = CustomEndpointModelRegistry(config_path=str(manifest))
+    openrouter = OpenRouterModelRegistry(config_path=str(manifest))
+
+    assert custom.model_map["shared-model"].friendly_name == "Custom (shared-model)"
+    assert openrouter.model_map["shared-model"].friendly_name == "OpenRouter (shared-model)"
+
+
+def test_reload_if_changed_applies_edits(tmp_path):
+    manifest = tmp_path / "custom_models.json"
+    _write_manifest(manifest, "first-model")
+    registry = CustomEndpointModelRegistry(config_path=str(manifest))
+    generation = registry.generation
+
+    assert registry.reload_if_changed() is False
+
+    _write_manifest(manifest, "first-model", "second-model")
+    os.utime(manifest, ns=(1, 1))
+    assert registry.reload_if_changed() is True
+    assert registry.resolve("second-model-alias").model_name == "second-model"
+    assert registry.generation == generation + 1
+
+    # Broken edits keep serving the previous models
+    for broken in ("{not json", json.dumps({"models": [{"model_name": "x", "max_tokens": 1}]})):
+        manifest.write_text(broken, encoding="utf-8")
+        os.utime(manifest, ns=(2, len(broken)))
+        assert registry.reload_if_changed() is False
+    assert sorted(registry.list_models()) == ["first-model", "second-model"]
+
+
+def test_watcher_polls_registered_registries(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAL_REGISTRY_RELOAD_SECONDS", "3600")
+    manifest = tmp_path / "custom_models.json"
+    _write_manifest(manifest, "first-model")
+    watcher = cache.RegistryWatcher()
+    monkeypatch.setattr(cache, "watcher", watcher)
+    monkeypatch.setattr("providers.registries.base.watcher", watcher)
+
+    registry = CustomEndpointModelRegistry(config_path=str(manifest))
+    assert watcher.poll() == 0
+
+    _write_manifest(manifest, "renamed-model")
+    os.utime(manifest, ns=(1, 1))
+    assert watcher.poll() == 1
+    assert registry.list_models() == ["renamed-model"]
@@ -0,0 +1,108 @@
+"""Tests for spilling large tool outputs to files."""
+
+import json
+import os
+import time
+
+import pytest
+
+from clink.agents import AgentOutput
+from clink.parsers.base import ParsedCLIResponse
+from clink.streaming import get_max_capture_bytes
+from tools.clink import MAX_RESPONSE_CHARS, CLinkTool
+from tools.debug import DebugIssueTool
+from utils import output_spill
+
+
+@pytest.fixture
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PAL_OUTPUT_SPILL_THRESHOLD", "1000")
+    monkeypatch.setenv("PAL_OUTPUT_SPILL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_spill_is_content_addressed_and_expires(spill_dir, monkeypatch):
+    content = "line of output\n" * 200
+
+    assert output_spill.maybe_spill("short") is None
+    first = output_spill.maybe_spill(content)
+    second = output_spill.maybe_spill(content)
+
+    assert first.path == second.path == spill_dir / f"{first.sha256}.txt"
+    assert first.path.read_text(encoding="utf-8") == content
+    assert first.size_bytes == len(content.encode("utf-8"))
+    assert len(first.summary) < len(content) and str(first.path) in first.to_text()
+    assert list(spill_dir.iterdir()) == [first.path]
+
+    stale = time.time() - 2 * 3600
+    os.utime(first.path, (stale, stale))
+    assert output_spill.cleanup_expired(spill_dir, ttl_seconds=3600) == 1
+    assert not first.path.exists()
+
+    monkeypatch.setenv("PAL_OUTPUT_SPILL_THRESHOLD", "0")
+    assert output_spill.maybe_spill(content) is None
+
+
+@pytest.mark.asyncio
+async def test_clink_spills_instead_of_truncating(spill_dir, monkeypatch):
+    long_text = "B" * (MAX_RESPONSE_CHARS * 2) + "<SUMMARY>Condensed findings.</SUMMARY>"
+    run_kwargs = {}
+
+    class DummyAgent:
+        async def run(self, **kwargs):
+            run_kwargs.update(kwargs)
+            return AgentOutput(
+                parsed=ParsedCLIResponse(content=long_text, metadata={}),
+                sanitized_command=["codex"],
+                returncode=0,
+                stdout="",
+                stderr="",
+                duration_seconds=0.1,
+                parser_name="codex_jsonl",
+                output_file_content=None,
+            )
+
+    monkeypatch.setattr("tools.clink.create_agent", lambda client: DummyAgent())
+
+    result = await CLinkTool().execute({"prompt": "Review", "cli_name": "codex"})
+    payload = json.loads(result[0].text)
+
+    # The parser keeps the output for the spill file, but only up to the capture cap
+    assert run_kwargs["output_limit"] == get_max_capture_bytes()
+    metadata = payload["metadata"]
+    assert metadata["output_spilled"] is True and "output_truncated" not in metadata
+    assert metadata["output_original_length"] == len(long_text)
+    assert "Condensed findings." in payload["content"] and metadata["output_spill_path"] in payload["content"]
+    with open(metadata["output_spill_path"], encoding="utf-8") as handle:
+        assert handle.read() == long_text
+
+
+def test_output_beyond_capture_cap_is_truncated_not_spilled(spill_dir, monkeypatch):
+    monkeypatch.setenv("PAL_CLINK_MAX_CAPTURE_MB", "1")
+    tool = CLinkTool()
+    limit = tool._parser_output_limit()
+    assert limit == 1024 * 1024
+
+    client = tool._registry.get_client("codex")
+    kept = "C" * limit
+    content, metadata = tool._apply_output_limit(client, kept, {"output_streamed_length": limit * 3})
+
+    assert metadata["output_truncated"] is True and "output_spilled" not in metadata
+    assert metadata["output_original_length"] == limit * 3
+    assert len(content) < MAX_RESPONSE_CHARS
+
+
+def test_large_expert_analysis_is_replaced_by_reference(spill_dir):
+    analysis = "Finding: the cache is never invalidated.\n" * 100
+    response = {
+        "status": "calling_expert_analysis",
+        "expert_analysis": {"status": "analysis_complete", "raw_analysis": analysis},
+    }
+
+    DebugIssueTool()._spill_expert_analysis(response)
+
+    reference = response["expert_analysis"]
+    assert reference["output_spilled"] is True
+    assert reference["summary"].startswith("Finding: the cache")
+    with open(reference["output_spill_path"], encoding="utf-8") as handle:
+        assert handle.read() == analysis
@@ -0,0 +1,108 @@
+"""Tests for formatting large prompt files in worker processes."""
+
+import asyncio
+import os
+
+import pytest
+
+from utils import prep_pool
+from utils.file_utils import read_file_content, read_files
+
+
+@pytest.fixture
+def pool_started(monkeypatch):
+    monkeypatch.setenv("PAL_PREP_WORKERS", "2")
+    monkeypatch.setenv("PAL_PREP_INLINE_KB", "4")
+    prep_pool.start_prep_pool()
+    yield prep_pool.get_prep_pool()
+    prep_pool.shutdown_prep_pool()
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    small = tmp_path / "small.py"
+    small.write_text("x = 1\r\ny = 2\n")
+    large = tmp_path / "large.py"
+    large.write_text("".join(f"value_{i} = {i}\n" for i in range(5000)))
+    missing = tmp_path / "missing.py"
+    return [str(small), str(large), str(missing), f"{large}:10-20"]
+
+
+def test_worker_settings(monkeypatch):
+    monkeypatch.setenv("PAL_PREP_WORKERS", "0")
+    assert prep_pool.start_prep_pool() is None
+
+    monkeypatch.setenv("PAL_PREP_WORKERS", "auto")
+    assert 0 <= prep_pool.get_worker_count() <= prep_pool.MAX_AUTO_WORKERS
+
+    monkeypatch.setenv("PAL_PREP_INLINE_KB", "64")
+    assert prep_pool.get_inline_threshold() == 64 * 1024
+
+
+async def test_without_started_pool_everything_is_inline(source_files):
+    assert prep_pool.get_prep_pool() is None
+    assert await prep_pool.prefetch_file_contents(source_files) == 0
+    assert prep_pool.get_file_content(source_files[1]) == read_file_content(source_files[1])
+
+
+async def test_prefetched_results_match_inline_formatting(pool_started, source_files, monkeypatch):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticking = asyncio.create_task(ticker())
+    formatted = await prep_pool.prefetch_file_contents(source_files, include_line_numbers=True)
+    ticking.cancel()
+
+    assert formatted == 1  # only the large, unwindowed file leaves the process
+    assert ticks > 1  # the event loop kept running while the worker formatted
+
+    monkeypatch.setattr("utils.file_utils.read_file_content", lambda *args, **kwargs: pytest.fail("read inline"))
+    content, tokens = prep_pool.get_file_content(source_files[1], include_line_numbers=True)
+    monkeypatch.undo()
+
+    assert (content, tokens) == read_file_content(source_files[1], include_line_numbers=True)
+    assert "│ value_0 = 0" in content
+    # Other formatting options and small files are formatted inline
+    assert prep_pool.get_file_content(source_files[1]) == read_file_content(source_files[1])
+    assert prep_pool.get_file_content(source_files[0]) == read_file_content(source_files[0])
+
+
+async def test_changed_file_is_formatted_again(pool_started, source_files):
+    await prep_pool.prefetch_file_contents(source_files)
+
+    with open(source_files[1], "a") as handle:
+        handle.write("appended = True\n")
+    stat = os.stat(source_files[1])
+    os.utime(source_files[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert "appended = True" in prep_pool.get_file_content(source_files[1])[0]
+
+
+async def test_read_files_uses_prefetched_content(pool_started, tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"module_{index}.py"
+        path.write_text(f"# module {index}\n" + "a = 1\n" * 4000)
+        paths.append(str(path))
+
+    assert await prep_pool.prefetch_file_contents([str(tmp_path)]) == 3
+    content = read_files(paths, max_tokens=100_000, reserve_tokens=0)
+
+    assert all(f"BEGIN FILE: {path}" in content for path in paths)
+
+
+async def test_broken_worker_falls_back_inline(pool_started, source_files, monkeypatch):
+    def crash(fn, *args):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(pool_started, "submit", crash)
+
+    assert await prep_pool.prefetch_file_contents(source_files) == 0
+    assert prep_pool.get_file_content(source_files[1]) == read_file_content(source_files[1])
+    # The broken pool is replaced for later requests
+    assert prep_pool.get_prep_pool() not in (None, pool_started)
@@ -0,0 +1,104 @@
+"""
+Tests for the ignore-aware project walker behind expand_paths
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from utils.file_utils import expand_paths
+from utils.project_walker import IgnoreRules
+
+
+def _names(files, root):
+    return sorted(str(f)[len(str(root)) + 1 :] for f in files)
+
+
+class TestIgnoreRules:
+    def test_basename_and_anchored_patterns(self):
+        rules = IgnoreRules("/repo", ["*.log", "/build", "docs/generated/", "# comment", ""])
+
+        assert rules.match("app.log", False) is True
+        assert rules.match("src/deep/app.log", False) is True
+        assert rules.match("build", True) is True
+        assert rules.match("src/build", True) is None
+        assert rules.match("docs/generated", True) is True
+        assert rules.match("docs/generated", False) is None
+
+    def test_negation_and_double_star(self):
+        rules = IgnoreRules("/repo", ["data/**", "!data/keep.py", "**/cache/*.py"])
+
+        assert rules.match("data/big.py", False) is True
+        assert rules.match("data/keep.py", False) is False
+        assert rules.match("a/b/cache/x.py", False) is True
+        assert rules.match("cache/x.py", False) is True
+
+
+class TestIgnoreAwareExpansion:
+    @pytest.fixture
+    def project(self, tmp_path, monkeypatch):
+        # Keep these tests on the filesystem walk regardless of the git fast path
+        monkeypatch.setenv("PAL_GIT_LS_FILES", "false")
+        root = tmp_path / "project"
+        (root / "src").mkdir(parents=True)
+        (root / "artifacts").mkdir()
+        (root / "src" / "generated").mkdir()
+        (root / "src" / "app.py").write_text("app")
+        (root / "src" / "generated" / "models.py").write_text("gen")
+        (root / "src" / "generated" / "keep.py").write_text("keep")
+        (root / "artifacts" / "bundle.js").write_text("bundle")
+        (root / "notes.py").write_text("notes")
+        (root / ".gitignore").write_text("artifacts/\nnotes.py\n")
+        (root / "src" / ".ignore").write_text("generated/*\n!generated/keep.py\n")
+        return root
+
+    def test_ignored_files_and_directories_are_skipped(self, project):
+        files = expand_paths([str(project)])
+
+        assert _names(files, project) == ["src/app.py", "src/generated/keep.py"]
+
+    def test_ignore_files_can_be_disabled(self, project, monkeypatch):
+        monkeypatch.setenv("PAL_RESPECT_GITIGNORE", "false")
+
+        files = expand_paths([str(project)])
+
+        assert "artifacts/bundle.js" in _names(files, project)
+        assert "notes.py" in _names(files, project)
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+    def test_git_ls_files_fast_path_matches_walk(self, project, monkeypatch):
+        subprocess.run(["git", "init", "-q", str(project)], check=True)
+        (project / "src" / "untracked.py").write_text("new")
+
+        walked = expand_paths([str(project / "src")])
+        monkeypatch.setenv("PAL_GIT_LS_FILES", "true")
+        listed = expand_paths([str(project / "src")])
+
+        assert listed == walked
+        assert _names(listed, project) == ["src/app.py", "src/generated/keep.py", "src/untracked.py"]
+        assert _names(expand_paths([str(project)]), project) == [
+            "src/app.py",
+            "src/generated/keep.py",
+            "src/untracked.py",
+        ]
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+    def test_git_ls_files_applies_ignore_files_above_the_root(self, project, monkeypatch):
+        subprocess.run(["git", "init", "-q", str(project)], check=True)
+        (project / ".ignore").write_text("src/app.py\n")
+        (project / "src" / "generated" / "extra.py").write_text("extra")
+        (project / "src" / ".ignore").write_text("scratch.py\n")
+        (project / "src" / "generated" / "scratch.py").write_text("scratch")
+
+        walked = expand_paths([str(project / "src" / "generated")])
+        monkeypatch.setenv("PAL_GIT_LS_FILES", "true")
+        listed = expand_paths([str(project / "src" / "generated")])
+
+        assert listed == walked
+        assert _names(expand_paths([str(project / "src")]), project) == [
+            "src/generated/extra.py",
+            "src/generated/keep.py",
+            "src/generated/models.py",
+        ]
+        assert _names(listed, project) == ["src/generated/extra.py", "src/generated/keep.py", "src/generated/models.py"]
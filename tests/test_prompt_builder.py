@@ -0,0 +1,71 @@
+"""Tests for segment-based prompt assembly."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from providers.shared import ModelResponse, ProviderType
+from tools.chat import ChatRequest, ChatTool
+from utils.model_context import ModelContext
+from utils.prompt_builder import PromptBuilder, materialize
+
+
+def test_builder_joins_once_and_accounts_per_section():
+    files = "x" * 4000
+    section = PromptBuilder("=== USER REQUEST ===\n").add(files, label="files")
+    prompt = PromptBuilder("system", label="system").add("\n\n").add(section, label="request")
+
+    assert [segment.label for segment in prompt.segments] == ["system", None, "request", "files"]
+    assert prompt.token_breakdown() == {"system": 1, "other": 0, "request": 5, "files": 1000}
+    assert len(prompt) == len(prompt.build())
+
+    built = prompt.build()
+    assert prompt.build() is built  # cached
+    assert prompt.segments[-1].text is files  # stored by reference, not copied
+
+    retry = prompt.copy().add("\n\nretry", label="instructions")
+    assert retry.build() == built + "\n\nretry"
+    assert prompt.build() is built
+    assert materialize("plain") == "plain"
+
+
+def test_standard_prompt_layout_is_unchanged(tmp_path):
+    source = tmp_path / "app.py"
+    source.write_text("print('hi')\n")
+    tool = ChatTool()
+    request = ChatRequest(
+        prompt="Explain this",
+        absolute_file_paths=[str(source)],
+        working_directory_absolute_path=str(tmp_path),
+    )
+    tool._model_context = ModelContext("gemini-2.5-flash")
+
+    full = tool.build_standard_prompt("SYSTEM", "Explain this", request, "CONTEXT FILES")
+
+    assert full.startswith("SYSTEM")
+    assert "\n\n=== USER REQUEST ===\nExplain this\n\n=== CONTEXT FILES ===\n" in full
+    assert "print('hi')" in full
+    assert full.endswith(
+        "\n=== END CONTEXT ====\n=== END REQUEST ===\n\nPlease provide a thoughtful, comprehensive response:"
+    )
+
+    chat_prompt = tool.prepare_chat_style_prompt(request, system_prompt="SYSTEM")
+    assert full.endswith(chat_prompt)
+    assert chat_prompt.startswith("=== USER REQUEST ===\nExplain this")
+
+
+@pytest.mark.asyncio
+async def test_provider_receives_one_joined_prompt(monkeypatch, tmp_path):
+    monkeypatch.setenv("PAL_REQUEST_COALESCING", "false")
+    provider = MagicMock()
+    provider.get_provider_type.return_value = ProviderType.GOOGLE
+    provider.generate_content.return_value = ModelResponse(content="answer", model_name="gemini-2.5-flash")
+
+    tool = ChatTool()
+    await tool._generate_content(
+        provider,
+        prompt=PromptBuilder("request", label="request").add("\n\n").add("follow up", label="instructions"),
+        model_name="gemini-2.5-flash",
+    )
+
+    assert provider.generate_content.call_args.kwargs["prompt"] == "request\n\nfollow up"
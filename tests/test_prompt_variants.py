@@ -0,0 +1,44 @@
+"""Tests for precompiled system prompt variants."""
+
+import hashlib
+
+from providers.shared import ModelCapabilities, ProviderType
+from systemprompts import CHAT_PROMPT, GENERATE_CODE_PROMPT
+from tools.chat import ChatTool
+from utils.prompt_variants import capability_flags
+
+
+def _capabilities(**flags):
+    return ModelCapabilities(
+        provider=ProviderType.OPENAI,
+        model_name="test-model",
+        friendly_name="Test",
+        context_window=200_000,
+        max_output_tokens=32_000,
+        **flags,
+    )
+
+
+def test_variants_are_interned_per_capabilities_and_locale(monkeypatch):
+    monkeypatch.setenv("LOCALE", "")
+    tool = ChatTool()
+
+    plain = tool.get_system_prompt_variant(_capabilities())
+    assert plain is ChatTool().get_system_prompt_variant(_capabilities())
+    assert plain.text == CHAT_PROMPT
+    assert plain.digest == hashlib.sha256(CHAT_PROMPT.encode("utf-8")).hexdigest()[:16]
+    assert plain.tokens > 0
+
+    codegen = tool.get_system_prompt_variant(_capabilities(allow_code_generation=True))
+    assert codegen is not plain
+    assert codegen.text.endswith(GENERATE_CODE_PROMPT.strip())
+    assert capability_flags(_capabilities(allow_code_generation=True)) == {
+        "allow_code_generation",
+        "supports_system_prompts",
+        "supports_temperature",
+    }
+
+    monkeypatch.setenv("LOCALE", "fr-FR")
+    localized = tool.get_system_prompt_variant(_capabilities())
+    assert localized.text.startswith("Always respond in fr-FR.\n\n")
+    assert localized.digest != plain.digest
@@ -0,0 +1,142 @@
+"""Tests for client-side RPM/TPM pacing of provider calls."""
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from providers.openai import OpenAIModelProvider
+from providers.rate_limiter import (
+    ModelRateLimiter,
+    TokenBucket,
+    get_rate_limiter,
+    parse_duration,
+    rate_limiter_stats,
+    reset_rate_limiters,
+    retry_after_seconds,
+)
+from providers.shared import ModelResponse, ProviderType
+from tools.chat import ChatTool
+
+
+@pytest.fixture(autouse=True)
+def clean_limiters():
+    reset_rate_limiters()
+    yield
+    reset_rate_limiters()
+
+
+def test_bucket_paces_reservations_in_order():
+    bucket = TokenBucket(60)  # one token per second
+
+    assert bucket.reserve(60, now=bucket.updated) == 0.0
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2.0)
+    # Oversized requests wait for a full bucket at most
+    assert bucket.reserve(10_000, now=bucket.updated) == pytest.approx(62.0)
+
+
+def test_limiter_sleeps_instead_of_bursting():
+    limiter = ModelRateLimiter("openai/o3", requests_per_minute=120, tokens_per_minute=600)
+    with patch("providers.rate_limiter.time.sleep") as sleep:
+        for _ in range(120):
+            limiter.acquire(1)
+        sleep.assert_not_called()
+        limiter.acquire(1)
+        assert sleep.call_args[0][0] == pytest.approx(0.5, rel=0.05)
+
+    # Token bucket: 600 TPM = 10 tokens/s, 480 left
+    limiter.requests = None
+    with patch("providers.rate_limiter.time.sleep") as sleep:
+        limiter.acquire(500)
+        assert sleep.call_args[0][0] == pytest.approx(2.0, rel=0.05)
+
+
+def test_usage_and_headers_adapt_buckets():
+    limiter = ModelRateLimiter("openai/o3", tokens_per_minute=1000)
+    limiter.acquire(100)
+    limiter.record_usage(100, 400)
+    assert limiter.tokens.level == pytest.approx(600, abs=1)
+
+    limiter.observe_headers(
+        {
+            "X-RateLimit-Limit-Requests": "500",
+            "X-RateLimit-Remaining-Requests": "3",
+            "x-ratelimit-limit-tokens": "2000",
+        }
+    )
+    assert limiter.requests.capacity == 500
+    assert limiter.requests.level == pytest.approx(3, abs=0.1)
+    assert limiter.tokens.capacity == 2000
+
+
+def test_retry_after_parsing():
+    def error(status, headers=None, message="rate limited"):
+        exc = Exception(message)
+        exc.status_code = status
+        exc.response = SimpleNamespace(headers=headers or {}, status_code=status)
+        return exc
+
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("250ms") == 0.25
+    assert retry_after_seconds(error(429, {"retry-after": "7"})) == 7
+    assert retry_after_seconds(error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(error(429, message="Please retry in 12.5s")) == 12.5
+    assert retry_after_seconds(error(500, message="server error")) is None
+
+
+def test_limits_come_from_capabilities():
+    provider = OpenAIModelProvider(api_key="test-key")
+    capabilities = provider.get_capabilities("o3")
+    capabilities.requests_per_minute = 30
+
+    limiter = get_rate_limiter(ProviderType.OPENAI, "o3", capabilities)
+    assert limiter.requests.capacity == 30 and limiter.tokens is None
+
+    capabilities.requests_per_minute = 60
+    assert get_rate_limiter(ProviderType.OPENAI, "o3", capabilities) is limiter
+    assert limiter.requests.capacity == 60
+
+
+def test_provider_attempt_pauses_model_after_429(monkeypatch):
+    provider = OpenAIModelProvider(api_key="test-key")
+    rate_limited = Exception("429 Too Many Requests")
+    rate_limited.status_code = 429
+    rate_limited.response = SimpleNamespace(headers={"retry-after": "3"}, status_code=429)
+    outcomes = [rate_limited, ModelResponse(content="ok", usage={"total_tokens": 5})]
+
+    def operation():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    attempt = provider._rate_limited(operation, model_name="o3", estimated_tokens=5)
+    with patch("time.sleep") as sleep:
+        result = provider._run_with_retries(attempt, max_attempts=2, delays=[0.1])
+
+    assert result.content == "ok"
+    # No retry back-off on top: the limiter alone holds the call for the advertised delay
+    assert [call.args[0] for call in sleep.call_args_list] == [pytest.approx(3.0, abs=0.1)]
+    assert rate_limiter_stats()["openai/o3"]["throttled_calls"] == 1
+
+    monkeypatch.setenv("PAL_RATE_LIMITING", "false")
+    assert provider._rate_limited(operation, model_name="o3") is operation
+
+
+async def test_uncoalesced_provider_calls_run_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    call_threads = []
+
+    class Provider:
+        def generate_content(self, **kwargs):
+            call_threads.append(threading.get_ident())
+            return ModelResponse(content="ok")
+
+    tool = ChatTool()
+    with patch.object(ChatTool, "supports_request_coalescing", return_value=False):
+        response = await tool._generate_content(Provider(), prompt="hi", model_name="o3")
+
+    assert response.content == "ok"
+    assert call_threads and call_threads[0] != loop_thread
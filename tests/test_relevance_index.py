@@ -0,0 +1,181 @@
+"""
+Tests for the lexical relevance index used to rank files under tight token budgets
+"""
+
+import os
+
+from utils.conversation_memory import _plan_file_inclusion_by_size
+from utils.file_utils import read_file_excerpt, read_files
+from utils.relevance_index import LexicalIndex, get_index, rank_by_relevance, tokenize
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _filler(lines: int) -> str:
+    return "\n".join(f"value_{i} = compute_default({i})" for i in range(lines))
+
+
+class TestTokenize:
+    def test_splits_identifiers_into_parts(self):
+        terms = tokenize("def calculateTokenBudget(max_file_tokens): pass")
+        assert "calculatetokenbudget" in terms
+        assert {"calculate", "token", "budget"} <= set(terms)
+        assert {"max_file_tokens", "max", "file", "tokens"} <= set(terms)
+
+    def test_drops_stopwords_and_short_terms(self):
+        assert tokenize("how does the x work") == ["work"]
+
+
+class TestLexicalIndex:
+    def test_incremental_refresh_uses_mtime(self, project_path):
+        a = _write(project_path / "a.py", "def parse_invoice(): pass")
+        b = _write(project_path / "b.py", "def render_page(): pass")
+
+        index = LexicalIndex()
+        assert index.refresh([a, b]) == 2
+        assert index.refresh([a, b]) == 0
+
+        _write(project_path / "b.py", "def render_page_again(): pass")
+        stat = os.stat(b)
+        os.utime(b, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert index.refresh([a, b]) == 1
+
+    def test_index_persists_between_instances(self, project_path):
+        a = _write(project_path / "a.py", "def parse_invoice(): pass")
+
+        first = LexicalIndex()
+        first.refresh([a])
+        first.save()
+        assert first.entry_path(a).exists()
+
+        second = LexicalIndex()
+        assert second.refresh([a]) == 0
+        assert second.score_chunks("invoice", [a])
+
+    def test_save_rewrites_only_changed_files(self, project_path, tmp_path):
+        other_root = tmp_path / "other_project"
+        other_root.mkdir()
+        a = _write(project_path / "a.py", "def parse_invoice(): pass")
+        b = _write(project_path / "b.py", "def render_page(): pass")
+        c = _write(other_root / "c.py", "def send_invoice(): pass")
+
+        index = LexicalIndex()
+        index.refresh([a, b, c])
+        index.save()
+        untouched = index.entry_path(a).stat().st_mtime_ns
+
+        _write(project_path / "b.py", "def render_page_again(): pass")
+        stat = os.stat(b)
+        os.utime(b, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        os.remove(c)
+        index.refresh([a, b, c])
+        index.save()
+
+        assert index.entry_path(a).stat().st_mtime_ns == untouched
+        assert not index.entry_path(c).exists()
+        reloaded = LexicalIndex()
+        assert reloaded.refresh([b]) == 0
+        assert reloaded.score_chunks("again", [b])
+
+    def test_chunk_scores_point_at_matching_region(self, project_path):
+        text = _filler(200) + "\ndef refund_invoice(invoice):\n    return invoice.refund()\n" + _filler(200)
+        path = _write(project_path / "billing.py", text)
+
+        index = get_index()
+        index.refresh([path])
+        matches = index.score_chunks("refund invoice", [path])
+
+        assert matches
+        assert matches[0].start_line <= 201 <= matches[0].end_line
+
+
+class TestRankByRelevance:
+    def test_matching_files_first_and_stable_fallback(self, project_path):
+        files = [
+            _write(project_path / "a_utils.py", "def helper(): pass"),
+            _write(project_path / "b_models.py", "class Widget: pass"),
+            _write(project_path / "c_auth.py", "def verify_session_token(token): return token"),
+        ]
+
+        ordered, chunks = rank_by_relevance(files, "Why does session token verification fail?")
+
+        assert ordered[0] == files[2]
+        assert ordered[1:] == files[:2]
+        assert set(chunks) == {files[2]}
+
+    def test_ranking_can_be_disabled(self, project_path, monkeypatch):
+        files = [
+            _write(project_path / "a.py", "def helper(): pass"),
+            _write(project_path / "b.py", "def verify_session_token(): pass"),
+        ]
+        monkeypatch.setenv("PAL_RELEVANCE_RANKING", "false")
+
+        ordered, chunks = rank_by_relevance(files, "session token")
+
+        assert ordered == files
+        assert chunks == {}
+
+
+class TestBudgetedReads:
+    def test_read_files_prefers_relevant_files_over_alphabetical_prefix(self, project_path):
+        for name in ("a_one.py", "a_two.py", "a_three.py"):
+            _write(project_path / name, _filler(300))
+        _write(project_path / "z_payments.py", "def settle_payment(payment):\n    return payment.settle()\n")
+
+        content = read_files(
+            [str(project_path)],
+            max_tokens=4_000,
+            reserve_tokens=0,
+            relevance_query="How is a payment settled?",
+        )
+
+        assert "settle_payment" in content
+        assert content.index("z_payments.py") < content.index("a_one.py")
+
+    def test_read_files_without_query_keeps_sorted_order(self, project_path):
+        for name in ("a_one.py", "a_two.py", "a_three.py"):
+            _write(project_path / name, _filler(300))
+        _write(project_path / "z_payments.py", "def settle_payment(payment):\n    return payment.settle()\n")
+
+        content = read_files([str(project_path)], max_tokens=4_000, reserve_tokens=0)
+
+        assert content.index("a_one.py") < content.index("z_payments.py")
+
+    def test_large_file_contributes_relevant_excerpt(self, project_path):
+        text = _filler(400) + "\ndef settle_payment(payment):\n    return payment.settle()\n" + _filler(400)
+        big = _write(project_path / "ledger.py", text)
+
+        content = read_files(
+            [big],
+            max_tokens=2_000,
+            reserve_tokens=0,
+            include_line_numbers=True,
+            relevance_query="settle payment",
+        )
+
+        assert "--- BEGIN FILE EXCERPT:" in content
+        assert " 401│ def settle_payment(payment):" in content
+        assert "SKIPPED FILES" not in content
+
+    def test_read_file_excerpt_merges_adjacent_ranges(self, project_path):
+        path = _write(project_path / "lines.txt", "\n".join(f"line {i}" for i in range(1, 21)))
+
+        excerpt, tokens = read_file_excerpt(path, [(5, 6), (7, 8), (15, 15)])
+
+        assert "(lines 5-8, 15-15 of 20;" in excerpt
+        assert "line 5\nline 6\nline 7\nline 8\n...\nline 15" in excerpt
+        assert tokens > 0
+
+    def test_history_plan_keeps_relevant_file_under_budget(self, project_path):
+        newest = _write(project_path / "newest.py", _filler(100))
+        relevant = _write(project_path / "older_cache.py", "def evict_stale_cache_entries(cache): pass\n")
+
+        included, skipped, _ = _plan_file_inclusion_by_size(
+            [newest, relevant], max_file_tokens=200, query="cache eviction of stale entries"
+        )
+
+        assert included == [relevant]
+        assert skipped == [newest]
@@ -0,0 +1,94 @@
+"""Tests for the compact response encoding mode."""
+
+import json
+
+import pytest
+
+from tools.debug import DebugIssueTool
+from tools.workflow.schema_builders import WorkflowSchemaBuilder
+from utils.response_format import field_digests, omit_unchanged_fields, select_fields
+
+
+def _step(step_number, continuation_id=None, **extra):
+    arguments = {
+        "step": f"Investigating step {step_number}",
+        "step_number": step_number,
+        "total_steps": 5,
+        "next_step_required": True,
+        "findings": f"Findings {step_number}",
+        "model": "flash",
+        **extra,
+    }
+    if continuation_id:
+        arguments["continuation_id"] = continuation_id
+    return arguments
+
+
+def test_helpers_trim_repeated_and_unselected_fields():
+    first = {"status": "pause", "required_actions": ["a"], "next_steps": "go", "metadata": {"tool_name": "debug"}}
+    second = {"status": "pause", "required_actions": ["a"], "next_steps": "stop", "metadata": {"tool_name": "debug"}}
+
+    assert omit_unchanged_fields(second, field_digests(first)) == ["required_actions", "metadata"]
+    assert second == {"status": "pause", "next_steps": "stop", "omitted_unchanged": ["required_actions", "metadata"]}
+    assert select_fields(second, ["next_steps"]) == second
+    assert select_fields(second, ["findings"]) == {
+        "status": "pause",
+        "omitted_unchanged": ["required_actions", "metadata"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_compact_workflow_steps(monkeypatch):
+    monkeypatch.setenv("PAL_RESPONSE_FORMAT", "compact")
+    tool = DebugIssueTool()
+    assert "response_fields" in WorkflowSchemaBuilder.build_schema(tool_name="debug")["properties"]
+
+    first_text = (await tool.execute(_step(1)))[0].text
+    first = json.loads(first_text)
+    assert "\n" not in first_text and ", " not in first_text.split('"next_steps"')[0]
+    assert "required_actions" in first and "omitted_unchanged" not in first
+
+    continuation_id = first["continuation_id"]
+    second = json.loads((await DebugIssueTool().execute(_step(2, continuation_id)))[0].text)
+    assert second["step_number"] == 2
+    assert "required_actions" in second  # investigation actions differ from step 1
+
+    third = json.loads((await DebugIssueTool().execute(_step(3, continuation_id)))[0].text)
+    assert "required_actions" in third["omitted_unchanged"]
+    assert "required_actions" not in third
+
+    selected = json.loads(
+        (await DebugIssueTool().execute(_step(4, continuation_id, response_fields=["next_steps"])))[0].text
+    )
+    assert set(selected) <= {
+        "status",
+        "continuation_id",
+        "step_number",
+        "total_steps",
+        "next_step_required",
+        "next_steps",
+        "omitted_unchanged",
+    }
+
+
+@pytest.mark.asyncio
+async def test_unselected_fields_are_not_treated_as_sent(monkeypatch):
+    monkeypatch.setenv("PAL_RESPONSE_FORMAT", "compact")
+
+    first = json.loads((await DebugIssueTool().execute(_step(1, response_fields=["next_steps"])))[0].text)
+    assert "metadata" not in first
+
+    # The client never received the metadata, so it is sent rather than reported as unchanged
+    second = json.loads((await DebugIssueTool().execute(_step(2, first["continuation_id"])))[0].text)
+    assert "metadata" in second
+    assert "metadata" not in second.get("omitted_unchanged", [])
+
+    # Once sent (or carried over as omitted) it is skipped while it stays the same
+    third = json.loads((await DebugIssueTool().execute(_step(3, first["continuation_id"])))[0].text)
+    fourth = json.loads((await DebugIssueTool().execute(_step(4, first["continuation_id"])))[0].text)
+    assert "metadata" in third["omitted_unchanged"] and "metadata" in fourth["omitted_unchanged"]
+
+
+def test_pretty_mode_is_default(monkeypatch):
+    monkeypatch.delenv("PAL_RESPONSE_FORMAT", raising=False)
+    assert "response_fields" not in WorkflowSchemaBuilder.build_schema(tool_name="debug")["properties"]
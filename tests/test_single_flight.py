@@ -0,0 +1,122 @@
+"""Tests for single-flight coalescing of identical model calls."""
+
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from providers.shared import ModelResponse, ProviderType
+from tools.chat import ChatTool
+from utils.single_flight import SingleFlight, request_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    results = await asyncio.gather(*(flight.run("k", work, label="chat", clone=dict) for _ in range(3)))
+
+    assert calls == 1
+    assert results == [{"answer": 42}] * 3
+    assert results[1] is not results[0]
+    assert flight.stats() == {"chat": {"calls": 3, "coalesced": 2, "in_flight": 0}}
+
+    # Finished calls are not reused
+    await flight.run("k", work, label="chat")
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    original = asyncio.create_task(flight.run("k", work))
+    await asyncio.sleep(0)
+    original.cancel()
+    await asyncio.gather(original, return_exceptions=True)
+
+    retry = asyncio.create_task(flight.run("k", work))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await retry == "done"
+    assert flight.stats()["default"]["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_caller():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    results = await asyncio.gather(flight.run("k", work), flight.run("k", work), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_request_key_tracks_file_versions(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text("a = 1\n")
+    base = {"tool_name": "chat", "provider": "openai", "model_name": "o3", "prompt": "explain", "temperature": 0.5}
+
+    first = request_key(**base, files=[str(source)])
+    assert request_key(**base, files=[str(source), str(source)]) == first
+
+    os.utime(source, ns=(1, 1))
+    assert request_key(**base, files=[str(source)]) != first
+    assert request_key(**{**base, "temperature": 0.7}, files=[str(source)]) != request_key(**base, files=[str(source)])
+
+
+def _slow_provider(calls: list):
+    provider = MagicMock()
+    provider.get_provider_type.return_value = ProviderType.OPENAI
+
+    def generate_content(**kwargs):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return ModelResponse(content="hello", model_name=kwargs["model_name"], metadata={"n": 1})
+
+    provider.generate_content.side_effect = generate_content
+    return provider
+
+
+@pytest.mark.asyncio
+async def test_tool_coalesces_and_can_opt_out(monkeypatch):
+    calls: list[int] = []
+    provider = _slow_provider(calls)
+    tool = ChatTool()
+
+    async def ask():
+        return await tool._generate_content(provider, prompt="same", model_name="o3", temperature=0.5)
+
+    first, second = await asyncio.gather(ask(), ask())
+    assert len(calls) == 1
+    assert calls[0] != threading.get_ident()  # ran off the event loop
+    assert first.content == second.content == "hello"
+    assert first.metadata is not second.metadata
+
+    monkeypatch.setattr(ChatTool, "supports_request_coalescing", lambda self: False)
+    await asyncio.gather(ask(), ask())
+    assert len(calls) == 3
+
+    monkeypatch.setattr(ChatTool, "supports_request_coalescing", lambda self: True)
+    monkeypatch.setenv("PAL_REQUEST_COALESCING", "false")
+    await asyncio.gather(ask(), ask())
+    assert len(calls) == 5
@@ -0,0 +1,97 @@
+"""Tests for expiry and memory-bounded eviction in the in-memory storage backend."""
+
+import json
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from utils.storage_backend import InMemoryStorage
+from utils.storage_compression import PayloadCodec, train_dictionary
+
+
+@pytest.fixture
+def make_storage():
+    created = []
+
+    def factory(**kwargs):
+        storage = InMemoryStorage(**kwargs)
+        created.append(storage)
+        return storage
+
+    yield factory
+    for storage in created:
+        storage.shutdown()
+
+
+def test_expired_entries_are_removed_from_the_heap(make_storage):
+    storage = make_storage(max_bytes=0)
+    with patch("utils.storage_backend.time.time", return_value=1000.0):
+        storage.setex("thread:short", 10, "a")
+        storage.setex("thread:long", 100, "b")
+        storage.setex("thread:refreshed", 10, "c")
+        storage.setex("thread:refreshed", 100, "c2")
+
+    with patch("utils.storage_backend.time.time", return_value=1050.0):
+        storage._cleanup_expired()
+        assert storage.get("thread:short") is None
+        assert storage.get("thread:refreshed") == "c2"  # stale deadline skipped
+        assert storage.get("thread:long") == "b"
+
+    assert len(storage) == 2
+    assert storage.stats()["bytes"] == sys.getsizeof("b") + sys.getsizeof("c2")
+
+    storage.clear()
+    assert len(storage) == 0 and storage.stats()["bytes"] == 0
+
+
+def test_memory_ceiling_evicts_least_recently_used(make_storage):
+    value = "x" * 1000
+    storage = make_storage(max_bytes=3 * sys.getsizeof(value), codec=PayloadCodec("off"))
+
+    storage.setex("thread:1", 3600, value)
+    storage.setex("thread:2", 3600, value)
+    storage.setex("thread:3", 3600, value)
+    assert storage.get("thread:1") == value  # now the most recently used
+
+    storage.setex("thread:4", 3600, value)
+
+    assert storage.get("thread:2") is None
+    assert all(storage.get(key) == value for key in ("thread:1", "thread:3", "thread:4"))
+    assert storage.stats()["evictions"] == 1
+    assert storage.stats()["bytes"] <= storage.stats()["max_bytes"]
+
+    # A single oversized thread is kept rather than evicting itself
+    storage.setex("thread:big", 3600, value * 10)
+    assert storage.get("thread:big") == value * 10
+    assert len(storage) == 1
+
+
+def test_large_payloads_are_stored_compressed(make_storage):
+    payload = json.dumps({"turns": [{"role": "assistant", "content": "The fix is in utils/file_utils.py. " * 40}] * 10})
+    storage = make_storage(max_bytes=0, codec=PayloadCodec("zlib", min_bytes=1024))
+
+    version = storage.setex("thread:big", 3600, payload)
+    storage.setex("thread:small", 3600, "{}")
+
+    assert storage.get("thread:big") == payload
+    assert storage.get_versioned("thread:big") == (payload, version)
+    assert storage.get_versioned("thread:big", known_version=version) == (None, version)  # not decoded again
+    assert storage.get_versioned("thread:missing") == (None, None)
+    assert storage.get("thread:small") == "{}"
+    assert storage.stats()["bytes"] < sys.getsizeof(payload) / 5
+
+
+def test_shared_dictionary_round_trip():
+    samples = [
+        json.dumps({"thread_id": str(i), "turns": [{"role": "user", "content": f"step {i}"}] * 50}) for i in range(20)
+    ]
+    dictionary = train_dictionary(samples)
+    codec = PayloadCodec("zlib", min_bytes=0, dictionary=dictionary)
+
+    stored = codec.encode(samples[0])
+    assert len(stored) < len(PayloadCodec("zlib", min_bytes=0).encode(samples[0]))
+    assert codec.decode(stored) == samples[0]
+
+    with pytest.raises(ValueError):
+        PayloadCodec("zlib", min_bytes=0).decode(stored)
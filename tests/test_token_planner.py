@@ -0,0 +1,73 @@
+"""Tests for demand-driven token budget planning."""
+
+from unittest.mock import patch
+
+from tests.mock_helpers import create_mock_provider
+from utils.model_context import (
+    DEFAULT_SYSTEM_PROMPT_TOKENS,
+    IMAGE_TOKEN_ESTIMATE,
+    INSTRUCTION_OVERHEAD_TOKENS,
+    MIN_RESPONSE_TOKENS,
+    ModelContext,
+    TokenDemand,
+    plan_token_allocation,
+)
+
+OVERHEAD = DEFAULT_SYSTEM_PROMPT_TOKENS + INSTRUCTION_OVERHEAD_TOKENS
+
+
+def test_fresh_request_gives_files_everything_but_the_prompt():
+    demand = TokenDemand(prompt_tokens=10_000, history_tokens=0)
+    allocation = plan_token_allocation(1_000_000, demand, max_output_tokens=65_536)
+
+    # Response reservation is capped by what the model can actually produce
+    assert allocation.response_tokens == 65_536
+    assert allocation.content_tokens == 1_000_000 - 65_536
+    assert allocation.history_tokens == 0
+    assert allocation.file_tokens == allocation.content_tokens - 10_000 - OVERHEAD
+    # System prompt and instructions keep their room next to the user's prompt
+    assert allocation.available_for_prompt == 10_000 + OVERHEAD
+
+    compiled = plan_token_allocation(1_000_000, TokenDemand(history_tokens=0, system_prompt_tokens=12_000))
+    assert compiled.available_for_prompt == 12_000 + INSTRUCTION_OVERHEAD_TOKENS
+
+    small = plan_token_allocation(1_000_000, TokenDemand(history_tokens=0, expected_output_tokens=1_000))
+    assert small.response_tokens == MIN_RESPONSE_TOKENS
+
+
+def test_oversubscribed_demands_keep_minimum_shares():
+    demand = TokenDemand(history_tokens=900_000, file_tokens=900_000)
+    allocation = plan_token_allocation(1_000_000, demand, reserved_for_response=200_000)
+    pool = allocation.content_tokens - OVERHEAD
+    assert allocation.file_tokens + allocation.history_tokens == pool
+    assert allocation.history_tokens == int(pool * 0.2)
+    assert allocation.file_tokens == pool - int(pool * 0.2)
+
+    # Demands that fit are met in full and the spare room is still shared
+    fitting = plan_token_allocation(1_000_000, TokenDemand(history_tokens=50_000, file_tokens=50_000))
+    assert fitting.history_tokens >= 50_000 and fitting.file_tokens >= 50_000
+    assert fitting.history_tokens + fitting.file_tokens == fitting.content_tokens - OVERHEAD
+
+
+@patch("utils.model_context.ModelProviderRegistry.get_provider_for_model", return_value=create_mock_provider())
+def test_model_context_uses_recorded_demand(_mock_provider):
+    demand = TokenDemand.from_arguments(
+        {"prompt": "x" * 4_000, "images": ["a.png", "b.png"], "continuation_id": "abc", "_history_tokens": 2_000}
+    )
+    assert (demand.prompt_tokens, demand.image_tokens, demand.history_tokens) == (
+        1_000,
+        2 * IMAGE_TOKEN_ESTIMATE,
+        2_000,
+    )
+    assert TokenDemand.from_arguments({"prompt": "hi", "_history_tokens": 2_000}).history_tokens == 0
+
+    context = ModelContext("gemini-2.5-flash")
+    default_files = context.calculate_token_allocation().file_tokens
+
+    context.token_demand = TokenDemand(history_tokens=0)
+    assert context.calculate_token_allocation().file_tokens > default_files
+
+    context.record_demand(prompt_tokens=100_000)
+    assert context.token_demand.history_tokens == 0
+    allocation = context.calculate_token_allocation()
+    assert allocation.file_tokens == allocation.content_tokens - 100_000 - OVERHEAD
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import json
 from typing import TYPE_CHECKING, Any
 
 from pydantic import Field
@@ -10,6 +9,7 @@ from pydantic import Field
 from config import TEMPERATURE_ANALYTICAL
 from tools.shared.base_models import ToolRequest
 from tools.simple.base import SimpleTool
+from utils import response_format
 
 if TYPE_CHECKING:
     from tools.models import ToolModelCategory
@@ -128,4 +128,4 @@ class LookupTool(SimpleTool):
             "instructions": LOOKUP_PROMPT,
             "user_prompt": request.prompt,
         }
-        return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False, indent=2))]
+        return [TextContent(type="text", text=response_format.dumps(response))]
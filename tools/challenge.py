@@ -18,6 +18,7 @@ if TYPE_CHECKING:
 from config import TEMPERATURE_ANALYTICAL
 from tools.shared.base_models import ToolRequest
 from tools.shared.exceptions import ToolExecutionError
+from utils import response_format
 
 from .simple.base import SimpleTool
 
@@ -137,7 +138,7 @@ class ChallengeTool(SimpleTool):
                 ),
             }
 
-            return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
+            return [TextContent(type="text", text=response_format.dumps(response_data))]
 
         except ToolExecutionError:
             raise
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-import re
+import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
@@ -13,17 +15,19 @@ from pydantic import BaseModel, Field
 
 from clink import get_registry
 from clink.agents import AgentOutput, CLIAgentError, create_agent
+from clink.constants import SUMMARY_PATTERN
 from clink.models import ResolvedCLIClient, ResolvedCLIRole
+from clink.streaming import get_max_capture_bytes
 from config import TEMPERATURE_BALANCED
 from tools.models import ToolModelCategory, ToolOutput
 from tools.shared.base_models import COMMON_FIELD_DESCRIPTIONS
 from tools.shared.exceptions import ToolExecutionError
 from tools.simple.base import SchemaBuilder, SimpleTool
+from utils import output_spill
 
 logger = logging.getLogger(__name__)
 
 MAX_RESPONSE_CHARS = 20_000
-SUMMARY_PATTERN = re.compile(r"<SUMMARY>(.*?)</SUMMARY>", re.IGNORECASE | re.DOTALL)
 
 
 class CLinkRequest(BaseModel):
@@ -34,6 +38,10 @@ class CLinkRequest(BaseModel):
         default=None,
         description="Configured CLI client name to invoke. Defaults to the first configured CLI if omitted.",
     )
+    cli_names: list[str] | None = Field(
+        default=None,
+        description="Run the same prompt and role against several configured CLIs in parallel.",
+    )
     role: str | None = Field(
         default=None,
         description="Optional role preset defined in the CLI configuration (defaults to 'default').",
@@ -115,7 +123,10 @@ class CLinkTool(SimpleTool):
                 f" Default: {self._default_cli_name}." if self._default_cli_name and len(self._cli_names) <= 1 else ""
             )
             cli_description = (
-                "Configured CLI client name (from conf/cli_clients). Available: " + cli_available + default_text
+                "Configured CLI client name (from conf/cli_clients). Available: "
+                + cli_available
+                + default_text
+                + (" Provide cli_name or cli_names." if len(self._cli_names) > 1 else "")
             )
             role_description = (
                 "Optional role preset defined for the selected CLI (defaults to 'default'). Roles per CLI: "
@@ -135,6 +146,15 @@ class CLinkTool(SimpleTool):
                 "enum": self._cli_names,
                 "description": cli_description,
             },
+            "cli_names": {
+                "type": "array",
+                "items": {"type": "string", "enum": self._cli_names},
+                "minItems": 1,
+                "description": (
+                    "Run the same prompt and role against several CLIs in parallel instead of a single cli_name "
+                    "(answers are merged; CLIs that fail or time out are reported alongside the others)."
+                ),
+            },
             "role": {
                 "type": "string",
                 "enum": self._all_roles or ["default"],
@@ -153,7 +173,8 @@ class CLinkTool(SimpleTool):
         }
 
         if len(self._cli_names) > 1:
-            schema["required"].append("cli_name")
+            # There is no default to fall back on: callers pick one CLI or several
+            schema["anyOf"] = [{"required": ["cli_name"]}, {"required": ["cli_names"]}]
 
         return schema
 
@@ -169,19 +190,18 @@ class CLinkTool(SimpleTool):
         if path_error:
             self._raise_tool_error(path_error)
 
-        selected_cli = request.cli_name or self._default_cli_name
-        if not selected_cli:
-            self._raise_tool_error("No CLI clients are configured for clink.")
-
-        try:
-            client_config = self._registry.get_client(selected_cli)
-        except KeyError as exc:
-            self._raise_tool_error(str(exc))
+        jobs: list[tuple[ResolvedCLIClient, ResolvedCLIRole]] = []
+        for cli_name in self._resolve_cli_names(request):
+            try:
+                client_config = self._registry.get_client(cli_name)
+            except KeyError as exc:
+                self._raise_tool_error(str(exc))
 
-        try:
-            role_config = client_config.get_role(request.role)
-        except KeyError as exc:
-            self._raise_tool_error(str(exc))
+            try:
+                role_config = client_config.get_role(request.role)
+            except KeyError as exc:
+                self._raise_tool_error(str(exc))
+            jobs.append((client_config, role_config))
 
         absolute_file_paths = self.get_request_files(request)
         images = self.get_request_images(request)
@@ -189,49 +209,35 @@ class CLinkTool(SimpleTool):
 
         self._model_context = arguments.get("_model_context")
 
-        system_prompt_text = role_config.prompt_path.read_text(encoding="utf-8")
-        include_system_prompt = not self._use_external_system_prompt(client_config)
+        if len(jobs) > 1:
+            content, metadata, model_info = await self._execute_fan_out(request, jobs, absolute_file_paths, images)
+        else:
+            client_config, role_config = jobs[0]
+            prompt_text, system_prompt_text = await self._prepare_cli_prompt(request, client_config, role_config)
+            try:
+                result = await self._run_cli(
+                    client_config, role_config, prompt_text, system_prompt_text, absolute_file_paths, images
+                )
+            except CLIAgentError as exc:
+                metadata = self._build_error_metadata(client_config, exc)
+                self._raise_tool_error(
+                    f"CLI '{client_config.name}' execution failed: {exc}",
+                    metadata=metadata,
+                )
 
-        try:
-            prompt_text = await self._prepare_prompt_for_role(
-                request,
-                role_config,
-                system_prompt=system_prompt_text,
-                include_system_prompt=include_system_prompt,
-            )
-        except Exception as exc:
-            logger.exception("Failed to prepare clink prompt")
-            self._raise_tool_error(f"Failed to prepare prompt: {exc}")
+            metadata = self._build_success_metadata(client_config, role_config, result)
+            metadata = self._prune_metadata(metadata, client_config, reason="normal")
 
-        agent = create_agent(client_config)
-        try:
-            result = await agent.run(
-                role=role_config,
-                prompt=prompt_text,
-                system_prompt=system_prompt_text if system_prompt_text.strip() else None,
-                files=absolute_file_paths,
-                images=images,
+            content, metadata = self._apply_output_limit(
+                client_config,
+                result.parsed.content,
+                metadata,
             )
-        except CLIAgentError as exc:
-            metadata = self._build_error_metadata(client_config, exc)
-            self._raise_tool_error(
-                f"CLI '{client_config.name}' execution failed: {exc}",
-                metadata=metadata,
-            )
-
-        metadata = self._build_success_metadata(client_config, role_config, result)
-        metadata = self._prune_metadata(metadata, client_config, reason="normal")
 
-        content, metadata = self._apply_output_limit(
-            client_config,
-            result.parsed.content,
-            metadata,
-        )
-
-        model_info = {
-            "provider": client_config.name,
-            "model_name": result.parsed.metadata.get("model_used"),
-        }
+            model_info = {
+                "provider": client_config.name,
+                "model_name": result.parsed.metadata.get("model_used"),
+            }
 
         if continuation_id:
             try:
@@ -258,6 +264,180 @@ class CLinkTool(SimpleTool):
 
         return [TextContent(type="text", text=tool_output.model_dump_json())]
 
+    def _resolve_cli_names(self, request: CLinkRequest) -> list[str]:
+        """Return the CLIs to run: ``cli_names`` (deduplicated) or the single selected CLI."""
+        if request.cli_names:
+            names: dict[str, str] = {}
+            for name in request.cli_names:
+                if name and name.strip():
+                    names.setdefault(name.strip().lower(), name.strip())
+            if request.cli_name and request.cli_name.strip().lower() not in names:
+                self._raise_tool_error("Provide either cli_name or cli_names (cli_name must be one of cli_names).")
+            if names:
+                return list(names.values())
+
+        selected_cli = request.cli_name or self._default_cli_name
+        if not selected_cli:
+            self._raise_tool_error("No CLI clients are configured for clink.")
+        return [selected_cli]
+
+    async def _prepare_cli_prompt(
+        self,
+        request: CLinkRequest,
+        client_config: ResolvedCLIClient,
+        role_config: ResolvedCLIRole,
+    ) -> tuple[str, str]:
+        """Build the prompt for one CLI and return it with the role's system prompt."""
+        system_prompt_text = role_config.prompt_path.read_text(encoding="utf-8")
+        include_system_prompt = not self._use_external_system_prompt(client_config)
+
+        try:
+            prompt_text = await self._prepare_prompt_for_role(
+                request,
+                role_config,
+                system_prompt=system_prompt_text,
+                include_system_prompt=include_system_prompt,
+            )
+        except Exception as exc:
+            logger.exception("Failed to prepare clink prompt")
+            self._raise_tool_error(f"Failed to prepare prompt: {exc}")
+        return prompt_text, system_prompt_text
+
+    async def _run_cli(
+        self,
+        client_config: ResolvedCLIClient,
+        role_config: ResolvedCLIRole,
+        prompt_text: str,
+        system_prompt_text: str,
+        files: list[str],
+        images: list[str],
+    ) -> AgentOutput:
+        agent = create_agent(client_config)
+        return await agent.run(
+            role=role_config,
+            prompt=prompt_text,
+            system_prompt=system_prompt_text if system_prompt_text.strip() else None,
+            files=files,
+            images=images,
+            output_limit=self._parser_output_limit(),
+            on_progress=self._progress_reporter(client_config),
+        )
+
+    @staticmethod
+    def _parser_output_limit() -> int:
+        """Characters of CLI output the parser keeps in memory.
+
+        With spilling enabled the output is kept in full up to the raw capture
+        cap (``PAL_CLINK_MAX_CAPTURE_MB``) so it can be written to disk; a
+        runaway CLI is still cut off there and reported as truncated.
+        """
+        if output_spill.is_enabled():
+            return max(MAX_RESPONSE_CHARS, get_max_capture_bytes())
+        return MAX_RESPONSE_CHARS
+
+    async def _execute_fan_out(
+        self,
+        request: CLinkRequest,
+        jobs: list[tuple[ResolvedCLIClient, ResolvedCLIRole]],
+        files: list[str],
+        images: list[str],
+    ) -> tuple[str, dict[str, Any], dict[str, Any]]:
+        """Run the same request against several CLIs concurrently and merge their answers.
+
+        Each CLI is bounded by its own ``timeout_seconds`` (enforced by the agent),
+        so the wall-clock time is that of the slowest CLI. Failed or timed-out CLIs
+        are reported alongside the answers of the others; only when every CLI
+        fails is the call an error.
+        """
+        prompts = [await self._prepare_cli_prompt(request, client, role) for client, role in jobs]
+
+        async def run_one(index: int) -> AgentOutput | CLIAgentError:
+            client_config, role_config = jobs[index]
+            prompt_text, system_prompt_text = prompts[index]
+            try:
+                return await self._run_cli(client_config, role_config, prompt_text, system_prompt_text, files, images)
+            except CLIAgentError as exc:
+                return exc
+
+        start_time = time.monotonic()
+        outcomes = await asyncio.gather(*(run_one(index) for index in range(len(jobs))))
+        wall_clock = time.monotonic() - start_time
+
+        cli_names = [client.name for client, _ in jobs]
+        failures = {
+            client.name: (outcome, self._build_error_metadata(client, outcome))
+            for (client, _), outcome in zip(jobs, outcomes)
+            if isinstance(outcome, CLIAgentError)
+        }
+        if len(failures) == len(jobs):
+            details = "; ".join(f"{name}: {exc}" for name, (exc, _) in failures.items())
+            self._raise_tool_error(
+                f"All CLIs failed ({details})",
+                metadata={"cli_names": cli_names, "errors": {name: meta for name, (_, meta) in failures.items()}},
+            )
+
+        headers: list[str] = []
+        for (client, role), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, CLIAgentError):
+                headers.append(f"=== {client.name} (role: {role.name}) FAILED ===\n{outcome}")
+            else:
+                headers.append(f"=== {client.name} (role: {role.name}, {outcome.duration_seconds:.1f}s) ===\n")
+
+        successes = [
+            (index, client, role, outcome)
+            for index, ((client, role), outcome) in enumerate(zip(jobs, outcomes))
+            if isinstance(outcome, AgentOutput)
+        ]
+        lengths = [
+            max(len(outcome.parsed.content), int(outcome.parsed.metadata.get("output_streamed_length") or 0))
+            for _, _, _, outcome in successes
+        ]
+        overhead = sum(len(header) + 2 for header in headers)
+        budgets = self._allocate_output_budget(lengths, max(0, MAX_RESPONSE_CHARS - overhead))
+
+        sections = list(headers)
+        results: dict[str, Any] = {}
+        for (index, client, role, outcome), budget in zip(successes, budgets):
+            cli_metadata = self._build_success_metadata(client, role, outcome)
+            cli_metadata = self._prune_metadata(cli_metadata, client, reason="normal")
+            content, cli_metadata = self._apply_output_limit(
+                client, outcome.parsed.content, cli_metadata, limit=max(budget, 1)
+            )
+            sections[index] = headers[index] + content
+            results[client.name] = cli_metadata
+
+        metadata: dict[str, Any] = {
+            "cli_names": cli_names,
+            "role": jobs[0][1].name,
+            "fan_out": True,
+            "wall_clock_seconds": round(wall_clock, 3),
+            "results": results,
+        }
+        if failures:
+            metadata["partial_results"] = True
+            metadata["errors"] = {name: meta for name, (_, meta) in failures.items()}
+
+        logger.info(
+            "Clink fan-out finished: %d/%d CLIs succeeded in %.1fs",
+            len(successes),
+            len(jobs),
+            wall_clock,
+        )
+        model_info = {"provider": ", ".join(name for name in cli_names if name not in failures), "model_name": None}
+        return "\n\n".join(sections), metadata, model_info
+
+    @staticmethod
+    def _allocate_output_budget(lengths: list[int], total: int) -> list[int]:
+        """Split ``total`` characters across outputs, letting short ones donate unused room."""
+        budgets = [0] * len(lengths)
+        remaining = total
+        order = sorted(range(len(lengths)), key=lambda index: lengths[index])
+        for position, index in enumerate(order):
+            fair_share = remaining // (len(order) - position)
+            budgets[index] = min(lengths[index], fair_share)
+            remaining -= budgets[index]
+        return budgets
+
     async def prepare_prompt(self, request) -> str:
         client_config = self._registry.get_client(request.cli_name)
         role_config = client_config.get_role(request.role)
@@ -319,6 +499,8 @@ class CLinkTool(SimpleTool):
         }
         metadata.update(result.parsed.metadata)
 
+        if result.queue_wait_seconds:
+            metadata["queue_wait_seconds"] = round(result.queue_wait_seconds, 3)
         if result.stderr.strip():
             metadata.setdefault("stderr", result.stderr.strip())
         if result.output_file_content and "raw" not in metadata:
@@ -335,33 +517,44 @@ class CLinkTool(SimpleTool):
         client: ResolvedCLIClient,
         content: str,
         metadata: dict[str, Any],
+        limit: int | None = None,
     ) -> tuple[str, dict[str, Any]]:
-        if len(content) <= MAX_RESPONSE_CHARS:
+        limit = limit or MAX_RESPONSE_CHARS
+        # Streaming parsers stop keeping content past the limit but report the full length
+        original_length = max(len(content), int(metadata.get("output_streamed_length") or 0))
+
+        spill_threshold = output_spill.get_spill_threshold()
+        if spill_threshold and original_length > min(limit, spill_threshold) and len(content) >= original_length:
+            spilled = self._spill_output(client, content, metadata, limit)
+            if spilled is not None:
+                return spilled
+
+        if original_length <= limit:
             return content, metadata
 
         summary = self._extract_summary(content)
         if summary:
             summary_text = summary
-            if len(summary_text) > MAX_RESPONSE_CHARS:
+            if len(summary_text) > limit:
                 logger.debug(
                     "Clink summary from %s exceeded %d chars; truncating summary to fit.",
                     client.name,
-                    MAX_RESPONSE_CHARS,
+                    limit,
                 )
-                summary_text = summary_text[:MAX_RESPONSE_CHARS]
+                summary_text = summary_text[:limit]
             summary_metadata = self._prune_metadata(metadata, client, reason="summary")
             summary_metadata.update(
                 {
                     "output_summarized": True,
-                    "output_original_length": len(content),
+                    "output_original_length": original_length,
                     "output_summary_length": len(summary_text),
-                    "output_limit": MAX_RESPONSE_CHARS,
+                    "output_limit": limit,
                 }
             )
             logger.info(
                 "Clink compressed %s output via <SUMMARY>: original=%d chars, summary=%d chars",
                 client.name,
-                len(content),
+                original_length,
                 len(summary_text),
             )
             return summary_text, summary_metadata
@@ -370,32 +563,93 @@ class CLinkTool(SimpleTool):
         truncated_metadata.update(
             {
                 "output_truncated": True,
-                "output_original_length": len(content),
-                "output_limit": MAX_RESPONSE_CHARS,
+                "output_original_length": original_length,
+                "output_limit": limit,
             }
         )
 
-        excerpt_limit = min(4000, MAX_RESPONSE_CHARS // 2)
+        excerpt_limit = min(4000, limit // 2)
         excerpt = content[:excerpt_limit]
         truncated_metadata["output_excerpt_length"] = len(excerpt)
 
         logger.warning(
             "Clink truncated %s output: original=%d chars exceeds limit=%d; excerpt_length=%d",
             client.name,
-            len(content),
-            MAX_RESPONSE_CHARS,
+            original_length,
+            limit,
             len(excerpt),
         )
 
         message = (
-            f"CLI '{client.name}' produced {len(content)} characters, exceeding the configured clink limit "
-            f"({MAX_RESPONSE_CHARS} characters). The full output was suppressed to stay within MCP response caps. "
+            f"CLI '{client.name}' produced {original_length} characters, exceeding the configured clink limit "
+            f"({limit} characters). The full output was suppressed to stay within MCP response caps. "
             "Please narrow the request (review fewer files, summarize results) or run the CLI directly for the full log.\n\n"
-            f"--- Begin excerpt ({len(excerpt)} of {len(content)} chars) ---\n{excerpt}\n--- End excerpt ---"
+            f"--- Begin excerpt ({len(excerpt)} of {original_length} chars) ---\n{excerpt}\n--- End excerpt ---"
         )
 
         return message, truncated_metadata
 
+    def _spill_output(
+        self,
+        client: ResolvedCLIClient,
+        content: str,
+        metadata: dict[str, Any],
+        limit: int,
+    ) -> tuple[str, dict[str, Any]] | None:
+        """Write the full output to a spill file and return its summary and reference instead."""
+        summary = self._extract_summary(content) or output_spill.summarize(
+            content, min(output_spill.DEFAULT_SUMMARY_CHARS, limit // 2)
+        )
+        try:
+            spilled = output_spill.spill_output(content, summary=summary)
+        except OSError as exc:
+            logger.warning("Clink could not spill %s output, falling back to the limit: %s", client.name, exc)
+            return None
+
+        text = spilled.to_text()
+        if len(text) > limit:
+            room = max(0, limit - len(spilled.reference()) - 2)
+            text = f"{summary[:room]}\n\n{spilled.reference()}" if room else spilled.reference()
+
+        spilled_metadata = self._prune_metadata(metadata, client, reason="spilled")
+        spilled_metadata.update(spilled.metadata())
+        spilled_metadata["output_limit"] = limit
+        logger.info(
+            "Clink spilled %s output to %s: original=%d chars, returned=%d chars",
+            client.name,
+            spilled.path,
+            spilled.chars,
+            len(text),
+        )
+        return text, spilled_metadata
+
+    def _progress_reporter(self, client: ResolvedCLIClient) -> Callable[[str], Awaitable[None]] | None:
+        """Forward CLI progress notes to the MCP client when it asked for progress updates."""
+        try:
+            from mcp.server.lowlevel.server import request_ctx
+
+            context = request_ctx.get()
+        except (ImportError, LookupError):
+            return None
+
+        progress_token = getattr(context.meta, "progressToken", None) if context.meta else None
+        if progress_token is None:
+            return None
+
+        step = 0
+
+        async def report(note: str) -> None:
+            nonlocal step
+            step += 1
+            await context.session.send_progress_notification(
+                progress_token,
+                step,
+                message=f"{client.name}: {note}",
+                related_request_id=context.request_id,
+            )
+
+        return report
+
     def _extract_summary(self, content: str) -> str | None:
         match = SUMMARY_PATTERN.search(content)
         if not match:
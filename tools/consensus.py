@@ -15,7 +15,6 @@ Key features:
 
 from __future__ import annotations
 
-import json
 import logging
 from typing import TYPE_CHECKING, Any
 
@@ -29,6 +28,7 @@ from mcp.types import TextContent
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import CONSENSUS_PROMPT
 from tools.shared.base_models import ConsolidatedFindings, WorkflowRequest
+from utils import response_format
 from utils.conversation_memory import MAX_CONVERSATION_TURNS, create_thread, get_thread
 
 from .workflow.base import WorkflowTool
@@ -539,7 +539,7 @@ of the evidence, even when it strongly points in one direction.""",
                     if continuation_offer:
                         response_data["continuation_offer"] = continuation_offer
 
-                return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
+                return [TextContent(type="text", text=response_format.dumps(response_data))]
 
         # Otherwise, use standard workflow execution
         return await super().execute_workflow(arguments)
@@ -615,13 +615,15 @@ of the evidence, even when it strongly points in one direction.""",
                 logger.warning(warning)
 
             # Call the model with validated temperature
-            response = provider.generate_content(
+            response = await self._generate_content(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
                 temperature=validated_temperature,
                 thinking_mode="medium",
                 images=request.images if request.images else None,
+                files=request.relevant_files,
             )
 
             return {
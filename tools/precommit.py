@@ -10,27 +10,42 @@ Key features:
 - Step-by-step pre-commit investigation workflow with progress tracking
 - Context-aware file embedding (references during investigation, full content for analysis)
 - Automatic git repository discovery and change analysis
+- Server-side git changeset collection for expert analysis (utils.git_changes)
 - Expert analysis integration with external models (default)
 - Support for multiple repositories and change types
 - Configurable validation type (external with expert model or internal only)
 """
 
+import asyncio
 import logging
 from typing import TYPE_CHECKING, Any, Literal, Optional
 
 from pydantic import Field, model_validator
 
 if TYPE_CHECKING:
+    from mcp.types import TextContent
+
     from tools.models import ToolModelCategory
 
 from config import TEMPERATURE_ANALYTICAL
 from systemprompts import PRECOMMIT_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from utils.git_changes import GitError, collect_changes, find_repository_root, is_server_diff_enabled, render_changeset
 
 from .workflow.base import WorkflowTool
 
 logger = logging.getLogger(__name__)
 
+# Budget for the server-collected changeset when no model context is available
+DEFAULT_GIT_CHANGES_TOKENS = 50_000
+
+# Replaces the "run git diff and save a changeset file" instructions when the server collects changes
+SERVER_DIFF_NOTE = (
+    "The server collects git status and diffs (staged, unstaged, untracked or compare_to) itself and "
+    "attaches them to expert analysis. Do NOT paste diffs into findings or create a changeset file; "
+    "use `git diff --stat` only if you need an overview."
+)
+
 # Tool-specific field descriptions for precommit workflow
 PRECOMMIT_WORKFLOW_FIELD_DESCRIPTIONS = {
     "step": (
@@ -130,6 +145,9 @@ class PrecommitTool(WorkflowTool):
         super().__init__()
         self.initial_request = None
         self.git_config = {}
+        # Per request: path -> repository root (None outside git) and the collected changeset section
+        self._repository_roots: dict[str, Optional[str]] = {}
+        self._git_changes: Optional[str] = None
 
     def get_name(self) -> str:
         return "precommit"
@@ -262,6 +280,8 @@ class PrecommitTool(WorkflowTool):
             continuation_id = self.get_request_continuation_id(request)
             precommit_type = self.get_precommit_type(request)
             if continuation_id and precommit_type == "external":
+                if step_number == 1 and self._uses_server_diff(request):
+                    return ["Execute git status to confirm which changes are in scope", SERVER_DIFF_NOTE]
                 if step_number == 1:
                     return [
                         "Execute git status to see all changes",
@@ -269,6 +289,8 @@ class PrecommitTool(WorkflowTool):
                         "Execute git diff for unstaged changes (exclude binary files)",
                         "List any relevant untracked files as well.",
                     ]
+                elif self._uses_server_diff(request):
+                    return ["Complete validation and proceed to expert analysis"]
                 else:
                     return ["Complete validation and proceed to expert analysis with changeset file"]
 
@@ -276,7 +298,16 @@ class PrecommitTool(WorkflowTool):
         findings_count = len(findings.split("\n")) if findings else 0
         issues_count = self.get_consolidated_issues_count()
 
-        if step_number == 1:
+        if step_number == 1 and self._uses_server_diff(request):
+            return [
+                "Search for all git repositories in the specified path using appropriate tools",
+                "Check git status to identify staged, unstaged, and untracked changes as required",
+                SERVER_DIFF_NOTE,
+                "Understand what functionality was added, modified, or removed",
+                "Identify the scope and intent of the changes being committed",
+                "CRITICAL: You are on step 1 - you MUST set next_step_required=True and continue to at least step 3 minimum",
+            ]
+        elif step_number == 1:
             # Initial pre-commit investigation tasks
             return [
                 "Search for all git repositories in the specified path using appropriate tools",
@@ -388,6 +419,11 @@ class PrecommitTool(WorkflowTool):
             config_text = "\\n".join(f"- {key}: {value}" for key, value in self.git_config.items())
             context_parts.append(f"\\n=== GIT CONFIGURATION ===\\n{config_text}\\n=== END CONFIGURATION ===")
 
+        # Attach the changeset collected on the server so the agent never has to relay diffs
+        git_changes = self._git_changes if self._git_changes is not None else self._collect_git_changes()
+        if git_changes:
+            context_parts.append(git_changes)
+
         # Add relevant methods/functions if available
         if consolidated_findings.relevant_context:
             methods_text = "\\n".join(f"- {method}" for method in consolidated_findings.relevant_context)
@@ -417,6 +453,67 @@ class PrecommitTool(WorkflowTool):
 
         return "\\n".join(context_parts)
 
+    async def execute_workflow(self, arguments: dict[str, Any]) -> list["TextContent"]:
+        """Resolve the repository root once, off the event loop, before running the step."""
+        self._repository_roots = {}
+        self._git_changes = None
+        path = arguments.get("path") or self.git_config.get("path")
+        if path and is_server_diff_enabled():
+            self._repository_roots[path] = await asyncio.to_thread(find_repository_root, path)
+        return await super().execute_workflow(arguments)
+
+    async def _call_expert_analysis(self, arguments: dict, request) -> dict:
+        # git diff can take a while on large changesets; collect it in a thread
+        self._git_changes = await asyncio.to_thread(self._collect_git_changes)
+        return await super()._call_expert_analysis(arguments, request)
+
+    def _repository_root(self, path: str) -> Optional[str]:
+        """Repository root containing ``path``, resolved at most once per request."""
+        if path not in self._repository_roots:
+            self._repository_roots[path] = find_repository_root(path)
+        return self._repository_roots[path]
+
+    def _uses_server_diff(self, request=None) -> bool:
+        """Whether the server collects the changeset itself for this validation."""
+        if not is_server_diff_enabled():
+            return False
+        path = getattr(request, "path", None) or self.git_config.get("path")
+        return bool(path) and self._repository_root(path) is not None
+
+    def _collect_git_changes(self) -> str:
+        """Collect and render the git changeset within the expert-analysis file budget."""
+        path = self.git_config.get("path")
+        if not path or not is_server_diff_enabled():
+            return ""
+        repo_root = self._repository_root(path)
+        if repo_root is None:
+            return ""
+
+        max_tokens = DEFAULT_GIT_CHANGES_TOKENS
+        model_context = self.get_current_model_context()
+        if model_context:
+            try:
+                # Share the file budget with the embedded relevant_files
+                max_tokens = model_context.calculate_token_allocation().file_tokens // 2
+            except Exception as e:
+                logger.debug(f"[PRECOMMIT] Falling back to default git changes budget: {e}")
+
+        try:
+            changeset = collect_changes(
+                path,
+                repo_root=repo_root,
+                compare_to=self.git_config.get("compare_to"),
+                include_staged=self.git_config.get("include_staged", True) is not False,
+                include_unstaged=self.git_config.get("include_unstaged", True) is not False,
+            )
+        except GitError as e:
+            logger.warning(f"[PRECOMMIT] Could not collect git changes for {path}: {e}")
+            return f"=== GIT CHANGES ===\nServer-side collection failed: {e}\n=== END GIT CHANGES ==="
+
+        if changeset is None:
+            return ""
+        return render_changeset(changeset, max_tokens, query=self.initial_request)
+
     def _build_precommit_summary(self, consolidated_findings) -> str:
         """Prepare a comprehensive summary of the pre-commit investigation."""
         summary_parts = [
@@ -608,6 +705,7 @@ class PrecommitTool(WorkflowTool):
         continuation_id = self.get_request_continuation_id(request)
         is_external_continuation = continuation_id and request.precommit_type == "external"
         is_internal_continuation = continuation_id and request.precommit_type == "internal"
+        server_diff = self._uses_server_diff(request)
 
         # Format the guidance based on step number and continuation status
         if step_number == 1:
@@ -617,10 +715,14 @@ class PrecommitTool(WorkflowTool):
                     "You are on step 1 of MAXIMUM 2 steps. CRITICAL: Gather and save the complete git changeset NOW. "
                     "MANDATORY ACTIONS:\\n"
                     + "\\n".join(f"{i+1}. {action}" for i, action in enumerate(required_actions))
-                    + "\\n\\nMANDATORY: The changeset may be large. You MUST save the required changeset as a 'pal_precommit.changeset' file "
-                    "(replacing any existing one) in your work directory and include the FULL absolute path in relevant_files (exclude any "
-                    "binary files). ONLY include the code changes, no extra commentary."
-                    "Set next_step_required=True and step_number=2 for the next call."
+                    + (
+                        "\\n\\nThe server attaches the git changeset to expert analysis; do not save or paste it. "
+                        if server_diff
+                        else "\\n\\nMANDATORY: The changeset may be large. You MUST save the required changeset as a 'pal_precommit.changeset' file "
+                        "(replacing any existing one) in your work directory and include the FULL absolute path in relevant_files (exclude any "
+                        "binary files). ONLY include the code changes, no extra commentary."
+                    )
+                    + "Set next_step_required=True and step_number=2 for the next call."
                 )
             elif is_internal_continuation:
                 # Internal validation mode
@@ -658,11 +760,16 @@ class PrecommitTool(WorkflowTool):
                     "Proceeding immediately to expert analysis. "
                     f"MANDATORY: call {self.get_name()} tool immediately again, and set next_step_required=False to "
                     f"trigger external validation NOW. "
-                    f"MANDATORY: Include the entire changeset! The changeset may be large. You MUST save the required "
-                    f"changeset as a 'pal_precommit.changeset' file (replacing any existing one) in your work directory "
-                    f"and include the FULL absolute path in relevant_files so the expert can access the complete changeset. "
-                    f"ONLY include the code changes, no extra commentary."
                 )
+                if server_diff:
+                    next_steps += "The server attaches the complete git changeset; do not save or paste it."
+                else:
+                    next_steps += (
+                        "MANDATORY: Include the entire changeset! The changeset may be large. You MUST save the required "
+                        "changeset as a 'pal_precommit.changeset' file (replacing any existing one) in your work directory "
+                        "and include the FULL absolute path in relevant_files so the expert can access the complete changeset. "
+                        "ONLY include the code changes, no extra commentary."
+                    )
             else:
                 # Normal flow - deeper analysis needed
                 next_steps = (
@@ -676,9 +783,10 @@ class PrecommitTool(WorkflowTool):
         elif step_number >= 3:
             if not request.next_step_required and request.precommit_type == "external":
                 # About to complete - ensure changeset is saved
-                next_steps = (
-                    "Completing validation and proceeding to expert analysis. "
-                    "MANDATORY: Save the complete git changeset as a 'pal_precommit.changeset' file "
+                next_steps = "Completing validation and proceeding to expert analysis. " + (
+                    "The server attaches the complete git changeset."
+                    if server_diff
+                    else "MANDATORY: Save the complete git changeset as a 'pal_precommit.changeset' file "
                     "in your work directory and include the FULL absolute path in relevant_files."
                 )
             else:
@@ -702,9 +810,10 @@ class PrecommitTool(WorkflowTool):
                     f"This violates the minimum step requirement. You MUST set next_step_required=True until step {request.total_steps}."
                 )
             elif not request.next_step_required and request.precommit_type == "external":
-                next_steps = (
-                    "Completing validation. "
-                    "MANDATORY: Save complete git changeset as 'pal_precommit.changeset' file and include path in relevant_files, "
+                next_steps = "Completing validation. " + (
+                    "The server attaches the complete git changeset."
+                    if server_diff
+                    else "MANDATORY: Save complete git changeset as 'pal_precommit.changeset' file and include path in relevant_files, "
                     "excluding any binary files."
                 )
             else:
@@ -29,7 +29,9 @@ COMMON_FIELD_DESCRIPTIONS = {
         "files, and findings so the agent can resume seamlessly."
     ),
     "images": "Optional absolute image paths or base64 blobs for visual context.",
-    "absolute_file_paths": "Full paths to relevant code",
+    "absolute_file_paths": (
+        "Full paths to relevant code. For large files, append a line window: path:START-END, path:head=N or path:tail=N"
+    ),
 }
 
 # Workflow-specific field descriptions
@@ -54,6 +56,10 @@ WORKFLOW_FIELD_DESCRIPTIONS = {
         "False skips expert analysis, relies solely on your personal investigation. "
         "Defaults to True for comprehensive validation."
     ),
+    "response_fields": (
+        "Optional top-level response fields to return (e.g. expert_analysis, required_actions). "
+        "Status, step and continuation fields are always included."
+    ),
 }
 
 
@@ -122,6 +128,7 @@ class WorkflowRequest(BaseWorkflowRequest):
     # Optional workflow fields
     hypothesis: Optional[str] = Field(None, description=WORKFLOW_FIELD_DESCRIPTIONS["hypothesis"])
     use_assistant_model: Optional[bool] = Field(True, description=WORKFLOW_FIELD_DESCRIPTIONS["use_assistant_model"])
+    response_fields: Optional[list[str]] = Field(None, description=WORKFLOW_FIELD_DESCRIPTIONS["response_fields"])
 
     @field_validator("files_checked", "relevant_files", "relevant_context", mode="before")
     @classmethod
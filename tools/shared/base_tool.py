@@ -9,10 +9,13 @@ common functionality for request validation, error handling, model management,
 conversation handling, file processing, and response formatting.
 """
 
+import asyncio
+import dataclasses
+import functools
 import logging
 import os
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from mcp.types import TextContent
 
@@ -30,6 +33,8 @@ from utils.conversation_memory import (
 )
 from utils.env import get_env
 from utils.file_utils import read_file_content, read_files
+from utils.prompt_builder import PromptBuilder, materialize
+from utils.prompt_variants import SystemPromptVariant, get_system_prompt_variant, system_prompt_text
 
 # Import models from tools.models for compatibility
 try:
@@ -43,6 +48,46 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=64)
+def _websearch_instruction(tool_specific: Optional[str]) -> str:
+    """Build the web search instruction once per tool-specific guidance text."""
+    base_instruction = """
+
+WEB SEARCH CAPABILITY: You can request the calling agent to perform web searches to enhance your analysis with current information!
+
+IMPORTANT: When you identify areas where web searches would significantly improve your response (such as checking current documentation, finding recent solutions, verifying best practices, or gathering community insights), you MUST explicitly instruct the agent to perform specific web searches and then respond back using the continuation_id from this response to continue the analysis.
+
+Use clear, direct language based on the value of the search:
+
+For valuable supplementary information: "Please perform a web search on '[specific topic/query]' and then continue this analysis using the continuation_id from this response if you find relevant information."
+
+For important missing information: "Please search for '[specific topic/query]' and respond back with the findings using the continuation_id from this response - this information is needed to provide a complete analysis."
+
+For critical/essential information: "SEARCH REQUIRED: Please immediately perform a web search on '[specific topic/query]' and respond back with the results using the continuation_id from this response. Cannot provide accurate analysis without this current information."
+
+This ensures you get the most current and comprehensive information while maintaining conversation context through the continuation_id."""
+
+    if tool_specific:
+        return f"""{base_instruction}
+
+{tool_specific}
+
+When recommending searches, be specific about what information you need and why it would improve your analysis."""
+
+    # Default instruction for all tools
+    return f"""{base_instruction}
+
+Consider requesting searches for:
+- Current documentation and API references
+- Recent best practices and patterns
+- Known issues and community solutions
+- Framework updates and compatibility
+- Security advisories and patches
+- Performance benchmarks and optimizations
+
+When recommending searches, be specific about what information you need and why it would improve your analysis. Always remember to instruct agent to use the continuation_id from this response when providing search results."""
+
+
 class BaseTool(ABC):
     """
     Abstract base class for all PAL MCP tools.
@@ -202,6 +247,20 @@ class BaseTool(ABC):
         suffix = "" if base_prompt.endswith("\n\n") else "\n\n"
         return f"{base_prompt}{suffix}{addition_text}"
 
+    def get_system_prompt_variant(self, capabilities: Optional["ModelCapabilities"]) -> SystemPromptVariant:
+        """
+        Return the complete system prompt for a model with ``capabilities``.
+
+        Combines the LOCALE language instruction, the base system prompt and the
+        capability addenda. The result is compiled once per combination and
+        reused, carrying a stable digest and its token count.
+        """
+        return get_system_prompt_variant(self, capabilities)
+
+    def get_system_prompt_tokens(self, capabilities: Optional["ModelCapabilities"]) -> Optional[int]:
+        """Token count of the compiled system prompt, reserved by the token planner."""
+        return self.get_system_prompt_variant(capabilities).tokens
+
     def get_annotations(self) -> Optional[dict[str, Any]]:
         """
         Return optional annotations for this tool.
@@ -227,6 +286,82 @@ class BaseTool(ABC):
         """
         return True
 
+    def supports_request_coalescing(self) -> bool:
+        """
+        Return whether identical concurrent model calls from this tool may share one result.
+
+        Tools whose callers expect an independent sample for every call (even
+        with an identical prompt) should return False.
+
+        Returns:
+            bool: True to coalesce duplicate in-flight calls (default)
+        """
+        return True
+
+    async def _generate_content(
+        self,
+        provider: ModelProvider,
+        *,
+        prompt: Union[str, PromptBuilder],
+        model_name: str,
+        system_prompt: Union[str, SystemPromptVariant, None] = None,
+        temperature: Optional[float] = None,
+        thinking_mode: Optional[str] = None,
+        images: Optional[list[str]] = None,
+        files: Optional[list[str]] = None,
+    ):
+        """
+        Call ``provider.generate_content``, joining an identical call already in flight.
+
+        Args:
+            provider: Provider serving the model
+            prompt: Prompt text, or a ``PromptBuilder`` that is joined here, once,
+                    right before it is handed to the provider
+            model_name, temperature, thinking_mode, images:
+                Forwarded to ``generate_content``
+            system_prompt: System prompt text or a compiled variant; a variant's
+                           digest stands in for its text in the coalescing key
+            files: Files embedded in the prompt; their mtimes are part of the
+                   coalescing key so an edited file never reuses a stale answer
+
+        Returns:
+            ModelResponse: The provider response
+        """
+        from utils.single_flight import get_single_flight, is_coalescing_enabled, request_key
+
+        prompt = materialize(prompt)
+        call = functools.partial(
+            provider.generate_content,
+            prompt=prompt,
+            model_name=model_name,
+            system_prompt=system_prompt_text(system_prompt),
+            temperature=temperature,
+            thinking_mode=thinking_mode,
+            images=images,
+        )
+        if not (self.supports_request_coalescing() and is_coalescing_enabled()):
+            # Provider calls block (network, rate limit pacing); keep the event loop free
+            return await asyncio.to_thread(call)
+
+        key = request_key(
+            tool_name=self.get_name(),
+            provider=provider.get_provider_type().value,
+            model_name=model_name,
+            prompt=prompt,
+            system_prompt=system_prompt.digest if isinstance(system_prompt, SystemPromptVariant) else system_prompt,
+            temperature=temperature,
+            thinking_mode=thinking_mode,
+            images=images,
+            files=files,
+        )
+
+        def clone(response):
+            if dataclasses.is_dataclass(response):
+                return dataclasses.replace(response, metadata=dict(response.metadata or {}))
+            return response
+
+        return await get_single_flight().run(key, lambda: asyncio.to_thread(call), label=self.get_name(), clone=clone)
+
     def is_effective_auto_mode(self) -> bool:
         """
         Check if we're in effective auto mode for schema generation.
@@ -638,6 +773,20 @@ class BaseTool(ABC):
 
         return ToolModelCategory.BALANCED
 
+    def get_expected_output_tokens(self) -> Optional[int]:
+        """
+        Return the typical size of this tool's model response in tokens.
+
+        The token planner reserves this much of the context window for the
+        response (capped by the model's maximum output), leaving the rest for
+        prompt, history and files. Return None to reserve the model's default
+        response share.
+
+        Returns:
+            Optional[int]: Expected response tokens, or None if unknown
+        """
+        return None
+
     @abstractmethod
     def get_request_model(self):
         """
@@ -1110,6 +1259,7 @@ class BaseTool(ABC):
                     max_tokens=effective_max_tokens + reserve_tokens,
                     reserve_tokens=reserve_tokens,
                     include_line_numbers=self.wants_line_numbers_by_default(),
+                    relevance_query=self.get_relevance_query(arguments or getattr(self, "_current_arguments", {})),
                 )
                 # Note: No need to validate against MCP_PROMPT_SIZE_LIMIT here
                 # read_files already handles token-aware truncation based on model's capabilities
@@ -1163,52 +1313,42 @@ class BaseTool(ABC):
         )
         return result, actually_processed_files
 
-    def get_websearch_instruction(self, tool_specific: Optional[str] = None) -> str:
+    def get_relevance_query(self, arguments: Optional[dict]) -> Optional[str]:
         """
-        Generate standardized web search instruction.
+        Return the request text used to rank files when they exceed the token budget.
+
+        Prefers the user's original prompt over the history-enhanced one so that
+        earlier turns do not dominate the ranking. Workflow tools contribute their
+        current step and findings.
 
         Args:
-            tool_specific: Optional tool-specific search guidance
+            arguments: Tool arguments (may include server-injected keys)
 
         Returns:
-            str: Web search instruction to append to prompt
+            Optional[str]: Query text, or None when the request carries no text
         """
+        if not arguments:
+            return None
 
-        base_instruction = """
-
-WEB SEARCH CAPABILITY: You can request the calling agent to perform web searches to enhance your analysis with current information!
-
-IMPORTANT: When you identify areas where web searches would significantly improve your response (such as checking current documentation, finding recent solutions, verifying best practices, or gathering community insights), you MUST explicitly instruct the agent to perform specific web searches and then respond back using the continuation_id from this response to continue the analysis.
-
-Use clear, direct language based on the value of the search:
-
-For valuable supplementary information: "Please perform a web search on '[specific topic/query]' and then continue this analysis using the continuation_id from this response if you find relevant information."
-
-For important missing information: "Please search for '[specific topic/query]' and respond back with the findings using the continuation_id from this response - this information is needed to provide a complete analysis."
-
-For critical/essential information: "SEARCH REQUIRED: Please immediately perform a web search on '[specific topic/query]' and respond back with the results using the continuation_id from this response. Cannot provide accurate analysis without this current information."
-
-This ensures you get the most current and comprehensive information while maintaining conversation context through the continuation_id."""
-
-        if tool_specific:
-            return f"""{base_instruction}
-
-{tool_specific}
-
-When recommending searches, be specific about what information you need and why it would improve your analysis."""
+        prompt = arguments.get("_original_user_prompt") or arguments.get("prompt")
+        parts = [
+            value
+            for value in (prompt, arguments.get("step"), arguments.get("findings"))
+            if isinstance(value, str) and value.strip()
+        ]
+        return "\n".join(parts) if parts else None
 
-        # Default instruction for all tools
-        return f"""{base_instruction}
+    def get_websearch_instruction(self, tool_specific: Optional[str] = None) -> str:
+        """
+        Generate standardized web search instruction.
 
-Consider requesting searches for:
-- Current documentation and API references
-- Recent best practices and patterns
-- Known issues and community solutions
-- Framework updates and compatibility
-- Security advisories and patches
-- Performance benchmarks and optimizations
+        Args:
+            tool_specific: Optional tool-specific search guidance
 
-When recommending searches, be specific about what information you need and why it would improve your analysis. Always remember to instruct agent to use the continuation_id from this response when providing search results."""
+        Returns:
+            str: Web search instruction to append to prompt
+        """
+        return _websearch_instruction(tool_specific)
 
     def get_language_instruction(self) -> str:
         """
@@ -19,6 +19,8 @@ from tools.shared.base_models import ToolRequest
 from tools.shared.base_tool import BaseTool
 from tools.shared.exceptions import ToolExecutionError
 from tools.shared.schema_builders import SchemaBuilder
+from utils import output_spill, response_format
+from utils.prompt_builder import PromptBuilder
 
 
 class SimpleTool(BaseTool):
@@ -319,9 +321,12 @@ class SimpleTool(BaseTool):
                 logger.debug(f"{self.get_name()}: Using model context from arguments")
             else:
                 # Create model context if not provided
-                from utils.model_context import ModelContext
+                from utils.model_context import ModelContext, TokenDemand
 
                 self._model_context = ModelContext(model_name)
+                self._model_context.token_demand = TokenDemand.from_arguments(
+                    arguments, expected_output_tokens=self.get_expected_output_tokens()
+                )
                 logger.debug(f"{self.get_name()}: Created model context for {model_name}")
 
             # Get images if present
@@ -334,7 +339,7 @@ class SimpleTool(BaseTool):
                 field_value = self.get_request_prompt(request)
                 if "=== CONVERSATION HISTORY ===" in field_value:
                     # Use pre-embedded history
-                    prompt = field_value
+                    prompt = PromptBuilder(field_value, label="request")
                     logger.debug(f"{self.get_name()}: Using pre-embedded conversation history")
                 else:
                     # No embedded history - reconstruct it (for in-process calls)
@@ -366,24 +371,24 @@ class SimpleTool(BaseTool):
                         # Get the base prompt from the tool
                         base_prompt = await self.prepare_prompt(request)
 
-                        # Combine with conversation history
+                        # Combine with conversation history (joined once, when sent to the provider)
+                        prompt = PromptBuilder()
                         if conversation_history:
-                            prompt = f"{conversation_history}\n\n=== NEW USER INPUT ===\n{base_prompt}"
-                        else:
-                            prompt = base_prompt
+                            prompt.add(conversation_history, label="history").add("\n\n=== NEW USER INPUT ===\n")
+                        prompt.add(base_prompt, label="request")
                     else:
                         # Thread not found, prepare normally
                         logger.warning(f"Thread {continuation_id} not found, preparing prompt normally")
-                        prompt = await self.prepare_prompt(request)
+                        prompt = PromptBuilder(await self.prepare_prompt(request), label="request")
             else:
                 # New conversation, prepare prompt normally
-                prompt = await self.prepare_prompt(request)
+                prompt = PromptBuilder(await self.prepare_prompt(request), label="request")
 
                 # Add follow-up instructions for new conversations
                 from server import get_follow_up_instructions
 
                 follow_up_instructions = get_follow_up_instructions(0)
-                prompt = f"{prompt}\n\n{follow_up_instructions}"
+                prompt.add("\n\n").add(follow_up_instructions, label="instructions")
                 logger.debug(
                     f"Added follow-up instructions for new {self.get_name()} conversation"
                 )  # Validate images if any were provided
@@ -417,13 +422,9 @@ class SimpleTool(BaseTool):
             provider = self._model_context.provider
             capabilities = self._model_context.capabilities
 
-            # Get system prompt for this tool
-            base_system_prompt = self.get_system_prompt()
-            capability_augmented_prompt = self._augment_system_prompt_with_capabilities(
-                base_system_prompt, capabilities
-            )
-            language_instruction = self.get_language_instruction()
-            system_prompt = language_instruction + capability_augmented_prompt
+            # Get the compiled system prompt for this tool, model capabilities and locale
+            system_prompt = self.get_system_prompt_variant(capabilities)
+            logger.debug(f"System prompt {system_prompt.digest} (~{system_prompt.tokens:,} tokens)")
 
             # Generate AI response using the provider
             logger.info(f"Sending request to {provider.get_provider_type().value} API for {self.get_name()}")
@@ -431,23 +432,24 @@ class SimpleTool(BaseTool):
                 f"Using model: {self._model_context.model_name} via {provider.get_provider_type().value} provider"
             )
 
-            # Estimate tokens for logging
-            from utils.token_utils import estimate_tokens
-
-            estimated_tokens = estimate_tokens(prompt)
+            # Estimate tokens for logging from the segments, before the prompt is joined
+            estimated_tokens = prompt.token_count()
             logger.debug(f"Prompt length: {len(prompt)} characters (~{estimated_tokens:,} tokens)")
+            logger.debug(f"Prompt tokens by section: {prompt.token_breakdown()}")
 
             # Resolve model capabilities for feature gating
             supports_thinking = capabilities.supports_extended_thinking
 
             # Generate content with provider abstraction
-            model_response = provider.generate_content(
+            model_response = await self._generate_content(
+                provider,
                 prompt=prompt,
                 model_name=self._current_model_name,
                 system_prompt=system_prompt,
                 temperature=temperature,
                 thinking_mode=thinking_mode if supports_thinking else None,
                 images=images if images else None,
+                files=self.get_request_files(request),
             )
 
             logger.info(f"Received response from {provider.get_provider_type().value} API for {self.get_name()}")
@@ -494,17 +496,21 @@ class SimpleTool(BaseTool):
                         )
 
                         # Retry the same request with modified prompt asking for explicit response
-                        original_prompt = prompt
-                        retry_prompt = f"{original_prompt}\n\nIMPORTANT: Please provide a substantive response. If you cannot respond to the above request, please explain why and suggest alternatives."
+                        retry_prompt = prompt.copy().add(
+                            "\n\nIMPORTANT: Please provide a substantive response. If you cannot respond to the above request, please explain why and suggest alternatives.",
+                            label="instructions",
+                        )
 
                         try:
-                            retry_response = provider.generate_content(
+                            retry_response = await self._generate_content(
+                                provider,
                                 prompt=retry_prompt,
                                 model_name=self._current_model_name,
                                 system_prompt=system_prompt,
                                 temperature=temperature,
                                 thinking_mode=thinking_mode if supports_thinking else None,
                                 images=images if images else None,
+                                files=self.get_request_files(request),
                             )
 
                             if retry_response.content:
@@ -563,8 +569,16 @@ class SimpleTool(BaseTool):
                             content_type="text",
                         )
 
+            # Large answers go to a spill file; the response carries a summary and the path
+            if tool_output.status != "error" and tool_output.content:
+                spilled = output_spill.maybe_spill(tool_output.content)
+                if spilled is not None:
+                    tool_output.content = spilled.to_text()
+                    tool_output.metadata = {**(tool_output.metadata or {}), **spilled.metadata()}
+
             # Return the tool output as TextContent, marking protocol errors appropriately
-            payload = tool_output.model_dump_json()
+            # Compact responses drop unset fields (e.g. a null continuation_offer)
+            payload = tool_output.model_dump_json(exclude_none=response_format.is_compact())
             if tool_output.status == "error":
                 logger.error("%s reported error status - raising ToolExecutionError", self.get_name())
                 raise ToolExecutionError(payload)
@@ -798,10 +812,26 @@ class SimpleTool(BaseTool):
         Returns:
             Complete formatted prompt ready for the AI model
         """
+        preamble, request_section = self._build_standard_prompt_segments(
+            system_prompt, user_content, request, file_context_title
+        )
+        return PromptBuilder(preamble, "\n\n", request_section).build()
+
+    def _build_standard_prompt_segments(
+        self, system_prompt: str, user_content: str, request, file_context_title: str
+    ) -> tuple[PromptBuilder, PromptBuilder]:
+        """
+        Collect the standard prompt as segments without joining them.
+
+        Returns:
+            Tuple of (system prompt with web search guidance, "=== USER REQUEST ===" section)
+        """
         # Check size limits against raw user input before enriching with internal context
         content_to_validate = self.get_prompt_content_for_size_validation(user_content)
         self._validate_token_limit(content_to_validate, "Content")
 
+        request_section = PromptBuilder("=== USER REQUEST ===\n").add(user_content, label="request")
+
         # Add context files if provided (does not affect MCP boundary enforcement)
         files = self.get_request_files(request)
         if files:
@@ -813,21 +843,17 @@ class SimpleTool(BaseTool):
             )
             self._actually_processed_files = processed_files
             if file_content:
-                user_content = f"{user_content}\n\n=== {file_context_title} ===\n{file_content}\n=== END CONTEXT ===="
+                request_section.add(f"\n\n=== {file_context_title} ===\n")
+                request_section.add(file_content, label="files")
+                request_section.add("\n=== END CONTEXT ====")
+
+        request_section.add("\n=== END REQUEST ===\n\nPlease provide a thoughtful, comprehensive response:")
 
         # Add standardized web search guidance
         websearch_instruction = self.get_websearch_instruction(self.get_websearch_guidance())
+        preamble = PromptBuilder(system_prompt, websearch_instruction, label="system")
 
-        # Combine system prompt with user content
-        full_prompt = f"""{system_prompt}{websearch_instruction}
-
-=== USER REQUEST ===
-{user_content}
-=== END REQUEST ===
-
-Please provide a thoughtful, comprehensive response:"""
-
-        return full_prompt
+        return preamble, request_section
 
     def get_prompt_content_for_size_validation(self, user_content: str) -> str:
         """
@@ -997,15 +1023,15 @@ Please provide a thoughtful, comprehensive response:"""
         self.get_websearch_guidance = lambda: websearch_guidance
 
         try:
-            full_prompt = self.build_standard_prompt(system_prompt, user_content, request, "CONTEXT FILES")
+            preamble, request_section = self._build_standard_prompt_segments(
+                system_prompt, user_content, request, "CONTEXT FILES"
+            )
         finally:
             # Restore original guidance method
             self.get_websearch_guidance = original_guidance
 
+        # The system prompt is sent separately by execute(), so only the request section is joined
         if system_prompt:
-            marker = "\n\n=== USER REQUEST ===\n"
-            if marker in full_prompt:
-                _, user_section = full_prompt.split(marker, 1)
-                return f"=== USER REQUEST ===\n{user_section}"
+            return request_section.build()
 
-        return full_prompt
+        return PromptBuilder(preamble, "\n\n", request_section).build()
@@ -7,6 +7,8 @@ keeping workflow concerns separated from simple tool concerns.
 
 from typing import Any
 
+from utils.response_format import is_compact
+
 from ..shared.base_models import WORKFLOW_FIELD_DESCRIPTIONS
 from ..shared.schema_builders import SchemaBuilder
 
@@ -79,6 +81,13 @@ class WorkflowSchemaBuilder:
         },
     }
 
+    # Only advertised in compact response mode, where trimming output is the point
+    RESPONSE_FIELDS_SCHEMA = {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": WORKFLOW_FIELD_DESCRIPTIONS["response_fields"],
+    }
+
     @staticmethod
     def build_schema(
         tool_specific_fields: dict[str, dict[str, Any]] = None,
@@ -113,6 +122,8 @@ class WorkflowSchemaBuilder:
             for field in excluded_workflow_fields:
                 workflow_fields.pop(field, None)
         properties.update(workflow_fields)
+        if is_compact():
+            properties["response_fields"] = WorkflowSchemaBuilder.RESPONSE_FIELDS_SCHEMA
 
         # Add common fields (temperature, thinking_mode, etc.) from base builder, excluding any specified fields
         common_fields = SchemaBuilder.COMMON_FIELD_SCHEMAS.copy()
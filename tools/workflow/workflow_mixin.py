@@ -30,6 +30,7 @@ from typing import Any, Optional
 from mcp.types import TextContent
 
 from config import MCP_PROMPT_SIZE_LIMIT
+from utils import output_spill, response_format
 from utils.conversation_memory import add_turn, create_thread
 
 from ..shared.base_models import ConsolidatedFindings
@@ -71,6 +72,9 @@ class BaseWorkflowMixin(ABC):
         self.work_history: list[dict[str, Any]] = []
         self.consolidated_findings: ConsolidatedFindings = ConsolidatedFindings()
         self.initial_request: Optional[str] = None
+        # Digests of repeatable response fields (compact response mode)
+        self._previous_field_digests: dict[str, str] = {}
+        self._response_field_digests: dict[str, str] = {}
 
     # ================================================================================
     # Abstract Methods - Required Implementation by BaseTool or Subclasses
@@ -96,6 +100,11 @@ class BaseWorkflowMixin(ABC):
         """Return the language instruction for localization. Usually provided by BaseTool."""
         pass
 
+    @abstractmethod
+    def get_system_prompt_variant(self, capabilities: Any) -> Any:
+        """Return the compiled system prompt for the model capabilities. Usually provided by BaseTool."""
+        pass
+
     @abstractmethod
     def get_default_temperature(self) -> float:
         """Return the default temperature for this tool. Usually provided by BaseTool."""
@@ -411,6 +420,7 @@ class BaseWorkflowMixin(ABC):
             max_tokens=max_tokens,
             reserve_tokens=1000,
             include_line_numbers=self.wants_line_numbers_by_default(),
+            relevance_query=self.get_relevance_query(self.get_current_arguments()),
         )
 
         # Expand paths to get individual files for tracking
@@ -668,6 +678,8 @@ class BaseWorkflowMixin(ABC):
 
             # Handle continuation
             continuation_id = request.continuation_id
+            self._previous_field_digests = {}
+            self._response_field_digests = {}
 
             # Restore workflow state on continuation
             if continuation_id:
@@ -682,6 +694,7 @@ class BaseWorkflowMixin(ABC):
                             if isinstance(state, dict) and "work_history" in state:
                                 self.work_history = state.get("work_history", [])
                                 self.initial_request = state.get("initial_request")
+                                self._previous_field_digests = state.get("response_field_digests") or {}
                                 # Rebuild consolidated findings from restored history
                                 self._reprocess_consolidated_findings()
                                 logger.debug(
@@ -729,11 +742,25 @@ class BaseWorkflowMixin(ABC):
             # Add metadata (provider_used and model_used) to workflow response
             self._add_workflow_metadata(response_data, arguments)
 
+            # Conversation memory keeps the full response; the client gets a shaped copy
+            delivered = dict(response_data)
+            self._spill_expert_analysis(delivered)
+
+            compact = response_format.is_compact()
+            omitted = response_format.omit_unchanged_fields(delivered, self._previous_field_digests) if compact else []
+            delivered = response_format.select_fields(delivered, getattr(request, "response_fields", None))
+            if compact:
+                # Remember what the client holds: fields sent now, plus omitted ones it already had
+                self._response_field_digests = {
+                    **{field: self._previous_field_digests[field] for field in omitted},
+                    **response_format.field_digests(delivered),
+                }
+
             # Store in conversation memory
             if continuation_id:
                 self.store_conversation_turn(continuation_id, response_data, request)
 
-            return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
+            return [TextContent(type="text", text=response_format.dumps(delivered))]
 
         except ToolExecutionError:
             raise
@@ -752,7 +779,7 @@ class BaseWorkflowMixin(ABC):
             # Add metadata to error responses too
             self._add_workflow_metadata(error_data, arguments)
 
-            raise ToolExecutionError(json.dumps(error_data, indent=2, ensure_ascii=False)) from e
+            raise ToolExecutionError(response_format.dumps(error_data)) from e
 
     # Hook methods for tool customization
 
@@ -1121,6 +1148,8 @@ class BaseWorkflowMixin(ABC):
 
         # Serialize workflow state for persistence across stateless tool calls
         workflow_state = {"work_history": self.work_history, "initial_request": getattr(self, "initial_request", None)}
+        if getattr(self, "_response_field_digests", None):
+            workflow_state["response_field_digests"] = self._response_field_digests
 
         add_turn(
             thread_id=continuation_id,
@@ -1260,7 +1289,7 @@ class BaseWorkflowMixin(ABC):
         # - file_context (internal optimization info)
         # - required_actions (internal workflow instructions)
 
-        return json.dumps(clean_data, indent=2, ensure_ascii=False)
+        return response_format.dumps(clean_data)
 
     # Core workflow logic methods
 
@@ -1468,16 +1497,11 @@ class BaseWorkflowMixin(ABC):
                     expert_context = self._add_files_to_expert_context(expert_context, file_content)
 
             # Get system prompt for this tool with localization support
-            base_system_prompt = self.get_system_prompt()
-            capability_augmented_prompt = self._augment_system_prompt_with_capabilities(
-                base_system_prompt, getattr(self._model_context, "capabilities", None)
-            )
-            language_instruction = self.get_language_instruction()
-            system_prompt = language_instruction + capability_augmented_prompt
+            system_prompt = self.get_system_prompt_variant(getattr(self._model_context, "capabilities", None))
 
             # Check if tool wants system prompt embedded in main prompt
             if self.should_embed_system_prompt():
-                prompt = f"{system_prompt}\n\n{expert_context}\n\n{self.get_expert_analysis_instruction()}"
+                prompt = f"{system_prompt.text}\n\n{expert_context}\n\n{self.get_expert_analysis_instruction()}"
                 system_prompt = ""  # Clear it since we embedded it
             else:
                 prompt = expert_context
@@ -1490,13 +1514,15 @@ class BaseWorkflowMixin(ABC):
                 logger.warning(warning)
 
             # Generate AI response - use request parameters if available
-            model_response = provider.generate_content(
+            model_response = await self._generate_content(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
                 temperature=validated_temperature,
                 thinking_mode=self.get_request_thinking_mode(request),
                 images=list(set(self.consolidated_findings.images)) if self.consolidated_findings.images else None,
+                files=sorted(self.consolidated_findings.relevant_files),
             )
 
             if model_response.content:
@@ -1534,6 +1560,30 @@ class BaseWorkflowMixin(ABC):
             logger.error(f"Error calling expert analysis: {e}", exc_info=True)
             return {"error": str(e), "status": "analysis_error"}
 
+    def _spill_expert_analysis(self, response_data: dict) -> None:
+        """Replace a large expert analysis with a summary and the path of its spill file."""
+        expert_analysis = response_data.get("expert_analysis")
+        if not isinstance(expert_analysis, dict):
+            return
+
+        raw_analysis = expert_analysis.get("raw_analysis")
+        if isinstance(raw_analysis, str):
+            text = raw_analysis
+        else:
+            text = json.dumps(expert_analysis, indent=2, ensure_ascii=False)
+
+        spilled = output_spill.maybe_spill(text)
+        if spilled is None:
+            return
+
+        response_data["expert_analysis"] = {
+            "status": expert_analysis.get("status", "analysis_complete"),
+            "summary": spilled.summary,
+            "note": spilled.reference(),
+            **spilled.metadata(),
+        }
+        logger.info(f"[{self.get_name()}] Expert analysis of {spilled.chars} chars spilled to {spilled.path}")
+
     def _process_work_step(self, step_data: dict):
         """
         Process a single work step and update internal state.
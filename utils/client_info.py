@@ -5,17 +5,25 @@ This module provides utilities to extract and format client information
 from the MCP protocol's clientInfo sent during initialization.
 
 It also provides friendly name mapping and caching for consistent client
-identification across the application.
+identification across the application. Client info is cached per MCP
+session, so a server serving several clients over HTTP reports each
+session's own client.
 """
 
 import logging
+import threading
+import weakref
 from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
-# Global cache for client information
+# Client information of the most recently seen session
 _client_info_cache: Optional[dict[str, Any]] = None
 
+# Client information per MCP session (sessions end when their client disconnects)
+_session_client_info: "weakref.WeakKeyDictionary[Any, dict[str, Any]]" = weakref.WeakKeyDictionary()
+_session_lock = threading.Lock()
+
 # Mapping of known client names to friendly names
 # This is case-insensitive and checks if the key is contained in the client name
 CLIENT_NAME_MAPPINGS = {
@@ -88,7 +96,8 @@ def get_client_info_from_context(server: Any) -> Optional[dict[str, Any]]:
     - name: The client application name (e.g., "Claude Code", "Claude Desktop")
     - version: The client version string
 
-    This function also adds a friendly_name field and caches the result.
+    This function also adds a friendly_name field and caches the result for
+    the session. Outside a request the most recently seen client is returned.
 
     Args:
         server: The MCP server instance
@@ -103,39 +112,16 @@ def get_client_info_from_context(server: Any) -> Optional[dict[str, Any]]:
     """
     global _client_info_cache
 
-    # Return cached info if available
-    if _client_info_cache is not None:
+    session = _current_session(server)
+    if session is None:
         return _client_info_cache
 
-    try:
-        # Try to access the request context and session
-        if not server:
-            return None
-
-        # Check if server has request_context property
-        request_context = None
-        try:
-            request_context = server.request_context
-        except AttributeError:
-            logger.debug("Server does not have request_context property")
-            return None
-
-        if not request_context:
-            logger.debug("Request context is None")
-            return None
-
-        # Try to access session from request context
-        session = None
-        try:
-            session = request_context.session
-        except AttributeError:
-            logger.debug("Request context does not have session property")
-            return None
-
-        if not session:
-            logger.debug("Session is None")
-            return None
+    with _session_lock:
+        cached = _session_client_info.get(session)
+    if cached is not None:
+        return cached
 
+    try:
         # Try to access client params from session
         client_params = None
         try:
@@ -182,6 +168,11 @@ def get_client_info_from_context(server: Any) -> Optional[dict[str, Any]]:
         result["friendly_name"] = get_friendly_name(raw_name)
 
         # Cache the result
+        with _session_lock:
+            try:
+                _session_client_info[session] = result
+            except TypeError:
+                logger.debug("Session cannot be weakly referenced; caching client info globally only")
         _client_info_cache = result
         logger.debug(f"Cached client info: {result}")
 
@@ -192,6 +183,20 @@ def get_client_info_from_context(server: Any) -> Optional[dict[str, Any]]:
         return None
 
 
+def _current_session(server: Any) -> Optional[Any]:
+    """Return the MCP session handling the current request, if any."""
+    if not server:
+        return None
+
+    try:
+        request_context = server.request_context
+    except (AttributeError, LookupError):
+        logger.debug("No request context available")
+        return None
+
+    return getattr(request_context, "session", None) if request_context else None
+
+
 def format_client_info(client_info: Optional[dict[str, Any]], use_friendly_name: bool = True) -> str:
     """
     Format client information for display.
@@ -106,13 +106,16 @@ context preservation and natural conversation understanding.
 
 import logging
 import os
+import threading
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Any, Optional
 
 from pydantic import BaseModel
 
 from utils.env import get_env
+from utils.storage_backend import InMemoryStorage
 
 logger = logging.getLogger(__name__)
 
@@ -205,6 +208,74 @@ class ThreadContext(BaseModel):
     initial_context: dict[str, Any]  # Original request parameters
 
 
+# Decoded threads, reused while their stored entry is unchanged. Workflow tools load the
+# same thread several times per step; decompressing and validating its JSON each time
+# costs far more than checking the entry's write version. Only the decoded context is
+# kept, and the cache is bounded by the size of the payloads it stands for.
+THREAD_CACHE_SIZE = 16
+THREAD_CACHE_MAX_BYTES = 16 * 1024 * 1024
+_decoded_threads: OrderedDict[str, tuple[int, int, ThreadContext]] = OrderedDict()
+_decoded_threads_bytes = 0
+_decoded_threads_lock = threading.Lock()
+
+
+def _copy_thread(context: ThreadContext) -> ThreadContext:
+    """Copy a thread so callers can append turns without touching the cached one (turns are shared)."""
+    return context.model_copy(update={"turns": list(context.turns), "initial_context": dict(context.initial_context)})
+
+
+def _forget_thread(thread_id: str) -> None:
+    """Drop a cached thread (caller holds the cache lock)."""
+    global _decoded_threads_bytes
+    cached = _decoded_threads.pop(thread_id, None)
+    if cached is not None:
+        _decoded_threads_bytes -= cached[1]
+
+
+def _remember_thread(version: Any, size: int, context: ThreadContext) -> None:
+    """Cache a decoded thread under the write version of its stored entry."""
+    global _decoded_threads_bytes
+    with _decoded_threads_lock:
+        _forget_thread(context.thread_id)
+        # Storage backends without write versions, and oversized threads, are not cached
+        if not isinstance(version, int) or size > THREAD_CACHE_MAX_BYTES:
+            return
+        _decoded_threads[context.thread_id] = (version, size, _copy_thread(context))
+        _decoded_threads_bytes += size
+        while len(_decoded_threads) > THREAD_CACHE_SIZE or _decoded_threads_bytes > THREAD_CACHE_MAX_BYTES:
+            _forget_thread(next(iter(_decoded_threads)))
+
+
+def _store_thread(storage, context: ThreadContext) -> None:
+    """Store a thread with the configured TTL, keeping the decoded form for the next load."""
+    data = context.model_dump_json()
+    version = storage.setex(f"thread:{context.thread_id}", CONVERSATION_TIMEOUT_SECONDS, data)
+    _remember_thread(version, len(data), context)
+
+
+def _load_thread(storage, thread_id: str) -> Optional[ThreadContext]:
+    """Load a stored thread, skipping decoding when its entry has not been rewritten."""
+    key = f"thread:{thread_id}"
+    if not isinstance(storage, InMemoryStorage):
+        data = storage.get(key)
+        return ThreadContext.model_validate_json(data) if data else None
+
+    with _decoded_threads_lock:
+        cached = _decoded_threads.get(thread_id)
+    data, version = storage.get_versioned(key, cached[0] if cached else None)
+    if version is None:
+        return None
+    if data is None:
+        with _decoded_threads_lock:
+            if thread_id in _decoded_threads:
+                _decoded_threads.move_to_end(thread_id)
+        return _copy_thread(cached[2])
+
+    context = ThreadContext.model_validate_json(data)
+    _remember_thread(version, len(data), context)
+    return context
+
+
 def get_storage():
     """
     Get in-memory storage backend for conversation persistence.
@@ -261,8 +332,7 @@ def create_thread(tool_name: str, initial_request: dict[str, Any], parent_thread
 
     # Store in memory with configurable TTL to prevent indefinite accumulation
     storage = get_storage()
-    key = f"thread:{thread_id}"
-    storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())
+    _store_thread(storage, context)
 
     logger.debug(f"[THREAD] Created new thread {thread_id} with parent {parent_thread_id}")
 
@@ -293,13 +363,7 @@ def get_thread(thread_id: str) -> Optional[ThreadContext]:
         return None
 
     try:
-        storage = get_storage()
-        key = f"thread:{thread_id}"
-        data = storage.get(key)
-
-        if data:
-            return ThreadContext.model_validate_json(data)
-        return None
+        return _load_thread(get_storage(), thread_id)
     except Exception:
         # Silently handle errors to avoid exposing storage details
         return None
@@ -380,8 +444,7 @@ def add_turn(
     # Save back to storage and refresh TTL
     try:
         storage = get_storage()
-        key = f"thread:{thread_id}"
-        storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())  # Refresh TTL to configured timeout
+        _store_thread(storage, context)  # Refresh TTL to configured timeout
         return True
     except Exception as e:
         logger.debug(f"[FLOW] Failed to save turn to storage: {type(e).__name__}")
@@ -574,15 +637,23 @@ def get_conversation_image_list(context: ThreadContext) -> list[str]:
     return image_list
 
 
-def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) -> tuple[list[str], list[str], int]:
+def _plan_file_inclusion_by_size(
+    all_files: list[str], max_file_tokens: int, query: Optional[str] = None
+) -> tuple[list[str], list[str], int]:
     """
     Plan which files to include based on size constraints.
 
     This is ONLY used for conversation history building, not MCP boundary checks.
 
+    When a query is given and the files cannot all fit, they are re-ordered by
+    lexical relevance to the query first (see utils.relevance_index). Files
+    with equal relevance keep their newest-first order, so the existing
+    prioritization still decides among unrelated files.
+
     Args:
         all_files: List of files to consider for inclusion
         max_file_tokens: Maximum tokens available for file content
+        query: Optional request text used to rank files when the budget is tight
 
     Returns:
         Tuple of (files_to_include, files_to_skip, estimated_total_tokens)
@@ -590,6 +661,15 @@ def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) ->
     if not all_files:
         return [], [], 0
 
+    if query:
+        from utils.file_utils import estimate_file_tokens
+
+        if sum(estimate_file_tokens(f) for f in all_files) > max_file_tokens:
+            from utils.relevance_index import rank_by_relevance
+
+            all_files, _ = rank_by_relevance(all_files, query)
+            logger.debug(f"[FILES] Budget exceeded, ranked {len(all_files)} history files by relevance to request")
+
     files_to_include = []
     files_to_skip = []
     total_tokens = 0
@@ -599,8 +679,10 @@ def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) ->
     for file_path in all_files:
         try:
             from utils.file_utils import estimate_file_tokens
+            from utils.file_windows import strip_file_reference
 
-            if os.path.exists(file_path) and os.path.isfile(file_path):
+            target_path = strip_file_reference(file_path)
+            if os.path.exists(target_path) and os.path.isfile(target_path):
                 # Use centralized token estimation for consistency
                 estimated_tokens = estimate_file_tokens(file_path)
 
@@ -618,7 +700,7 @@ def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) ->
             else:
                 files_to_skip.append(file_path)
                 # More descriptive message for missing files
-                if not os.path.exists(file_path):
+                if not os.path.exists(target_path):
                     logger.debug(
                         f"[FILES] Skipping {file_path} - file no longer exists (may have been moved/deleted since conversation)"
                     )
@@ -635,7 +717,9 @@ def _plan_file_inclusion_by_size(all_files: list[str], max_file_tokens: int) ->
     return files_to_include, files_to_skip, total_tokens
 
 
-def build_conversation_history(context: ThreadContext, model_context=None, read_files_func=None) -> tuple[str, int]:
+def build_conversation_history(
+    context: ThreadContext, model_context=None, read_files_func=None, query: Optional[str] = None
+) -> tuple[str, int]:
     """
     Build formatted conversation history for tool prompts with embedded file contents.
 
@@ -683,6 +767,8 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         context: ThreadContext containing the conversation to format
         model_context: ModelContext for token allocation (optional, uses DEFAULT_MODEL fallback)
         read_files_func: Optional function to read files (primarily for testing)
+        query: Optional text of the new request; when history files exceed the budget,
+               the most relevant files are kept instead of only the newest
 
     Returns:
         tuple[str, int]: (formatted_conversation_history, total_tokens_used)
@@ -770,10 +856,12 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
 
     logger.debug(f"[FILES] Found {len(all_files)} unique files in conversation history")
 
+    from utils.model_context import ModelContext, TokenDemand
+    from utils.token_utils import estimate_tokens
+
     # Get model-specific token allocation early (needed for both files and turns)
     if model_context is None:
         from config import DEFAULT_MODEL, IS_AUTO_MODE
-        from utils.model_context import ModelContext
 
         # In auto mode, use an intelligent fallback model for token calculations
         # since "auto" is not a real model with a provider
@@ -786,9 +874,23 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
 
         model_context = ModelContext(model_name)
 
+    # Tell the planner how much the full conversation (turns plus referenced files)
+    # needs, so history gets its real size while files for the new request still fit
+    turn_tokens = None
+    demand = getattr(model_context, "token_demand", None)
+    if isinstance(demand, TokenDemand) and demand.history_tokens is None:
+        from utils.file_utils import estimate_file_tokens
+
+        turn_tokens = sum(estimate_tokens(turn.content or "") for turn in all_turns)
+        file_tokens = sum(estimate_file_tokens(path) for path in all_files)
+        model_context.record_demand(history_tokens=turn_tokens + file_tokens)
+
     token_allocation = model_context.calculate_token_allocation()
     max_file_tokens = token_allocation.file_tokens
     max_history_tokens = token_allocation.history_tokens
+    if turn_tokens is not None:
+        # The history budget was sized for the turns and their files together
+        max_file_tokens = max(max_file_tokens, max_history_tokens - turn_tokens)
 
     logger.debug(f"[HISTORY] Using model-specific limits for {model_context.model_name}:")
     logger.debug(f"[HISTORY]   Max file tokens: {max_file_tokens:,}")
@@ -811,7 +913,9 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         # CRITICAL: all_files is already ordered by newest-first prioritization from get_conversation_file_list()
         # So when _plan_file_inclusion_by_size() hits token limits, it naturally excludes OLDER files first
         # while preserving the most recent file references - exactly what we want!
-        files_to_include, files_to_skip, estimated_tokens = _plan_file_inclusion_by_size(all_files, max_file_tokens)
+        files_to_include, files_to_skip, estimated_tokens = _plan_file_inclusion_by_size(
+            all_files, max_file_tokens, query=query
+        )
 
         if files_to_skip:
             logger.info(f"[FILES] Excluding {len(files_to_skip)} files from conversation history: {files_to_skip}")
@@ -833,7 +937,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
             )
 
             if read_files_func is None:
-                from utils.file_utils import read_file_content
+                from utils.prep_pool import get_file_content
 
                 # Process files for embedding
                 file_contents = []
@@ -843,7 +947,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
                 for file_path in files_to_include:
                     try:
                         logger.debug(f"[FILES] Processing file {file_path}")
-                        formatted_content, content_tokens = read_file_content(file_path)
+                        formatted_content, content_tokens = get_file_content(file_path)
                         if formatted_content:
                             file_contents.append(formatted_content)
                             total_tokens += content_tokens
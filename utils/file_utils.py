@@ -37,6 +37,7 @@ multi-turn file handling:
    - Error handling preserves conversation flow when files become unavailable
 """
 
+import io
 import json
 import logging
 import os
@@ -45,6 +46,16 @@ from pathlib import Path
 from typing import Optional
 
 from .file_types import BINARY_EXTENSIONS, CODE_EXTENSIONS, IMAGE_EXTENSIONS, TEXT_EXTENSIONS
+from .file_windows import (
+    MAX_WINDOW_BYTES,
+    WINDOW_BYTES_PER_LINE,
+    FileWindow,
+    iter_lines,
+    parse_file_reference,
+    read_line_window,
+    write_numbered_lines,
+)
+from .project_walker import walk_project_files
 from .security_config import EXCLUDED_DIRS, is_dangerous_path
 from .token_utils import DEFAULT_CONTEXT_WINDOW, estimate_tokens
 
@@ -265,18 +276,16 @@ def _add_line_numbers(content: str) -> str:
     """
     # Normalize line endings first
     normalized_content = _normalize_line_endings(content)
-    lines = normalized_content.split("\n")
 
     # Dynamic width allocation based on total line count
     # This supports files of any size by computing required width
-    total_lines = len(lines)
-    width = len(str(total_lines))
-    width = max(width, 4)  # Minimum padding for readability
+    total_lines = normalized_content.count("\n") + 1
+    width = max(len(str(total_lines)), 4)  # Minimum padding for readability
 
-    # Format with dynamic width and clear separator
-    numbered_lines = [f"{i + 1:{width}d}│ {line}" for i, line in enumerate(lines)]
-
-    return "\n".join(numbered_lines)
+    # Stream numbered lines into one buffer instead of building and joining a list
+    out = io.StringIO()
+    write_numbered_lines(out, iter_lines(normalized_content), 1, width)
+    return out.getvalue()
 
 
 def resolve_and_validate_path(path_str: str) -> Path:
@@ -329,8 +338,9 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
     Expand paths to individual files, handling both files and directories.
 
     This function recursively walks directories to find all matching files.
-    It automatically filters out hidden files and common non-code directories
-    like __pycache__ to avoid including generated or system files.
+    It automatically filters out hidden files, common non-code directories
+    like __pycache__, and anything ignored by .gitignore/.ignore files (see
+    utils.project_walker) to avoid including generated or system files.
 
     Args:
         paths: List of file or directory paths (must be absolute)
@@ -346,6 +356,20 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
     seen = set()
 
     for path in paths:
+        # Line-window references (path:START-END, path:head=N, ...) pass through as-is
+        # once their file is validated; the window is applied when the file is read
+        target_path, window = parse_file_reference(path)
+        if window is not None:
+            try:
+                target_obj = resolve_and_validate_path(target_path)
+            except (ValueError, PermissionError):
+                continue
+            reference = f"{target_obj}:{window.describe()}"
+            if target_obj.is_file() and reference not in seen:
+                expanded_files.append(reference)
+                seen.add(reference)
+            continue
+
         try:
             # Validate each path for security before processing
             path_obj = resolve_and_validate_path(path)
@@ -377,40 +401,14 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
                 seen.add(str(path_obj))
 
         elif path_obj.is_dir():
-            # Walk directory recursively to find all files
-            for root, dirs, files in os.walk(path_obj):
-                # Filter directories in-place to skip hidden and excluded directories
-                # This prevents descending into .git, .venv, __pycache__, node_modules, etc.
-                original_dirs = dirs[:]
-                dirs[:] = []
-                for d in original_dirs:
-                    # Skip hidden directories
-                    if d.startswith("."):
-                        continue
-                    # Skip excluded directories
-                    if d in EXCLUDED_DIRS:
-                        continue
-                    # Skip MCP directories found during traversal
-                    dir_path = Path(root) / d
-                    if is_mcp_directory(dir_path):
-                        logger.debug(f"Skipping MCP directory during traversal: {dir_path}")
-                        continue
-                    dirs.append(d)
-
-                for file in files:
-                    # Skip hidden files (e.g., .DS_Store, .gitignore)
-                    if file.startswith("."):
-                        continue
-
-                    file_path = Path(root) / file
-
-                    # Filter by extension if specified
-                    if not extensions or file_path.suffix.lower() in extensions:
-                        full_path = str(file_path)
-                        # Use set to prevent duplicates
-                        if full_path not in seen:
-                            expanded_files.append(full_path)
-                            seen.add(full_path)
+            # Walk directory recursively to find all files, skipping hidden entries,
+            # EXCLUDED_DIRS, MCP directories and anything matched by .gitignore/.ignore
+            walked = walk_project_files(path_obj, extensions, EXCLUDED_DIRS, lambda d: is_mcp_directory(d))
+            for full_path in walked:
+                # Use set to prevent duplicates
+                if full_path not in seen:
+                    expanded_files.append(full_path)
+                    seen.add(full_path)
 
     # Sort for consistent ordering across different runs
     # This makes output predictable and easier to debug
@@ -428,8 +426,14 @@ def read_file_content(
     returns formatted content, even for errors. This ensures the AI model
     gets context about what files were attempted but couldn't be read.
 
+    The path may carry a line window (``/abs/app.log:12000-12600``,
+    ``:head=N`` or ``:tail=N``, see utils.file_windows). Windows are read via
+    mmap without loading the rest of the file, so they are not subject to
+    ``max_size`` and are numbered with their original line numbers unless
+    line numbers are explicitly disabled.
+
     Args:
-        file_path: Path to file (must be absolute)
+        file_path: Path to file (must be absolute), optionally with a line window suffix
         max_size: Maximum file size to read (default 1MB to prevent memory issues)
         include_line_numbers: Whether to add line numbers. If None, auto-detects based on file type
 
@@ -438,9 +442,10 @@ def read_file_content(
         Content is wrapped with clear delimiters for AI parsing
     """
     logger.debug(f"[FILES] read_file_content called for: {file_path}")
+    target_path, window = parse_file_reference(file_path)
     try:
         # Validate path security before any file operations
-        path = resolve_and_validate_path(file_path)
+        path = resolve_and_validate_path(target_path)
         logger.debug(f"[FILES] Path validated and resolved: {path}")
     except (ValueError, PermissionError) as e:
         # Return error in a format that provides context to the AI
@@ -467,12 +472,18 @@ def read_file_content(
         stat_result = path.stat()
         file_size = stat_result.st_size
         logger.debug(f"[FILES] File size for {file_path}: {file_size:,} bytes")
+
+        if window is not None:
+            return _read_file_window(file_path, path, stat_result, window, include_line_numbers)
+
         if file_size > max_size:
             logger.debug(f"[FILES] File too large: {file_path} ({file_size:,} > {max_size:,} bytes)")
             modified_at = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
             content = (
                 f"\n--- FILE TOO LARGE: {file_path} (Last modified: {modified_at}) ---\n"
                 f"File size: {file_size:,} bytes (max: {max_size:,})\n"
+                f"Request part of it with a line range ({file_path}:START-END) "
+                f"or {file_path}:head=N / {file_path}:tail=N\n"
                 "--- END FILE ---\n"
             )
             return content, estimate_tokens(content)
@@ -520,6 +531,139 @@ def read_file_content(
         return content, tokens
 
 
+def _read_file_window(
+    file_path: str, path: Path, stat_result: os.stat_result, window: FileWindow, include_line_numbers: Optional[bool]
+) -> tuple[str, int]:
+    """Format a line window of a file as an excerpt block with original line numbers."""
+    content = read_line_window(str(path), window)
+    modified_at = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
+    logger.debug(
+        f"[FILES] Read window {window.describe()} of {file_path}: lines {content.first_line}-{content.last_line} "
+        f"of {content.total_lines}, {len(content.text):,} chars"
+    )
+
+    out = io.StringIO()
+    out.write(
+        f"\n--- BEGIN FILE EXCERPT: {file_path} (lines {content.first_line}-{content.last_line} "
+        f"of {content.total_lines}; Last modified: {modified_at}) ---\n"
+    )
+    if include_line_numbers is False:
+        out.write(content.text)
+    else:
+        width = max(len(str(content.total_lines)), 4)
+        write_numbered_lines(out, iter_lines(content.text), content.first_line, width)
+    if content.truncated:
+        out.write("\n[... window truncated, request a narrower line range ...]")
+    out.write(f"\n--- END FILE EXCERPT: {file_path} ---\n")
+
+    formatted = out.getvalue()
+    return formatted, estimate_tokens(formatted)
+
+
+def _format_excerpt(
+    file_path: str, lines: list[str], modified_at: str, line_ranges: list[tuple[int, int]], include_line_numbers: bool
+) -> str:
+    """Format merged line ranges of already-split file content as a single excerpt block."""
+    merged: list[list[int]] = []
+    for start, end in sorted(line_ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+
+    width = max(len(str(len(lines))), 4)
+    sections = []
+    for start, end in merged:
+        selected = lines[start - 1 : end]
+        if include_line_numbers:
+            selected = [f"{start + i:{width}d}│ {line}" for i, line in enumerate(selected)]
+        sections.append("\n".join(selected))
+
+    shown = ", ".join(f"{start}-{end}" for start, end in merged)
+    return (
+        f"\n--- BEGIN FILE EXCERPT: {file_path} (lines {shown} of {len(lines)}; Last modified: {modified_at}) ---\n"
+        + "\n...\n".join(sections)
+        + f"\n--- END FILE EXCERPT: {file_path} ---\n"
+    )
+
+
+def _read_lines_for_excerpt(file_path: str) -> Optional[tuple[list[str], str]]:
+    """Read and split a file for excerpting; returns (lines, modified_at) or None on failure."""
+    try:
+        path = resolve_and_validate_path(file_path)
+        stat_result = path.stat()
+        with open(path, encoding="utf-8", errors="replace") as f:
+            lines = _normalize_line_endings(f.read()).split("\n")
+    except (OSError, ValueError) as e:
+        logger.debug(f"[FILES] Could not read excerpt from {file_path}: {type(e).__name__}: {e}")
+        return None
+    modified_at = datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
+    return lines, modified_at
+
+
+def read_file_excerpt(
+    file_path: str, line_ranges: list[tuple[int, int]], *, include_line_numbers: bool = False
+) -> tuple[str, int]:
+    """
+    Read selected line ranges of a file and format them as a single excerpt.
+
+    Used when a whole file does not fit in the remaining budget but some of its
+    regions are relevant to the request. Line numbers, when enabled, refer to
+    the original file so the model can still cite exact locations.
+
+    Args:
+        file_path: Path to file (must be absolute)
+        line_ranges: 1-based inclusive (start, end) ranges; merged and sorted internally
+        include_line_numbers: Whether to prefix lines with their original line numbers
+
+    Returns:
+        Tuple of (formatted_excerpt, estimated_tokens); ("", 0) if nothing could be read
+    """
+    if not line_ranges:
+        return "", 0
+
+    loaded = _read_lines_for_excerpt(file_path)
+    if loaded is None:
+        return "", 0
+
+    lines, modified_at = loaded
+    formatted = _format_excerpt(file_path, lines, modified_at, line_ranges, include_line_numbers)
+    return formatted, estimate_tokens(formatted)
+
+
+def _read_relevant_excerpt(
+    file_path: str, chunk_matches: list, budget: int, include_line_numbers: bool
+) -> tuple[str, int]:
+    """Greedily pick the best-scoring chunks of a file that fit the budget and format them."""
+    loaded = _read_lines_for_excerpt(file_path)
+    if loaded is None:
+        return "", 0
+
+    lines, modified_at = loaded
+    # Line numbering adds a fixed-width prefix per line; account for it up front
+    prefix_chars = max(len(str(len(lines))), 4) + 2 if include_line_numbers else 0
+    header_tokens = estimate_tokens(file_path) * 2 + 40
+
+    line_ranges: list[tuple[int, int]] = []
+    estimated = header_tokens
+    for match in chunk_matches:
+        chunk_chars = sum(len(line) + 1 + prefix_chars for line in lines[match.start_line - 1 : match.end_line])
+        chunk_tokens = chunk_chars // 4 + 2
+        if estimated + chunk_tokens > budget:
+            continue
+        line_ranges.append((match.start_line, match.end_line))
+        estimated += chunk_tokens
+
+    while line_ranges:
+        excerpt = _format_excerpt(file_path, lines, modified_at, line_ranges, include_line_numbers)
+        tokens = estimate_tokens(excerpt)
+        if tokens <= budget:
+            return excerpt, tokens
+        # Estimate was optimistic; drop the weakest chunk and retry
+        line_ranges.pop()
+    return "", 0
+
+
 def read_files(
     file_paths: list[str],
     code: Optional[str] = None,
@@ -527,6 +671,7 @@ def read_files(
     reserve_tokens: int = 50_000,
     *,
     include_line_numbers: bool = False,
+    relevance_query: Optional[str] = None,
 ) -> str:
     """
     Read multiple files and optional direct code with smart token management.
@@ -536,12 +681,18 @@ def read_files(
     within token limits. It prioritizes direct code and reads files until
     the token budget is exhausted.
 
+    When ``relevance_query`` is provided and the expanded files would not fit,
+    files are ranked against the query (see utils.relevance_index) and read
+    most-relevant first. Files that are too large for the remaining budget
+    contribute their best-matching line ranges as excerpts instead.
+
     Args:
         file_paths: List of file or directory paths (absolute paths required)
         code: Optional direct code to include (prioritized over files)
         max_tokens: Maximum tokens to use (defaults to DEFAULT_CONTEXT_WINDOW)
         reserve_tokens: Tokens to reserve for prompt and response (default 50K)
         include_line_numbers: Whether to add line numbers to file content
+        relevance_query: Optional request text used to rank files when the budget is tight
 
     Returns:
         str: All file contents formatted for AI consumption
@@ -583,7 +734,23 @@ def read_files(
             logger.debug("[FILES] No files found from provided paths")
             content_parts.append(f"\n--- NO FILES FOUND ---\nProvided paths: {', '.join(file_paths)}\n--- END ---\n")
         else:
-            # Read files sequentially until token limit is reached
+            # When everything cannot fit, rank files against the request so the budget
+            # goes to the most relevant content instead of an alphabetical prefix
+            chunk_matches = {}
+            if relevance_query:
+                estimated_total = sum(estimate_file_tokens(f) for f in all_files)
+                if estimated_total > available_tokens:
+                    from .relevance_index import rank_by_relevance
+
+                    logger.debug(
+                        f"[FILES] Estimated {estimated_total:,} tokens exceeds budget {available_tokens:,}, ranking by relevance"
+                    )
+                    all_files, chunk_matches = rank_by_relevance(all_files, relevance_query)
+
+            # Read files sequentially until token limit is reached; large files
+            # prefetched by the preparation pool are already formatted
+            from .prep_pool import get_file_content
+
             logger.debug(f"[FILES] Reading {len(all_files)} files with token budget {available_tokens:,}")
             for i, file_path in enumerate(all_files):
                 if total_tokens >= available_tokens:
@@ -591,7 +758,7 @@ def read_files(
                     files_skipped.extend(all_files[i:])
                     break
 
-                file_content, file_tokens = read_file_content(file_path, include_line_numbers=include_line_numbers)
+                file_content, file_tokens = get_file_content(file_path, include_line_numbers=include_line_numbers)
                 logger.debug(f"[FILES] File {file_path}: {file_tokens:,} tokens")
 
                 # Check if adding this file would exceed limit
@@ -600,7 +767,19 @@ def read_files(
                     total_tokens += file_tokens
                     logger.debug(f"[FILES] Added file {file_path}, total tokens: {total_tokens:,}")
                 else:
-                    # File too large for remaining budget
+                    # File too large for remaining budget - fall back to its most relevant regions
+                    if file_path in chunk_matches:
+                        excerpt, excerpt_tokens = _read_relevant_excerpt(
+                            file_path, chunk_matches[file_path], available_tokens - total_tokens, include_line_numbers
+                        )
+                        if excerpt:
+                            content_parts.append(excerpt)
+                            total_tokens += excerpt_tokens
+                            logger.debug(
+                                f"[FILES] Added relevant excerpt of {file_path} ({excerpt_tokens:,} tokens), total tokens: {total_tokens:,}"
+                            )
+                            continue
+
                     logger.debug(
                         f"[FILES] File {file_path} too large for remaining budget ({file_tokens:,} tokens, {available_tokens - total_tokens:,} remaining)"
                     )
@@ -629,17 +808,27 @@ def estimate_file_tokens(file_path: str) -> int:
     """
     Estimate tokens for a file using file-type aware ratios.
 
+    Line-window references are estimated from the window length, assuming
+    WINDOW_BYTES_PER_LINE bytes per line, capped by the file size.
+
     Args:
-        file_path: Path to the file
+        file_path: Path to the file, optionally with a line window suffix
 
     Returns:
         Estimated token count for the file
     """
     try:
+        file_path, window = parse_file_reference(file_path)
         if not os.path.exists(file_path) or not os.path.isfile(file_path):
             return 0
 
         file_size = os.path.getsize(file_path)
+        if window is not None:
+            if window.mode != "range":
+                file_size = min(file_size, window.count * WINDOW_BYTES_PER_LINE)
+            elif window.end is not None:
+                file_size = min(file_size, (window.end - window.start + 1) * WINDOW_BYTES_PER_LINE)
+            file_size = min(file_size, MAX_WINDOW_BYTES)
 
         # Get the appropriate ratio for this file type
         from .file_types import get_token_estimation_ratio
@@ -803,7 +992,7 @@ def read_file_safely(file_path: str, max_size: int = 10 * 1024 * 1024) -> Option
         return None
 
 
-def check_total_file_size(files: list[str], model_name: str) -> Optional[dict]:
+def check_total_file_size(files: list[str], model_name: str, model_context=None) -> Optional[dict]:
     """
     Check if total file sizes would exceed token threshold before embedding.
 
@@ -817,6 +1006,8 @@ def check_total_file_size(files: list[str], model_name: str) -> Optional[dict]:
     Args:
         files: List of file paths to check
         model_name: The resolved model name for context-aware thresholds (required)
+        model_context: Model context carrying the request's token demands (history,
+                       prompt), so the file budget reflects what is actually left
 
     Returns:
         Dict with `code_too_large` response if too large, None if acceptable
@@ -835,7 +1026,8 @@ def check_total_file_size(files: list[str], model_name: str) -> Optional[dict]:
 
     from utils.model_context import ModelContext
 
-    model_context = ModelContext(model_name)
+    if model_context is None:
+        model_context = ModelContext(model_name)
     token_allocation = model_context.calculate_token_allocation()
 
     # Dynamic threshold based on model capacity
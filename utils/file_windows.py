@@ -0,0 +1,248 @@
+"""
+Windowed file reads for large files and line-range file references
+
+Whole-file reads are capped at ``max_size`` (1MB) because reading, normalizing,
+splitting and numbering a file creates several full copies of it. For large
+logs and generated files, the interesting part is usually a known region, so
+a file reference may carry a line window:
+
+    /abs/path/app.log:12000-12600   lines 12000 through 12600 (1-based, inclusive)
+    /abs/path/app.log:12000-        line 12000 to the end of the file
+    /abs/path/app.log:head=200      first 200 lines
+    /abs/path/app.log:tail=200      last 200 lines (``head``/``tail`` alone use DEFAULT_WINDOW_LINES)
+
+Windows are located by scanning a memory-mapped file for newline bytes, so
+only the requested byte range is ever decoded. The first window read of a
+file version builds a small line index (newline counts per fixed-size block,
+cached per path, mtime and size); later windows into the same version, such
+as paging through a log, find their lines from the index and scan only the
+blocks they start and end in.
+
+A reference whose full text names an existing file is always treated as a
+plain path, so files that happen to contain ":10-20" in their name still work.
+"""
+
+import bisect
+import io
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Optional
+
+# Lines returned by bare "head"/"tail" references
+DEFAULT_WINDOW_LINES = 200
+
+# Window content above this many bytes is cut off (guards against giant single lines)
+MAX_WINDOW_BYTES = 1_000_000
+
+# Average line length assumed when estimating a window's size before reading it
+WINDOW_BYTES_PER_LINE = 120
+
+# Block size of the line index; locating a line scans at most one block
+_INDEX_BLOCK_BYTES = 64 * 1024
+
+# File versions whose line index is kept
+_INDEX_CACHE_SIZE = 32
+
+_WINDOW_RE = re.compile(r"^(?P<path>.+?):(?:(?P<start>\d+)-(?P<end>\d*)|(?P<mode>head|tail)(?:=(?P<count>\d+))?)$")
+
+
+@dataclass(frozen=True)
+class FileWindow:
+    """A line window into a file. ``start``/``end`` are 1-based and inclusive."""
+
+    mode: str  # "range", "head" or "tail"
+    start: int = 1
+    end: Optional[int] = None
+    count: int = DEFAULT_WINDOW_LINES
+
+    def describe(self) -> str:
+        if self.mode == "range":
+            return f"{self.start}-{self.end if self.end is not None else ''}"
+        return f"{self.mode}={self.count}"
+
+
+@dataclass
+class WindowContent:
+    """Decoded window text plus the line numbers it covers."""
+
+    text: str
+    first_line: int
+    last_line: int
+    total_lines: int
+    truncated: bool = False
+
+
+def parse_file_reference(reference: str) -> tuple[str, Optional[FileWindow]]:
+    """
+    Split a file reference into its path and optional line window.
+
+    Args:
+        reference: Plain path or path with a ":START-END", ":head[=N]" or ":tail[=N]" suffix
+
+    Returns:
+        Tuple of (path, window); window is None for plain paths
+    """
+    match = _WINDOW_RE.match(reference)
+    if not match or os.path.exists(reference):
+        return reference, None
+
+    path = match.group("path")
+    if match.group("mode"):
+        count = int(match.group("count")) if match.group("count") else DEFAULT_WINDOW_LINES
+        return path, FileWindow(mode=match.group("mode"), count=max(count, 1))
+
+    start = max(int(match.group("start")), 1)
+    end = int(match.group("end")) if match.group("end") else None
+    if end is not None and end < start:
+        start, end = end, start
+        start = max(start, 1)
+    return path, FileWindow(mode="range", start=start, end=end)
+
+
+def strip_file_reference(reference: str) -> str:
+    """Return the filesystem path of a reference, dropping any line window."""
+    return parse_file_reference(reference)[0]
+
+
+_line_indexes: "OrderedDict[tuple, array]" = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+
+def _line_index(path: str, stat_result: os.stat_result, mm: mmap.mmap) -> array:
+    """
+    Newlines before each index block of one file version, built once and cached.
+
+    ``index[i]`` counts the newlines in blocks ``0..i-1``; the final entry is
+    the file's total newline count.
+    """
+    key = (os.path.abspath(path), stat_result.st_mtime_ns, stat_result.st_size)
+    with _line_indexes_lock:
+        index = _line_indexes.get(key)
+        if index is not None:
+            _line_indexes.move_to_end(key)
+            return index
+
+    index = array("q", [0])
+    for offset in range(0, len(mm), _INDEX_BLOCK_BYTES):
+        index.append(index[-1] + mm[offset : offset + _INDEX_BLOCK_BYTES].count(b"\n"))
+
+    with _line_indexes_lock:
+        _line_indexes[key] = index
+        while len(_line_indexes) > _INDEX_CACHE_SIZE:
+            _line_indexes.popitem(last=False)
+    return index
+
+
+def clear_line_index_cache() -> None:
+    """Drop cached line indexes (mainly for tests)."""
+    with _line_indexes_lock:
+        _line_indexes.clear()
+
+
+def _offset_of_line(mm: mmap.mmap, index: array, line: int) -> int:
+    """Byte offset where 1-based ``line`` starts (len(mm) if the file has fewer lines)."""
+    newlines_before = line - 1
+    if newlines_before <= 0:
+        return 0
+    if newlines_before > index[-1]:
+        return len(mm)
+    # The block holding the newline that ends line - 1
+    block = bisect.bisect_left(index, newlines_before) - 1
+    start = block * _INDEX_BLOCK_BYTES
+    chunk = mm[start : start + _INDEX_BLOCK_BYTES]
+    position = -1
+    for _ in range(newlines_before - index[block]):
+        position = chunk.find(b"\n", position + 1)
+    return start + position + 1
+
+
+def read_line_window(path: str, window: FileWindow) -> WindowContent:
+    """
+    Decode only the lines selected by a window.
+
+    Args:
+        path: Path to an existing regular file
+        window: Line window to extract
+
+    Returns:
+        WindowContent with line-ending-normalized text (no trailing newline)
+
+    Raises:
+        OSError: If the file cannot be opened or mapped
+    """
+    with open(path, "rb") as handle:
+        stat_result = os.fstat(handle.fileno())
+        if stat_result.st_size == 0:
+            return WindowContent(text="", first_line=1, last_line=0, total_lines=0)
+
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            index = _line_index(path, stat_result, mm)
+            # A trailing newline terminates the last line rather than starting a new one
+            total_lines = index[-1] + (0 if mm[size - 1 : size] == b"\n" else 1)
+
+            if window.mode == "head":
+                first, last = 1, min(window.count, total_lines)
+            elif window.mode == "tail":
+                first, last = max(total_lines - window.count + 1, 1), total_lines
+            else:
+                first = window.start
+                last = total_lines if window.end is None else min(window.end, total_lines)
+
+            if first > last:
+                return WindowContent(text="", first_line=first, last_line=first - 1, total_lines=total_lines)
+
+            start_offset = _offset_of_line(mm, index, first)
+            end_offset = _offset_of_line(mm, index, last + 1)
+            truncated = end_offset - start_offset > MAX_WINDOW_BYTES
+            if truncated:
+                end_offset = start_offset + MAX_WINDOW_BYTES
+
+            raw = mm[start_offset:end_offset]
+
+    text = raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+    if text.endswith("\n"):
+        text = text[:-1]
+    if truncated:
+        last = first + text.count("\n")
+    return WindowContent(text=text, first_line=first, last_line=last, total_lines=total_lines, truncated=truncated)
+
+
+def iter_lines(text: str) -> Iterable[str]:
+    """Yield the "\\n"-separated lines of text without materializing a list (split semantics)."""
+    position = 0
+    while True:
+        newline = text.find("\n", position)
+        if newline == -1:
+            yield text[position:]
+            return
+        yield text[position:newline]
+        position = newline + 1
+
+
+def write_numbered_lines(out: io.TextIOBase, lines: Iterable[str], first_line: int, width: int) -> None:
+    """
+    Stream lines to ``out`` with "  45│ " style number prefixes.
+
+    Writing directly to the output avoids building a list of numbered lines and
+    joining it, which would briefly hold two extra copies of the content.
+
+    Args:
+        out: Text stream to write to (e.g. io.StringIO)
+        lines: Lines without trailing newlines
+        first_line: Number of the first line
+        width: Minimum width of the line number column
+    """
+    number = first_line
+    for line in lines:
+        if number != first_line:
+            out.write("\n")
+        out.write(f"{number:{width}d}│ ")
+        out.write(line)
+        number += 1
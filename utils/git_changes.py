@@ -0,0 +1,499 @@
+"""
+Server-side git change collection for pre-commit validation
+
+The precommit workflow used to ask the agent to run git itself and paste the
+output back, so large diffs travelled through the agent's context twice. This
+module collects the changeset directly on the server:
+
+- Enumerates changed files per source (staged, unstaged, untracked, or
+  ``<ref>...HEAD`` when comparing against a ref) with ``git diff --numstat``
+- Skips binary files and dependency lockfiles up front
+- Streams ``git diff`` output through a pipe and splits it into per-file
+  hunks without buffering the whole diff; oversized hunks are truncated
+- Ranks hunks into a token budget (request relevance first, then smaller,
+  denser hunks) and renders them with ``--- BEGIN DIFF`` markers
+- Caches collected changesets keyed by HEAD, the index file signature (a
+  cheap stand-in for the index tree hash that changes whenever the index is
+  written) and the mtimes of changed worktree files
+
+Set PAL_PRECOMMIT_SERVER_DIFF=false to keep the agent-driven flow.
+"""
+
+import codecs
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.env import get_env_bool
+from utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+GIT_TIMEOUT_SECONDS = 30
+
+# Lockfiles are machine-generated, large, and rarely useful for review
+LOCKFILE_NAMES = frozenset(
+    {
+        "package-lock.json",
+        "npm-shrinkwrap.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+        "bun.lockb",
+        "poetry.lock",
+        "Pipfile.lock",
+        "uv.lock",
+        "pdm.lock",
+        "Cargo.lock",
+        "Gemfile.lock",
+        "composer.lock",
+        "go.sum",
+        "mix.lock",
+        "Podfile.lock",
+        "packages.lock.json",
+        "flake.lock",
+    }
+)
+
+# Longest hunk kept verbatim; the rest of an oversized hunk is summarized
+MAX_HUNK_LINES = 400
+
+# Untracked files above this size are listed but not embedded
+MAX_UNTRACKED_FILE_BYTES = 512 * 1024
+
+# Paths passed to one git diff invocation (keeps command lines short)
+_PATHSPEC_BATCH = 200
+
+_CACHE_SIZE = 8
+
+
+def is_server_diff_enabled() -> bool:
+    """Return True unless server-side diff collection was disabled via PAL_PRECOMMIT_SERVER_DIFF."""
+    return get_env_bool("PAL_PRECOMMIT_SERVER_DIFF", True)
+
+
+@dataclass
+class DiffHunk:
+    """One hunk of a file diff, tagged with the change source it came from."""
+
+    path: str
+    source: str
+    header: str
+    lines: list[str]
+    added: int = 0
+    removed: int = 0
+    truncated_lines: int = 0
+
+    @property
+    def text(self) -> str:
+        body = "\n".join([self.header, *self.lines])
+        if self.truncated_lines:
+            body += f"\n[... {self.truncated_lines} more lines in this hunk omitted ...]"
+        return body
+
+
+@dataclass
+class FileChange:
+    """A changed file as reported by git --numstat."""
+
+    path: str
+    source: str
+    added: int
+    removed: int
+    skipped_reason: Optional[str] = None
+
+
+@dataclass
+class ChangeSet:
+    """All changes collected for one repository and comparison mode."""
+
+    repo_root: str
+    description: str
+    files: list[FileChange] = field(default_factory=list)
+    hunks: list[DiffHunk] = field(default_factory=list)
+
+
+class GitError(RuntimeError):
+    """Raised when a git command fails."""
+
+
+def _run_git(repo: str, *args: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", "-C", repo, *args],
+            capture_output=True,
+            timeout=GIT_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        raise GitError(f"git {args[0]} failed: {e}") from e
+    if completed.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {completed.stderr.decode(errors='replace').strip()}")
+    return completed.stdout.decode("utf-8", errors="replace")
+
+
+def find_repository_root(path: str) -> Optional[str]:
+    """Return the work tree root containing ``path``, or None if it is not in a git repository."""
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    try:
+        return _run_git(directory, "rev-parse", "--show-toplevel").strip() or None
+    except GitError:
+        return None
+
+
+def _is_lockfile(path: str) -> bool:
+    return os.path.basename(path) in LOCKFILE_NAMES
+
+
+def _diff_sources(compare_to: Optional[str], include_staged: bool, include_unstaged: bool) -> list[tuple[str, list]]:
+    """Return (source_label, git diff arguments) for each requested change source."""
+    if compare_to:
+        return [(f"{compare_to}...HEAD", [f"{compare_to}...HEAD"])]
+    sources = []
+    if include_staged:
+        sources.append(("staged", ["--cached"]))
+    if include_unstaged:
+        sources.append(("unstaged", []))
+    return sources
+
+
+def _parse_numstat(output: str, source: str) -> list[FileChange]:
+    """Parse ``git diff --numstat -z`` output (renames use two extra NUL-separated fields)."""
+    changes = []
+    fields = output.split("\0")
+    index = 0
+    while index < len(fields):
+        entry = fields[index]
+        index += 1
+        if not entry:
+            continue
+        parts = entry.split("\t", 2)
+        if len(parts) < 3:
+            continue
+        added, removed, path = parts
+        if not path:
+            # Rename or copy: the old and new paths follow as separate fields
+            path = fields[index + 1] if index + 1 < len(fields) else fields[index]
+            index += 2
+
+        binary = added == "-" or removed == "-"
+        change = FileChange(
+            path=path,
+            source=source,
+            added=0 if binary else int(added),
+            removed=0 if binary else int(removed),
+        )
+        if binary:
+            change.skipped_reason = "binary"
+        elif _is_lockfile(path):
+            change.skipped_reason = "lockfile"
+        changes.append(change)
+    return changes
+
+
+def _diff_path(raw: bytes) -> Optional[str]:
+    """Path named by a ``---``/``+++`` line, or None for /dev/null."""
+    token = raw[4:].rstrip(b"\r\n").rstrip(b"\t")
+    if token.startswith(b'"') and token.endswith(b'"'):
+        # Paths with control characters, quotes or backslashes are C-quoted even with core.quotePath=false
+        token = codecs.escape_decode(token[1:-1])[0]
+    if token == b"/dev/null":
+        return None
+    path = token.decode("utf-8", errors="replace")
+    # The prefixes are forced on the command line, whatever diff.noprefix / diff.mnemonicPrefix say
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def _stream_hunks(repo: str, diff_args: list, paths: list[str], source: str) -> list[DiffHunk]:
+    """Run git diff for the given paths and split its streamed output into hunks."""
+    hunks: list[DiffHunk] = []
+    for start in range(0, len(paths), _PATHSPEC_BATCH):
+        batch = paths[start : start + _PATHSPEC_BATCH]
+        command = [
+            "git",
+            "-c",
+            "core.quotePath=false",
+            "-C",
+            repo,
+            "diff",
+            "--no-color",
+            "--no-ext-diff",
+            "--src-prefix=a/",
+            "--dst-prefix=b/",
+            "-U3",
+            *diff_args,
+            "--",
+            *batch,
+        ]
+        # stderr goes to a file so a chatty git cannot block on a full pipe while stdout streams
+        with tempfile.TemporaryFile() as errors:
+            try:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors)
+            except OSError as e:
+                raise GitError(f"git diff failed: {e}") from e
+
+            # A git that stops producing output would block the read forever; kill it at the deadline
+            watchdog = threading.Timer(GIT_TIMEOUT_SECONDS, process.kill)
+            watchdog.start()
+            current_path: Optional[str] = None
+            current: Optional[DiffHunk] = None
+            try:
+                for raw in process.stdout:
+                    if current is None and (raw.startswith(b"--- ") or raw.startswith(b"+++ ")):
+                        current_path = _diff_path(raw) or current_path
+                        continue
+                    line = raw.decode("utf-8", errors="replace").rstrip("\n")
+                    if line.startswith("diff --git "):
+                        current = None
+                        current_path = None
+                    elif line.startswith("@@") and current_path:
+                        current = DiffHunk(path=current_path, source=source, header=line, lines=[])
+                        hunks.append(current)
+                    elif current is not None:
+                        if line.startswith("+"):
+                            current.added += 1
+                        elif line.startswith("-"):
+                            current.removed += 1
+                        if len(current.lines) < MAX_HUNK_LINES:
+                            current.lines.append(line)
+                        else:
+                            current.truncated_lines += 1
+            finally:
+                process.stdout.close()
+                try:
+                    process.wait(timeout=GIT_TIMEOUT_SECONDS)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+                # finished is only set before cancel() when the watchdog fired
+                timed_out = watchdog.finished.is_set() and process.returncode != 0
+                watchdog.cancel()
+
+            if timed_out:
+                raise GitError(f"git diff timed out after {GIT_TIMEOUT_SECONDS} seconds")
+            if process.returncode != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", errors="replace").strip()
+                raise GitError(f"git diff failed (exit {process.returncode}): {message}")
+    return hunks
+
+
+def _untracked_hunk(repo: str, path: str) -> tuple[Optional[DiffHunk], Optional[str]]:
+    """Render an untracked file as an all-added hunk; returns (hunk, skipped_reason)."""
+    if _is_lockfile(path):
+        return None, "lockfile"
+    full_path = os.path.join(repo, path)
+    try:
+        if os.path.getsize(full_path) > MAX_UNTRACKED_FILE_BYTES:
+            return None, "too large"
+        with open(full_path, "rb") as handle:
+            data = handle.read()
+    except OSError:
+        return None, "unreadable"
+    if b"\0" in data[:8192]:
+        return None, "binary"
+
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    hunk = DiffHunk(path=path, source="untracked", header=f"@@ -0,0 +1,{len(lines)} @@ (new file)", lines=[])
+    hunk.added = len(lines)
+    hunk.lines = ["+" + line for line in lines[:MAX_HUNK_LINES]]
+    hunk.truncated_lines = max(len(lines) - MAX_HUNK_LINES, 0)
+    return hunk, None
+
+
+_cache: "OrderedDict[tuple, ChangeSet]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(
+    repo: str, compare_to: Optional[str], include_staged: bool, include_unstaged: bool, include_untracked: bool
+) -> tuple:
+    try:
+        head = _run_git(repo, "rev-parse", "-q", "--verify", "HEAD").strip()
+    except GitError:
+        # Unborn branch (no commits yet)
+        head = ""
+    compare_commit = _run_git(repo, "rev-parse", "-q", "--verify", compare_to).strip() if compare_to else ""
+
+    worktree = ()
+    if not compare_to and (include_unstaged or include_untracked):
+        # --no-optional-locks keeps status from refreshing (rewriting) the index
+        status = _run_git(repo, "--no-optional-locks", "status", "--porcelain=v1", "-z", "--untracked-files=all")
+        signatures = []
+        for entry in status.split("\0"):
+            if len(entry) < 4:
+                continue
+            path = entry[3:]
+            try:
+                stat_result = os.stat(os.path.join(repo, path))
+                signatures.append((path, stat_result.st_mtime_ns, stat_result.st_size))
+            except OSError:
+                signatures.append((path, None, None))
+        worktree = tuple(sorted(signatures))
+
+    git_dir = _run_git(repo, "rev-parse", "--absolute-git-dir").strip()
+    try:
+        index_stat = os.stat(os.path.join(git_dir, "index"))
+        index_signature = (index_stat.st_mtime_ns, index_stat.st_size)
+    except OSError:
+        index_signature = None
+
+    return (repo, head, compare_commit, index_signature, worktree, include_staged, include_unstaged, include_untracked)
+
+
+def collect_changes(
+    path: str,
+    repo_root: Optional[str] = None,
+    compare_to: Optional[str] = None,
+    include_staged: bool = True,
+    include_unstaged: bool = True,
+    include_untracked: bool = True,
+) -> Optional[ChangeSet]:
+    """
+    Collect the changeset of the repository containing ``path``.
+
+    Args:
+        path: Any path inside the work tree
+        repo_root: Work tree root of ``path`` when the caller already resolved it
+        compare_to: Optional ref; when set, diffs ``<ref>...HEAD`` and ignores the include flags
+        include_staged: Include staged changes (``git diff --cached``)
+        include_unstaged: Include unstaged changes (``git diff``)
+        include_untracked: Include untracked, non-ignored files with unstaged changes
+
+    Returns:
+        ChangeSet, or None when ``path`` is not inside a git repository
+
+    Raises:
+        GitError: If a git command fails (e.g. an unknown ``compare_to`` ref)
+    """
+    repo = repo_root or find_repository_root(path)
+    if not repo:
+        return None
+
+    include_untracked = include_untracked and include_unstaged and not compare_to
+    key = _cache_key(repo, compare_to, include_staged, include_unstaged, include_untracked)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            logger.debug(f"[GIT_CHANGES] Reusing cached changeset for {repo}")
+            return cached
+
+    sources = _diff_sources(compare_to, include_staged, include_unstaged)
+    labels = [label for label, _ in sources] + (["untracked"] if include_untracked else [])
+    changeset = ChangeSet(repo_root=repo, description=" + ".join(labels) or "no change sources selected")
+
+    for label, diff_args in sources:
+        files = _parse_numstat(_run_git(repo, "diff", "--numstat", "-z", *diff_args), label)
+        changeset.files.extend(files)
+        wanted = [change.path for change in files if not change.skipped_reason]
+        if wanted:
+            changeset.hunks.extend(_stream_hunks(repo, diff_args, wanted, label))
+
+    if include_untracked:
+        for untracked in filter(None, _run_git(repo, "ls-files", "--others", "--exclude-standard", "-z").split("\0")):
+            hunk, skipped_reason = _untracked_hunk(repo, untracked)
+            change = FileChange(path=untracked, source="untracked", added=hunk.added if hunk else 0, removed=0)
+            change.skipped_reason = skipped_reason
+            changeset.files.append(change)
+            if hunk:
+                changeset.hunks.append(hunk)
+
+    logger.debug(
+        f"[GIT_CHANGES] Collected {len(changeset.files)} changed files, {len(changeset.hunks)} hunks from {repo}"
+    )
+    with _cache_lock:
+        _cache[key] = changeset
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return changeset
+
+
+def clear_change_cache() -> None:
+    """Drop cached changesets (mainly for tests)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def render_changeset(changeset: ChangeSet, max_tokens: int, query: Optional[str] = None) -> str:
+    """
+    Render a changeset within a token budget.
+
+    When everything fits, all hunks are rendered in git order. Otherwise hunks
+    are ranked by how many request terms they mention, then by size (smaller
+    first, so many focused hunks win over one bulk change), and selected
+    greedily; the selection is still rendered in git order and omitted hunks
+    are listed per file.
+
+    Args:
+        changeset: Collected changes
+        max_tokens: Token budget for the rendered section
+        query: Optional request text used for ranking
+
+    Returns:
+        Formatted "=== GIT CHANGES ===" section
+    """
+    summary = [
+        "=== GIT CHANGES (collected by server) ===",
+        f"Repository: {changeset.repo_root}",
+        f"Changes: {changeset.description}",
+    ]
+    if not changeset.files:
+        summary.append("No changes found.")
+        summary.append("=== END GIT CHANGES ===")
+        return "\n".join(summary)
+
+    total_added = sum(change.added for change in changeset.files)
+    total_removed = sum(change.removed for change in changeset.files)
+    summary.append(f"Files changed: {len(changeset.files)} (+{total_added}/-{total_removed} lines)")
+    for change in changeset.files:
+        note = f" - skipped ({change.skipped_reason})" if change.skipped_reason else ""
+        summary.append(f"  {change.path} [{change.source}] (+{change.added}/-{change.removed}){note}")
+
+    header = "\n".join(summary)
+    budget = max_tokens - estimate_tokens(header) - 50
+    hunk_tokens = [estimate_tokens(hunk.text) + 20 for hunk in changeset.hunks]
+
+    selected = set(range(len(changeset.hunks)))
+    if sum(hunk_tokens) > budget:
+        from utils.relevance_index import tokenize
+
+        query_terms = set(tokenize(query)) if query else set()
+
+        def rank(index: int) -> tuple:
+            hits = len(query_terms.intersection(tokenize(changeset.hunks[index].text))) if query_terms else 0
+            return (-hits, hunk_tokens[index], index)
+
+        selected = set()
+        used = 0
+        for index in sorted(range(len(changeset.hunks)), key=rank):
+            if used + hunk_tokens[index] <= budget:
+                selected.add(index)
+                used += hunk_tokens[index]
+
+    parts = [header]
+    omitted: dict[str, int] = {}
+    open_block: Optional[tuple[str, str]] = None
+    for index, hunk in enumerate(changeset.hunks):
+        if index not in selected:
+            omitted[hunk.path] = omitted.get(hunk.path, 0) + 1
+            continue
+        block = (hunk.path, hunk.source)
+        if block != open_block:
+            if open_block:
+                parts.append(f"--- END DIFF: {open_block[0]} ({open_block[1]}) ---")
+            parts.append(f"--- BEGIN DIFF: {hunk.path} ({hunk.source}) ---")
+            open_block = block
+        parts.append(hunk.text)
+    if open_block:
+        parts.append(f"--- END DIFF: {open_block[0]} ({open_block[1]}) ---")
+
+    if omitted:
+        listing = ", ".join(f"{path} ({count})" for path, count in omitted.items())
+        parts.append(f"[{sum(omitted.values())} hunks omitted to fit the token budget: {listing}]")
+    parts.append("=== END GIT CHANGES ===")
+    return "\n".join(parts)
@@ -0,0 +1,215 @@
+"""
+HTTP transport for serving many MCP clients from one process
+
+With the default stdio transport every MCP client session spawns its own
+server process, each with its own provider clients, model registries, caches
+and in-memory conversation store. In HTTP mode a single long-running process
+serves all clients concurrently:
+
+* MCP streamable HTTP on ``/mcp`` (responses stream back as SSE)
+* the legacy HTTP+SSE transport on ``/sse`` and ``/messages/`` for older clients
+* ``/health`` for liveness checks
+
+Sessions share the provider layer, caches and conversation memory, so a
+continuation_id created by one client can be continued from another. Client
+information (name/version from the MCP handshake) stays scoped to the session
+that sent it.
+
+Enable with PAL_TRANSPORT=http. The bind address defaults to 127.0.0.1:8000
+(PAL_HTTP_HOST / PAL_HTTP_PORT). When binding to a non-loopback address, set
+PAL_HTTP_AUTH_TOKEN so clients have to send ``Authorization: Bearer <token>``.
+"""
+
+import contextlib
+import hmac
+import ipaddress
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from utils.env import get_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_HOST = "127.0.0.1"
+DEFAULT_HTTP_PORT = 8000
+STREAMABLE_HTTP_PATH = "/mcp"
+SSE_PATH = "/sse"
+SSE_MESSAGES_PATH = "/messages/"
+HEALTH_PATH = "/health"
+
+_TRANSPORT_ALIASES = {
+    "stdio": "stdio",
+    "http": "http",
+    "streamable-http": "http",
+    "streamable_http": "http",
+    "sse": "http",
+}
+
+
+def get_transport() -> str:
+    """Return the configured transport ("stdio" or "http") from PAL_TRANSPORT."""
+    value = (get_env("PAL_TRANSPORT", "stdio") or "stdio").strip().lower()
+    transport = _TRANSPORT_ALIASES.get(value)
+    if transport is None:
+        raise ValueError(f"Unsupported PAL_TRANSPORT '{value}'. Use 'stdio' or 'http'.")
+    return transport
+
+
+@dataclass(frozen=True)
+class HTTPTransportSettings:
+    """Bind address and access control for the HTTP transport."""
+
+    host: str = DEFAULT_HTTP_HOST
+    port: int = DEFAULT_HTTP_PORT
+    auth_token: Optional[str] = None
+
+    @property
+    def is_loopback(self) -> bool:
+        if self.host == "localhost":
+            return True
+        try:
+            return ipaddress.ip_address(self.host).is_loopback
+        except ValueError:
+            return False
+
+    @classmethod
+    def from_env(cls) -> "HTTPTransportSettings":
+        host = (get_env("PAL_HTTP_HOST", DEFAULT_HTTP_HOST) or DEFAULT_HTTP_HOST).strip()
+        port_value = (get_env("PAL_HTTP_PORT", str(DEFAULT_HTTP_PORT)) or str(DEFAULT_HTTP_PORT)).strip()
+        try:
+            port = int(port_value)
+        except ValueError as exc:
+            raise ValueError(f"Invalid PAL_HTTP_PORT '{port_value}'") from exc
+        auth_token = (get_env("PAL_HTTP_AUTH_TOKEN") or "").strip() or None
+        return cls(host=host, port=port, auth_token=auth_token)
+
+
+class _ServerApp:
+    """Expose the low-level server with PAL's handshake options to the session manager.
+
+    The streamable HTTP session manager asks its app for initialization options
+    per session; the bare ``Server`` would build generic ones without PAL's
+    instructions and version.
+    """
+
+    def __init__(self, server: Any, initialization_options: Any) -> None:
+        self._server = server
+        self._initialization_options = initialization_options
+
+    def create_initialization_options(self) -> Any:
+        return self._initialization_options
+
+    async def run(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._server.run(*args, **kwargs)
+
+
+class _ASGIEndpoint:
+    """Route endpoint that hands the raw ASGI call to a transport handler."""
+
+    def __init__(self, handler) -> None:
+        self._handler = handler
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self._handler(scope, receive, send)
+
+
+class _BearerAuthMiddleware:
+    """Reject requests without the configured bearer token (health checks stay open)."""
+
+    def __init__(self, app, token: str) -> None:
+        self.app = app
+        self._expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope.get("path") != HEALTH_PATH:
+            provided = dict(scope.get("headers") or []).get(b"authorization", b"")
+            if not hmac.compare_digest(provided, self._expected):
+                from starlette.responses import JSONResponse
+
+                response = JSONResponse({"error": "unauthorized"}, status_code=401)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def build_http_app(server: Any, initialization_options: Any, settings: Optional[HTTPTransportSettings] = None):
+    """
+    Build the ASGI application serving ``server`` over streamable HTTP and SSE.
+
+    Args:
+        server: The low-level MCP server with all handlers registered
+        initialization_options: Handshake options sent to every session
+        settings: Bind address and access control (defaults to the environment)
+
+    Returns:
+        A Starlette application
+    """
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from mcp.server.transport_security import TransportSecuritySettings
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.responses import JSONResponse
+    from starlette.routing import Mount, Route
+
+    settings = settings or HTTPTransportSettings.from_env()
+
+    if settings.is_loopback:
+        # Browsers must not be able to reach a local server through DNS rebinding
+        security = TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=["127.0.0.1:*", "localhost:*", "[::1]:*"],
+            allowed_origins=["http://127.0.0.1:*", "http://localhost:*", "http://[::1]:*"],
+        )
+    else:
+        security = TransportSecuritySettings(enable_dns_rebinding_protection=False)
+
+    session_manager = StreamableHTTPSessionManager(
+        app=_ServerApp(server, initialization_options),
+        security_settings=security,
+    )
+    sse = SseServerTransport(SSE_MESSAGES_PATH, security_settings=security)
+
+    async def handle_sse(scope, receive, send) -> None:
+        async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, initialization_options)
+
+    async def health(request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "transport": "http"})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            logger.info(f"[HTTP] Serving MCP on http://{settings.host}:{settings.port}{STREAMABLE_HTTP_PATH}")
+            yield
+
+    middleware = []
+    if settings.auth_token:
+        middleware.append(Middleware(_BearerAuthMiddleware, token=settings.auth_token))
+    elif not settings.is_loopback:
+        logger.warning(
+            f"[HTTP] Listening on {settings.host} without PAL_HTTP_AUTH_TOKEN; anyone who can reach this "
+            "address can use your provider API keys"
+        )
+
+    return Starlette(
+        routes=[
+            Route(STREAMABLE_HTTP_PATH, endpoint=_ASGIEndpoint(session_manager.handle_request)),
+            Route(SSE_PATH, endpoint=_ASGIEndpoint(handle_sse)),
+            Mount(SSE_MESSAGES_PATH, app=sse.handle_post_message),
+            Route(HEALTH_PATH, endpoint=health),
+        ],
+        middleware=middleware,
+        lifespan=lifespan,
+    )
+
+
+async def serve_http(server: Any, initialization_options: Any, settings: Optional[HTTPTransportSettings] = None):
+    """Run the HTTP transport until the process is stopped."""
+    import uvicorn
+
+    settings = settings or HTTPTransportSettings.from_env()
+    app = build_http_app(server, initialization_options, settings)
+    config = uvicorn.Config(app, host=settings.host, port=settings.port, log_level="warning")
+    await uvicorn.Server(config).serve()
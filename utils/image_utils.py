@@ -1,15 +1,133 @@
-"""Utility helpers for validating image inputs."""
+"""Utility helpers for validating and preparing image inputs.
+
+Validated images are cached in-process, keyed by path + mtime + size for files
+and by content hash for data URLs, together with their base64 encoding. A
+continuation that re-ships every earlier screenshot therefore reads and
+encodes each image once per process instead of once per request.
+
+When Pillow is installed, ``prepare_image`` also downscales images whose
+longest side exceeds ``PAL_IMAGE_MAX_DIMENSION`` (providers downsample larger
+images server-side anyway) and recompresses images that exceed the model's
+``max_image_size_mb``. Without Pillow images are passed through unchanged.
+"""
 
 import base64
 import binascii
+import hashlib
+import io
+import logging
 import os
-from collections.abc import Iterable
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Optional
 
+from utils.env import get_env
 from utils.file_types import IMAGES, get_image_mime_type
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_MAX_IMAGE_SIZE_MB = 20.0
 
-__all__ = ["DEFAULT_MAX_IMAGE_SIZE_MB", "validate_image"]
+# Longest side images are scaled down to before upload (0 disables resizing)
+DEFAULT_IMAGE_MAX_DIMENSION = 2048
+
+# Upper bound on cached image payload (raw bytes + base64) held in memory
+DEFAULT_IMAGE_CACHE_MB = 128
+
+# Formats Pillow re-encodes to, keyed by MIME type; anything else becomes PNG
+_PIL_FORMATS = {"image/png": "PNG", "image/jpeg": "JPEG", "image/webp": "WEBP"}
+
+__all__ = ["DEFAULT_MAX_IMAGE_SIZE_MB", "PreparedImage", "clear_image_cache", "prepare_image", "validate_image"]
+
+
+@dataclass(frozen=True)
+class PreparedImage:
+    """An image ready for upload: bytes, MIME type and base64 payload."""
+
+    image_bytes: bytes
+    mime_type: str
+    base64_data: str
+    resized: bool = False
+
+    @property
+    def data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.base64_data}"
+
+
+class _ImageCache:
+    """Thread-safe LRU cache bounded by the total bytes of cached payloads."""
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def find(self, predicate: Callable[[tuple, object], bool]):
+        """Return the most recently used value whose (key, value) matches ``predicate``."""
+        with self._lock:
+            for key in reversed(self._entries):
+                value = self._entries[key][0]
+                if predicate(key, value):
+                    self._entries.move_to_end(key)
+                    return value
+        return None
+
+    def pop(self, key: tuple) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def put(self, key: tuple, value: object, size: int) -> None:
+        limit = _get_cache_limit_bytes()
+        if size > limit:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > limit and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_cache = _ImageCache()
+
+
+def _get_cache_limit_bytes() -> int:
+    try:
+        return int(float(get_env("PAL_IMAGE_CACHE_MB", str(DEFAULT_IMAGE_CACHE_MB)) or 0) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_IMAGE_CACHE_MB * 1024 * 1024
+
+
+def _get_max_dimension() -> int:
+    try:
+        return max(int(get_env("PAL_IMAGE_MAX_DIMENSION", str(DEFAULT_IMAGE_MAX_DIMENSION)) or 0), 0)
+    except ValueError:
+        return DEFAULT_IMAGE_MAX_DIMENSION
+
+
+def clear_image_cache() -> None:
+    """Drop all cached images (mainly for tests)."""
+    _cache.clear()
 
 
 def _valid_mime_types() -> Iterable[str]:
@@ -33,13 +151,157 @@ def validate_image(image_path: str, max_size_mb: float = None) -> tuple[bytes, s
     if max_size_mb is None:
         max_size_mb = DEFAULT_MAX_IMAGE_SIZE_MB
 
+    image_bytes, mime_type = _load_image(image_path)
+    _validate_size(image_bytes, max_size_mb)
+    return image_bytes, mime_type
+
+
+def prepare_image(image_path: str, max_size_mb: Optional[float] = None) -> PreparedImage:
+    """Validate, optionally downscale, and base64-encode an image once.
+
+    Results are cached per source version and size limit, so repeated calls
+    for the same screenshot across turns are dictionary lookups.
+
+    Args:
+        image_path: Either a filesystem path or a data URL.
+        max_size_mb: Optional size limit (defaults to ``DEFAULT_MAX_IMAGE_SIZE_MB``).
+
+    Returns:
+        PreparedImage with the bytes and base64 payload to upload.
+
+    Raises:
+        ValueError: When the image is missing, malformed, or exceeds limits
+            even after recompression.
+    """
+    if max_size_mb is None:
+        max_size_mb = DEFAULT_MAX_IMAGE_SIZE_MB
+
+    max_dimension = _get_max_dimension()
+    source_key = _source_key(image_path)
+    key = ("prepared", source_key, max_size_mb, max_dimension)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Only the prepared result is cached; raw bytes are not kept alongside it
+    image_bytes, mime_type = _load_image(image_path, cache_raw=False)
+    max_bytes = int(max_size_mb * 1024 * 1024)
+
+    resized = False
+    downscaled = _downscale(image_bytes, mime_type, max_dimension, max_bytes)
+    if downscaled is not None:
+        logger.debug(
+            f"[IMAGES] Downscaled {_describe(image_path)} from {len(image_bytes):,} to {len(downscaled[0]):,} bytes"
+        )
+        image_bytes, mime_type = downscaled
+        resized = True
+
+    _validate_size(image_bytes, max_size_mb)
+
+    if image_path.startswith("data:") and not resized:
+        # Reuse the caller's payload instead of re-encoding identical bytes
+        base64_data = image_path.split(",", 1)[1]
+    else:
+        base64_data = base64.b64encode(image_bytes).decode()
+
+    prepared = PreparedImage(image_bytes=image_bytes, mime_type=mime_type, base64_data=base64_data, resized=resized)
+    if source_key[-1] is not None:
+        _cache.put(key, prepared, len(image_bytes) + len(base64_data))
+        _cache.pop(("raw", source_key))
+    return prepared
+
+
+def _describe(image_path: str) -> str:
+    return "data URL" if image_path.startswith("data:") else image_path
+
+
+def _source_key(image_path: str) -> tuple:
+    """Identify one version of an image source without reading file contents."""
+    if image_path.startswith("data:"):
+        return ("data", hashlib.sha256(image_path.encode("utf-8")).hexdigest())
+    try:
+        stat_result = os.stat(image_path)
+    except OSError:
+        # Never cache lookups for unreadable paths; the loader reports the error
+        return ("file", image_path, None)
+    return ("file", image_path, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def _load_image(image_path: str, cache_raw: bool = True) -> tuple[bytes, str]:
+    """Return (bytes, mime_type) for a path or data URL, reading each version once.
+
+    A prepared copy that was not resized holds the original bytes, so it
+    serves raw lookups too.
+    """
+    source_key = _source_key(image_path)
+    cacheable = source_key[-1] is not None
+    key = ("raw", source_key)
+    if cacheable:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+        prepared = _cache.find(lambda entry_key, value: entry_key[:2] == ("prepared", source_key) and not value.resized)
+        if prepared is not None:
+            return prepared.image_bytes, prepared.mime_type
+
     if image_path.startswith("data:"):
-        return _validate_data_url(image_path, max_size_mb)
+        loaded = _validate_data_url(image_path)
+    else:
+        loaded = _validate_file_path(image_path)
+
+    if cacheable and cache_raw:
+        _cache.put(key, loaded, len(loaded[0]))
+    return loaded
+
 
-    return _validate_file_path(image_path, max_size_mb)
+def _downscale(image_bytes: bytes, mime_type: str, max_dimension: int, max_bytes: int) -> Optional[tuple[bytes, str]]:
+    """Shrink an image to ``max_dimension`` / ``max_bytes`` with Pillow, if available.
 
+    Returns None when Pillow is missing, the image is already within limits,
+    it is animated, or re-encoding does not help.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
 
-def _validate_data_url(image_data_url: str, max_size_mb: float) -> tuple[bytes, str]:
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            width, height = image.size
+            scale = 1.0
+            if max_dimension and max(width, height) > max_dimension:
+                scale = max_dimension / max(width, height)
+            if scale >= 1.0 and len(image_bytes) <= max_bytes:
+                return None
+            if getattr(image, "is_animated", False):
+                return None
+
+            image_format = _PIL_FORMATS.get(mime_type, "PNG")
+            target_mime = mime_type if mime_type in _PIL_FORMATS else "image/png"
+
+            # Each attempt shrinks further until the encoded size fits
+            for _ in range(6):
+                size = (max(1, int(width * scale)), max(1, int(height * scale)))
+                candidate = image.resize(size, Image.LANCZOS) if scale < 1.0 else image.copy()
+                if image_format == "JPEG" and candidate.mode not in ("RGB", "L"):
+                    candidate = candidate.convert("RGB")
+
+                buffer = io.BytesIO()
+                save_kwargs = {"optimize": True}
+                if image_format in ("JPEG", "WEBP"):
+                    save_kwargs["quality"] = 85
+                candidate.save(buffer, format=image_format, **save_kwargs)
+                encoded = buffer.getvalue()
+
+                if len(encoded) <= max_bytes:
+                    return (encoded, target_mime) if len(encoded) < len(image_bytes) or scale < 1.0 else None
+                scale *= 0.75
+    except Exception as exc:
+        logger.debug(f"[IMAGES] Could not downscale image: {type(exc).__name__}: {exc}")
+    return None
+
+
+def _validate_data_url(image_data_url: str) -> tuple[bytes, str]:
     """Validate a data URL and return image bytes plus MIME type."""
     try:
         header, data = image_data_url.split(",", 1)
@@ -60,11 +322,10 @@ def _validate_data_url(image_data_url: str, max_size_mb: float) -> tuple[bytes,
     except binascii.Error as exc:
         raise ValueError(f"Invalid base64 data: {exc}")
 
-    _validate_size(image_bytes, max_size_mb)
     return image_bytes, mime_type
 
 
-def _validate_file_path(file_path: str, max_size_mb: float) -> tuple[bytes, str]:
+def _validate_file_path(file_path: str) -> tuple[bytes, str]:
     """Validate an image loaded from the filesystem."""
     try:
         with open(file_path, "rb") as handle:
@@ -83,7 +344,6 @@ def _validate_file_path(file_path: str, max_size_mb: float) -> tuple[bytes, str]
         )
 
     mime_type = get_image_mime_type(ext)
-    _validate_size(image_bytes, max_size_mb)
     return image_bytes, mime_type
 
 
@@ -14,11 +14,11 @@ optimal token allocation for multi-turn conversations:
    - Enables the conversation memory system to apply newest-first prioritization
    - Ensures optimal balance between context preservation and new content
 
-2. MODEL-SPECIFIC ALLOCATION:
-   - Dynamic allocation based on model capabilities (context window size)
-   - Conservative allocation for smaller models (O3: 200K context)
-   - Generous allocation for larger models (Gemini: 1M+ context)
-   - Adapts token distribution ratios based on model capacity
+2. DEMAND-DRIVEN ALLOCATION:
+   - The window is planned from what the request actually needs (prompt,
+     images, conversation history, files, expected output) in one pass
+   - Demands that are not known yet fall back to capacity-based shares
+     (conservative for 200K models, generous for 1M+ models)
 
 3. CROSS-TOOL CONSISTENCY:
    - Provides consistent token budgets across different tools
@@ -26,6 +26,7 @@ optimal token allocation for multi-turn conversations:
    - Supports conversation reconstruction with proper budget management
 """
 
+import dataclasses
 import logging
 from dataclasses import dataclass
 from typing import Any, Optional
@@ -52,6 +53,158 @@ class TokenAllocation:
         return self.content_tokens - self.file_tokens - self.history_tokens
 
 
+# Tokens assumed per attached image when planning the context window
+IMAGE_TOKEN_ESTIMATE = 1_500
+
+# System prompt size assumed when the tool's compiled prompt is not known
+DEFAULT_SYSTEM_PROMPT_TOKENS = 4_000
+
+# Text wrapped around the prompt besides the system prompt: request template,
+# web search guidance and follow-up/continuation instructions
+INSTRUCTION_OVERHEAD_TOKENS = 1_500
+
+# Smallest response reservation, even for tools that expect short answers
+MIN_RESPONSE_TOKENS = 4_096
+
+# Share of the history/file budget each side keeps when their demands exceed it
+MIN_HISTORY_SHARE = 0.2
+MIN_FILE_SHARE = 0.2
+
+
+@dataclass
+class TokenDemand:
+    """
+    What a request needs from the context window.
+
+    ``None`` marks a demand that is not known yet; the planner then falls back
+    to a capacity-based share for it.
+    """
+
+    prompt_tokens: int = 0
+    image_tokens: int = 0
+    system_prompt_tokens: Optional[int] = None
+    history_tokens: Optional[int] = None
+    file_tokens: Optional[int] = None
+    expected_output_tokens: Optional[int] = None
+
+    @classmethod
+    def from_arguments(
+        cls,
+        arguments: dict[str, Any],
+        expected_output_tokens: Optional[int] = None,
+        system_prompt_tokens: Optional[int] = None,
+    ) -> "TokenDemand":
+        """Derive the known demands of a tool call from its arguments."""
+        from utils.token_utils import estimate_tokens
+
+        # server.py embeds history into "prompt" and keeps the user's input separately
+        prompt = arguments.get("_original_user_prompt")
+        if prompt is None:
+            prompt = arguments.get("prompt") or arguments.get("step") or ""
+
+        if arguments.get("continuation_id"):
+            history_tokens = arguments.get("_history_tokens")
+        else:
+            history_tokens = 0
+
+        return cls(
+            prompt_tokens=estimate_tokens(prompt) if isinstance(prompt, str) else 0,
+            image_tokens=len(arguments.get("images") or []) * IMAGE_TOKEN_ESTIMATE,
+            system_prompt_tokens=system_prompt_tokens,
+            history_tokens=history_tokens,
+            expected_output_tokens=expected_output_tokens,
+        )
+
+
+def _capacity_shares(total_tokens: int) -> tuple[float, float, float]:
+    """Response share of the window and history/file shares of content, used for unknown demands."""
+    if total_tokens < 300_000:
+        # Smaller context models (O3): Conservative allocation
+        return 0.4, 0.5, 0.3
+    # Larger context models (Gemini): More generous allocation
+    return 0.2, 0.4, 0.4
+
+
+def plan_token_allocation(
+    total_tokens: int,
+    demand: Optional[TokenDemand] = None,
+    *,
+    reserved_for_response: Optional[int] = None,
+    max_output_tokens: int = 0,
+) -> TokenAllocation:
+    """
+    Allocate a context window to response, prompt, history and files in one pass.
+
+    1. Response: the explicit reservation, otherwise the capacity share capped
+       by the model's maximum output and the tool's expected output (with a
+       floor of MIN_RESPONSE_TOKENS)
+    2. Prompt, images, system prompt (DEFAULT_SYSTEM_PROMPT_TOKENS when not
+       known) and INSTRUCTION_OVERHEAD_TOKENS: always reserved in full
+    3. History and files share the rest. When both demands fit, each gets
+       what it needs and the spare room is split by capacity shares between
+       the sides with a non-zero demand. When they do not, each keeps a
+       minimum share and the remainder goes to files first (they belong to
+       the current request), then to history (oldest turns are dropped first
+       when it is trimmed).
+
+    Args:
+        total_tokens: Model context window
+        demand: Known demands of the request (unknown ones use capacity shares)
+        reserved_for_response: Override the response reservation
+        max_output_tokens: Model's maximum output tokens (0 if unknown)
+
+    Returns:
+        TokenAllocation for the request
+    """
+    demand = demand or TokenDemand()
+    response_share, history_share, file_share = _capacity_shares(total_tokens)
+
+    if reserved_for_response:
+        response_tokens = reserved_for_response
+    else:
+        response_tokens = int(total_tokens * response_share)
+        if max_output_tokens > 0:
+            response_tokens = min(response_tokens, max_output_tokens)
+        if demand.expected_output_tokens:
+            response_tokens = min(response_tokens, max(demand.expected_output_tokens, MIN_RESPONSE_TOKENS))
+    content_tokens = max(total_tokens - response_tokens, 0)
+
+    system_prompt_tokens = (
+        demand.system_prompt_tokens if demand.system_prompt_tokens is not None else DEFAULT_SYSTEM_PROMPT_TOKENS
+    )
+    fixed_tokens = min(
+        demand.prompt_tokens + demand.image_tokens + system_prompt_tokens + INSTRUCTION_OVERHEAD_TOKENS,
+        content_tokens,
+    )
+    pool = content_tokens - fixed_tokens
+
+    history_need = demand.history_tokens if demand.history_tokens is not None else int(pool * history_share)
+    file_need = demand.file_tokens if demand.file_tokens is not None else int(pool * file_share)
+
+    if history_need + file_need <= pool:
+        # Demands are estimates, so spare room is shared by the sides that need any
+        history_weight = history_share if history_need else 0.0
+        file_weight = file_share if file_need or not history_need else 0.0
+        spare = pool - history_need - file_need
+        history_tokens = history_need + int(spare * history_weight / (history_weight + file_weight))
+        file_tokens = pool - history_tokens
+    else:
+        history_min = min(history_need, int(pool * MIN_HISTORY_SHARE))
+        file_min = min(file_need, int(pool * MIN_FILE_SHARE))
+        remaining = pool - history_min - file_min
+        file_tokens = file_min + min(file_need - file_min, remaining)
+        remaining -= file_tokens - file_min
+        history_tokens = history_min + min(history_need - history_min, remaining)
+
+    return TokenAllocation(
+        total_tokens=total_tokens,
+        content_tokens=content_tokens,
+        response_tokens=response_tokens,
+        file_tokens=file_tokens,
+        history_tokens=history_tokens,
+    )
+
+
 class ModelContext:
     """
     Encapsulates model-specific information and token calculations.
@@ -66,6 +219,7 @@ class ModelContext:
         self._provider = None
         self._capabilities = None
         self._token_allocation = None
+        self.token_demand = TokenDemand()
 
     @property
     def provider(self):
@@ -93,24 +247,32 @@ class ModelContext:
             self._capabilities = self.provider.get_capabilities(self.model_name)
         return self._capabilities
 
+    def record_demand(self, **demands: Any) -> None:
+        """
+        Record what the current request needs from the context window.
+
+        Args:
+            **demands: TokenDemand fields (prompt_tokens, image_tokens,
+                       system_prompt_tokens, history_tokens, file_tokens,
+                       expected_output_tokens)
+        """
+        self.token_demand = dataclasses.replace(self.token_demand, **demands)
+
     def calculate_token_allocation(self, reserved_for_response: Optional[int] = None) -> TokenAllocation:
         """
-        Calculate token allocation based on model capacity and conversation requirements.
+        Plan the token allocation for this model and the recorded request demands.
 
         This method implements the core token budget calculation that supports the
-        dual prioritization strategy used in conversation memory and file processing:
-
-        TOKEN ALLOCATION STRATEGY:
-        1. CONTENT vs RESPONSE SPLIT:
-           - Smaller models (< 300K): 60% content, 40% response (conservative)
-           - Larger models (≥ 300K): 80% content, 20% response (generous)
+        dual prioritization strategy used in conversation memory and file processing.
+        See ``plan_token_allocation`` for the planning rules:
 
-        2. CONTENT SUB-ALLOCATION:
-           - File tokens: 30-40% of content budget for newest file versions
-           - History tokens: 40-50% of content budget for conversation context
-           - Remaining: Available for tool-specific prompt content
+        - The response reservation follows the model's maximum output and the
+          tool's expected output instead of a fixed share of the window
+        - A request without conversation history leaves the whole content
+          budget (after the prompt) to files
+        - History gets what the conversation needs while files still fit
 
-        3. CONVERSATION MEMORY INTEGRATION:
+        CONVERSATION MEMORY INTEGRATION:
            - History allocation enables conversation reconstruction in reconstruct_thread_context()
            - File allocation supports newest-first file prioritization in tools
            - Remaining budget passed to tools via _remaining_tokens parameter
@@ -121,44 +283,20 @@ class ModelContext:
         Returns:
             TokenAllocation with calculated budgets for dual prioritization strategy
         """
-        total_tokens = self.capabilities.context_window
-
-        # Dynamic allocation based on model capacity
-        if total_tokens < 300_000:
-            # Smaller context models (O3): Conservative allocation
-            content_ratio = 0.6  # 60% for content
-            response_ratio = 0.4  # 40% for response
-            file_ratio = 0.3  # 30% of content for files
-            history_ratio = 0.5  # 50% of content for history
-        else:
-            # Larger context models (Gemini): More generous allocation
-            content_ratio = 0.8  # 80% for content
-            response_ratio = 0.2  # 20% for response
-            file_ratio = 0.4  # 40% of content for files
-            history_ratio = 0.4  # 40% of content for history
-
-        # Calculate allocations
-        content_tokens = int(total_tokens * content_ratio)
-        response_tokens = reserved_for_response or int(total_tokens * response_ratio)
-
-        # Sub-allocations within content budget
-        file_tokens = int(content_tokens * file_ratio)
-        history_tokens = int(content_tokens * history_ratio)
-
-        allocation = TokenAllocation(
-            total_tokens=total_tokens,
-            content_tokens=content_tokens,
-            response_tokens=response_tokens,
-            file_tokens=file_tokens,
-            history_tokens=history_tokens,
+        allocation = plan_token_allocation(
+            self.capabilities.context_window,
+            self.token_demand,
+            reserved_for_response=reserved_for_response,
+            max_output_tokens=self.capabilities.max_output_tokens,
         )
 
         logger.debug(f"Token allocation for {self.model_name}:")
         logger.debug(f"  Total: {allocation.total_tokens:,}")
-        logger.debug(f"  Content: {allocation.content_tokens:,} ({content_ratio:.0%})")
-        logger.debug(f"  Response: {allocation.response_tokens:,} ({response_ratio:.0%})")
-        logger.debug(f"  Files: {allocation.file_tokens:,} ({file_ratio:.0%} of content)")
-        logger.debug(f"  History: {allocation.history_tokens:,} ({history_ratio:.0%} of content)")
+        logger.debug(f"  Demand: {self.token_demand}")
+        logger.debug(f"  Content: {allocation.content_tokens:,}")
+        logger.debug(f"  Response: {allocation.response_tokens:,}")
+        logger.debug(f"  Files: {allocation.file_tokens:,}")
+        logger.debug(f"  History: {allocation.history_tokens:,}")
 
         return allocation
 
@@ -0,0 +1,206 @@
+"""
+Spilling of large tool outputs to files
+
+CLI output relayed by clink and long expert analyses (codereview, docgen,
+testgen, ...) can exceed what is reasonable to send back over stdio. Without
+spilling, clink truncates such output to an excerpt and the rest is lost.
+
+With spilling enabled, outputs above the threshold are written to a
+content-addressed file (``<sha256>.txt``) and the response carries a summary
+plus the file path and size, so the agent reads only the parts it needs.
+Identical outputs share one file. Files older than the TTL are removed by a
+sweep that runs at most once per SWEEP_INTERVAL_SECONDS while spilling.
+
+Configuration:
+    PAL_OUTPUT_SPILL_THRESHOLD: characters above which outputs are spilled (default 0 = off)
+    PAL_OUTPUT_SPILL_DIR: directory for spilled outputs (default <tmp>/pal-mcp-outputs)
+    PAL_OUTPUT_SPILL_TTL_HOURS: how long spilled files are kept (default 24)
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from utils.env import get_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_HOURS = 24
+DEFAULT_SUMMARY_CHARS = 2000
+SWEEP_INTERVAL_SECONDS = 600
+SPILL_SUFFIX = ".txt"
+
+_sweep_lock = threading.Lock()
+_last_sweep: dict[str, float] = {}
+
+
+@dataclass(frozen=True)
+class SpilledOutput:
+    """Reference to an output written to disk."""
+
+    path: Path
+    sha256: str
+    chars: int
+    size_bytes: int
+    summary: str
+
+    def reference(self) -> str:
+        """Footer pointing the agent at the full output."""
+        return (
+            f"--- Full output ({self.chars} characters, {self.size_bytes} bytes) saved to {self.path} ---\n"
+            "Read that file for the complete output; it is removed after "
+            f"{get_spill_ttl_hours():g}h."
+        )
+
+    def to_text(self) -> str:
+        """Summary followed by the reference footer."""
+        return f"{self.summary}\n\n{self.reference()}" if self.summary else self.reference()
+
+    def metadata(self) -> dict[str, object]:
+        return {
+            "output_spilled": True,
+            "output_spill_path": str(self.path),
+            "output_spill_bytes": self.size_bytes,
+            "output_original_length": self.chars,
+        }
+
+
+def get_spill_threshold() -> int:
+    """Characters above which outputs are spilled (0 = spilling disabled)."""
+    value = get_env("PAL_OUTPUT_SPILL_THRESHOLD", "0") or "0"
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        logger.warning(f"Invalid PAL_OUTPUT_SPILL_THRESHOLD '{value}', spilling disabled")
+        return 0
+
+
+def is_enabled() -> bool:
+    return get_spill_threshold() > 0
+
+
+def get_spill_dir() -> Path:
+    configured = (get_env("PAL_OUTPUT_SPILL_DIR", "") or "").strip()
+    if configured:
+        return Path(configured).expanduser()
+    return Path(tempfile.gettempdir()) / "pal-mcp-outputs"
+
+
+def get_spill_ttl_hours() -> float:
+    value = get_env("PAL_OUTPUT_SPILL_TTL_HOURS", str(DEFAULT_TTL_HOURS)) or str(DEFAULT_TTL_HOURS)
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        logger.warning(f"Invalid PAL_OUTPUT_SPILL_TTL_HOURS '{value}', using {DEFAULT_TTL_HOURS}")
+        return float(DEFAULT_TTL_HOURS)
+
+
+def summarize(content: str, limit: int = DEFAULT_SUMMARY_CHARS) -> str:
+    """Leading excerpt of ``content``, cut at a line break when one is close to the limit."""
+    if len(content) <= limit:
+        return content
+    excerpt = content[:limit]
+    cut = excerpt.rfind("\n")
+    if cut > limit // 2:
+        excerpt = excerpt[:cut]
+    return f"{excerpt.rstrip()}\n[... {len(content) - len(excerpt)} more characters in the spilled file]"
+
+
+def spill_output(
+    content: str,
+    summary: Optional[str] = None,
+    directory: Optional[Path] = None,
+) -> SpilledOutput:
+    """
+    Write ``content`` to a content-addressed file and return a reference to it.
+
+    Args:
+        content: Full output to keep
+        summary: Text returned in place of the output (defaults to a leading excerpt)
+        directory: Target directory (defaults to PAL_OUTPUT_SPILL_DIR)
+
+    Returns:
+        SpilledOutput: Path, digest, sizes and summary of the spilled output
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    directory = directory or get_spill_dir()
+    data = content.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    path = directory / f"{digest}{SPILL_SUFFIX}"
+
+    directory.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        # Same content already spilled; refresh its TTL
+        os.utime(path)
+    else:
+        # Write to a temporary name first so readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".spill-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    logger.info(f"[SPILL] Wrote {len(content)} characters to {path}")
+    _maybe_sweep(directory)
+    return SpilledOutput(
+        path=path,
+        sha256=digest,
+        chars=len(content),
+        size_bytes=len(data),
+        summary=summarize(content) if summary is None else summary,
+    )
+
+
+def maybe_spill(content: str, summary: Optional[str] = None) -> Optional[SpilledOutput]:
+    """Spill ``content`` if spilling is enabled and it exceeds the threshold; ``None`` otherwise."""
+    threshold = get_spill_threshold()
+    if not threshold or len(content) <= threshold:
+        return None
+    try:
+        return spill_output(content, summary=summary)
+    except OSError as e:
+        logger.warning(f"[SPILL] Could not write output to {get_spill_dir()}: {e}")
+        return None
+
+
+def cleanup_expired(directory: Optional[Path] = None, ttl_seconds: Optional[float] = None) -> int:
+    """Remove spilled files older than the TTL; returns how many were removed."""
+    directory = directory or get_spill_dir()
+    ttl_seconds = get_spill_ttl_hours() * 3600 if ttl_seconds is None else ttl_seconds
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    try:
+        candidates = list(directory.glob(f"*{SPILL_SUFFIX}"))
+    except OSError:
+        return 0
+    for path in candidates:
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    if removed:
+        logger.debug(f"[SPILL] Removed {removed} expired outputs from {directory}")
+    return removed
+
+
+def _maybe_sweep(directory: Path) -> None:
+    now = time.time()
+    key = str(directory)
+    with _sweep_lock:
+        if now - _last_sweep.get(key, 0.0) < SWEEP_INTERVAL_SECONDS:
+            return
+        _last_sweep[key] = now
+    cleanup_expired(directory)
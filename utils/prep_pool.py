@@ -0,0 +1,234 @@
+"""
+Process pool for CPU-heavy prompt preparation
+
+Formatting a file for a prompt (decoding, newline normalization, line
+numbering and token estimation) is pure-Python work that holds the GIL. For
+large embeds (a 150k-line file takes hundreds of milliseconds) every other
+session on the server stalls while it runs, and several large files are
+formatted one after another on a single core.
+
+The request path therefore prefetches large files before the tool runs:
+``prefetch_file_contents()`` awaits their formatting in worker processes via
+``loop.run_in_executor``, so the event loop keeps serving other sessions and
+the files are formatted in parallel. Results are kept for the current request
+(a context variable) together with the file's (mtime, size) signature, and
+the synchronous readers pick them up through ``get_file_content()``. Anything
+not prefetched, or changed since, is formatted inline as before.
+
+Small files are always formatted inline, where shipping the result back
+would cost more than the work itself. Workers are started once, at server
+startup; without a started pool everything is formatted inline.
+
+Configuration:
+    PAL_PREP_WORKERS: worker processes ("auto" = up to 4 based on CPU count,
+        0 disables the pool and formats everything inline)
+    PAL_PREP_INLINE_KB: files up to this size are formatted inline (default 256)
+"""
+
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from utils.env import get_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INLINE_KB = 256
+MAX_AUTO_WORKERS = 4
+
+# Files above the read cap are rejected by read_file_content, so formatting them is pointless
+MAX_PREFETCH_FILE_BYTES = 1_000_000
+
+# Upper bound on file bytes prefetched per request; the token budget will skip the rest anyway
+MAX_PREFETCH_BYTES_PER_REQUEST = 16 * 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# (file_path, include_line_numbers) -> (mtime_ns, size, formatted_content, estimated_tokens)
+_prepared: contextvars.ContextVar[Optional[dict[tuple[str, Optional[bool]], tuple[int, int, str, int]]]] = (
+    contextvars.ContextVar("pal_prepared_files", default=None)
+)
+
+
+def get_worker_count() -> int:
+    """Number of worker processes configured via PAL_PREP_WORKERS (0 = inline only)."""
+    value = (get_env("PAL_PREP_WORKERS", "auto") or "auto").strip().lower()
+    if value == "auto":
+        return min(MAX_AUTO_WORKERS, max((os.cpu_count() or 1) - 1, 0))
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        logger.warning(f"[PREP] Invalid PAL_PREP_WORKERS '{value}', formatting files inline")
+        return 0
+
+
+def get_inline_threshold() -> int:
+    """Largest file size in bytes that is formatted inline."""
+    value = get_env("PAL_PREP_INLINE_KB", str(DEFAULT_INLINE_KB)) or str(DEFAULT_INLINE_KB)
+    try:
+        return max(int(value), 0) * 1024
+    except ValueError:
+        return DEFAULT_INLINE_KB * 1024
+
+
+def _warm_up() -> int:
+    """Worker job: import the formatting code so the first real job does not pay for it."""
+    import utils.file_utils  # noqa: F401
+
+    return os.getpid()
+
+
+def start_prep_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Start the worker processes, once, at server startup.
+
+    Returns:
+        The pool, or None when PAL_PREP_WORKERS disables it
+    """
+    global _pool
+
+    workers = get_worker_count()
+    with _pool_lock:
+        if _pool is not None or workers == 0:
+            return _pool
+        # Spawned workers do not inherit the server's threads and locks
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        for _ in range(workers):
+            _pool.submit(_warm_up)
+        logger.info(f"[PREP] Started prompt preparation pool with {workers} workers")
+        return _pool
+
+
+def get_prep_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the started worker pool, or None when prompt preparation runs inline."""
+    return _pool
+
+
+def shutdown_prep_pool() -> None:
+    """Stop the worker processes."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _format_file(file_path: str, include_line_numbers: Optional[bool]) -> tuple[str, int]:
+    """Worker job: format one file for a prompt and count its tokens."""
+    from utils.file_utils import read_file_content
+
+    return read_file_content(file_path, include_line_numbers=include_line_numbers)
+
+
+def _signature(file_path: str) -> Optional[tuple[int, int]]:
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+def _select_large_files(paths: list[str], threshold: int) -> list[tuple[str, tuple[int, int]]]:
+    """Expand directories and keep unwindowed files worth formatting in a worker."""
+    from utils.file_utils import expand_paths
+    from utils.file_windows import parse_file_reference
+
+    selected = []
+    budget = MAX_PREFETCH_BYTES_PER_REQUEST
+    for file_path in expand_paths(paths):
+        if parse_file_reference(file_path)[1] is not None:
+            # Windows are read via mmap and only format the requested lines
+            continue
+        signature = _signature(file_path)
+        if signature is None or not threshold < signature[1] <= min(MAX_PREFETCH_FILE_BYTES, budget):
+            continue
+        budget -= signature[1]
+        selected.append((file_path, signature))
+    return selected
+
+
+async def prefetch_file_contents(paths: Optional[list[str]], *, include_line_numbers: Optional[bool] = None) -> int:
+    """
+    Format the large files among ``paths`` in the worker pool for the current request.
+
+    Directories are expanded the same way the file readers expand them. The
+    event loop is free while workers run; results are picked up by
+    ``get_file_content()`` later in the same request.
+
+    Args:
+        paths: Absolute file or directory paths the request will embed
+        include_line_numbers: Formatting the readers will ask for
+
+    Returns:
+        int: Number of files formatted in workers
+    """
+    pool = _pool
+    if pool is None or not paths:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    candidates = await loop.run_in_executor(None, _select_large_files, list(paths), get_inline_threshold())
+    if not candidates:
+        return 0
+
+    async def format_in_worker(path: str) -> tuple[str, int]:
+        return await loop.run_in_executor(pool, _format_file, path, include_line_numbers)
+
+    results = await asyncio.gather(*(format_in_worker(path) for path, _ in candidates), return_exceptions=True)
+
+    prepared = dict(_prepared.get() or {})
+    formatted = 0
+    broken = False
+    for (path, signature), result in zip(candidates, results):
+        if isinstance(result, BaseException):
+            # The readers format this file inline instead
+            logger.warning(f"[PREP] Worker failed formatting {path}, formatting inline: {type(result).__name__}")
+            broken = True
+            continue
+        prepared[(path, include_line_numbers)] = (*signature, *result)
+        formatted += 1
+    _prepared.set(prepared)
+
+    if broken:
+        # A crashed worker breaks the whole pool; replace it for later requests
+        _discard_broken_pool(pool)
+        start_prep_pool()
+
+    logger.debug(f"[PREP] Formatted {formatted}/{len(candidates)} large files in worker processes")
+    return formatted
+
+
+def get_file_content(file_path: str, *, include_line_numbers: Optional[bool] = None) -> tuple[str, int]:
+    """
+    Return ``read_file_content(file_path)``, using the prefetched result when it is still current.
+
+    Args:
+        file_path: Absolute file path, optionally with a line window suffix
+        include_line_numbers: Passed through to ``read_file_content``
+
+    Returns:
+        Tuple of (formatted_content, estimated_tokens)
+    """
+    prepared = _prepared.get()
+    if prepared:
+        entry = prepared.get((file_path, include_line_numbers))
+        if entry is not None and entry[:2] == _signature(file_path):
+            return entry[2], entry[3]
+
+    from utils.file_utils import read_file_content
+
+    return read_file_content(file_path, include_line_numbers=include_line_numbers)
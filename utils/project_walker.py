@@ -0,0 +1,386 @@
+"""
+Ignore-aware project walker used by expand_paths
+
+Directory expansion used to walk everything below a path with os.walk and
+only skip hidden entries and the static EXCLUDED_DIRS set, so build outputs,
+data folders and anything else a project lists in .gitignore were still
+walked and, if the extension matched, embedded.
+
+This walker:
+- Honours .gitignore and .ignore files (nested files layer on top of their
+  parents, the last matching rule wins, "!" re-includes) plus the
+  repository's .git/info/exclude, using patterns compiled to regexes once
+  and cached per file mtime
+- Walks with os.scandir so file/directory classification comes from the
+  cached DirEntry data instead of extra stat calls
+- Optionally asks git for the file list (``git ls-files``) inside a work
+  tree, which is the fastest way to enumerate a large monorepo
+
+Set PAL_RESPECT_GITIGNORE=false to fall back to the previous behaviour and
+PAL_GIT_LS_FILES=false to always use the filesystem walk.
+"""
+
+import logging
+import os
+import re
+import subprocess
+from collections.abc import Callable
+from pathlib import Path
+from typing import Optional
+
+from utils.env import get_env_bool
+
+logger = logging.getLogger(__name__)
+
+IGNORE_FILE_NAMES = (".gitignore", ".ignore")
+
+# git ls-files must finish quickly; otherwise the filesystem walk is used
+GIT_LS_FILES_TIMEOUT_SECONDS = 5
+
+
+def is_gitignore_enabled() -> bool:
+    """Return True unless ignore-file handling was disabled via PAL_RESPECT_GITIGNORE."""
+    return get_env_bool("PAL_RESPECT_GITIGNORE", True)
+
+
+def is_git_ls_files_enabled() -> bool:
+    """Return True unless the git ls-files fast path was disabled via PAL_GIT_LS_FILES."""
+    return get_env_bool("PAL_GIT_LS_FILES", True)
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) into a regex fragment."""
+    parts: list[str] = []
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        if char == "*":
+            if pattern.startswith("**", i):
+                if pattern.startswith("**/", i):
+                    parts.append("(?:.*/)?")
+                    i += 3
+                else:
+                    parts.append(".*")
+                    i += 2
+                continue
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[^", i) else i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1 : end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                parts.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < length:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 1
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+class IgnoreRules:
+    """Compiled rules of one ignore file, matched against paths relative to ``base``."""
+
+    def __init__(self, base: str, lines: list[str]):
+        self.base = base
+        # Each rule: (regex, negated, directory_only)
+        self.rules: list[tuple[re.Pattern[str], bool, bool]] = []
+        for raw in lines:
+            line = raw.rstrip("\n").rstrip("\r")
+            # Trailing spaces are ignored unless escaped
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+
+            if "/" in line:
+                # Patterns with a slash are relative to the ignore file's directory
+                regex = "^" + _translate_glob(line.lstrip("/")) + "$"
+            else:
+                regex = "^(?:.*/)?" + _translate_glob(line) + "$"
+            try:
+                self.rules.append((re.compile(regex), negated, directory_only))
+            except re.error:
+                logger.debug(f"[WALK] Ignoring invalid pattern {raw!r} in {base}")
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True (ignored), False (re-included) or None when no rule matches."""
+        result = None
+        for regex, negated, directory_only in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                result = not negated
+        return result
+
+
+_rules_cache: dict[str, tuple[int, Optional[IgnoreRules]]] = {}
+
+
+def _load_rules(path: str, base: str) -> Optional[IgnoreRules]:
+    """Load and compile an ignore file, reusing the compiled rules while its mtime is unchanged."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _rules_cache.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    try:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            rules = IgnoreRules(base, handle.readlines())
+    except OSError:
+        rules = None
+    if rules is not None and not rules.rules:
+        rules = None
+    _rules_cache[path] = (mtime_ns, rules)
+    return rules
+
+
+def _rules_for_directory(
+    directory: str, names: Optional[set[str]] = None, file_names: tuple[str, ...] = IGNORE_FILE_NAMES
+) -> list[IgnoreRules]:
+    rules = []
+    for name in file_names:
+        if names is not None and name not in names:
+            continue
+        loaded = _load_rules(os.path.join(directory, name), directory)
+        if loaded:
+            rules.append(loaded)
+    return rules
+
+
+def find_git_root(path: str) -> Optional[str]:
+    """Return the closest ancestor (or the path itself) that contains a .git entry."""
+    current = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _ancestor_rules(
+    root: str, git_root: Optional[str], file_names: tuple[str, ...] = IGNORE_FILE_NAMES
+) -> list[IgnoreRules]:
+    """Rules from the repository root down to (but excluding) ``root`` itself.
+
+    ``.git/info/exclude`` is included along with .gitignore; pass
+    ``file_names=(".ignore",)`` for just the files git does not apply itself.
+    """
+    if not git_root:
+        return []
+
+    rules = []
+    if ".gitignore" in file_names:
+        exclude = _load_rules(os.path.join(git_root, ".git", "info", "exclude"), git_root)
+        if exclude:
+            rules.append(exclude)
+
+    relative = os.path.relpath(root, git_root)
+    directory = git_root
+    for part in relative.split(os.sep) if relative != "." else []:
+        rules.extend(_rules_for_directory(directory, file_names=file_names))
+        directory = os.path.join(directory, part)
+    return rules
+
+
+def is_ignored(path: str, is_dir: bool, rules: list[IgnoreRules]) -> bool:
+    """Apply layered rules (outermost first) to an absolute path; the last match wins."""
+    ignored = False
+    for rule_set in rules:
+        prefix = rule_set.base.rstrip(os.sep) + os.sep
+        if not path.startswith(prefix):
+            continue
+        relative = path[len(prefix) :].replace(os.sep, "/")
+        result = rule_set.match(relative, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def _accept_file(name: str, extensions: Optional[set[str]]) -> bool:
+    if name.startswith("."):
+        return False
+    return not extensions or os.path.splitext(name)[1].lower() in extensions
+
+
+def _git_ls_files(
+    root: str,
+    git_root: str,
+    extensions: Optional[set[str]],
+    excluded_dirs: set[str],
+    skip_dir: Callable[[Path], bool],
+) -> Optional[list[str]]:
+    """Enumerate tracked and untracked-but-not-ignored files via git, or None on failure."""
+    try:
+        completed = subprocess.run(
+            ["git", "-C", root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            capture_output=True,
+            timeout=GIT_LS_FILES_TIMEOUT_SECONDS,
+            check=False,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"[WALK] git ls-files unavailable for {root}: {type(e).__name__}: {e}")
+        return None
+    if completed.returncode != 0:
+        logger.debug(f"[WALK] git ls-files failed for {root}: {completed.stderr.decode(errors='replace').strip()}")
+        return None
+
+    relative_paths = [p for p in completed.stdout.decode("utf-8", errors="replace").split("\0") if p]
+
+    # git does not know about .ignore files: apply those above root, then any in the listing
+    ignore_rules: dict[str, list[IgnoreRules]] = {}
+    for rule_set in _ancestor_rules(root, git_root, file_names=(".ignore",)):
+        ignore_rules[rule_set.base] = [rule_set]
+    for relative in relative_paths:
+        if os.path.basename(relative) == ".ignore":
+            directory = os.path.join(root, os.path.dirname(relative))
+            loaded = _load_rules(os.path.join(directory, ".ignore"), os.path.normpath(directory))
+            if loaded:
+                ignore_rules[os.path.normpath(directory)] = [loaded]
+
+    skipped_dirs: dict[str, bool] = {}
+
+    def directory_skipped(directory: str) -> bool:
+        cached = skipped_dirs.get(directory)
+        if cached is None:
+            cached = skip_dir(Path(directory))
+            skipped_dirs[directory] = cached
+        return cached
+
+    files = []
+    for relative in relative_paths:
+        parts = relative.split("/")
+        if not _accept_file(parts[-1], extensions):
+            continue
+        if any(part.startswith(".") or part in excluded_dirs for part in parts[:-1]):
+            continue
+
+        full_path = os.path.join(root, *parts)
+        directory = os.path.dirname(full_path)
+        if directory_skipped(directory):
+            continue
+        if ignore_rules:
+            applicable = [
+                rule for base, rules in ignore_rules.items() if full_path.startswith(base + os.sep) for rule in rules
+            ]
+            if applicable and _ignored_with_parents(full_path, root, applicable):
+                continue
+        # --cached also lists files deleted from the work tree
+        if os.path.isfile(full_path):
+            files.append(full_path)
+    return files
+
+
+def _ignored_with_parents(full_path: str, root: str, rules: list[IgnoreRules]) -> bool:
+    """Check a file and each of its parent directories below ``root`` against rules."""
+    if is_ignored(full_path, False, rules):
+        return True
+    directory = os.path.dirname(full_path)
+    while directory.startswith(root + os.sep):
+        if is_ignored(directory, True, rules):
+            return True
+        directory = os.path.dirname(directory)
+    return False
+
+
+def walk_project_files(
+    root: Path,
+    extensions: Optional[set[str]],
+    excluded_dirs: set[str],
+    skip_dir: Callable[[Path], bool],
+) -> list[str]:
+    """
+    List files below a directory, honouring ignore files.
+
+    Hidden entries and ``excluded_dirs`` are always skipped, and ``skip_dir``
+    is consulted for every directory before descending into it.
+
+    Args:
+        root: Validated absolute directory to expand
+        extensions: File extensions to include (None or empty includes everything)
+        excluded_dirs: Directory names that are never descended into
+        skip_dir: Callback returning True for directories to skip entirely
+
+    Returns:
+        Absolute file paths (unsorted)
+    """
+    root_str = str(root)
+    respect_ignores = is_gitignore_enabled()
+    git_root = find_git_root(root_str) if respect_ignores else None
+
+    if git_root and is_git_ls_files_enabled():
+        files = _git_ls_files(root_str, git_root, extensions, excluded_dirs, skip_dir)
+        if files is not None:
+            logger.debug(f"[WALK] git ls-files listed {len(files)} files under {root_str}")
+            return files
+
+    files: list[str] = []
+    base_rules = _ancestor_rules(root_str, git_root) if respect_ignores else []
+    stack: list[tuple[str, list[IgnoreRules]]] = [(root_str, base_rules)]
+
+    while stack:
+        directory, inherited_rules = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError as e:
+            logger.debug(f"[WALK] Cannot scan {directory}: {e}")
+            continue
+
+        rules = inherited_rules
+        if respect_ignores:
+            names = {entry.name for entry in entries}
+            local_rules = _rules_for_directory(directory, names)
+            if local_rules:
+                rules = inherited_rules + local_rules
+
+        for entry in entries:
+            name = entry.name
+            if name.startswith("."):
+                continue
+            try:
+                entry_is_dir = entry.is_dir()
+            except OSError:
+                continue
+
+            if entry_is_dir:
+                # Like os.walk, symlinked directories are not followed
+                if name in excluded_dirs or entry.is_symlink():
+                    continue
+                if rules and is_ignored(entry.path, True, rules):
+                    continue
+                if skip_dir(Path(entry.path)):
+                    logger.debug(f"Skipping MCP directory during traversal: {entry.path}")
+                    continue
+                stack.append((entry.path, rules))
+            elif _accept_file(name, extensions):
+                if rules and is_ignored(entry.path, False, rules):
+                    continue
+                files.append(entry.path)
+
+    return files
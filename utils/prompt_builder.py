@@ -0,0 +1,120 @@
+"""
+Segment-based prompt assembly
+
+Prompts used to be assembled by string concatenation at every layer: file
+content was wrapped in context markers, wrapped again in the request
+template, followed by instructions, and prefixed with conversation history,
+each step copying the full text. For a prompt with a million characters of
+embedded files that meant several full copies alive at once.
+
+A ``PromptBuilder`` collects the pieces as segments instead and joins them
+exactly once, when the prompt is handed to the provider. Each segment may
+carry a label, which gives per-section token accounting (history, files,
+request, instructions) without re-scanning the final prompt.
+"""
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from utils.token_utils import estimate_tokens
+
+
+@dataclass(frozen=True)
+class PromptSegment:
+    """One piece of a prompt, optionally labelled for accounting."""
+
+    text: str
+    label: Optional[str] = None
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+class PromptBuilder:
+    """
+    Rope of prompt segments materialized once.
+
+    Segments are stored by reference, so appending, nesting another builder or
+    copying a builder never copies prompt text. ``build()`` (or ``str()``) joins
+    everything into a single string and caches it until the builder changes.
+    """
+
+    def __init__(self, *parts: Union[str, "PromptBuilder"], label: Optional[str] = None) -> None:
+        self._segments: list[PromptSegment] = []
+        self._built: Optional[str] = None
+        for part in parts:
+            self.add(part, label=label)
+
+    def add(self, part: Union[str, "PromptBuilder"], label: Optional[str] = None) -> "PromptBuilder":
+        """
+        Append text or the segments of another builder.
+
+        Args:
+            part: Text to append, or a builder whose segments are appended
+            label: Accounting label (segments from a nested builder keep their
+                   own label unless they have none)
+
+        Returns:
+            self, for chaining
+        """
+        if isinstance(part, PromptBuilder):
+            for segment in part._segments:
+                self._segments.append(segment if segment.label or not label else PromptSegment(segment.text, label))
+        elif part:
+            self._segments.append(PromptSegment(part, label))
+        else:
+            return self
+        self._built = None
+        return self
+
+    def copy(self) -> "PromptBuilder":
+        """Return an independent builder sharing the same (immutable) segments."""
+        clone = PromptBuilder()
+        clone._segments = list(self._segments)
+        clone._built = self._built
+        return clone
+
+    @property
+    def segments(self) -> list[PromptSegment]:
+        return list(self._segments)
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the segment texts in order without joining them."""
+        return (segment.text for segment in self._segments)
+
+    def __len__(self) -> int:
+        return sum(len(segment.text) for segment in self._segments)
+
+    def __bool__(self) -> bool:
+        return bool(self._segments)
+
+    def token_count(self) -> int:
+        """Estimated tokens of the whole prompt."""
+        return sum(segment.tokens for segment in self._segments)
+
+    def token_breakdown(self) -> dict[str, int]:
+        """Estimated tokens per label (unlabelled glue text is counted as "other")."""
+        breakdown: dict[str, int] = {}
+        for segment in self._segments:
+            label = segment.label or "other"
+            breakdown[label] = breakdown.get(label, 0) + segment.tokens
+        return breakdown
+
+    def build(self) -> str:
+        """Join all segments into the final prompt (cached until the builder changes)."""
+        if self._built is None:
+            self._built = "".join(self.iter_text())
+        return self._built
+
+    def __str__(self) -> str:
+        return self.build()
+
+    def __repr__(self) -> str:
+        return f"PromptBuilder({len(self._segments)} segments, {len(self)} chars)"
+
+
+def materialize(prompt: Union[str, PromptBuilder]) -> str:
+    """Return the prompt text, joining builder segments if needed."""
+    return prompt.build() if isinstance(prompt, PromptBuilder) else prompt
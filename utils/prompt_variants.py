@@ -0,0 +1,123 @@
+"""
+Precompiled system prompt variants
+
+The system prompt sent with a model call is the tool's base prompt (one of the
+large ``systemprompts/*`` strings), plus capability-gated addenda for the
+active model, prefixed with the LOCALE language instruction. It only changes
+when one of those inputs changes, yet it used to be reassembled on every call.
+
+Variants are compiled once per (tool, base prompt, capability flags, language
+instruction) and interned, so every call for the same combination receives
+the same object. Each variant carries a stable digest of its text, usable as a
+cache key (request coalescing keys on it instead of re-hashing the prompt, and
+it gives provider-side prefix caching a stable anchor), and its token count.
+
+Tools must derive ``get_capability_system_prompts`` from the capability flags
+listed in ``CAPABILITY_FLAGS`` only; the flags are part of the variant key.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from utils.token_utils import estimate_tokens
+
+if TYPE_CHECKING:
+    from providers.shared import ModelCapabilities
+
+logger = logging.getLogger(__name__)
+
+# Capability fields that may influence a tool's system prompt
+CAPABILITY_FLAGS = (
+    "supports_extended_thinking",
+    "supports_system_prompts",
+    "supports_function_calling",
+    "supports_images",
+    "supports_json_mode",
+    "supports_temperature",
+    "allow_code_generation",
+)
+
+# Dynamic base prompts (e.g. clink roles) can produce many variants; keep the most recent
+MAX_VARIANTS = 128
+
+_variants: "OrderedDict[tuple, SystemPromptVariant]" = OrderedDict()
+_variants_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SystemPromptVariant:
+    """A compiled system prompt with its stable digest and token count."""
+
+    text: str
+    digest: str
+    tokens: int
+    tool_name: str = ""
+
+    @classmethod
+    def compile(cls, text: str, tool_name: str = "") -> "SystemPromptVariant":
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        return cls(text=text, digest=digest, tokens=estimate_tokens(text), tool_name=tool_name)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __bool__(self) -> bool:
+        return bool(self.text)
+
+
+def capability_flags(capabilities: Optional["ModelCapabilities"]) -> Optional[frozenset[str]]:
+    """Return the enabled prompt-relevant capability flags (None when capabilities are unknown)."""
+    if capabilities is None:
+        return None
+    return frozenset(flag for flag in CAPABILITY_FLAGS if getattr(capabilities, flag, False) is True)
+
+
+def get_system_prompt_variant(tool: Any, capabilities: Optional["ModelCapabilities"]) -> SystemPromptVariant:
+    """
+    Return the interned system prompt for ``tool`` running on a model with ``capabilities``.
+
+    Args:
+        tool: Tool instance (provides the base prompt, capability addenda and
+              language instruction)
+        capabilities: Capabilities of the active model, or None if unknown
+
+    Returns:
+        SystemPromptVariant: The same object for every call with the same inputs
+    """
+    base_prompt = tool.get_system_prompt()
+    language_instruction = tool.get_language_instruction()
+    key = (type(tool), base_prompt, capability_flags(capabilities), language_instruction)
+
+    with _variants_lock:
+        variant = _variants.get(key)
+        if variant is not None:
+            _variants.move_to_end(key)
+            return variant
+
+    tool_name = tool.get_name()
+    text = language_instruction + tool._augment_system_prompt_with_capabilities(base_prompt, capabilities)
+    variant = SystemPromptVariant.compile(text, tool_name)
+    logger.debug(f"[PROMPT] Compiled system prompt for {tool_name}: {variant.digest} (~{variant.tokens:,} tokens)")
+
+    with _variants_lock:
+        # Another caller may have compiled the same variant meanwhile; keep the first one
+        variant = _variants.setdefault(key, variant)
+        _variants.move_to_end(key)
+        while len(_variants) > MAX_VARIANTS:
+            _variants.popitem(last=False)
+    return variant
+
+
+def clear_system_prompt_variants() -> None:
+    """Drop all compiled variants (e.g. after prompt files are reloaded)."""
+    with _variants_lock:
+        _variants.clear()
+
+
+def system_prompt_text(system_prompt: Union[str, SystemPromptVariant, None]) -> Optional[str]:
+    """Return the prompt text of a plain string or compiled variant."""
+    return system_prompt.text if isinstance(system_prompt, SystemPromptVariant) else system_prompt
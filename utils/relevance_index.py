@@ -0,0 +1,415 @@
+"""
+Local lexical relevance index for budget-constrained file selection
+
+When the files requested for a prompt do not fit into the token budget, the
+file readers used to keep whatever came first in sorted (or newest-first)
+order. This module ranks files, and line chunks inside files, against the
+request text using BM25 so the budget is filled with the most relevant
+content first.
+
+Key Features:
+- Identifier-aware tokenization (snake_case and camelCase are split into parts)
+- Chunk-level term statistics so large files can contribute focused excerpts
+- On-disk persistence as one postings record per file (~/.pal/index, override
+  with PAL_INDEX_DIR), so saving after an edit rewrites only the edited files
+  and every project shares the same store
+- Incremental refresh: files whose mtime and size are unchanged are never re-read
+
+Ranking is only applied when a budget would otherwise be exceeded, so prompts
+that fit entirely keep their original, predictable ordering. Set
+PAL_RELEVANCE_RANKING=false to disable ranking altogether.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from utils.env import get_env, get_env_bool
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or tokenization changes so stale indexes are rebuilt
+INDEX_FORMAT_VERSION = 2
+
+# Number of lines per chunk; small enough for focused excerpts, large enough to keep context
+CHUNK_LINES = 60
+
+# Files larger than this are not indexed (they cannot be embedded meaningfully anyway)
+MAX_INDEXED_FILE_BYTES = 10 * 1024 * 1024
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+DEFAULT_INDEX_DIR = Path.home() / ".pal" / "index"
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Words that carry no signal in either prose prompts or source code
+_STOPWORDS = frozenset(
+    {
+        "the",
+        "and",
+        "for",
+        "with",
+        "this",
+        "that",
+        "from",
+        "are",
+        "was",
+        "were",
+        "what",
+        "how",
+        "why",
+        "can",
+        "you",
+        "your",
+        "please",
+        "into",
+        "not",
+        "but",
+        "all",
+        "any",
+        "its",
+        "our",
+        "has",
+        "have",
+        "does",
+        "should",
+        "would",
+        "could",
+        "there",
+        "then",
+        "than",
+        "when",
+        "which",
+        "where",
+        "self",
+        "none",
+        "true",
+        "false",
+        "return",
+        "import",
+        "def",
+        "class",
+    }
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase search terms.
+
+    Identifiers are kept whole and additionally split into their snake_case /
+    camelCase parts, so a prompt mentioning "token budget" matches code that
+    says ``calculateTokenBudget`` or ``token_budget``.
+
+    Args:
+        text: Free text or source code
+
+    Returns:
+        list[str]: Terms in order of appearance (duplicates preserved)
+    """
+    terms: list[str] = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if len(lower) >= 2 and lower not in _STOPWORDS:
+            terms.append(lower)
+        parts = _SUBWORD_RE.findall(word)
+        if len(parts) > 1:
+            for part in parts:
+                part_lower = part.lower()
+                if len(part_lower) >= 2 and part_lower != lower and part_lower not in _STOPWORDS:
+                    terms.append(part_lower)
+    return terms
+
+
+def is_ranking_enabled() -> bool:
+    """Return True unless relevance ranking was disabled via PAL_RELEVANCE_RANKING."""
+    return get_env_bool("PAL_RELEVANCE_RANKING", True)
+
+
+def get_index_dir() -> Path:
+    """Return the directory used to persist lexical indexes."""
+    configured = (get_env("PAL_INDEX_DIR", "") or "").strip()
+    return Path(configured).expanduser() if configured else DEFAULT_INDEX_DIR
+
+
+@dataclass
+class ChunkMatch:
+    """A scored line range inside an indexed file (1-based, inclusive)."""
+
+    path: str
+    start_line: int
+    end_line: int
+    score: float
+
+
+def _count_terms(lines: list[str]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for term in tokenize("\n".join(lines)):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def _build_file_entry(path: str, stat_result: os.stat_result) -> dict:
+    """Tokenize a file into chunk records: [start_line, end_line, length, term_counts]."""
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        text = handle.read()
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        window = lines[start : start + CHUNK_LINES]
+        counts = _count_terms(window)
+        chunks.append([start + 1, start + len(window), sum(counts.values()), counts])
+
+    return {
+        "path": path,
+        "mtime_ns": stat_result.st_mtime_ns,
+        "size": stat_result.st_size,
+        "lines": len(lines),
+        "chunks": chunks,
+    }
+
+
+class LexicalIndex:
+    """
+    BM25 index over individual files, shared by every project in the process.
+
+    Entries are keyed by absolute file path and carry the (mtime_ns, size)
+    signature they were built from. ``refresh()`` only re-tokenizes files
+    whose signature changed, which keeps repeated calls on large repositories
+    cheap. Corpus statistics (document frequency, average chunk length) are
+    computed over the candidate files of each query, so scores reflect the
+    set of files actually competing for the budget.
+
+    Each file's postings are persisted in a record of their own and loaded
+    the first time the file is a candidate, so neither loading nor saving
+    touches files outside the current request.
+    """
+
+    def __init__(self, index_dir: Optional[Path] = None):
+        self.index_dir = (index_dir or get_index_dir()) / f"v{INDEX_FORMAT_VERSION}"
+        self._entries: dict[str, Optional[dict]] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    def entry_path(self, path: str) -> Path:
+        """Return the on-disk record holding the postings of one file."""
+        digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return self.index_dir / digest[:2] / f"{digest}.json"
+
+    def _entry(self, path: str) -> Optional[dict]:
+        """Return the entry for a file, loading its persisted record on first use (caller holds the lock)."""
+        if path in self._entries:
+            return self._entries[path]
+
+        entry = None
+        try:
+            with open(self.entry_path(path), encoding="utf-8") as handle:
+                data = json.load(handle)
+            # Guard against digest collisions and hand-edited records
+            if data.get("path") == path:
+                entry = data
+        except (OSError, ValueError):
+            pass
+        self._entries[path] = entry
+        return entry
+
+    def save(self) -> None:
+        """Persist the records of files re-indexed or removed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            records = {path: self._entries.get(path) for path in dirty}
+
+        written = 0
+        for path, entry in records.items():
+            record_path = self.entry_path(path)
+            try:
+                if entry is None:
+                    record_path.unlink(missing_ok=True)
+                    continue
+                record_path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=record_path.parent, prefix=".entry-", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                    json.dump(entry, handle, separators=(",", ":"))
+                os.replace(tmp_path, record_path)
+                written += 1
+            except OSError as e:
+                # Persistence is an optimization only; keep working from memory
+                logger.debug(f"[INDEX] Could not persist index entry for {path}: {e}")
+
+        logger.debug(f"[INDEX] Saved {written} of {len(records)} changed index entries to {self.index_dir}")
+
+    def refresh(self, files: list[str]) -> int:
+        """
+        Bring index entries for the given files up to date.
+
+        Args:
+            files: Absolute file paths to (re-)index when changed
+
+        Returns:
+            int: Number of files that had to be re-tokenized
+        """
+        updated = 0
+        with self._lock:
+            for path in files:
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    if self._entry(path) is not None:
+                        self._entries[path] = None
+                        self._dirty.add(path)
+                    continue
+
+                entry = self._entry(path)
+                if (
+                    entry
+                    and entry.get("mtime_ns") == stat_result.st_mtime_ns
+                    and entry.get("size") == stat_result.st_size
+                ):
+                    continue
+
+                if stat_result.st_size > MAX_INDEXED_FILE_BYTES:
+                    if entry is not None:
+                        self._entries[path] = None
+                        self._dirty.add(path)
+                    continue
+
+                try:
+                    self._entries[path] = _build_file_entry(path, stat_result)
+                except OSError as e:
+                    logger.debug(f"[INDEX] Failed to index {path}: {e}")
+                    continue
+                self._dirty.add(path)
+                updated += 1
+
+        if updated:
+            logger.debug(f"[INDEX] Re-indexed {updated}/{len(files)} files")
+        return updated
+
+    def score_chunks(self, query: str, files: list[str]) -> list[ChunkMatch]:
+        """
+        Score every chunk of the given (already refreshed) files against a query.
+
+        Args:
+            query: Request text to rank against
+            files: Candidate files; only these contribute to corpus statistics
+
+        Returns:
+            list[ChunkMatch]: Chunks with a positive score, best first
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            candidates = [(path, self._entries[path]) for path in files if self._entries.get(path)]
+
+        total_chunks = 0
+        total_length = 0
+        doc_freq = dict.fromkeys(query_terms, 0)
+        for _, entry in candidates:
+            for _start, _end, length, counts in entry["chunks"]:
+                total_chunks += 1
+                total_length += length
+                for term in query_terms:
+                    if term in counts:
+                        doc_freq[term] += 1
+
+        if not total_chunks:
+            return []
+
+        avg_length = total_length / total_chunks or 1.0
+        idf = {term: math.log(1 + (total_chunks - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items() if df > 0}
+        if not idf:
+            return []
+
+        matches: list[ChunkMatch] = []
+        for path, entry in candidates:
+            for start, end, length, counts in entry["chunks"]:
+                score = 0.0
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                for term, term_idf in idf.items():
+                    tf = counts.get(term)
+                    if tf:
+                        score += term_idf * tf * (BM25_K1 + 1) / (tf + norm)
+                if score > 0:
+                    matches.append(ChunkMatch(path, start, end, score))
+
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> LexicalIndex:
+    """Return the process-wide lexical index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex()
+        return _index
+
+
+def clear_index_cache() -> None:
+    """Drop the in-process index instance (persisted records are left untouched)."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def rank_by_relevance(files: list[str], query: Optional[str]) -> tuple[list[str], dict[str, list[ChunkMatch]]]:
+    """
+    Order files by relevance to a query.
+
+    File score is the sum of its three best chunk scores, which favours files
+    with several strongly matching regions over files with a single mention.
+    Files without any match keep their original relative order after all
+    matching files, so the caller's fallback ordering (alphabetical or
+    newest-first) still applies to them.
+
+    Args:
+        files: Absolute file paths in the caller's fallback order
+        query: Request text (prompt / step); ranking is skipped when empty
+
+    Returns:
+        tuple: (ordered_files, chunk_matches_by_file) - the second element maps
+        each matching file to its positively scored chunks, best first
+    """
+    if not files or not query or not query.strip() or not is_ranking_enabled():
+        return list(files), {}
+
+    try:
+        index = get_index()
+        index.refresh(files)
+        matches = index.score_chunks(query, files)
+        index.save()
+    except Exception as e:
+        logger.warning(f"[INDEX] Relevance ranking failed, keeping original order: {type(e).__name__}: {e}")
+        return list(files), {}
+
+    chunks_by_file: dict[str, list[ChunkMatch]] = {}
+    for match in matches:
+        chunks_by_file.setdefault(match.path, []).append(match)
+
+    file_scores = {path: sum(m.score for m in chunks[:3]) for path, chunks in chunks_by_file.items()}
+    position = {path: i for i, path in enumerate(files)}
+    ordered = sorted(files, key=lambda path: (-file_scores.get(path, 0.0), position[path]))
+
+    logger.debug(f"[INDEX] Ranked {len(files)} files against query; {len(file_scores)} matched, top: {ordered[:3]}")
+    return ordered, chunks_by_file
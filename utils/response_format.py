@@ -0,0 +1,101 @@
+"""
+Encoding of tool responses sent back to the MCP client
+
+Workflow responses are JSON documents that the agent reads on every step.
+Pretty-printed, and repeating the same guidance (required actions, next
+steps, file context notes, metadata) step after step, they spend client-side
+tokens and count against MAX_MCP_OUTPUT_TOKENS without telling the agent
+anything new.
+
+In compact mode responses are minified, guidance fields identical to the
+previous step of the same thread are dropped (their names are listed under
+``omitted_unchanged``) and callers may select the fields they want back.
+
+Configuration:
+    PAL_RESPONSE_FORMAT: pretty (default, indented JSON) or compact
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from utils.env import get_env
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_FORMATS = ("pretty", "compact")
+
+# Fields that tend to repeat verbatim between workflow steps
+REPEATABLE_FIELDS = ("required_actions", "next_steps", "file_context", "metadata")
+
+# Fields an agent needs to continue the workflow, kept even when not selected
+ESSENTIAL_FIELDS = (
+    "status",
+    "continuation_id",
+    "step_number",
+    "total_steps",
+    "next_step_required",
+    "omitted_unchanged",
+)
+
+
+def get_response_format() -> str:
+    """Return the configured response format ("pretty" or "compact")."""
+    value = (get_env("PAL_RESPONSE_FORMAT", "pretty") or "pretty").strip().lower()
+    if value not in RESPONSE_FORMATS:
+        logger.warning(f"Invalid PAL_RESPONSE_FORMAT '{value}', using pretty")
+        return "pretty"
+    return value
+
+
+def is_compact() -> bool:
+    return get_response_format() == "compact"
+
+
+def dumps(data: Any) -> str:
+    """Serialize a response in the configured format."""
+    if is_compact():
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def field_digests(data: dict[str, Any], fields: Iterable[str] = REPEATABLE_FIELDS) -> dict[str, str]:
+    """Stable digests of the repeatable fields present in ``data``."""
+    digests = {}
+    for field in fields:
+        if field in data:
+            encoded = json.dumps(data[field], sort_keys=True, ensure_ascii=False, default=str)
+            digests[field] = hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+    return digests
+
+
+def omit_unchanged_fields(data: dict[str, Any], previous: Optional[dict[str, str]]) -> list[str]:
+    """
+    Drop repeatable fields whose content matches the previous step.
+
+    Args:
+        data: Response to trim (modified in place)
+        previous: Digests recorded for the previous step (``field_digests``)
+
+    Returns:
+        Names of the omitted fields (also listed under ``omitted_unchanged``)
+    """
+    if not previous:
+        return []
+
+    omitted = [field for field, digest in field_digests(data).items() if previous.get(field) == digest]
+    for field in omitted:
+        del data[field]
+    if omitted:
+        data["omitted_unchanged"] = omitted
+    return omitted
+
+
+def select_fields(data: dict[str, Any], fields: Optional[Iterable[str]]) -> dict[str, Any]:
+    """Keep only the requested top-level fields (plus the ones needed to continue)."""
+    if not fields:
+        return data
+    wanted = set(fields).union(ESSENTIAL_FIELDS)
+    return {key: value for key, value in data.items() if key in wanted}
@@ -0,0 +1,187 @@
+"""
+Single-flight coalescing of identical in-flight model calls
+
+Agents often retry a tool call after a client-side timeout, and parallel
+subagents regularly send the very same chat/analyze request. Every duplicate
+used to trigger its own full generate_content call while the original was
+still running, multiplying provider spend and queueing.
+
+Model calls are keyed on the normalized request (tool, provider, model,
+prompts, temperature, thinking mode, images and the referenced files with
+their mtimes). While a call with the same key is in flight, further callers
+await the same result instead of issuing another request. The shared call
+runs in a worker thread and is shielded from caller cancellation, so a
+retry after a client timeout joins the original call rather than starting
+over.
+
+Coalescing is on by default; set PAL_REQUEST_COALESCING=false to disable it,
+or override ``BaseTool.supports_request_coalescing()`` for a single tool.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import weakref
+from collections.abc import Awaitable, Iterable
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+from utils.env import get_env_bool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def is_coalescing_enabled() -> bool:
+    """Return True unless request coalescing was disabled via PAL_REQUEST_COALESCING."""
+    return get_env_bool("PAL_REQUEST_COALESCING", True)
+
+
+def _path_signature(path: str) -> list:
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return [path, None, None]
+    return [path, stat_result.st_mtime_ns, stat_result.st_size]
+
+
+def request_key(
+    *,
+    tool_name: str,
+    provider: str,
+    model_name: str,
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: Optional[float] = None,
+    thinking_mode: Optional[str] = None,
+    images: Optional[Iterable[str]] = None,
+    files: Optional[Iterable[str]] = None,
+    extra: Optional[dict[str, Any]] = None,
+) -> str:
+    """Build the coalescing key for a model call."""
+    digest = hashlib.sha256()
+    header = {
+        "tool": tool_name,
+        "provider": provider,
+        "model": model_name,
+        "temperature": temperature,
+        "thinking_mode": thinking_mode,
+        # Data URLs are hashed as part of the header; paths are pinned to their current version
+        "images": [
+            image if image.startswith("data:") else _path_signature(image) for image in sorted(set(images or []))
+        ],
+        "files": [_path_signature(path) for path in sorted(set(files or []))],
+        "extra": extra or {},
+    }
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+    for part in (system_prompt or "", prompt):
+        digest.update(b"\0")
+        digest.update(part.encode("utf-8", errors="replace"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CoalescingStats:
+    """Counters for one tool."""
+
+    calls: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+
+
+class SingleFlight:
+    """Share one in-flight result between concurrent callers with the same key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, CoalescingStats] = {}
+        # Tasks belong to one event loop; tests and embedded clients may run several
+        self._inflight: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Task]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[T]],
+        *,
+        label: str = "default",
+        clone: Optional[Callable[[T], T]] = None,
+    ) -> T:
+        """
+        Await ``factory()`` or join the identical call already in flight.
+
+        Args:
+            key: Coalescing key (see ``request_key``)
+            factory: Starts the call when nothing with this key is running
+            label: Name used for metrics (usually the tool name)
+            clone: Copies the shared result for callers that joined, so no two
+                   callers mutate the same object
+
+        Returns:
+            The call's result
+        """
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+
+        with self._lock:
+            stats = self._stats.setdefault(label, CoalescingStats())
+            stats.calls += 1
+            task = inflight.get(key)
+            joined = task is not None
+            if joined:
+                stats.coalesced += 1
+            else:
+                task = loop.create_task(self._lead(factory))
+                inflight[key] = task
+                stats.in_flight += 1
+                task.add_done_callback(lambda done: self._finish(inflight, key, done, stats))
+
+        if joined:
+            logger.info(f"[COALESCE] {label}: joined identical in-flight model call")
+
+        # Shielded so a caller that gives up (e.g. client timeout) does not cancel the shared call
+        result = await asyncio.shield(task)
+        if joined and clone is not None:
+            return clone(result)
+        return result
+
+    @staticmethod
+    async def _lead(factory: Callable[[], Awaitable[T]]) -> T:
+        return await factory()
+
+    def _finish(self, inflight: dict, key: str, task: asyncio.Task, stats: CoalescingStats) -> None:
+        with self._lock:
+            if inflight.get(key) is task:
+                del inflight[key]
+            stats.in_flight -= 1
+        if not task.cancelled():
+            # Retrieve the exception so abandoned calls do not log "never retrieved" warnings
+            task.exception()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-tool call, coalesced and in-flight counts."""
+        with self._lock:
+            return {label: asdict(stats) for label, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """Forget metrics (in-flight calls keep running)."""
+        with self._lock:
+            self._stats.clear()
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide coalescer for model calls."""
+    return _single_flight
+
+
+def coalescing_stats() -> dict[str, dict[str, int]]:
+    """Metrics on coalesced model calls, keyed by tool name."""
+    return _single_flight.stats()
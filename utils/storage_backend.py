@@ -11,89 +11,291 @@ conversations only need to persist during a single Claude session.
     share conversation state between tool calls.
 
 Key Features:
-- Thread-safe operations using locks
-- TTL support with automatic expiration
-- Background cleanup thread for memory management
+- Thread-safe operations using striped locks (readers of one thread never wait
+  on writers or cleanup of another)
+- TTL support with automatic expiration driven by a min-heap of deadlines, so
+  cleanup only touches entries that are actually due
+- Per-entry byte accounting with a memory ceiling; the least recently used
+  threads are evicted when it is exceeded
+- Transparent compression of large payloads (see utils.storage_compression)
 - Singleton pattern for consistent state within a single process
 - Drop-in replacement for Redis storage (for single-process scenarios)
+
+Configuration:
+    PAL_STORAGE_MAX_MB: memory ceiling for stored threads (default 256, 0 = unbounded)
 """
 
+import heapq
+import itertools
 import logging
+import sys
 import threading
 import time
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Union
 
 from utils.env import get_env
+from utils.storage_compression import PayloadCodec
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_MB = 256
+LOCK_STRIPES = 16
+# Every write gets a new version, unique across storage instances, so callers can keep
+# a decoded copy of a value and check it is still current without reading it again
+_write_versions = itertools.count(1)
+
+
+@dataclass
+class _Entry:
+    value: Union[str, bytes]
+    expires_at: float
+    size: int
+    last_access: int
+    version: int
+
+
+class _Stripe:
+    """One lock-protected shard of the store, ordered from least to most recently used."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, _Entry] = OrderedDict()
+
+
+def get_max_bytes() -> int:
+    """Memory ceiling in bytes configured via PAL_STORAGE_MAX_MB (0 = unbounded)."""
+    value = get_env("PAL_STORAGE_MAX_MB", str(DEFAULT_MAX_MB)) or str(DEFAULT_MAX_MB)
+    try:
+        return max(int(value), 0) * 1024 * 1024
+    except ValueError:
+        logger.warning(f"Invalid PAL_STORAGE_MAX_MB '{value}', using {DEFAULT_MAX_MB}MB")
+        return DEFAULT_MAX_MB * 1024 * 1024
+
 
 class InMemoryStorage:
     """Thread-safe in-memory storage for conversation threads"""
 
-    def __init__(self):
-        self._store: dict[str, tuple[str, float]] = {}
-        self._lock = threading.Lock()
+    def __init__(self, max_bytes: Optional[int] = None, codec: Optional[PayloadCodec] = None):
+        self._stripes = [_Stripe() for _ in range(LOCK_STRIPES)]
+        self._max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+        self._codec = codec or PayloadCodec.from_env()
+        # Logical clock for recency, so eviction order never depends on timer resolution
+        self._access_clock = itertools.count()
+
+        # Expiry index: (expires_at, key). Refreshing a TTL leaves the old deadline
+        # behind; it is recognised as stale when popped and skipped.
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._heap_lock = threading.Lock()
+
+        # Byte accounting across all stripes
+        self._accounting_lock = threading.Lock()
+        self._total_bytes = 0
+        self._evictions = 0
+
         # Match Redis behavior: cleanup interval based on conversation timeout
         # Run cleanup at 1/10th of timeout interval (e.g., 18 mins for 3 hour timeout)
         timeout_hours = int(get_env("CONVERSATION_TIMEOUT_HOURS", "3") or "3")
         self._cleanup_interval = (timeout_hours * 3600) // 10
         self._cleanup_interval = max(300, self._cleanup_interval)  # Minimum 5 minutes
-        self._shutdown = False
+        self._shutdown = threading.Event()
 
         # Start background cleanup thread
         self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
         self._cleanup_thread.start()
 
+        ceiling = f"{self._max_bytes // (1024 * 1024)}MB ceiling" if self._max_bytes else "no memory ceiling"
         logger.info(
-            f"In-memory storage initialized with {timeout_hours}h timeout, cleanup every {self._cleanup_interval//60}m"
+            f"In-memory storage initialized with {timeout_hours}h timeout, {ceiling}, "
+            f"cleanup at most every {self._cleanup_interval//60}m"
+        )
+
+    def _stripe(self, key: str) -> _Stripe:
+        return self._stripes[hash(key) % LOCK_STRIPES]
+
+    def _account(self, delta: int) -> None:
+        with self._accounting_lock:
+            self._total_bytes += delta
+
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> int:
+        """Store value with expiration time and return its write version"""
+        now = time.time()
+        expires_at = now + ttl_seconds
+        # Compress outside the locks; only the stored form counts against the ceiling
+        stored = self._codec.encode(value)
+        entry = _Entry(
+            value=stored,
+            expires_at=expires_at,
+            size=sys.getsizeof(stored),
+            last_access=next(self._access_clock),
+            version=next(_write_versions),
         )
 
-    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
-        """Store value with expiration time"""
-        with self._lock:
-            expires_at = time.time() + ttl_seconds
-            self._store[key] = (value, expires_at)
-            logger.debug(f"Stored key {key} with TTL {ttl_seconds}s")
+        stripe = self._stripe(key)
+        with stripe.lock:
+            previous = stripe.entries.pop(key, None)
+            stripe.entries[key] = entry
+        self._account(entry.size - (previous.size if previous else 0))
+
+        with self._heap_lock:
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            # Refreshed TTLs leave stale deadlines behind; rebuild once they dominate
+            if len(self._expiry_heap) > 2 * len(self) + 64:
+                self._compact_heap()
+
+        logger.debug(f"Stored key {key} with TTL {ttl_seconds}s ({entry.size} bytes)")
+        self._enforce_memory_limit(keep=key)
+        return entry.version
 
     def get(self, key: str) -> Optional[str]:
         """Retrieve value if not expired"""
-        with self._lock:
-            if key in self._store:
-                value, expires_at = self._store[key]
-                if time.time() < expires_at:
-                    logger.debug(f"Retrieved key {key}")
-                    return value
-                else:
-                    # Clean up expired entry
-                    del self._store[key]
-                    logger.debug(f"Key {key} expired and removed")
-        return None
-
-    def setex(self, key: str, ttl_seconds: int, value: str) -> None:
+        entry = self._lookup(key)
+        return self._codec.decode(entry.value) if entry else None
+
+    def get_versioned(self, key: str, known_version: Optional[int] = None) -> tuple[Optional[str], Optional[int]]:
+        """
+        Retrieve value and write version if not expired
+
+        The value is not decoded, and None is returned in its place, when the entry
+        still has known_version. The version is None for missing or expired keys.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None, None
+        if entry.version == known_version:
+            return None, entry.version
+        return self._codec.decode(entry.value), entry.version
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        """Return the live entry for key, refreshing its recency, or drop it if expired"""
+        stripe = self._stripe(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is None:
+                return None
+            if time.time() < entry.expires_at:
+                entry.last_access = next(self._access_clock)
+                stripe.entries.move_to_end(key)
+                expired = False
+            else:
+                # Clean up expired entry
+                del stripe.entries[key]
+                expired = True
+        if expired:
+            self._account(-entry.size)
+            logger.debug(f"Key {key} expired and removed")
+            return None
+        logger.debug(f"Retrieved key {key}")
+        return entry
+
+    def setex(self, key: str, ttl_seconds: int, value: str) -> int:
         """Redis-compatible setex method"""
-        self.set_with_ttl(key, ttl_seconds, value)
+        return self.set_with_ttl(key, ttl_seconds, value)
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        for stripe in self._stripes:
+            with stripe.lock:
+                freed = sum(entry.size for entry in stripe.entries.values())
+                stripe.entries.clear()
+            self._account(-freed)
+        with self._heap_lock:
+            self._expiry_heap.clear()
+
+    def __len__(self) -> int:
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def stats(self) -> dict[str, int]:
+        """Entry count, stored bytes, memory ceiling and evictions so far"""
+        with self._accounting_lock:
+            total_bytes, evictions = self._total_bytes, self._evictions
+        return {"entries": len(self), "bytes": total_bytes, "max_bytes": self._max_bytes, "evictions": evictions}
+
+    def _compact_heap(self) -> None:
+        """Rebuild the expiry heap from live entries (caller holds the heap lock)"""
+        live = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                live.extend((entry.expires_at, key) for key, entry in stripe.entries.items())
+        heapq.heapify(live)
+        self._expiry_heap = live
+
+    def _enforce_memory_limit(self, keep: str) -> None:
+        """Evict least recently used threads until stored bytes fit the ceiling"""
+        if not self._max_bytes:
+            return
+
+        evicted = 0
+        while self._total_bytes > self._max_bytes:
+            # Each stripe's head is its coldest entry; the coldest head is globally coldest
+            coldest: Optional[tuple[int, str, _Stripe]] = None
+            for stripe in self._stripes:
+                with stripe.lock:
+                    for key, entry in stripe.entries.items():
+                        if key != keep:
+                            if coldest is None or entry.last_access < coldest[0]:
+                                coldest = (entry.last_access, key, stripe)
+                            break
+            if coldest is None:
+                # Only the entry just written is left; a single thread may exceed the ceiling
+                break
+
+            _, key, stripe = coldest
+            with stripe.lock:
+                entry = stripe.entries.pop(key, None)
+            if entry is not None:
+                self._account(-entry.size)
+                evicted += 1
+
+        if evicted:
+            with self._accounting_lock:
+                self._evictions += evicted
+            logger.info(
+                f"Evicted {evicted} least recently used conversation threads to stay under "
+                f"{self._max_bytes // (1024 * 1024)}MB"
+            )
+
+    def _next_deadline(self) -> Optional[float]:
+        with self._heap_lock:
+            return self._expiry_heap[0][0] if self._expiry_heap else None
 
     def _cleanup_worker(self):
-        """Background thread that periodically cleans up expired entries"""
-        while not self._shutdown:
-            time.sleep(self._cleanup_interval)
+        """Background thread that removes entries as their deadlines pass"""
+        while not self._shutdown.is_set():
+            deadline = self._next_deadline()
+            wait = self._cleanup_interval if deadline is None else deadline - time.time()
+            # Wake at the next deadline, but never sleep longer than the cleanup interval
+            if self._shutdown.wait(min(max(wait, 1.0), self._cleanup_interval)):
+                break
             self._cleanup_expired()
 
     def _cleanup_expired(self):
         """Remove all expired entries"""
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [k for k, (_, exp) in self._store.items() if exp < current_time]
-            for key in expired_keys:
-                del self._store[key]
+        now = time.time()
+        due: list[tuple[float, str]] = []
+        with self._heap_lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                due.append(heapq.heappop(self._expiry_heap))
+
+        removed = 0
+        for expires_at, key in due:
+            stripe = self._stripe(key)
+            with stripe.lock:
+                entry = stripe.entries.get(key)
+                # Skip deadlines that were superseded by a later write
+                if entry is None or entry.expires_at != expires_at:
+                    continue
+                del stripe.entries[key]
+            self._account(-entry.size)
+            removed += 1
 
-            if expired_keys:
-                logger.debug(f"Cleaned up {len(expired_keys)} expired conversation threads")
+        if removed:
+            logger.debug(f"Cleaned up {removed} expired conversation threads")
 
     def shutdown(self):
         """Graceful shutdown of background thread"""
-        self._shutdown = True
+        self._shutdown.set()
         if self._cleanup_thread.is_alive():
             self._cleanup_thread.join(timeout=1)
 
@@ -0,0 +1,183 @@
+"""
+Transparent compression of stored conversation payloads
+
+Thread JSON holds full assistant responses, workflow output and the original
+request arguments, and it stays resident for the whole conversation TTL.
+That text compresses several-fold, so the storage layer compresses payloads
+above a size threshold and decompresses them on read; callers (and the
+``ThreadContext`` API) only ever see strings.
+
+zstd is used when the optional ``zstandard`` package is installed, zlib
+otherwise. A shared dictionary trained on typical turn payloads can be
+supplied to improve the ratio for small and medium threads; see
+``train_dictionary``.
+
+Stored format: ``b"PZ"`` + codec byte (``z`` zlib, ``s`` zstd) + 4-byte id
+of the dictionary used (0 = none) + compressed UTF-8 payload. Values below
+the threshold, or that do not shrink, are stored as plain strings.
+
+Configuration:
+    PAL_STORAGE_COMPRESSION: auto (zstd if available, else zlib), zstd, zlib or off
+    PAL_STORAGE_COMPRESSION_MIN_BYTES: smallest payload that is compressed (default 2048)
+    PAL_STORAGE_COMPRESSION_DICT: path to a dictionary created with ``train_dictionary``
+"""
+
+import logging
+import re
+import zlib
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional, Union
+
+from utils.env import get_env
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PZ"
+HEADER_SIZE = len(MAGIC) + 1 + 4
+DEFAULT_MIN_BYTES = 2048
+DEFAULT_DICT_SIZE = 32 * 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Only keep compressed form when it saves at least this fraction
+MIN_SAVINGS = 0.1
+
+_FRAGMENT_BOUNDARY = re.compile(rb"(?<=[,{}\[\]\n])")
+
+
+def _dictionary_id(dictionary: Optional[bytes]) -> int:
+    # 0 is reserved for "no dictionary"
+    return (zlib.crc32(dictionary) or 1) if dictionary else 0
+
+
+class PayloadCodec:
+    """Compress and decompress stored payloads with an optional shared dictionary."""
+
+    def __init__(self, algorithm: str = "auto", min_bytes: int = DEFAULT_MIN_BYTES, dictionary: Optional[bytes] = None):
+        if algorithm == "auto":
+            algorithm = "zstd" if zstandard is not None else "zlib"
+        if algorithm == "zstd" and zstandard is None:
+            logger.warning("PAL_STORAGE_COMPRESSION=zstd but zstandard is not installed, using zlib")
+            algorithm = "zlib"
+        if algorithm not in ("zstd", "zlib", "off"):
+            raise ValueError(f"Unknown storage compression '{algorithm}' (expected auto, zstd, zlib or off)")
+
+        self.algorithm = algorithm
+        self.min_bytes = min_bytes
+        self.dictionary = dictionary
+        self.dictionary_id = _dictionary_id(dictionary)
+
+        self._zstd_dict = None
+        if algorithm == "zstd" and dictionary:
+            self._zstd_dict = zstandard.ZstdCompressionDict(dictionary)
+
+    @classmethod
+    def from_env(cls) -> "PayloadCodec":
+        algorithm = (get_env("PAL_STORAGE_COMPRESSION", "auto") or "auto").strip().lower()
+        if algorithm not in ("auto", "zstd", "zlib", "off"):
+            logger.warning(f"Invalid PAL_STORAGE_COMPRESSION '{algorithm}', using auto")
+            algorithm = "auto"
+        try:
+            min_bytes = int(get_env("PAL_STORAGE_COMPRESSION_MIN_BYTES", str(DEFAULT_MIN_BYTES)) or DEFAULT_MIN_BYTES)
+        except ValueError:
+            min_bytes = DEFAULT_MIN_BYTES
+
+        dictionary = None
+        dict_path = (get_env("PAL_STORAGE_COMPRESSION_DICT", "") or "").strip()
+        if dict_path and algorithm != "off":
+            try:
+                dictionary = Path(dict_path).expanduser().read_bytes()
+            except OSError as e:
+                logger.warning(f"Could not read compression dictionary {dict_path}: {e}")
+        return cls(algorithm=algorithm, min_bytes=max(min_bytes, 0), dictionary=dictionary)
+
+    def encode(self, value: str) -> Union[str, bytes]:
+        """Return the stored form of ``value`` (compressed bytes, or the string itself)."""
+        if self.algorithm == "off" or len(value) < self.min_bytes:
+            return value
+
+        data = value.encode("utf-8")
+        if self.algorithm == "zstd":
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict)
+            payload, codec = compressor.compress(data), b"s"
+        else:
+            if self.dictionary:
+                compressor = zlib.compressobj(ZLIB_LEVEL, zdict=self.dictionary)
+            else:
+                compressor = zlib.compressobj(ZLIB_LEVEL)
+            payload, codec = compressor.compress(data) + compressor.flush(), b"z"
+
+        if len(payload) + HEADER_SIZE > len(data) * (1 - MIN_SAVINGS):
+            return value
+        return MAGIC + codec + self.dictionary_id.to_bytes(4, "big") + payload
+
+    def decode(self, stored: Union[str, bytes]) -> str:
+        """Return the original string for a value produced by ``encode``."""
+        if isinstance(stored, str):
+            return stored
+        if stored[:2] != MAGIC:
+            raise ValueError("Stored payload has an unknown format")
+
+        codec = stored[2:3]
+        dictionary_id = int.from_bytes(stored[3:HEADER_SIZE], "big")
+        payload = stored[HEADER_SIZE:]
+        if dictionary_id and dictionary_id != self.dictionary_id:
+            raise ValueError("Stored payload was compressed with a different dictionary")
+
+        if codec == b"s":
+            if zstandard is None:
+                raise ValueError("Stored payload is zstd-compressed but zstandard is not installed")
+            dict_data = self._zstd_dict
+            if dictionary_id and dict_data is None:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary)
+            data = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+        elif codec == b"z":
+            decompressor = zlib.decompressobj(zdict=self.dictionary) if dictionary_id else zlib.decompressobj()
+            data = decompressor.decompress(payload) + decompressor.flush()
+        else:
+            raise ValueError(f"Stored payload uses unknown codec {codec!r}")
+        return data.decode("utf-8")
+
+
+def train_dictionary(samples: Iterable[str], size: int = DEFAULT_DICT_SIZE) -> bytes:
+    """
+    Build a shared compression dictionary from typical payloads.
+
+    With zstandard installed this trains a proper zstd dictionary. Otherwise a
+    zlib preset dictionary is assembled from the most frequent JSON fragments
+    of the samples (zlib favours content near the end, so the most common
+    fragments go last). Write the result to a file and point PAL_STORAGE_COMPRESSION_DICT
+    at it.
+
+    Args:
+        samples: Representative payloads, e.g. serialized threads
+        size: Target dictionary size in bytes
+
+    Returns:
+        bytes: Dictionary content
+    """
+    encoded = [sample.encode("utf-8") for sample in samples if sample]
+    if not encoded:
+        raise ValueError("At least one sample is required to train a dictionary")
+
+    if zstandard is not None:
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+
+    # Serialized threads are single-line JSON; split after structural characters
+    # so repeated keys and values ('"role":"assistant",') become fragments
+    counts = Counter(
+        fragment for sample in encoded for fragment in _FRAGMENT_BOUNDARY.split(sample) if len(fragment) > 3
+    )
+    dictionary = b""
+    for fragment, count in counts.most_common():
+        if count < 2 or len(dictionary) + len(fragment) > size:
+            break
+        dictionary = fragment + dictionary
+    return dictionary